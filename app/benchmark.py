@@ -0,0 +1,329 @@
+# End-to-end pipeline benchmark over a corpus of OR problems.
+#
+# The corpus (benchmarks/corpus.jsonl) holds problem statements with their
+# known optimal objective, and benchmarks/recordings/<id>.jsonl the Gemini
+# responses recorded for each problem (see llm_recordings.py). `run_benchmark`
+# runs the whole pipeline for every problem with those responses replayed, so
+# it needs neither network nor API key and gives the same answers every time,
+# and reports for each stage its wall time, CPU time and peak RSS, and for the
+# run stage also the CPU time and peak RSS of the process that ran the code.
+#
+# Every run happens in a fresh interpreter. It runs the problem once to warm up
+# (imports, solver worker, first-call paths), then resets the peak RSS where
+# the platform allows it (Linux) and runs the problem again, measured. A
+# stage's peak RSS is the process's high-water mark when the stage ended.
+#
+# `compare_results` flags stages that got slower or larger than in a baseline
+# by more than a relative threshold and a noise floor, and problems that no
+# longer reach their objective. `main bench` runs both.
+
+import json
+import logging
+import math
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(os.path.dirname(APP_DIR), "benchmarks")
+DEFAULT_CORPUS = os.path.join(BENCHMARK_DIR, "corpus.jsonl")
+DEFAULT_RECORDINGS = os.path.join(BENCHMARK_DIR, "recordings")
+
+# Pipeline stages in the order they run (see main.run_pipeline), and the whole run
+STAGES = ("optimize", "parse", "formulate", "render", "generate_code", "run", "validate", "total")
+METRICS = ("wall_seconds", "cpu_seconds", "peak_rss_kb", "child_cpu_seconds", "child_peak_rss_kb")
+
+DEFAULT_RUNS = 3
+DEFAULT_TIMEOUT = 60
+DEFAULT_THRESHOLD = 0.10
+# Changes smaller than these are noise, whatever the ratio
+NOISE_FLOORS = {"wall_seconds": 0.010, "cpu_seconds": 0.010, "peak_rss_kb": 2048,
+                "child_cpu_seconds": 0.010, "child_peak_rss_kb": 2048}
+
+_OBJECTIVE = re.compile(r"Objective Value:\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)")
+
+
+def read_corpus(path: str = DEFAULT_CORPUS, problem_ids=None) -> list:
+    """
+    Reads the corpus: one JSON object per line with 'id', 'problem_statement' and
+    'expected_objective' (the same format `main batch` reads).
+
+    Args:
+        path: The corpus file
+        problem_ids: Only these problems, in corpus order (default: all)
+
+    Returns:
+        list: The problems' dicts
+    """
+    problems = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                problem = json.loads(line)
+            except ValueError:
+                raise ValueError(f"{path}:{line_number}: expected a JSON object per line")
+            if not problem.get("id") or not problem.get("problem_statement"):
+                raise ValueError(f"{path}:{line_number}: 'id' and 'problem_statement' are required")
+            problems.append(problem)
+    if problem_ids:
+        unknown = set(problem_ids) - {problem["id"] for problem in problems}
+        if unknown:
+            raise ValueError(f"Not in the corpus: {', '.join(sorted(unknown))}")
+        problems = [problem for problem in problems if problem["id"] in problem_ids]
+    return problems
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the process's peak RSS to its current RSS (Linux only); False where it cannot."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _measure_in_child(spec_path: str):
+    """Body of the measuring interpreter: warm up, run the problem measured, write the outcome."""
+    with open(spec_path, encoding="utf-8") as f:
+        spec = json.load(f)
+    import llm_recordings
+    from main import run_pipeline
+    from solver_pool import shutdown_solver_pool
+
+    options = {"timeout": spec["timeout"], "candidates": 1}
+    try:
+        run_pipeline(spec["problem_statement"], **options)
+        llm_recordings.reset()
+        rss_reset = _reset_peak_rss()
+        result = run_pipeline(spec["problem_statement"], **options)
+    finally:
+        shutdown_solver_pool()
+    execution = result["execution"] or {}
+    replay = llm_recordings.stats().get(spec["recordings"], {})
+    outcome = {
+        "failed_stage": result["failed_stage"],
+        "error": result["error"],
+        "generator": result["generator"],
+        "output": execution.get("output"),
+        "timings": result["timings"],
+        "resources": result["resources"],
+        "total_seconds": result["total_seconds"],
+        "rss_reset": rss_reset,
+        "replay_misses": replay.get("misses", 0),
+    }
+    with open(spec["output_path"], "w", encoding="utf-8") as f:
+        json.dump(outcome, f, default=str)
+
+
+def _run_once(problem: dict, recordings: str, timeout: float) -> dict:
+    """Runs one problem in a fresh interpreter; returns what `_measure_in_child` wrote."""
+    with tempfile.TemporaryDirectory(prefix="auto-modeler-bench-") as directory:
+        spec_path = os.path.join(directory, "spec.json")
+        output_path = os.path.join(directory, "outcome.json")
+        with open(spec_path, "w", encoding="utf-8") as f:
+            json.dump({"problem_statement": problem["problem_statement"], "recordings": recordings,
+                       "timeout": timeout, "output_path": output_path}, f)
+        environment = dict(
+            os.environ,
+            LLM_PROVIDER="replay",
+            LLM_RECORDINGS=recordings,
+            LLM_CACHE_ENABLED="false",
+            SOLVE_CACHE_ENABLED="false",
+            LLM_CACHE_PATH=os.path.join(directory, "cache.sqlite3"),
+            SOLVER_POOL_SIZE="1",
+        )
+        completed = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", "import sys, benchmark; benchmark._measure_in_child(sys.argv[1])",
+             spec_path],
+            cwd=APP_DIR, env=environment, capture_output=True, text=True, timeout=4 * timeout + 60,
+        )
+        if completed.returncode != 0 or not os.path.exists(output_path):
+            raise RuntimeError(f"Benchmark of {problem['id']} failed:\n{completed.stderr[-2000:]}")
+        with open(output_path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _median(values: list):
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 4) if values else None
+
+
+def _stage_metrics(outcomes: list) -> dict:
+    """Per stage, the median of each metric over the runs."""
+    stages = {}
+    for stage in STAGES:
+        samples = {metric: [] for metric in METRICS}
+        for outcome in outcomes:
+            if stage == "total":
+                samples["wall_seconds"].append(outcome["total_seconds"])
+                continue
+            if stage not in outcome["timings"]:
+                continue
+            resources = outcome["resources"].get(stage, {})
+            samples["wall_seconds"].append(outcome["timings"][stage])
+            samples["cpu_seconds"].append(resources.get("cpu_seconds"))
+            samples["peak_rss_kb"].append(resources.get("max_rss_kb"))
+            samples["child_cpu_seconds"].append(resources.get("child_cpu_seconds"))
+            samples["child_peak_rss_kb"].append(resources.get("child_max_rss_kb"))
+        metrics = {metric: _median(values) for metric, values in samples.items()}
+        metrics = {metric: value for metric, value in metrics.items() if value is not None}
+        if metrics:
+            stages[stage] = metrics
+    return stages
+
+
+def _objective(output: str):
+    match = _OBJECTIVE.search(output or "")
+    return float(match.group(1)) if match else None
+
+
+def benchmark_problem(problem: dict, recordings_dir: str = DEFAULT_RECORDINGS, runs: int = DEFAULT_RUNS,
+                      timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """
+    Runs one corpus problem `runs` times, each in a fresh interpreter, with its recorded responses.
+
+    Returns:
+        dict: 'ok' (every run finished and reached the expected objective), 'failed_stage' and
+              'error' (of the first failed run), 'generator', 'objective', 'expected_objective',
+              'replay_misses' (prompts answered by a stale recording, see llm_recordings.py),
+              'rss_reset' and 'stages': per stage, the median over the runs of 'wall_seconds',
+              'cpu_seconds' and 'peak_rss_kb', and for 'run' 'child_cpu_seconds' and
+              'child_peak_rss_kb'. The 'total' stage is the whole pipeline's wall time.
+    """
+    recordings = os.path.join(recordings_dir, f"{problem['id']}.jsonl")
+    if not os.path.exists(recordings):
+        raise FileNotFoundError(f"No recorded responses for {problem['id']}: {recordings}")
+    outcomes = [_run_once(problem, recordings, timeout) for _ in range(max(1, runs))]
+    failed = next((outcome for outcome in outcomes if outcome["failed_stage"]), None)
+    objective = _objective(outcomes[-1]["output"])
+    expected = problem.get("expected_objective")
+    reached = [_objective(outcome["output"]) for outcome in outcomes]
+    objective_ok = expected is None or all(
+        value is not None and math.isclose(value, expected, rel_tol=1e-6, abs_tol=1e-6) for value in reached)
+    return {
+        "ok": failed is None and objective_ok,
+        "failed_stage": failed["failed_stage"] if failed else None,
+        "error": failed["error"] if failed else None,
+        "generator": outcomes[-1]["generator"],
+        "objective": objective,
+        "expected_objective": expected,
+        "replay_misses": max(outcome["replay_misses"] for outcome in outcomes),
+        "rss_reset": all(outcome["rss_reset"] for outcome in outcomes),
+        "stages": _stage_metrics(outcomes),
+    }
+
+
+def run_benchmark(corpus: str = DEFAULT_CORPUS, recordings_dir: str = DEFAULT_RECORDINGS, problem_ids=None,
+                  runs: int = DEFAULT_RUNS, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """
+    Benchmarks the pipeline on every corpus problem (or those in `problem_ids`).
+
+    Returns:
+        dict: 'created' (UTC, ISO 8601), 'environment' (python, platform, cpus), 'runs',
+              'seconds' (the benchmark's own wall time) and 'problems': id -> benchmark_problem
+    """
+    started = time.perf_counter()
+    problems = {}
+    for problem in read_corpus(corpus, problem_ids):
+        logger.info(f"Benchmarking {problem['id']} ({runs} runs)...")
+        problems[problem["id"]] = benchmark_problem(problem, recordings_dir, runs, timeout)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "runs": runs,
+        "seconds": round(time.perf_counter() - started, 3),
+        "problems": problems,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """
+    Compares two `run_benchmark` results problem by problem and stage by stage.
+
+    A metric regressed when it grew by more than `threshold` (relative) and by more than
+    its noise floor (NOISE_FLOORS); it improved when it shrank by as much.
+
+    Returns:
+        dict: 'regressions' and 'improvements' (each a list of 'problem', 'stage', 'metric',
+              'baseline', 'current' and 'change', the relative change), 'failures' (problems
+              that were ok in the baseline and are not now), 'missing' (baseline problems not
+              in `current`, e.g. because only some were run) and 'threshold'
+    """
+    regressions, improvements, failures, missing = [], [], [], []
+    for problem_id, before in baseline["problems"].items():
+        after = current["problems"].get(problem_id)
+        if after is None:
+            missing.append(problem_id)
+            continue
+        if before["ok"] and not after["ok"]:
+            failures.append(problem_id)
+        for stage in STAGES:
+            for metric in METRICS:
+                old = before["stages"].get(stage, {}).get(metric)
+                new = after["stages"].get(stage, {}).get(metric)
+                if old is None or new is None or abs(new - old) <= NOISE_FLOORS[metric]:
+                    continue
+                change = (new - old) / old if old else math.inf
+                entry = {"problem": problem_id, "stage": stage, "metric": metric, "baseline": old,
+                         "current": new, "change": round(change, 4)}
+                if change > threshold:
+                    regressions.append(entry)
+                elif change < -threshold:
+                    improvements.append(entry)
+    return {"regressions": regressions, "improvements": improvements, "failures": failures,
+            "missing": missing, "threshold": threshold}
+
+
+def _format_value(metric: str, value) -> str:
+    if value is None:
+        return "-"
+    if metric.endswith("_kb"):
+        return f"{value / 1024:.1f}MB"
+    return f"{value * 1000:.1f}ms"
+
+
+def format_results(results: dict) -> str:
+    """Renders benchmark results as one small table per problem."""
+    blocks = []
+    for problem_id, problem in results["problems"].items():
+        outcome = "ok" if problem["ok"] else f"FAILED {problem['failed_stage'] or 'objective'}"
+        header = (f"{problem_id}: {outcome}, objective {problem['objective']} "
+                  f"(expected {problem['expected_objective']}), {problem['generator']} code, "
+                  f"median of {results['runs']}")
+        if problem["replay_misses"]:
+            header += f", {problem['replay_misses']} stale recordings"
+        lines = [header, f"  {'stage':<14}{'wall':>10}{'cpu':>10}{'peak rss':>10}{'child cpu':>11}{'child rss':>11}"]
+        for stage, metrics in problem["stages"].items():
+            lines.append(f"  {stage:<14}" + "".join(
+                f"{_format_value(metric, metrics.get(metric)):>{width}}"
+                for metric, width in zip(METRICS, (10, 10, 10, 11, 11))))
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def format_comparison(comparison: dict) -> str:
+    """Renders a comparison as one line per regression, improvement and failure."""
+    lines = [f"Compared with the baseline (threshold {comparison['threshold']:.0%}):"]
+    for kind, entries in (("REGRESSION", comparison["regressions"]), ("improvement", comparison["improvements"])):
+        for entry in entries:
+            lines.append(f"  {kind} {entry['problem']}/{entry['stage']} {entry['metric']}: "
+                         f"{_format_value(entry['metric'], entry['baseline'])} -> "
+                         f"{_format_value(entry['metric'], entry['current'])} ({entry['change']:+.0%})")
+    for problem_id in comparison["failures"]:
+        lines.append(f"  FAILURE {problem_id} no longer reaches its expected objective")
+    for problem_id in comparison["missing"]:
+        lines.append(f"  missing {problem_id}")
+    if len(lines) == 1:
+        lines.append("  no changes beyond the threshold")
+    return "\n".join(lines)
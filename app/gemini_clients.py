@@ -0,0 +1,182 @@
+# Per-API-key Gemini clients, shared by every call site.
+#
+# google.generativeai keeps a single process-wide client configuration, and
+# `genai.configure(api_key=...)` replaces it for every thread at once: two
+# requests made with different session keys could each end up sending the
+# other's key. Nothing here touches that global configuration. Each API key
+# gets its own GenerativeServiceClient, created with the key in its client
+# options, and the models handed out carry that client. A client holds one
+# gRPC channel, which is reused (and multiplexed) by every model and request
+# for the same key instead of being set up per call.
+#
+# Entries are keyed by a hash of the key, never the key itself, and are dropped
+# once they have not been used for GEMINI_CLIENT_IDLE_SECONDS. A dropped client
+# is not closed explicitly, since a request that took it just before may still
+# be streaming from it; its channel closes when the last reference goes.
+#
+# `validate_key` checks a key with a metadata call (models.get) rather than a
+# generation, and remembers keys that passed for GEMINI_KEY_VALIDATION_TTL
+# seconds, so logging in again with a known-good key makes no network call.
+# Validated keys are held only as an HMAC under a salt generated per process.
+#
+# google.generativeai is imported on first use: it takes most of the time of
+# importing the web app, and workers that never call Gemini should not pay it.
+#
+# This is the "gemini" provider; call sites go through llm_provider.py, which
+# may send their requests elsewhere.
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_SECONDS = 900
+DEFAULT_VALIDATION_TTL = 3600
+VALIDATION_TIMEOUT = 10
+
+_lock = threading.Lock()
+_clients = {}  # key hash -> [client, last used]
+_models = {}  # (key hash, model name, generation config) -> [model, last used]
+_SALT = os.urandom(16)
+_validated = {}  # salted key hash -> time the key was last found valid
+
+
+def key_fingerprint(api_key: str) -> str:
+    """A stable, non-reversible identifier for an API key ("" when there is none)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else ""
+
+
+def _idle_seconds() -> float:
+    return float(os.getenv("GEMINI_CLIENT_IDLE_SECONDS", DEFAULT_IDLE_SECONDS))
+
+
+def _config_key(generation_config: dict) -> str:
+    return json.dumps(generation_config or {}, sort_keys=True, default=str)
+
+
+def _evict_idle(now: float):
+    """Drops entries idle for longer than the limit. Must be called with the lock held."""
+    cutoff = now - _idle_seconds()
+    for registry in (_models, _clients):
+        for key in [key for key, (_, used) in registry.items() if used < cutoff]:
+            del registry[key]
+
+
+def _client_for(api_key: str, fingerprint: str, now: float):
+    """The shared client for a key, created on first use. Must be called with the lock held."""
+    entry = _clients.get(fingerprint)
+    if entry is None:
+        import google.ai.generativelanguage as glm
+        client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        entry = _clients[fingerprint] = [client, now]
+    entry[1] = now
+    return entry[0]
+
+
+def get_model(api_key: str = None, model_name: str = None, generation_config: dict = None):
+    """
+    Returns a GenerativeModel that sends `api_key` and nothing else.
+
+    Models are reused for the same (key, model name, generation config), and all
+    models for one key share a client. Safe to call from any thread.
+
+    Args:
+        api_key: The key to call Gemini with; GEMINI_API_KEY is used when it is empty
+        model_name: The Gemini model
+        generation_config: The generation config the model is created with
+
+    Returns:
+        GenerativeModel: A model bound to the key's client. Without any key the model is
+        left to google.generativeai's own defaults (which read GOOGLE_API_KEY).
+    """
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    fingerprint = key_fingerprint(api_key)
+    registry_key = (fingerprint, model_name, _config_key(generation_config))
+    now = time.monotonic()
+    with _lock:
+        _evict_idle(now)
+        entry = _models.get(registry_key)
+        if entry is None:
+            import google.generativeai as genai
+            model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+            if api_key:
+                model._client = _client_for(api_key, fingerprint, now)
+            entry = _models[registry_key] = [model, now]
+        elif api_key:
+            _clients[fingerprint][1] = now
+        entry[1] = now
+        return entry[0]
+
+
+def _salted_hash(api_key: str) -> str:
+    return hmac.new(_SALT, api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _validation_ttl() -> float:
+    return float(os.getenv("GEMINI_KEY_VALIDATION_TTL", DEFAULT_VALIDATION_TTL))
+
+
+def validate_key(api_key: str, model_name: str, use_cache: bool = True) -> dict:
+    """
+    Checks that Gemini accepts a key, without generating anything.
+
+    A key that passed within the last GEMINI_KEY_VALIDATION_TTL seconds is accepted
+    from memory. Otherwise the model's metadata is fetched with the key, which costs
+    no generation quota. Rejected keys are not remembered.
+
+    Args:
+        api_key: The key to check
+        model_name: A model the key must be able to see
+        use_cache: Whether a recent successful validation may be reused
+
+    Returns:
+        dict: 'valid' (bool), 'cached' (whether no call was made) and 'error' (str or None)
+    """
+    salted = _salted_hash(api_key)
+    now = time.monotonic()
+    ttl = _validation_ttl()
+    with _lock:
+        for key in [key for key, checked in _validated.items() if checked < now - ttl]:
+            del _validated[key]
+        if use_cache and salted in _validated:
+            return {"valid": True, "cached": True, "error": None}
+    try:
+        import google.ai.generativelanguage as glm
+        client = glm.ModelServiceClient(client_options={"api_key": api_key})
+        client.get_model(name=f"models/{model_name}", timeout=VALIDATION_TIMEOUT)
+    except Exception as e:
+        with _lock:
+            _validated.pop(salted, None)
+        forget(api_key)
+        return {"valid": False, "cached": False, "error": str(e)}
+    with _lock:
+        _validated[salted] = time.monotonic()
+    return {"valid": True, "cached": False, "error": None}
+
+
+def forget(api_key: str):
+    """Drops the client and models of a key, e.g. after Gemini rejected it."""
+    fingerprint = key_fingerprint(api_key)
+    with _lock:
+        _clients.pop(fingerprint, None)
+        for key in [key for key in _models if key[0] == fingerprint]:
+            del _models[key]
+
+
+def clear():
+    """Drops every client and model, and forgets which keys were validated."""
+    with _lock:
+        _clients.clear()
+        _models.clear()
+        _validated.clear()
+
+
+def stats() -> dict:
+    """How many clients and models are currently held."""
+    with _lock:
+        return {"clients": len(_clients), "models": len(_models)}
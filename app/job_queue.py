@@ -0,0 +1,294 @@
+# Persistent queue of long-running solve and pipeline jobs.
+#
+# `POST /jobs` stores a job here and returns at once; `python app/main.py worker`
+# runs the processes that claim queued jobs, run them and store the result,
+# which `GET /jobs/<id>` then reads. The queue is a SQLite file (like the
+# response and solve caches), so web workers can be restarted or recycled
+# without losing jobs, and any number of processes on the machine can share it.
+#
+# A running job's worker refreshes a heartbeat. When a worker dies, its job's
+# heartbeat goes stale and the job is queued again, up to JOB_MAX_ATTEMPTS runs
+# in total. A job that used all of its attempts is marked failed.
+#
+# Pipeline jobs need the submitter's Gemini API key. It is kept in its own
+# column only while the job is pending or running, and is erased when the job ends.
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "auto-modeler", "jobs.sqlite3"
+)
+DEFAULT_TIME_LIMIT = 300
+DEFAULT_MAX_TIME_LIMIT = 3600
+DEFAULT_MAX_ATTEMPTS = 2
+DEFAULT_STALE_SECONDS = 60
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600
+HEARTBEAT_SECONDS = 10
+
+JOB_KINDS = ("solve", "pipeline")
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueue:
+    """
+    Jobs in a SQLite table, claimed oldest first.
+
+    Like ResponseCache, the database is opened per call, so one file can be shared
+    by threads and processes; claiming a job is a single write transaction.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 stale_seconds: float = DEFAULT_STALE_SECONDS,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.stale_seconds = stale_seconds
+        self.retention_seconds = retention_seconds
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    " id TEXT PRIMARY KEY,"
+                    " kind TEXT NOT NULL,"
+                    " payload TEXT NOT NULL,"
+                    " api_key TEXT,"
+                    " status TEXT NOT NULL,"
+                    " time_limit REAL NOT NULL,"
+                    " attempts INTEGER NOT NULL DEFAULT 0,"
+                    " worker TEXT,"
+                    " created_at REAL NOT NULL,"
+                    " started_at REAL,"
+                    " heartbeat_at REAL,"
+                    " finished_at REAL,"
+                    " result TEXT,"
+                    " error TEXT)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at)")
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def submit(self, kind: str, payload: dict, time_limit: float, api_key: str = None) -> str:
+        """Queues a job and returns its id. Finished jobs past the retention period are dropped."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind {kind!r}; expected one of {', '.join(JOB_KINDS)}")
+        self._ensure_schema()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, api_key, status, time_limit, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), api_key, QUEUED, float(time_limit), now),
+            )
+            if self.retention_seconds:
+                conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                             (DONE, FAILED, now - self.retention_seconds))
+        finally:
+            conn.close()
+        return job_id
+
+    def get(self, job_id: str):
+        """
+        Returns a job as a dict ('id', 'kind', 'status', 'time_limit', 'attempts',
+        'created_at', 'started_at', 'finished_at', 'result', 'error', and 'position'
+        in the queue while it is queued), or None if there is no such job.
+        """
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, kind, status, time_limit, attempts, created_at, started_at, finished_at,"
+                " result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(zip(("id", "kind", "status", "time_limit", "attempts", "created_at",
+                            "started_at", "finished_at", "result", "error"), row))
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+            if job["status"] == QUEUED:
+                job["position"] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at <= ?",
+                    (QUEUED, job["created_at"]),
+                ).fetchone()[0]
+            return job
+        finally:
+            conn.close()
+
+    def _requeue_stale(self, conn: sqlite3.Connection, now: float):
+        """Queues the jobs of workers that stopped sending heartbeats, or fails them when out of attempts."""
+        cutoff = now - self.stale_seconds
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ? AND attempts < ?",
+            (QUEUED, RUNNING, cutoff, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, api_key = NULL, finished_at = ?, error = ?"
+            " WHERE status = ? AND heartbeat_at < ?",
+            (FAILED, now, f"The worker stopped responding ({self.max_attempts} attempts).", RUNNING, cutoff),
+        )
+
+    def claim(self, worker: str = None):
+        """
+        Marks the oldest queued job as running and returns it as a dict with 'id', 'kind',
+        'payload', 'api_key', 'time_limit' and 'attempts', or None when nothing is queued.
+        """
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(conn, now)
+                row = conn.execute(
+                    "SELECT id, kind, payload, api_key, time_limit, attempts FROM jobs"
+                    " WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ?,"
+                        " attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, worker, now, now, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "payload": json.loads(row[2]), "api_key": row[3],
+                "time_limit": row[4], "attempts": row[5] + 1}
+
+    def heartbeat(self, job_id: str, worker: str = None):
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ? AND worker IS ?",
+                         (time.time(), job_id, RUNNING, worker))
+        finally:
+            conn.close()
+
+    def _finish(self, job_id: str, worker: str, status: str, result=None, error: str = None):
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, api_key = NULL, finished_at = ?, result = ?, error = ?"
+                " WHERE id = ? AND status = ? AND worker IS ?",
+                (status, time.time(), json.dumps(result, default=str) if result is not None else None,
+                 error, job_id, RUNNING, worker),
+            )
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, result, worker: str = None):
+        """Stores a job's result. Does nothing if the job was handed to another worker meanwhile."""
+        self._finish(job_id, worker, DONE, result=result)
+
+    def fail(self, job_id: str, error: str, worker: str = None):
+        self._finish(job_id, worker, FAILED, error=error)
+
+    def run(self, job: dict, handler, worker: str = None):
+        """Runs a claimed job through `handler(job) -> result`, sending heartbeats meanwhile."""
+        finished = threading.Event()
+
+        def beat():
+            while not finished.wait(HEARTBEAT_SECONDS):
+                try:
+                    self.heartbeat(job["id"], worker)
+                except Exception as e:
+                    logger.warning(f"Heartbeat for job {job['id']} failed: {e}")
+
+        threading.Thread(target=beat, daemon=True).start()
+        try:
+            result = handler(job)
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}", exc_info=True)
+            self.fail(job["id"], str(e), worker)
+        else:
+            self.complete(job["id"], result, worker)
+        finally:
+            finished.set()
+
+    def work(self, handler, stop: threading.Event, worker: str = None, poll_interval: float = 1.0):
+        """Claims and runs jobs until `stop` is set; the job in progress is finished first."""
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        while not stop.is_set():
+            job = self.claim(worker)
+            if job is None:
+                stop.wait(poll_interval)
+                continue
+            logger.info(f"Running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+            self.run(job, handler, worker)
+
+    def stats(self) -> dict:
+        """Number of jobs per status."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        finally:
+            conn.close()
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
+
+
+def time_limit_for(requested: float = None) -> float:
+    """
+    The solver time limit for a job: the requested one, else JOB_TIME_LIMIT (default
+    SOLVER_TIMEOUT). Raises ValueError when it is not positive or above JOB_MAX_TIME_LIMIT.
+    """
+    if requested is None:
+        requested = float(os.getenv("JOB_TIME_LIMIT", os.getenv("SOLVER_TIMEOUT", DEFAULT_TIME_LIMIT)))
+    maximum = float(os.getenv("JOB_MAX_TIME_LIMIT", DEFAULT_MAX_TIME_LIMIT))
+    if not 0 < requested <= maximum:
+        raise ValueError(f"time_limit must be between 0 and {maximum:g} seconds")
+    return float(requested)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Returns the process-wide job queue configured from the environment."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(
+                    path=os.path.expanduser(os.getenv("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH)),
+                    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+                    stale_seconds=float(os.getenv("JOB_STALE_SECONDS", DEFAULT_STALE_SECONDS)),
+                    retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", DEFAULT_RETENTION_SECONDS)),
+                )
+    return _job_queue
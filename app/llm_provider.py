@@ -0,0 +1,249 @@
+# The provider interface every Gemini call site goes through.
+#
+# Call sites get their models from `get_model` and check users' keys with
+# `validate_key`; LLM_PROVIDER decides who answers:
+#
+#   gemini  - Google's API, through the per-key clients of gemini_clients.py (default)
+#   record  - Gemini, with every exchange appended to LLM_RECORDINGS
+#   replay  - answers from LLM_RECORDINGS only; nothing leaves the process
+#             (llm_recordings.py; LLM_RECORDINGS_STRICT=true fails on unrecorded prompts)
+#   http    - the local stand-in server at LLM_STANDIN_URL (llm_standin.py), which
+#             serves canned or templated answers with configurable latency and errors
+#
+# Providers hand out models with Gemini's `generate_content(prompt, stream=False)`,
+# returning a response with `.text` (an iterator of them when streaming); that is
+# all response_cache.py reads, so the response cache, streaming and every call
+# site behave the same whichever provider answers.
+#
+# The time spent inside generate_content is counted per process (`stats`), and
+# with the tokens of each exchange in the LLM metrics (see metrics.py). Run
+# against replay or the stand-in, a request's duration minus that time is our
+# own overhead; against the stand-in with a fixed latency, the model's share is
+# known exactly.
+
+import abc
+import logging
+import math
+import os
+import threading
+import time
+
+import metrics
+from response_cache import extract_response_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER = "gemini"
+
+_lock = threading.Lock()
+_stats = {"calls": 0, "errors": 0, "seconds": 0.0}
+
+
+class Provider(abc.ABC):
+    """Where Gemini requests go. Subclasses implement `model` and, if keys mean anything to them, `validate_key`."""
+
+    # Whether call sites need an API key before they may call the provider
+    requires_key = True
+
+    @abc.abstractmethod
+    def model(self, api_key: str, model_name: str, generation_config: dict = None):
+        """A model with Gemini's generate_content(prompt, stream=False) for `model_name`."""
+
+    def validate_key(self, api_key: str, model_name: str, use_cache: bool = True) -> dict:
+        return {"valid": True, "cached": True, "error": None}
+
+
+class GeminiProvider(Provider):
+    """Google's Gemini API."""
+
+    def model(self, api_key, model_name, generation_config=None):
+        from gemini_clients import get_model as gemini_model
+        return gemini_model(api_key, model_name, generation_config)
+
+    def validate_key(self, api_key, model_name, use_cache=True):
+        from gemini_clients import validate_key as validate_gemini_key
+        return validate_gemini_key(api_key, model_name, use_cache)
+
+
+class RecordProvider(GeminiProvider):
+    """Gemini, recording every exchange to LLM_RECORDINGS."""
+
+    def model(self, api_key, model_name, generation_config=None):
+        from llm_recordings import RecordingModel
+        return RecordingModel(super().model(api_key, model_name, generation_config), _recordings(),
+                              model_name, generation_config)
+
+
+class ReplayProvider(Provider):
+    """Answers recorded in LLM_RECORDINGS; no network."""
+
+    requires_key = False
+
+    def model(self, api_key, model_name, generation_config=None):
+        from llm_recordings import ReplayModel
+        strict = os.getenv("LLM_RECORDINGS_STRICT", "false").lower() == "true"
+        return ReplayModel(_recordings(), model_name, generation_config, strict)
+
+
+class HTTPProvider(Provider):
+    """The local stand-in server at LLM_STANDIN_URL."""
+
+    requires_key = False
+
+    def model(self, api_key, model_name, generation_config=None):
+        from llm_standin import StandInModel
+        return StandInModel(_standin_url(), model_name, generation_config, _standin_timeout())
+
+    def validate_key(self, api_key, model_name, use_cache=True):
+        from llm_standin import check_model
+        try:
+            check_model(_standin_url(), model_name, _standin_timeout())
+        except Exception as e:
+            return {"valid": False, "cached": False, "error": str(e)}
+        return {"valid": True, "cached": False, "error": None}
+
+
+# name -> provider
+PROVIDERS = {"gemini": GeminiProvider(), "record": RecordProvider(), "replay": ReplayProvider(),
+             "http": HTTPProvider()}
+
+
+def register_provider(name: str, provider: Provider):
+    """Adds (or replaces) a provider, selectable with LLM_PROVIDER=<name>."""
+    PROVIDERS[name] = provider
+
+
+def _recordings():
+    from llm_recordings import get_recordings
+    path = os.getenv("LLM_RECORDINGS")
+    if not path:
+        raise ValueError(f"LLM_PROVIDER={provider_name()} needs LLM_RECORDINGS, the recordings file")
+    return get_recordings(os.path.expanduser(path))
+
+
+def _standin_url() -> str:
+    from llm_standin import DEFAULT_URL
+    return os.getenv("LLM_STANDIN_URL") or DEFAULT_URL
+
+
+def _standin_timeout() -> float:
+    from llm_standin import DEFAULT_TIMEOUT
+    return float(os.getenv("LLM_STANDIN_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def provider_name() -> str:
+    """The provider LLM_PROVIDER selects."""
+    return (os.getenv("LLM_PROVIDER") or DEFAULT_PROVIDER).lower()
+
+
+def get_provider() -> Provider:
+    """The provider LLM_PROVIDER selects; raises ValueError for unknown names."""
+    name = provider_name()
+    provider = PROVIDERS.get(name)
+    if provider is None:
+        raise ValueError(f"LLM_PROVIDER must be one of {', '.join(PROVIDERS)}, not {name!r}")
+    return provider
+
+
+def key_required() -> bool:
+    """Whether call sites need an API key to use the current provider (unknown ones fail when used instead)."""
+    provider = PROVIDERS.get(provider_name())
+    return provider is None or provider.requires_key
+
+
+def get_model(api_key: str = None, model_name: str = None, generation_config: dict = None):
+    """
+    Returns a model from the current provider, for response_cache.cached_generate and friends.
+
+    Args:
+        api_key: The key to call Gemini with (the gemini and record providers fall back to GEMINI_API_KEY)
+        model_name: The Gemini model
+        generation_config: The generation config, which is also part of every lookup key
+
+    Returns:
+        A model with generate_content(prompt, stream=False), timed into `stats` and the LLM metrics
+    """
+    return _TimedModel(get_provider().model(api_key, model_name, generation_config), provider_name(), model_name)
+
+
+def validate_key(api_key: str, model_name: str, use_cache: bool = True) -> dict:
+    """
+    Checks that the current provider accepts a key, without generating anything.
+
+    Returns:
+        dict: 'valid' (bool), 'cached' (whether no call was made) and 'error' (str or None)
+    """
+    return get_provider().validate_key(api_key, model_name, use_cache)
+
+
+class _TimedModel:
+    """Times a model's answers, including every wait for a streamed chunk, and counts their tokens."""
+
+    def __init__(self, model, provider: str, model_name: str):
+        self.model = model
+        self.provider = provider
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt, stream=stream, **kwargs)
+        except Exception:
+            self._answered(time.perf_counter() - started, error=True)
+            raise
+        if stream:
+            return self._timed_chunks(response, prompt, time.perf_counter() - started)
+        self._answered(time.perf_counter() - started)
+        self._count_tokens(prompt, len(extract_response_text(response)), getattr(response, "usage_metadata", None))
+        return response
+
+    def _timed_chunks(self, chunks, prompt: str, waited: float):
+        chunks = iter(chunks)
+        characters = 0
+        usage = None
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                self._answered(waited + time.perf_counter() - started)
+                self._count_tokens(prompt, characters, usage)
+                return
+            except Exception:
+                self._answered(waited + time.perf_counter() - started, error=True)
+                raise
+            waited += time.perf_counter() - started
+            characters += len(extract_response_text(chunk))
+            usage = getattr(chunk, "usage_metadata", None) or usage  # Gemini puts the totals on the last chunk
+            yield chunk
+
+    def _answered(self, seconds: float, error: bool = False):
+        with _lock:
+            _stats["calls"] += 1
+            _stats["errors"] += error
+            _stats["seconds"] += seconds
+        metrics.LLM_REQUEST_SECONDS.observe(seconds, provider=self.provider, model=self.model_name,
+                                            outcome="error" if error else "ok")
+        metrics.record_timing("llm", seconds)
+
+    def _count_tokens(self, prompt: str, response_characters: int, usage):
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) if usage is not None else 0
+        if prompt_tokens:
+            response_tokens, source = getattr(usage, "candidates_token_count", 0) or 0, "reported"
+        else:
+            prompt_tokens = math.ceil(len(prompt) / metrics.TOKEN_CHARS)
+            response_tokens, source = math.ceil(response_characters / metrics.TOKEN_CHARS), "estimated"
+        metrics.LLM_TOKENS.inc(prompt_tokens, model=self.model_name, kind="prompt", source=source)
+        metrics.LLM_TOKENS.inc(response_tokens, model=self.model_name, kind="response", source=source)
+
+
+def stats() -> dict:
+    """The current provider, and the calls made through it in this process and the seconds they took."""
+    with _lock:
+        return {"provider": provider_name(), "calls": _stats["calls"], "errors": _stats["errors"],
+                "seconds": round(_stats["seconds"], 4)}
+
+
+def reset_stats():
+    with _lock:
+        _stats.update(calls=0, errors=0, seconds=0.0)
@@ -0,0 +1,163 @@
+# Recorded Gemini responses, for running the pipeline offline and repeatably.
+#
+# A recordings file (LLM_RECORDINGS) holds JSON Lines, one exchange per line.
+# The record and replay providers (see llm_provider.py) hand out the models
+# below instead of Gemini's:
+#   ReplayModel     - every prompt is answered from the file; nothing is sent anywhere
+#   RecordingModel  - Gemini is called as usual and every exchange is appended to the file
+# The local stand-in server (llm_standin.py) can serve recordings too.
+#
+# An exchange is looked up by the key the response cache uses: the prompt, the
+# model name and the generation config. After a prompt has been edited its key
+# is no longer in the file, so the next unused exchange recorded for the same
+# model is replayed instead and counted as a miss; a benchmark keeps running
+# after a prompt change but reports that it replayed stale answers. With
+# LLM_RECORDINGS_STRICT=true a miss raises RecordingMissing instead.
+
+import json
+import logging
+import os
+import threading
+
+from response_cache import extract_response_text, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Characters of the prompt stored with each exchange, so a recordings file can be read
+PROMPT_HEAD_CHARS = 160
+
+_lock = threading.Lock()
+_recordings = {}  # path -> Recordings
+
+
+class RecordingMissing(LookupError):
+    """Raised when no recorded exchange answers a prompt."""
+
+
+class Recordings:
+    """The exchanges of one recordings file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.exchanges = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        self.exchanges.append(json.loads(line))
+                    except ValueError:
+                        raise ValueError(f"{path}:{line_number}: expected a JSON object per line")
+        self._used = set()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.recorded = 0
+
+    def replay(self, key: str, model_name: str, strict: bool = False) -> str:
+        """
+        The recorded text for `key`; without one (and unless `strict`), the next unused
+        exchange recorded for `model_name`, counted as a miss.
+        """
+        with self._lock:
+            for i, exchange in enumerate(self.exchanges):
+                if exchange["key"] == key:
+                    self._used.add(i)
+                    self.hits += 1
+                    return exchange["text"]
+            self.misses += 1
+            if not strict:
+                for i, exchange in enumerate(self.exchanges):
+                    if i not in self._used and exchange["model"] == model_name:
+                        self._used.add(i)
+                        logger.warning(f"No recording for prompt {key[:12]} to {model_name}; replaying the next "
+                                       f"one recorded for the model ({exchange['key'][:12]}). Re-record {self.path}.")
+                        return exchange["text"]
+        raise RecordingMissing(f"No recorded {model_name} response for prompt {key[:12]} in {self.path}")
+
+    def record(self, key: str, model_name: str, prompt: str, text: str):
+        """Appends an exchange to the file."""
+        exchange = {"key": key, "model": model_name, "prompt_head": prompt.strip()[:PROMPT_HEAD_CHARS], "text": text}
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(exchange) + "\n")
+            self.exchanges.append(exchange)
+            self.recorded += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"path": self.path, "exchanges": len(self.exchanges), "hits": self.hits,
+                    "misses": self.misses, "recorded": self.recorded}
+
+
+class _Response:
+    """The part of a Gemini response the call sites read."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = []
+
+
+class ReplayModel:
+    """Answers generate_content from recordings instead of calling Gemini."""
+
+    def __init__(self, recordings: Recordings, model_name: str, generation_config: dict = None,
+                 strict: bool = False):
+        self.recordings = recordings
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.strict = strict
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        key = make_cache_key(prompt, self.model_name, self.generation_config)
+        response = _Response(self.recordings.replay(key, self.model_name, self.strict))
+        return iter([response]) if stream else response
+
+
+class RecordingModel:
+    """Calls Gemini through `model` and records every exchange."""
+
+    def __init__(self, model, recordings: Recordings, model_name: str, generation_config: dict = None):
+        self.model = model
+        self.recordings = recordings
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        key = make_cache_key(prompt, self.model_name, self.generation_config)
+        response = self.model.generate_content(prompt, stream=stream, **kwargs)
+        if stream:
+            return self._recorded_stream(response, key, prompt)
+        self.recordings.record(key, self.model_name, prompt, extract_response_text(response))
+        return response
+
+    def _recorded_stream(self, chunks, key: str, prompt: str):
+        parts = []
+        for chunk in chunks:
+            parts.append(extract_response_text(chunk))
+            yield chunk
+        self.recordings.record(key, self.model_name, prompt, "".join(parts))
+
+
+def get_recordings(path: str) -> Recordings:
+    """The recordings of a file, loaded once per process."""
+    with _lock:
+        recordings = _recordings.get(path)
+        if recordings is None:
+            recordings = _recordings[path] = Recordings(path)
+        return recordings
+
+
+def stats() -> dict:
+    """Hits, misses and recorded exchanges of every recordings file used in this process."""
+    with _lock:
+        files = list(_recordings.values())
+    return {recordings.path: recordings.stats() for recordings in files}
+
+
+def reset():
+    """Forgets loaded recordings, so they are read again and replayed from the start."""
+    with _lock:
+        _recordings.clear()
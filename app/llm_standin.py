@@ -0,0 +1,297 @@
+# A local HTTP stand-in for Gemini, and the models that talk to it.
+#
+# `main standin` serves generations over plain HTTP (the standard library's
+# http.server, so it needs nothing installed), and LLM_PROVIDER=http points
+# every call site at it (see llm_provider.py). A prompt is answered by:
+#   1. a recorded exchange with the same key (prompt, model name and generation
+#      config), from recordings files written in record mode (llm_recordings.py)
+#   2. the first response rule that matches: rules name a `model` and/or a
+#      `match` regex on the prompt, and their `text` is a string.Template that
+#      may use $model, $prompt_chars, $request and the regex's named groups
+#   3. nothing: 404, which reaches the call site as a StandInError
+# Every answer is delayed by `latency` seconds (plus up to `jitter` either way);
+# streamed answers are sent in `chunk_chars` pieces, `chunk_delay` apart. With
+# `error_rate` set, that share of requests (seeded, so repeatable) fails with
+# `error_status` instead; a rule with a `status` always fails with it.
+#
+# Protocol (ours, not Gemini's):
+#   POST /v1/generate     {"model", "prompt", "generation_config", "stream"}
+#                         -> {"text"}, or one {"text"} JSON line per chunk when streaming
+#   GET  /v1/models/<m>   -> {"name"}; what validate_key calls
+#   GET  /stats           -> requests served, by outcome
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from string import Template
+
+from response_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+DEFAULT_TIMEOUT = 60
+GENERATE_PATH = "/v1/generate"
+MODELS_PATH = "/v1/models/"
+STATS_PATH = "/stats"
+
+
+class StandInError(RuntimeError):
+    """Raised when the stand-in answers with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"LLM stand-in returned {status}: {message}")
+        self.status = status
+
+
+def load_responses(path: str) -> list:
+    """
+    Reads response rules from a JSON file holding a list of rules.
+
+    Args:
+        path: The file
+
+    Returns:
+        list: The rules, as dicts
+    """
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: expected a JSON list of response rules")
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict) or ("text" not in rule and "status" not in rule):
+            raise ValueError(f"{path}: rule {i} needs a 'text' or a 'status'")
+    return rules
+
+
+def load_recorded(paths) -> dict:
+    """Key -> text of every exchange in the recordings files (or directories of them) given."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".jsonl"))
+        else:
+            files.append(path)
+    recorded = {}
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line)
+                    recorded[exchange["key"]] = exchange["text"]
+    return recorded
+
+
+class StandIn:
+    """What the stand-in answers, and how slowly and unreliably."""
+
+    def __init__(self, responses: list = (), recorded: dict = None, latency: float = 0.0, jitter: float = 0.0,
+                 chunk_chars: int = 0, chunk_delay: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 seed: int = None):
+        self.responses = [dict(rule, match=re.compile(rule["match"], re.DOTALL) if rule.get("match") else None)
+                          for rule in responses]
+        self.recorded = recorded or {}
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "recorded": 0, "templated": 0, "errors": 0, "not_found": 0}
+
+    def _draw(self, latency: float) -> tuple:
+        """(request number, whether to inject an error, delay in seconds) for a new request."""
+        with self._lock:
+            self.counts["requests"] += 1
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+            return self.counts["requests"], failed, max(0.0, latency + jitter)
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def _rule_for(self, model_name: str, prompt: str) -> tuple:
+        """The first rule answering the prompt and its regex match, or (None, None)."""
+        for rule in self.responses:
+            if rule.get("model") not in (None, model_name):
+                continue
+            match = rule["match"].search(prompt) if rule["match"] else None
+            if rule["match"] is None or match:
+                return rule, match
+        return None, None
+
+    def answer(self, model_name: str, prompt: str, generation_config: dict = None) -> tuple:
+        """
+        Decides the answer to a generation request.
+
+        Returns:
+            tuple: (HTTP status, text or error message, seconds to wait before answering)
+        """
+        rule, match = self._rule_for(model_name, prompt)
+        request_number, failed, delay = self._draw(rule.get("latency", self.latency) if rule else self.latency)
+        if failed:
+            self._count("errors")
+            return self.error_status, "injected error", delay
+        text = self.recorded.get(make_cache_key(prompt, model_name, generation_config))
+        if text is not None:
+            self._count("recorded")
+            return 200, text, delay
+        if rule is None:
+            self._count("not_found")
+            return 404, f"no response for this {model_name} prompt", delay
+        if rule.get("status"):
+            self._count("errors")
+            return rule["status"], rule.get("text", "error from response rule"), delay
+        fields = dict(match.groupdict(default="") if match else {},
+                      model=model_name, prompt_chars=len(prompt), request=request_number)
+        self._count("templated")
+        return 200, Template(rule["text"]).safe_substitute(fields), delay
+
+    def chunks(self, text: str) -> list:
+        """The pieces a streamed answer is sent in."""
+        if self.chunk_chars <= 0 or not text:
+            return [text]
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+def _handler(stand_in: StandIn):
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == STATS_PATH:
+                self._send_json(200, stand_in.stats())
+            elif self.path.startswith(MODELS_PATH):
+                _, failed, delay = stand_in._draw(stand_in.latency)
+                time.sleep(delay)
+                if failed:
+                    stand_in._count("errors")
+                    self._send_json(stand_in.error_status, {"error": "injected error"})
+                else:
+                    self._send_json(200, {"name": self.path[len(MODELS_PATH):]})
+            else:
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != GENERATE_PATH:
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                status, text, delay = stand_in.answer(request["model"], request["prompt"],
+                                                      request.get("generation_config"))
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {"error": f"bad generation request: {e}"})
+                return
+            time.sleep(delay)
+            if status != 200:
+                self._send_json(status, {"error": text})
+            elif not request.get("stream"):
+                self._send_json(200, {"text": text})
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for i, chunk in enumerate(stand_in.chunks(text)):
+                    if i and stand_in.chunk_delay:
+                        time.sleep(stand_in.chunk_delay)
+                    self.wfile.write(json.dumps({"text": chunk}).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+    return Handler
+
+
+def make_server(stand_in: StandIn, host: str = "127.0.0.1", port: int = 8765):
+    """An HTTP server for the stand-in, one thread per connection; call serve_forever() on it."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _handler(stand_in))
+    server.daemon_threads = True
+    return server
+
+
+def start(stand_in: StandIn, host: str = "127.0.0.1", port: int = 0):
+    """Serves the stand-in from a background thread; returns the server (its URL is server_url(server))."""
+    server = make_server(stand_in, host, port)
+    threading.Thread(target=server.serve_forever, name="llm-standin", daemon=True).start()
+    return server
+
+
+def server_url(server) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+class _Response:
+    """The part of a Gemini response the call sites read."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = []
+
+
+class StandInModel:
+    """Sends generate_content to the stand-in server instead of Gemini."""
+
+    def __init__(self, url: str, model_name: str, generation_config: dict = None, timeout: float = DEFAULT_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.timeout = timeout
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        body = json.dumps({"model": self.model_name, "prompt": prompt,
+                           "generation_config": self.generation_config, "stream": stream}, default=str)
+        response = _open(urllib.request.Request(self.url + GENERATE_PATH, data=body.encode("utf-8"),
+                                                headers={"Content-Type": "application/json"}), self.timeout)
+        if stream:
+            return self._chunks(response)
+        with response:
+            return _Response(json.loads(response.read())["text"])
+
+    def _chunks(self, response):
+        with response:
+            for line in response:
+                if line.strip():
+                    yield _Response(json.loads(line)["text"])
+
+
+def check_model(url: str, model_name: str, timeout: float = DEFAULT_TIMEOUT):
+    """Asks the stand-in for a model's metadata; raises StandInError when it refuses."""
+    with _open(urllib.request.Request(url.rstrip("/") + MODELS_PATH + model_name), timeout):
+        pass
+
+
+def _open(request, timeout: float):
+    try:
+        return urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error", e.reason)
+        except ValueError:
+            message = e.reason
+        raise StandInError(e.code, message) from None
@@ -0,0 +1,143 @@
+# Incremental post-processing of streamed Gemini output.
+#
+# The streaming endpoints forward Gemini's text to the browser as it arrives,
+# but the same cleanup the non-streaming functions apply to the complete text
+# (stripping markdown fences from code, splitting a validation into its
+# sections) has to happen on the fly. The helpers here do that chunk by chunk
+# while guaranteeing that the concatenated output is exactly what the one-shot
+# function produces for the concatenated input.
+
+import json
+
+CODE_FENCE = "```"
+PYTHON_FENCE = "```python"
+
+
+def strip_code_fences(text: str) -> str:
+    """Removes surrounding whitespace and a markdown code fence from a complete response."""
+    cleaned = text.strip()
+    if cleaned.startswith(PYTHON_FENCE):
+        cleaned = cleaned[len(PYTHON_FENCE):].lstrip()
+    elif cleaned.startswith(CODE_FENCE):
+        cleaned = cleaned[len(CODE_FENCE):].lstrip()
+    if cleaned.endswith(CODE_FENCE):
+        cleaned = cleaned[:-len(CODE_FENCE)].rstrip()
+    return cleaned
+
+
+def _trailing_fence_start(text: str) -> int:
+    """Index where the trailing run of whitespace and backticks begins."""
+    end = len(text)
+    while end and (text[end - 1].isspace() or text[end - 1] == "`"):
+        end -= 1
+    return end
+
+
+class CodeFenceStripper:
+    """
+    Streaming counterpart of `strip_code_fences`.
+
+    `feed` returns the part of the cleaned code that is already certain. The
+    opening fence is held back until it can be told apart from code, and a
+    trailing run of whitespace and backticks until the stream ends, since only
+    that run can still be removed as the closing fence.
+    """
+
+    def __init__(self):
+        self._head = ""
+        self._opened = False
+        self._skip_space = False
+        self._tail = ""
+
+    def feed(self, chunk: str) -> str:
+        if not self._opened:
+            self._head += chunk
+            head = self._head.lstrip()
+            if not head or (len(head) < len(PYTHON_FENCE) and PYTHON_FENCE.startswith(head)):
+                return ""  # still could be the opening fence
+            self._opened = True
+            for fence in (PYTHON_FENCE, CODE_FENCE):
+                if head.startswith(fence):
+                    head = head[len(fence):]
+                    self._skip_space = True
+                    break
+            chunk = head
+        if self._skip_space:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return ""
+            self._skip_space = False
+        text = self._tail + chunk
+        cut = _trailing_fence_start(text)
+        self._tail = text[cut:]
+        return text[:cut]
+
+    def finish(self) -> str:
+        if not self._opened:
+            return strip_code_fences(self._head)
+        tail = self._tail.rstrip()
+        if tail.endswith(CODE_FENCE):
+            tail = tail[:-len(CODE_FENCE)].rstrip()
+        self._tail = ""
+        return tail
+
+
+class SectionExtractor:
+    """
+    Splits streamed text into sections introduced by known headings (e.g. "SUGGESTIONS:").
+
+    A section is reported as soon as the heading of the next section has arrived;
+    the last one when the stream ends. Headings may appear in any order and
+    missing ones are skipped.
+    """
+
+    def __init__(self, headings):
+        self._headings = list(headings)  # (name, heading text) pairs
+        self._text = ""
+        self._scanned = 0
+        self._current = None  # (name, offset where its content starts)
+        self._found = set()
+
+    def feed(self, chunk: str) -> list:
+        """Adds a chunk and returns the (name, content) sections it completed."""
+        self._text += chunk
+        completed = []
+        while True:
+            hit = self._next_heading()
+            if hit is None:
+                break
+            name, start, end = hit
+            if self._current is not None:
+                completed.append(self._close(start))
+            self._current = (name, end)
+            self._found.add(name)
+            self._scanned = end
+        longest = max((len(heading) for _, heading in self._headings), default=1)
+        self._scanned = max(self._scanned, len(self._text) - longest + 1)
+        return completed
+
+    def finish(self) -> list:
+        if self._current is None:
+            return []
+        section = self._close(len(self._text))
+        self._current = None
+        return [section]
+
+    def _next_heading(self):
+        best = None
+        for name, heading in self._headings:
+            if name in self._found:
+                continue
+            start = self._text.find(heading, self._scanned)
+            if start != -1 and (best is None or start < best[1]):
+                best = (name, start, start + len(heading))
+        return best
+
+    def _close(self, end: int):
+        name, start = self._current
+        return name, self._text[start:end].strip()
+
+
+def sse_event(event: str, data) -> str:
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,111 @@
+# Closed-loop HTTP load generator for measuring the web app's throughput.
+#
+# `run_load` keeps `concurrency` requests in flight against one endpoint until
+# `requests` have completed and reports throughput and latency percentiles.
+# The scenarios cover the endpoints that work without Gemini, so the numbers
+# describe the server itself rather than the LLM. Used by `main loadtest`.
+
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+SAMPLE_CODE = """import pulp
+model = pulp.LpProblem("product_mix", pulp.LpMaximize)
+chairs = pulp.LpVariable("chairs", 0, cat="Integer")
+tables = pulp.LpVariable("tables", 0, cat="Integer")
+model += 45 * chairs + 80 * tables
+model += 5 * chairs + 20 * tables <= 400, "wood"
+model += 10 * chairs + 15 * tables <= 450, "labour"
+status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+print(f"Status: {pulp.LpStatus[status]}")
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+SAMPLE_OUTPUT = "Status: Optimal\nObjective Value: 2200.0"
+
+# name -> (method, path, form fields)
+SCENARIOS = {
+    "index": ("GET", "/", None),
+    "cache_stats": ("GET", "/cache_stats", None),
+    "run_code": ("POST", "/run_code", {"python_code": SAMPLE_CODE}),
+    "validate_results": ("POST", "/validate_results",
+                         {"problem_statement": "Product mix", "model_plaintext": "",
+                          "python_code": SAMPLE_CODE, "execution_output": SAMPLE_OUTPUT}),
+}
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_load(base_url: str, scenario: str, concurrency: int = 4, requests: int = 100,
+             bypass_cache: bool = False, timeout: float = 600) -> dict:
+    """
+    Sends one scenario's request `requests` times, `concurrency` at a time.
+
+    Args:
+        base_url: Where the app is served, e.g. http://127.0.0.1:5000
+        scenario: One of SCENARIOS
+        concurrency: Requests kept in flight
+        requests: Requests to complete in total
+        bypass_cache: Send bypass_cache=true so every request does the full work
+        timeout: Seconds a single request may take
+
+    Returns:
+        dict: 'scenario', 'concurrency', 'requests', 'errors' (non-2xx or failed requests),
+              'seconds', 'throughput_rps' and latency 'p50_ms', 'p95_ms', 'max_ms'
+    """
+    method, path, fields = SCENARIOS[scenario]
+    data = None
+    if fields is not None:
+        fields = dict(fields, bypass_cache="true" if bypass_cache else "false")
+        data = urllib.parse.urlencode(fields).encode("utf-8")
+    url = base_url.rstrip("/") + path
+
+    remaining = [requests]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method),
+                                            timeout=timeout) as response:
+                    response.read()
+                    failed = not 200 <= response.status < 300
+            except (urllib.error.URLError, OSError):
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(latencies) / seconds, 2) if seconds > 0 else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else 0.0,
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+    }
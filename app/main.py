@@ -1,16 +1,641 @@
 # Main application logic for Auto-Modeler
+#
+# `run_pipeline` runs the whole flow server-side in one call: optimize the
+# problem statement, parse it, formulate the model, generate code, run it and
+# check the solution. Stages that do not depend on each other overlap: the
+# solver pool is started while Gemini is still working on the statement, and
+# the model is rendered to plaintext/LaTeX while code is already being
+# generated from the structured model.
+
+import argparse
+import json
+import logging
+import math
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+
+# Put the 'app' directory on the path, so the modules below import the way they import each other
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from model_formulator import (formulate_model_from_nlp, remember_formulated_model, render_model_latex,
+                              render_model_plaintext)
+from nlp_processor import optimize_problem_statement, parse_problem_statement
+from job_queue import get_job_queue
+from metrics import PIPELINE_STAGE_SECONDS
+from solver_engine import generate_python_code, run_solver_code, run_with_repair
+from solver_pool import get_solver_pool
+from validator import validate_execution_results
+
+logger = logging.getLogger(__name__)
+
+
+def _peak_rss_kb():
+    """The process's peak resident set size so far in kB, or None where it is not available."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def _timed(result: dict, stage: str, fn, *args, **kwargs):
+    """
+    Calls fn and records its wall time in seconds under result['timings'][stage] (and in the
+    stage metrics), and under result['resources'][stage] the CPU seconds of the calling thread
+    and the process's peak RSS when the stage ended.
+    """
+    started = time.perf_counter()
+    cpu_started = time.thread_time()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        result["timings"][stage] = round(time.perf_counter() - started, 4)
+        PIPELINE_STAGE_SECONDS.observe(result["timings"][stage], stage=stage)
+        result["resources"][stage] = {"cpu_seconds": round(time.thread_time() - cpu_started, 4),
+                                      "max_rss_kb": _peak_rss_kb()}
+
+
+def _warm_solver_pool():
+    try:
+        pool = get_solver_pool()
+        if pool is not None:
+            pool.start()
+    except Exception as e:  # the run stage falls back to a fresh interpreter
+        logger.warning(f"Could not start the solver pool ahead of time: {e}")
+
+
+def _render(model_representation) -> tuple:
+    model_plaintext = render_model_plaintext(model_representation)
+    remember_formulated_model(model_plaintext, model_representation)
+    return model_plaintext, render_model_latex(model_representation)
+
+
+def run_pipeline(problem_statement: str, api_key: str = None, use_cache: bool = True,
+                 optimize: bool = True, validate: bool = True, timeout: float = None,
+                 candidates: int = None, repair_iterations: int = None, reasonableness: bool = False,
+                 llm_slots=None, solver_slots=None, solver_options: dict = None) -> dict:
+    """
+    Runs optimize → parse → formulate → generate code → run → validate for one problem.
+
+    Args:
+        problem_statement: The problem statement as written by the user
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response and solve caches
+        optimize: Set to False to parse the statement as given instead of refining it first
+        validate: Set to False to skip checking the solution against the model
+        timeout: Seconds before the solver run is killed. Defaults to SOLVER_TIMEOUT.
+        candidates: Gemini code candidates to race when the model cannot be translated locally
+        repair_iterations: Gemini patches allowed when the code fails (default REPAIR_MAX_ITERATIONS)
+        reasonableness: Whether validation also asks Gemini if the solution makes practical sense
+        llm_slots: Optional context manager (e.g. a Semaphore) held around each Gemini call
+        solver_slots: Optional context manager held around each solver run, speculative candidates' included
+        solver_options: Solver options for the run (threads, timeLimit, gapRel, presolve, warmStart)
+
+    Returns:
+        dict: 'optimized_statement', 'model_plaintext', 'model_latex', 'python_code',
+              'generator', 'fallback_reason', 'execution' (as returned by run_with_repair; its
+              'python_code' is what 'python_code' is updated to when a repair succeeded),
+              'validation' (as returned by validate_execution_results, or None), 'error' and
+              'failed_stage' (None on success), 'timings' (seconds per stage), 'resources' (per
+              stage: 'cpu_seconds' of the thread that ran it and the process's 'max_rss_kb' when it
+              ended; the run stage adds 'child_cpu_seconds' and 'child_max_rss_kb' of the process
+              that ran the code) and 'total_seconds'.
+              Stages after a failed one are not run and keep their None values.
+    """
+    started = time.perf_counter()
+    timings = {}
+    result = {
+        "problem_statement": problem_statement,
+        "optimized_statement": None,
+        "model_plaintext": None,
+        "model_latex": None,
+        "python_code": None,
+        "generator": None,
+        "fallback_reason": None,
+        "execution": None,
+        "validation": None,
+        "error": None,
+        "failed_stage": None,
+        "timings": timings,
+        "resources": {},
+    }
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="pipeline") as executor:
+        executor.submit(_warm_solver_pool)
+        try:
+            _run_stages(result, executor, api_key, use_cache, optimize, validate, timeout, candidates,
+                        repair_iterations, reasonableness, llm_slots or nullcontext(),
+                        solver_slots or nullcontext(), solver_options)
+        except Exception as e:
+            logger.error(f"Pipeline failed: {e}", exc_info=True)
+            result["error"] = str(e)
+            result["failed_stage"] = result["failed_stage"] or "pipeline"
+    result["total_seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def _run_stages(result: dict, executor: ThreadPoolExecutor, api_key: str, use_cache: bool,
+                optimize: bool, validate: bool, timeout: float, candidates: int, repair_iterations: int,
+                reasonableness: bool, llm_slots, solver_slots, solver_options: dict = None):
+    def fail(stage: str, error: str):
+        result["failed_stage"] = stage
+        result["error"] = error
+
+    statement = result["problem_statement"]
+    if optimize:
+        with llm_slots:
+            statement = _timed(result, "optimize", optimize_problem_statement, statement, api_key,
+                               use_cache=use_cache)
+        result["optimized_statement"] = statement
+
+    with llm_slots:
+        parsed_components = _timed(result, "parse", parse_problem_statement, statement, api_key,
+                                   use_cache=use_cache)
+    if not isinstance(parsed_components, dict) or "error" in parsed_components:
+        detail = parsed_components.get("error") if isinstance(parsed_components, dict) else None
+        return fail("parse", f"Failed to parse the problem statement: {detail or 'invalid format'}")
+
+    model_representation = _timed(result, "formulate", formulate_model_from_nlp, parsed_components)
+
+    # Code generation only needs the structured model, so rendering runs alongside it
+    rendering = executor.submit(_timed, result, "render", _render, model_representation)
+    # Gemini candidates take a slot each, and their speculative runs a solver slot each
+    generated = _timed(result, "generate_code", generate_python_code, model_representation,
+                       api_key=api_key, use_cache=use_cache, candidates=candidates,
+                       llm_slots=llm_slots, solver_slots=solver_slots)
+    result["model_plaintext"], result["model_latex"] = rendering.result()
+    result["python_code"] = generated["python_code"]
+    result["generator"] = generated["generator"]
+    result["fallback_reason"] = generated["fallback_reason"]
+    if not (generated["python_code"] or "").strip():
+        return fail("generate_code", "Code generation did not produce any code.")
+
+    # Runs take a solver slot and repairs a Gemini slot, never both at once
+    execution = _timed(result, "run", run_with_repair, generated["python_code"],
+                       model_plaintext=result["model_plaintext"], api_key=api_key, use_cache=use_cache,
+                       timeout=timeout, max_iterations=repair_iterations, solver_options=solver_options,
+                       llm_slots=llm_slots, solver_slots=solver_slots)
+    solve_report = execution.pop("solve_report", None)  # holds the solved model, only needed to validate
+    child = execution.get("resources")
+    if child:
+        result["resources"]["run"].update(child_cpu_seconds=child["cpu_seconds"],
+                                          child_max_rss_kb=child["max_rss_kb"])
+    result["execution"] = execution
+    result["python_code"] = execution["python_code"]
+    if execution["error"]:
+        return fail("run", execution["error_details"] or "Code execution failed.")
+
+    if validate:
+        # Only the optional reasonableness assessment calls Gemini
+        with llm_slots if reasonableness else nullcontext():
+            result["validation"] = _timed(
+                result, "validate", validate_execution_results,
+                problem_statement=statement,
+                model_plaintext=result["model_plaintext"],
+                python_code=execution["python_code"],
+                execution_output=execution["output"],
+                api_key=api_key,
+                use_cache=use_cache,
+                reasonableness=reasonableness,
+                solve_report=solve_report,
+            )
+
+
+def read_problems(path: str) -> list:
+    """
+    Reads problem statements from a directory of text files or from a JSONL file.
+
+    In a directory, every *.txt or *.md file is one problem and its name without
+    the extension is the ID. In a JSONL file every line is an object with
+    'problem_statement' (or 'statement') and an optional 'id', which defaults to
+    the line number.
+
+    Returns:
+        list: (id, problem_statement) pairs in input order
+    """
+    if os.path.isdir(path):
+        problems = []
+        for name in sorted(os.listdir(path)):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() in (".txt", ".md"):
+                with open(os.path.join(path, name), encoding="utf-8") as f:
+                    problems.append((stem, f.read()))
+        return problems
+
+    problems = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                statement = record.get("problem_statement", record.get("statement"))
+            except (ValueError, AttributeError):
+                raise ValueError(f"{path}:{line_number}: expected a JSON object per line")
+            if not statement:
+                raise ValueError(f"{path}:{line_number}: missing 'problem_statement'")
+            problems.append((str(record.get("id", line_number)), statement))
+    return problems
+
+
+def completed_ids(output_path: str) -> set:
+    """IDs already written to a results file; a line cut short by a crash does not count."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+def _percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize_batch(results: list, wall_seconds: float) -> dict:
+    """Throughput and per-stage latency percentiles (in seconds) for a batch of pipeline results."""
+    stage_times = {}
+    for result in results:
+        for stage, seconds in result["timings"].items():
+            stage_times.setdefault(stage, []).append(seconds)
+        stage_times.setdefault("total", []).append(result["total_seconds"])
+    latency = {}
+    for stage, values in stage_times.items():
+        values.sort()
+        latency[stage] = {
+            "count": len(values),
+            "p50": _percentile(values, 50),
+            "p90": _percentile(values, 90),
+            "p99": _percentile(values, 99),
+            "max": values[-1],
+        }
+    failed = {}
+    for result in results:
+        if result["failed_stage"]:
+            failed[result["failed_stage"]] = failed.get(result["failed_stage"], 0) + 1
+    return {
+        "problems": len(results),
+        "succeeded": len(results) - sum(failed.values()),
+        "failed_by_stage": failed,
+        "wall_seconds": round(wall_seconds, 3),
+        "problems_per_minute": round(len(results) * 60 / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency": latency,
+    }
+
+
+def run_batch(problems: list, output_path: str, llm_concurrency: int = 4, solver_concurrency: int = 2,
+              resume: bool = True, **pipeline_options) -> dict:
+    """
+    Runs the pipeline for many problems concurrently and appends each result to a JSONL file.
+
+    At most `llm_concurrency` Gemini calls and `solver_concurrency` solver runs are in
+    flight at any time, speculative code candidates included; a problem waiting for the solver does not hold up Gemini calls
+    for the others. Results are flushed as soon as each problem finishes, so an
+    interrupted batch can be resumed: problems whose ID is already in the output file
+    are skipped.
+
+    Args:
+        problems: (id, problem_statement) pairs, e.g. from `read_problems`
+        output_path: JSONL file results are appended to, one object per problem with its 'id'
+        llm_concurrency: Maximum number of concurrent Gemini calls
+        solver_concurrency: Maximum number of concurrent solver runs
+        resume: Set to False to run every problem even if it already has a result
+        **pipeline_options: Passed on to `run_pipeline` (api_key, use_cache, optimize, validate, timeout, ...)
+
+    Returns:
+        dict: `summarize_batch` of the problems run now, plus 'skipped' (already completed)
+    """
+    done = completed_ids(output_path) if resume else set()
+    pending = [(problem_id, statement) for problem_id, statement in problems if str(problem_id) not in done]
+    skipped = len(problems) - len(pending)
+    if skipped:
+        logger.info(f"Skipping {skipped} problems already in {output_path}.")
+
+    llm_slots = threading.BoundedSemaphore(llm_concurrency)
+    solver_slots = threading.BoundedSemaphore(solver_concurrency)
+    write_lock = threading.Lock()
+    results = []
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        if out.tell() and not _ends_with_newline(output_path):
+            out.write("\n")  # do not glue the first result onto a line cut short by a crash
+
+        def run_one(problem_id, statement):
+            result = run_pipeline(statement, llm_slots=llm_slots, solver_slots=solver_slots, **pipeline_options)
+            line = json.dumps(dict(result, id=str(problem_id)), default=str)
+            with write_lock:
+                out.write(line + "\n")
+                out.flush()
+            return result
+
+        # Enough threads to keep both the Gemini and the solver slots busy
+        with ThreadPoolExecutor(max_workers=llm_concurrency + solver_concurrency,
+                                thread_name_prefix="batch") as executor:
+            futures = {executor.submit(run_one, problem_id, statement): problem_id
+                       for problem_id, statement in pending}
+            for finished, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.append(result)
+                outcome = f"failed at {result['failed_stage']}" if result["failed_stage"] else "ok"
+                logger.info(f"[{finished}/{len(pending)}] {futures[future]}: {outcome} "
+                            f"in {result['total_seconds']:.1f}s")
+
+    summary = summarize_batch(results, time.perf_counter() - started)
+    summary["skipped"] = skipped
+    return summary
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def run_job(job: dict) -> dict:
+    """
+    Runs one queued job (see job_queue.py) and returns its result: run_solver_code's
+    dict for 'solve' jobs, run_pipeline's for 'pipeline' jobs. The job's time limit is
+    the solver timeout of the run.
+    """
+    payload = job["payload"]
+    use_cache = payload.get("use_cache", True)
+    if job["kind"] == "solve":
+        result = run_solver_code(payload["python_code"], timeout=job["time_limit"], use_cache=use_cache,
+                                 solver_options=payload.get("solver_options"))
+        result.pop("solve_report", None)  # the recorded model can be large; the job keeps the outcome
+        return result
+    return run_pipeline(payload["problem_statement"], api_key=job.get("api_key"), use_cache=use_cache,
+                        optimize=payload.get("optimize", True), validate=payload.get("validate", True),
+                        timeout=job["time_limit"], candidates=payload.get("candidates"),
+                        reasonableness=payload.get("reasonableness", False),
+                        solver_options=payload.get("solver_options"))
+
+
+def _work_until_signalled():
+    """Consumes the job queue in this process until SIGTERM or SIGINT."""
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    get_job_queue().work(run_job, stop)
+
+
+def run_job_workers(processes: int = 1) -> int:
+    """
+    Runs `processes` job worker processes until stopped. Each one finishes its current
+    job before exiting; jobs of a worker that is killed are picked up again by another.
+    """
+    os.environ.setdefault("SOLVER_POOL_SIZE", "1")  # each worker runs one job at a time
+    if processes <= 1:
+        _work_until_signalled()
+        return 0
+    import multiprocessing
+
+    workers = [multiprocessing.Process(target=_work_until_signalled, name=f"job-worker-{i}")
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    def forward(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, forward)
+    for worker in workers:
+        worker.join()
+    return 0
+
+
+def run_startup_profile(targets, runs: int, top: int, budget_ms: float = None, as_json: bool = False) -> int:
+    """Prints the import profile of each target; returns 1 when one is over the budget."""
+    from startup_profile import format_profile, profile_target
+
+    if budget_ms is None and os.getenv("STARTUP_BUDGET_MS"):
+        budget_ms = float(os.getenv("STARTUP_BUDGET_MS"))
+    profiles = [profile_target(target, runs=runs, top=top) for target in dict.fromkeys(targets)]
+    over = [profile["target"] for profile in profiles if budget_ms is not None and profile["import_ms"] > budget_ms]
+    if as_json:
+        json.dump({"budget_ms": budget_ms, "over_budget": over, "profiles": profiles}, sys.stdout, indent=2)
+        print()
+    else:
+        print("\n\n".join(format_profile(profile) for profile in profiles))
+        if budget_ms is not None:
+            print(f"\nBudget {budget_ms:.0f} ms: " + (f"exceeded by {', '.join(over)}" if over else "met"))
+    return 1 if over else 0
+
+
+def run_bench(args) -> int:
+    """Runs (or loads) benchmark results and compares them; returns 1 on failures or regressions."""
+    from benchmark import (DEFAULT_CORPUS, DEFAULT_RECORDINGS, compare_results, format_comparison,
+                           format_results, run_benchmark)
+
+    if args.results:
+        if not args.compare:
+            raise SystemExit("--results only makes sense together with --compare")
+        with open(args.results, encoding="utf-8") as f:
+            results = json.load(f)
+    else:
+        results = run_benchmark(args.corpus or DEFAULT_CORPUS, args.recordings or DEFAULT_RECORDINGS,
+                                args.problems, runs=args.runs, timeout=args.timeout)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    comparison = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            comparison = compare_results(json.load(f), results, args.threshold)
+    if args.json:
+        json.dump({"results": results, "comparison": comparison}, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_results(results))
+        if comparison is not None:
+            print("\n" + format_comparison(comparison))
+    failed = any(not problem["ok"] for problem in results["problems"].values())
+    regressed = comparison is not None and (comparison["regressions"] or comparison["failures"])
+    return 1 if failed or regressed else 0
+
+
+def run_standin(args) -> int:
+    """Serves the local LLM stand-in until interrupted."""
+    from llm_standin import StandIn, load_recorded, load_responses, make_server, server_url
+
+    stand_in = StandIn(responses=load_responses(args.responses) if args.responses else (),
+                       recorded=load_recorded(args.recordings), latency=args.latency, jitter=args.jitter,
+                       chunk_chars=args.chunk_chars, chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+                       error_status=args.error_status, seed=args.seed)
+    server = make_server(stand_in, args.host, args.port)
+    logger.info(f"LLM stand-in serving {len(stand_in.recorded)} recorded and {len(stand_in.responses)} "
+                f"rule-based responses on {server_url(server)} (use LLM_PROVIDER=http LLM_STANDIN_URL={server_url(server)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    json.dump(stand_in.stats(), sys.stdout)
+    print()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="auto-modeler", description="Auto-Modeler command line interface.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the full pipeline for one problem statement and print the result as JSON.")
+    run.add_argument("statement", help="The problem statement, or '-' to read it from stdin")
+
+    batch = commands.add_parser("batch", help="Run the pipeline for a corpus of problems, writing results to JSONL.")
+    batch.add_argument("input", help="Directory of .txt/.md problem statements, or a JSONL file")
+    batch.add_argument("-o", "--output", required=True, help="JSONL file results are appended to")
+    batch.add_argument("--llm-concurrency", type=int, default=4, help="Maximum concurrent Gemini calls (default: 4)")
+    batch.add_argument("--solver-concurrency", type=int, default=2, help="Maximum concurrent solver runs (default: 2)")
+    batch.add_argument("--no-resume", action="store_true", help="Run every problem, even those already in the output")
+
+    startup = commands.add_parser("startup", help="Measure how long the web app, the CLI and the solver workers take to import.")
+    startup.add_argument("targets", nargs="*", metavar="target",
+                         help="web, cli or worker (default: all three)")
+    startup.add_argument("--runs", type=int, default=3, help="Fresh interpreters per target; figures are medians (default: 3)")
+    startup.add_argument("--top", type=int, default=15, help="Slowest modules listed per target (default: 15)")
+    startup.add_argument("--budget-ms", type=float, default=None,
+                         help="Fail when a target's imports take longer (default: STARTUP_BUDGET_MS, unset means no limit)")
+    startup.add_argument("--json", action="store_true", help="Print the profiles as JSON instead of tables")
+
+    bench = commands.add_parser("bench", help="Benchmark every pipeline stage on a corpus of problems with recorded Gemini responses.")
+    bench.add_argument("problems", nargs="*", metavar="problem", help="Corpus problem IDs (default: all)")
+    bench.add_argument("--corpus", default=None, help="Corpus JSONL file (default: benchmarks/corpus.jsonl)")
+    bench.add_argument("--recordings", default=None,
+                       help="Directory of <id>.jsonl recorded responses (default: benchmarks/recordings)")
+    bench.add_argument("--runs", type=int, default=3, help="Runs per problem, each in a fresh interpreter; figures are medians (default: 3)")
+    bench.add_argument("--timeout", type=float, default=60, help="Solver timeout per run in seconds (default: 60)")
+    bench.add_argument("-o", "--output", default=None, help="Write the results as JSON to this file")
+    bench.add_argument("--compare", metavar="BASELINE", default=None,
+                       help="Compare with the results in this file and fail on regressions")
+    bench.add_argument("--results", default=None,
+                       help="With --compare: compare these saved results instead of running the benchmark")
+    bench.add_argument("--threshold", type=float, default=0.10,
+                       help="Relative change counted as a regression or improvement (default: 0.10)")
+    bench.add_argument("--json", action="store_true", help="Print the results (and comparison) as JSON instead of tables")
+
+    standin = commands.add_parser("standin", help="Serve canned Gemini responses over HTTP, for LLM_PROVIDER=http.")
+    standin.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    standin.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    standin.add_argument("--recordings", action="append", default=[], metavar="PATH",
+                         help="Recordings file, or directory of them, to answer from by prompt; may be repeated")
+    standin.add_argument("--responses", default=None,
+                         help="JSON file of response rules (model, match, text template, latency, status)")
+    standin.add_argument("--latency", type=float, default=0.0, help="Seconds before each answer (default: 0)")
+    standin.add_argument("--jitter", type=float, default=0.0, help="Random seconds added to or taken from the latency")
+    standin.add_argument("--chunk-chars", type=int, default=0,
+                         help="Characters per streamed chunk (default: 0, the whole answer in one chunk)")
+    standin.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    standin.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail (default: 0)")
+    standin.add_argument("--error-status", type=int, default=503, help="HTTP status of injected failures (default: 503)")
+    standin.add_argument("--seed", type=int, default=None, help="Seed for jitter and injected failures")
+
+    worker = commands.add_parser("worker", help="Run queued solve and pipeline jobs (submitted with POST /jobs).")
+    worker.add_argument("--processes", type=int, default=None,
+                        help="Job worker processes (default: JOB_WORKERS, else 1)")
+
+    loadtest = commands.add_parser("loadtest", help="Measure throughput and latency of a running web app.")
+    loadtest.add_argument("url", help="Base URL of the app, e.g. http://127.0.0.1:5000")
+    loadtest.add_argument("scenarios", nargs="*", metavar="scenario",
+                          help="index, cache_stats, run_code or validate_results (default: all)")
+    loadtest.add_argument("-c", "--concurrency", type=int, default=8, help="Requests kept in flight (default: 8)")
+    loadtest.add_argument("-n", "--requests", type=int, default=200, help="Requests per scenario (default: 200)")
+    loadtest.add_argument("--bypass-cache", action="store_true", help="Make every request do the full work")
+
+    for command in (run, batch):
+        command.add_argument("--no-optimize", action="store_true", help="Parse the statement as given instead of refining it first")
+        command.add_argument("--no-validate", action="store_true", help="Skip checking the solutions against their models")
+        command.add_argument("--reasonableness", action="store_true",
+                             help="Also ask Gemini whether each solution makes practical sense")
+        command.add_argument("--bypass-cache", action="store_true", help="Force fresh Gemini calls and solver runs")
+        command.add_argument("--timeout", type=float, default=None, help="Solver timeout in seconds (default: SOLVER_TIMEOUT)")
+        command.add_argument("--backend", default=None,
+                             help="Solver backend: auto, code, cbc, highs or highs_cmd (default: SOLVER_BACKEND)")
+        command.add_argument("--portfolio", default=None,
+                             help='Race solver configurations, e.g. "cbc highs cbc:presolve=false", or "true" '
+                                  'for SOLVER_PORTFOLIO_MEMBERS (default: SOLVER_PORTFOLIO)')
+        command.add_argument("--threads", type=int, default=None, help="Solver threads (default: SOLVER_THREADS)")
+        command.add_argument("--gap-rel", type=float, default=None,
+                             help="Relative MIP gap at which the solver stops (default: SOLVER_GAP_REL)")
+        command.add_argument("--solver-time-limit", type=float, default=None,
+                             help="Seconds the solver may search before returning its best solution "
+                                  "(default: SOLVER_TIME_LIMIT, and always less than --timeout)")
+        command.add_argument("--repair-iterations", type=int, default=None,
+                             help="Gemini patches allowed when generated code fails (default: REPAIR_MAX_ITERATIONS)")
+        command.add_argument("--candidates", type=int, default=None,
+                             help="Gemini code candidates to race when local code generation is not possible (default: CODEGEN_CANDIDATES)")
+
+    args = parser.parse_args(argv)
+
+    # Environment variables from a .env file, before any command reads them
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.command == "startup":
+        unknown = [target for target in args.targets if target not in ("web", "cli", "worker")]
+        if unknown:
+            parser.error(f"unknown startup target(s): {', '.join(unknown)} (choose from web, cli, worker)")
+        return run_startup_profile(args.targets or ["web", "cli", "worker"], args.runs, args.top, args.budget_ms, args.json)
+    if args.command == "bench":
+        return run_bench(args)
+    if args.command == "standin":
+        return run_standin(args)
+    if args.command == "worker":
+        processes = args.processes if args.processes is not None else int(os.getenv("JOB_WORKERS", 1))
+        logger.info(f"Starting {processes} job worker process(es) on {get_job_queue().path}")
+        return run_job_workers(processes)
+    if args.command == "loadtest":
+        from load_test import SCENARIOS, run_load
+
+        unknown = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+        if unknown:
+            parser.error(f"unknown scenario(s): {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+        results = [run_load(args.url, scenario, args.concurrency, args.requests, args.bypass_cache)
+                   for scenario in args.scenarios or SCENARIOS]
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return 1 if any(result["errors"] for result in results) else 0
+
+    pipeline_options = {
+        "use_cache": not args.bypass_cache,
+        "optimize": not args.no_optimize,
+        "validate": not args.no_validate,
+        "timeout": args.timeout,
+        "candidates": args.candidates,
+        "repair_iterations": args.repair_iterations,
+        "reasonableness": args.reasonableness,
+        "solver_options": {"backend": args.backend, "portfolio": args.portfolio, "threads": args.threads, "gapRel": args.gap_rel, "timeLimit": args.solver_time_limit},
+    }
+
+    if args.command == "batch":
+        summary = run_batch(read_problems(args.input), args.output, llm_concurrency=args.llm_concurrency,
+                            solver_concurrency=args.solver_concurrency, resume=not args.no_resume,
+                            **pipeline_options)
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return 1 if summary["failed_by_stage"] else 0
+
+    statement = sys.stdin.read() if args.statement == "-" else args.statement
+    result = run_pipeline(statement, **pipeline_options)
+    json.dump(result, sys.stdout, indent=2, default=str)
+    print()
+    return 1 if result["error"] else 0
 
-def main():
-    print("Starting Auto-Modeler...")
-    # TODO: Implement the main application flow
-    # 1. Get problem statement from user (via UI or command line)
-    # 2. Process with nlp_processor
-    # 3. Formulate model with model_formulator
-    # 4. Run with solver_engine
-    # 5. Validate with validator
-    # 6. Handle loops for self-healing and re-validation
-    # 7. Display results
-    print("Auto-Modeler finished (not yet implemented).")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
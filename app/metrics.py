@@ -0,0 +1,358 @@
+# Prometheus metrics for the web app, the pipeline and the solver.
+#
+# Instrumented code counts and observes on the metrics declared at the bottom
+# of this file, and `render` returns them in Prometheus' text exposition
+# format, which GET /metrics serves. No client library is needed: a metric is
+# a dict from label values to a count (counters) or to per-bucket counts and a
+# sum (histograms), all guarded by one lock. Gauges are read when rendered.
+#
+# Under gunicorn every worker process counts on its own. With METRICS_DIR set
+# (gunicorn.conf.py sets a fresh directory per server start) each process also
+# writes its counts to <METRICS_DIR>/<pid>.json, at most every
+# METRICS_FLUSH_SECONDS and when it exits, and `render` adds up the files of
+# every process, so a scrape that lands on any worker reports the whole server
+# (other workers' counts up to METRICS_FLUSH_SECONDS old). Files left by
+# processes that have exited, such as recycled workers, are folded into one.
+# A forked child starts counting from zero.
+#
+# While a web request is handled, the time its thread spends in Gemini calls,
+# waiting for a solver worker, running code and so on is also summed by name
+# (`record_timing`), for the request's Server-Timing header.
+
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_SECONDS = 5
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SPAWN_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+RSS_BUCKETS = tuple(mib * 1024 * 1024 for mib in (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192))
+TOKEN_CHARS = 4  # characters per token when the provider reports no counts
+
+_RETIRED = "retired.json"
+
+_lock = threading.Lock()
+_metrics = []  # in declaration order, which is the order they are rendered in
+_request = threading.local()
+_last_flush = 0.0
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # label values -> value
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labels) or 'none'}, not {', '.join(labels)}")
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(_Metric):
+    """A count that only goes up."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        _maybe_flush()
+
+
+class Histogram(_Metric):
+    """Observed values counted into buckets, with their sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # one count per bucket (not cumulative), then the +Inf bucket, then the sum
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+        _maybe_flush()
+
+
+class Gauge(_Metric):
+    """A current value, read from `collect()` (label values -> value) when rendered."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect=None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+
+def _snapshot() -> dict:
+    """This process's counts, as stored in METRICS_DIR. Must be called with the lock held."""
+    return {metric.name: [[list(key), value] for key, value in metric.values.items()]
+            for metric in _metrics if metric.kind != "gauge" and metric.values}
+
+
+def _merge(total: dict, snapshot: dict):
+    """Adds a snapshot's counts into `total` (metric name -> {label values: value})."""
+    for name, entries in snapshot.items():
+        values = total.setdefault(name, {})
+        for key, value in entries:
+            key = tuple(key)
+            current = values.get(key)
+            if current is None:
+                values[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                values[key] = [a + b for a, b in zip(current, value)]
+            else:
+                values[key] = current + value
+
+
+def _directory():
+    return os.getenv("METRICS_DIR") or None
+
+
+def _flush_seconds() -> float:
+    return float(os.getenv("METRICS_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS))
+
+
+def _write_json(path: str, data: dict):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def flush():
+    """Writes this process's counts to METRICS_DIR (when it is set)."""
+    global _last_flush
+    directory = _directory()
+    if not directory:
+        return
+    with _lock:
+        snapshot = _snapshot()
+        _last_flush = time.monotonic()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        _write_json(os.path.join(directory, f"{os.getpid()}.json"), snapshot)
+    except OSError as e:
+        logger.warning(f"Could not write metrics to {directory}: {e}")
+
+
+def _maybe_flush():
+    if _directory() and time.monotonic() - _last_flush >= _flush_seconds():
+        flush()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _collect_directory(directory: str) -> dict:
+    """The counts of every other process in `directory`, folding those of exited processes into one file."""
+    import fcntl
+
+    total = {}
+    own = f"{os.getpid()}.json"
+    with open(os.path.join(directory, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired = _read_json(os.path.join(directory, _RETIRED))
+        folded = False
+        for name in os.listdir(directory):
+            if not name.endswith(".json") or name in (own, _RETIRED) or not name[:-5].isdigit():
+                continue
+            path = os.path.join(directory, name)
+            if _alive(int(name[:-5])):
+                _merge(total, _read_json(path))
+                continue
+            merged = {}
+            _merge(merged, retired)
+            _merge(merged, _read_json(path))
+            retired = {metric: [[list(key), value] for key, value in values.items()]
+                       for metric, values in merged.items()}
+            folded = True
+            os.unlink(path)
+        if folded:
+            _write_json(os.path.join(directory, _RETIRED), retired)
+    _merge(total, retired)
+    return total
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, key: tuple, extra: str = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render() -> str:
+    """
+    Every metric in Prometheus' text exposition format (version 0.0.4).
+
+    Counters and histograms add up this process and, with METRICS_DIR set, every
+    other process that wrote there; gauges are collected now.
+    """
+    with _lock:
+        total = {metric.name: dict(metric.values) for metric in _metrics if metric.kind != "gauge"}
+    directory = _directory()
+    if directory and os.path.isdir(directory):
+        try:
+            _merge(total, {name: [[list(key), value] for key, value in values.items()]
+                           for name, values in _collect_directory(directory).items()})
+        except OSError as e:
+            logger.warning(f"Could not read metrics from {directory}: {e}")
+    lines = []
+    for metric in _metrics:
+        if metric.kind == "gauge":
+            try:
+                values = metric.collect() if metric.collect else {}
+            except Exception as e:
+                logger.warning(f"Could not collect {metric.name}: {e}")
+                continue
+        else:
+            values = total.get(metric.name, {})
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key in sorted(values):
+            value = values[key]
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(metric.labels, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ("+Inf",), value[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(float(bound))}"'
+                lines.append(f"{metric.name}_bucket{_labels(metric.labels, key, le)} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(metric.labels, key)} {_number(round(value[-1], 6))}")
+            lines.append(f"{metric.name}_count{_labels(metric.labels, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Forgets this process's counts (a forked child starts from zero)."""
+    with _lock:
+        for metric in _metrics:
+            if metric.kind != "gauge":
+                metric.values.clear()
+
+
+def _reset_in_child():
+    global _lock, _last_flush
+    _lock = threading.Lock()  # another thread may have held it when the process forked
+    _last_flush = 0.0
+    reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_in_child)
+atexit.register(flush)
+
+
+# --- Per-request timings ---------------------------------------------------
+
+def start_request():
+    """Starts summing the timings this thread records, for one request."""
+    _request.timings = {}
+
+
+def record_timing(name: str, seconds: float):
+    """Adds to a timing of the request this thread is handling; does nothing outside one."""
+    timings = getattr(_request, "timings", None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def finish_request() -> dict:
+    """The timings recorded since start_request (name -> seconds), and stops recording."""
+    timings = getattr(_request, "timings", None) or {}
+    _request.timings = None
+    return timings
+
+
+def server_timing(timings: dict) -> str:
+    """A Server-Timing header value: every timing, in milliseconds."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+# --- The metrics -----------------------------------------------------------
+
+def _job_queue_depth() -> dict:
+    from job_queue import get_job_queue
+    return {(status,): count for status, count in get_job_queue().stats().items()}
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "automodeler_http_request_seconds",
+    "Time to produce a web response, by route, method and status; streamed bodies are not included.",
+    ("route", "method", "status"))
+PIPELINE_STAGE_SECONDS = Histogram(
+    "automodeler_pipeline_stage_seconds", "Wall time of each stage of a full pipeline run.", ("stage",))
+LLM_REQUEST_SECONDS = Histogram(
+    "automodeler_llm_request_seconds",
+    "Time the LLM provider took to answer, until the last streamed chunk, by provider, model and outcome.",
+    ("provider", "model", "outcome"))
+LLM_TOKENS = Counter(
+    "automodeler_llm_tokens_total",
+    f"Prompt and response tokens, as the provider reported them, or estimated at {TOKEN_CHARS} characters "
+    f"per token (source=\"estimated\") when it reported none.",
+    ("model", "kind", "source"))
+CACHE_LOOKUPS = Counter(
+    "automodeler_cache_lookups_total",
+    "Cache lookups by cache (llm: Gemini responses, code: whole runs, lp: solutions by model) and result.",
+    ("cache", "result"))
+SOLVER_WAIT_SECONDS = Histogram(
+    "automodeler_solver_wait_seconds", "Time a run waited for an idle solver worker.", (), SPAWN_BUCKETS + LATENCY_BUCKETS[8:])
+SOLVER_SPAWN_SECONDS = Histogram(
+    "automodeler_solver_spawn_seconds",
+    "Time to start the process that runs the code: a fork of a warm worker, or a fresh interpreter.",
+    ("mode",), SPAWN_BUCKETS)
+SOLVER_RUN_SECONDS = Histogram(
+    "automodeler_solver_run_seconds", "Wall time of the process that ran the code, by outcome.", ("outcome",))
+SOLVE_SECONDS = Histogram(
+    "automodeler_solve_seconds", "Time spent in each model.solve(), by backend and status.", ("backend", "status"))
+SOLVER_CHILD_PEAK_RSS_BYTES = Histogram(
+    "automodeler_solver_child_peak_rss_bytes",
+    "Peak RSS of the process that ran the code, including the solver processes it waited for.", (), RSS_BUCKETS)
+JOB_QUEUE_JOBS = Gauge(
+    "automodeler_job_queue_jobs", "Jobs in the shared job queue, by status.", ("status",), _job_queue_depth)
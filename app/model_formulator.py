@@ -1,20 +1,45 @@
 # Converts NLP output (structured components) into a formal mathematical model.
 
-# Placeholder for how the structured OR model will be represented internally.
-# This could be a custom class or a dictionary structure.
+# The structured OR model is represented internally by ModelIR (see model_ir.py);
+# the renderers below accept either a ModelIR or the dict format returned by
+# parse_problem_statement.
 
+import hashlib
+import logging
+import os
 import re # For escaping special LaTeX characters
+import sqlite3
+import threading
+from model_ir import ModelIR
+from response_cache import DEFAULT_CACHE_PATH, ResponseCache
 
-def formulate_model_from_nlp(parsed_components: dict) -> dict:
+logger = logging.getLogger(__name__)
+
+def formulate_model_from_nlp(parsed_components: dict):
     """
     Takes the structured components from NLP and formulates an internal
     representation of the mathematical model.
-    Currently, this function is a pass-through, assuming parsed_components
-    is already in a suitable format for rendering.
-    Future: Could transform parsed_components into a more formal class-based model.
+    Returns a ModelIR (use ModelIR.to_dict() to get the dict format back).
+    Error dicts and non-dict input are passed through unchanged so the
+    renderers can report them.
     """
-    print(f"Formulating model from NLP output (pass-through for now)...")
-    return parsed_components
+    if not isinstance(parsed_components, dict) or 'error' in parsed_components:
+        return parsed_components
+    return ModelIR.from_dict(parsed_components)
+
+def _escape_label(label) -> str:
+    return str(label).replace("_", "\\_").replace("%", "\\%")
+
+def _latex_data_rows(table) -> list:
+    """Tabular rows of a numeric data entry. Each distinct index label is escaped only once."""
+    if table.kind == "dense":
+        labels = [_escape_label(label) for label in table.labels]
+        return [f"    {label} & {value} \\\\" for label, (_, value) in zip(labels, table.items())]
+    if table.kind == "csr" and not table.nested:
+        rows = {label: _escape_label(label) for label in table.row_labels}
+        cols = {label: _escape_label(label) for label in table.col_labels}
+        return [f"    {rows[row]},{cols[col]} & {value} \\\\" for (row, col), value in table.items()]
+    return [f"    {_escape_label(key)} & {value} \\\\" for key, value in table.to_python().items()]
 
 def latex_escape(text, is_math_mode=False):
     """Escapes special LaTeX characters in a string. Handles math mode differently."""
@@ -50,16 +75,16 @@ def latex_escape(text, is_math_mode=False):
             text = text.replace(char, replacement)
     return text
 
-def render_model_latex(model_representation: dict) -> str:
-    """Renders the internal model representation as a full LaTeX document string for PDF compilation."""
-    if not isinstance(model_representation, dict):
+def render_model_latex(model_representation) -> str:
+    """Renders the internal model representation (ModelIR or dict) as a full LaTeX document string for PDF compilation."""
+    if not isinstance(model_representation, (dict, ModelIR)):
         # Return a valid LaTeX document indicating an error
         return ("\\documentclass{article}\\usepackage{amsmath}\\begin{document}" 
                 "Error: Model representation is not a valid dictionary." 
                 "\\end{document}")
     
     # Check if there was an error in the model representation
-    if 'error' in model_representation:
+    if isinstance(model_representation, dict) and 'error' in model_representation:
         error_msg = latex_escape(model_representation.get('error', 'Unknown error'))
         return (
             "\\documentclass{article}\n"
@@ -71,6 +96,9 @@ def render_model_latex(model_representation: dict) -> str:
             "Please check your problem statement and try again.\n"
             "\\end{document}"
         )
+    if isinstance(model_representation, dict):
+        model_representation = ModelIR.from_dict(model_representation)
+    ir = model_representation
 
     # Create more stable LaTeX with safer defaults
     latex_doc = [
@@ -117,10 +145,11 @@ def render_model_latex(model_representation: dict) -> str:
         return f"\\safemath{{{content}}}"
     
     # --- Sets ---
-    if 'sets' in model_representation and model_representation['sets']:
+    if ir.sets:
         latex_doc.append("\\section*{Sets}")
         latex_doc.append("\\begin{itemize}")
-        for s in model_representation['sets']:
+        for index_set in ir.sets:
+            s = str(index_set.raw)
             # Extract both parts if in "Name ($X$)" format
             parts = s.split('(')
             if len(parts) > 1 and ')' in parts[1]:
@@ -132,10 +161,11 @@ def render_model_latex(model_representation: dict) -> str:
         latex_doc.append("\\end{itemize}")
 
     # --- Parameters ---
-    if 'parameters' in model_representation and model_representation['parameters']:
+    if ir.parameters:
         latex_doc.append("\\section*{Parameters}")
         latex_doc.append("\\begin{itemize}")
-        for k, v in model_representation['parameters'].items():
+        for param in ir.parameters:
+            k, v = param.key, param.description
             # Remove math delimiters if present (we'll handle them safely)
             param_key = k
             if param_key.startswith('$') and param_key.endswith('$'):
@@ -146,10 +176,11 @@ def render_model_latex(model_representation: dict) -> str:
         latex_doc.append("\\end{itemize}")
 
     # --- Decision Variables ---
-    if 'variables' in model_representation and model_representation['variables']:
+    if ir.variables:
         latex_doc.append("\\section*{Decision Variables}")
         latex_doc.append("\\begin{itemize}")
-        for k, v in model_representation['variables'].items():
+        for var in ir.variables:
+            k, v = var.key, var.description
             # Remove math delimiters if present (we'll handle them safely)
             var_key = k
             if var_key.startswith('$') and var_key.endswith('$'):
@@ -160,10 +191,9 @@ def render_model_latex(model_representation: dict) -> str:
         latex_doc.append("\\end{itemize}")
 
     # --- Objective Function ---
-    if 'objective' in model_representation and model_representation['objective']:
-        obj = model_representation['objective']
-        obj_type = obj.get('type', 'Objective').capitalize()
-        obj_expr = obj.get('expression', 'N/A') 
+    if ir.has_section('objective') and ir.objective is not None:
+        obj_type = str(ir.objective.sense).capitalize()
+        obj_expr = ir.objective.expression
         latex_doc.append(f"\\section*{{{obj_type} Function}}")
         
         # Remove math delimiters if present
@@ -179,16 +209,15 @@ def render_model_latex(model_representation: dict) -> str:
         latex_doc.append("\\end{center}")
 
     # --- Constraints ---
-    if 'constraints' in model_representation and model_representation['constraints']:
+    if ir.constraints:
         latex_doc.append("\\section*{Constraints}")
         latex_doc.append("\\noindent\\textbf{Subject to:}")
         latex_doc.append("\\begin{itemize}")
         
-        for constr in model_representation['constraints']:
-            # Split into formula and description if possible
-            parts = constr.split('(', 1)
-            formula = parts[0].strip()
-            description = f"({parts[1]}" if len(parts) > 1 else ""
+        for constr in ir.constraints:
+            # Formula and description were split when the IR was built
+            formula = constr.formula
+            description = constr.description
             
             # Extract math content if it's wrapped in delimiters
             if formula.startswith('$') and formula.endswith('$'):
@@ -209,16 +238,17 @@ def render_model_latex(model_representation: dict) -> str:
         latex_doc.append("\\end{itemize}")
 
     # --- Data (Optional) ---
-    if 'data' in model_representation and model_representation['data']:
+    if ir.data:
         latex_doc.append("\\section*{Data Values}")
         latex_doc.append("\\begin{itemize}")
-        for k, v_data in model_representation['data'].items():
+        for k, table in ir.data.items():
             # Clean up key (remove math delimiters if present)
             data_key = k
             if data_key.startswith('$') and data_key.endswith('$'):
                 data_key = data_key[1:-1]
                 
-            if isinstance(v_data, dict):
+            v_data = table.raw if table.kind == "raw" else None
+            if table.kind in ("dense", "csr") or isinstance(v_data, dict):
                 # Create a small table for dictionary data
                 latex_doc.append(f"    \\item \\safemath{{{data_key}}}:")
                 latex_doc.append("    \\begin{center}")
@@ -226,17 +256,20 @@ def render_model_latex(model_representation: dict) -> str:
                 latex_doc.append("    \\toprule")
                 latex_doc.append("    \\textbf{Index} & \\textbf{Value} \\\\")
                 latex_doc.append("    \\midrule")
-                for d_key, d_val in v_data.items():
-                    # Escape any special characters
-                    safe_key = str(d_key).replace("_", "\\_").replace("%", "\\%")
-                    latex_doc.append(f"    {safe_key} & {d_val} \\\\")
+                if v_data is None:
+                    latex_doc.extend(_latex_data_rows(table))
+                else:
+                    for d_key, d_val in v_data.items():
+                        # Escape any special characters
+                        safe_key = str(d_key).replace("_", "\\_").replace("%", "\\%")
+                        latex_doc.append(f"    {safe_key} & {d_val} \\\\")
                 latex_doc.append("    \\bottomrule")
                 latex_doc.append("    \\end{tabular}")
                 latex_doc.append("    \\end{center}")
-            elif isinstance(v_data, list):
+            elif table.kind == "list" or isinstance(v_data, list):
                 # Format list items safely
                 safe_items = []
-                for item in v_data:
+                for item in (table.labels if v_data is None else v_data):
                     safe_items.append(str(item).replace("_", "\\_").replace("%", "\\%"))
                 data_str = ", ".join(safe_items)
                 latex_doc.append(f"    \\item \\safemath{{{data_key}}}: $[{data_str}]$")
@@ -246,20 +279,29 @@ def render_model_latex(model_representation: dict) -> str:
                 latex_doc.append(f"    \\item \\safemath{{{data_key}}}: {safe_val}")
         latex_doc.append("\\end{itemize}")
 
+    # --- Sections Gemini returned in an unexpected shape ---
+    for key in ModelIR.SECTION_TYPES:
+        if key in ir.extras and ir.extras[key]:
+            latex_doc.append(f"\\section*{{{latex_escape(key.capitalize())}}}")
+            latex_doc.append(latex_escape(ir.extras[key]))
+
     if len(latex_doc) <= 10: # Just preamble
         latex_doc.append("No model components found to render or model structure is not as expected.")
     
     latex_doc.append("\\end{document}")
     return "\n".join(latex_doc)
 
-def render_model_plaintext(model_representation: dict) -> str:
-    """Renders the internal model representation as plaintext in a structured OR style."""
-    if not isinstance(model_representation, dict):
+def render_model_plaintext(model_representation) -> str:
+    """Renders the internal model representation (ModelIR or dict) as plaintext in a structured OR style."""
+    if isinstance(model_representation, dict):
+        model_representation = ModelIR.from_dict(model_representation)
+    elif not isinstance(model_representation, ModelIR):
         return "Error: Model representation is not a valid dictionary."
+    ir = model_representation
 
     plain_parts = []
     order = ['Sets', 'Parameters', 'Variables', 'Objective Function', 'Constraints', 'Data']
-    key_map = { # Map display name to potential keys in the dictionary
+    key_map = { # Map display name to the section key of the model
         'Sets': 'sets',
         'Parameters': 'parameters',
         'Variables': 'variables',
@@ -270,15 +312,14 @@ def render_model_plaintext(model_representation: dict) -> str:
 
     for display_name in order:
         actual_key = key_map.get(display_name)
-        if actual_key and actual_key in model_representation and model_representation[actual_key]:
-            content = model_representation[actual_key]
-            plain_parts.append(f"\n--- {display_name.upper()} ---")
-            
-            if display_name == "Objective Function" and isinstance(content, dict):
-                obj_type = content.get('type', 'Objective').capitalize()
-                obj_expr = content.get('expression', 'N/A')
-                plain_parts.append(f"{obj_type}: {obj_expr}")
-            elif isinstance(content, list):
+        if not ir.has_section(actual_key):
+            continue
+        plain_parts.append(f"\n--- {display_name.upper()} ---")
+
+        if actual_key in ir.extras:
+            # Unexpected shape: render the raw content generically
+            content = ir.extras[actual_key]
+            if isinstance(content, list):
                 for item_in_list in content:
                     plain_parts.append(f"- {str(item_in_list)}")
             elif isinstance(content, dict):
@@ -286,8 +327,62 @@ def render_model_plaintext(model_representation: dict) -> str:
                     plain_parts.append(f"  {k}: {str(v)}")
             else:
                 plain_parts.append(str(content))
-            plain_parts.append("") # Add a newline for spacing
+        elif actual_key == 'objective':
+            obj_type = str(ir.objective.sense).capitalize()
+            plain_parts.append(f"{obj_type}: {ir.objective.expression}")
+        elif actual_key == 'sets':
+            plain_parts.extend(f"- {str(s.raw)}" for s in ir.sets)
+        elif actual_key == 'constraints':
+            plain_parts.extend(f"- {str(c.raw)}" for c in ir.constraints)
+        elif actual_key == 'parameters':
+            plain_parts.extend(f"  {p.key}: {str(p.description)}" for p in ir.parameters)
+        elif actual_key == 'variables':
+            plain_parts.extend(f"  {v.key}: {str(v.description)}" for v in ir.variables)
+        elif actual_key == 'data':
+            plain_parts.extend(
+                f"  {k}: {t.python_repr() if t.kind in ('dense', 'csr') else str(t.to_python())}"
+                for k, t in ir.data.items()
+            )
+        plain_parts.append("") # Add a newline for spacing
             
     if not plain_parts:
         return "No model components found to render."
-    return "\n".join(plain_parts) 
\ No newline at end of file
+    return "\n".join(plain_parts) 
+
+# The UI only sends the rendered plaintext to /generate_code, so the structured
+# model behind it is kept in the shared cache database, keyed by that plaintext.
+_model_store = None
+_model_store_lock = threading.Lock()
+
+def _get_model_store() -> ResponseCache:
+    global _model_store
+    with _model_store_lock:
+        if _model_store is None:
+            _model_store = ResponseCache(
+                path=os.path.expanduser(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)),
+                max_entries=int(os.getenv("MODEL_STORE_MAX_ENTRIES", 2000)),
+                ttl_seconds=float(os.getenv("MODEL_STORE_TTL", 24 * 3600)),
+                table="formulated_models",
+            )
+        return _model_store
+
+def _plaintext_key(model_plaintext: str) -> str:
+    return hashlib.sha256(model_plaintext.strip().encode("utf-8")).hexdigest()
+
+def remember_formulated_model(model_plaintext: str, model_representation):
+    """Stores the structured model behind a rendered plaintext for later code generation."""
+    if isinstance(model_representation, ModelIR):
+        model_representation = model_representation.to_dict()
+    try:
+        _get_model_store().set(_plaintext_key(model_plaintext), model_representation)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not store formulated model: {e}")
+
+def recall_formulated_model(model_plaintext: str):
+    """Returns the ModelIR a plaintext was rendered from, or None if it is unknown."""
+    try:
+        model = _get_model_store().get(_plaintext_key(model_plaintext))
+    except sqlite3.Error as e:
+        logger.warning(f"Could not look up formulated model: {e}")
+        return None
+    return ModelIR.from_dict(model) if model is not None else None
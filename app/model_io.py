@@ -0,0 +1,509 @@
+# Reading optimization models from MPS and LP files.
+#
+# Large models usually already exist as MPS or CPLEX-LP files, and neither
+# Gemini nor generated Python source scale to 100k rows. The readers below
+# consume an upload line by line (optionally gzip-compressed), so the file is
+# never held in memory as a whole, and build the PuLP problem directly from
+# the parsed rows and columns without going through Python source.
+#
+# Supported:
+#   MPS  - free and fixed format without spaces in names; sections NAME,
+#          OBJSENSE, ROWS, COLUMNS (with INTORG/INTEND markers), RHS, RANGES,
+#          BOUNDS (UP, LO, FX, FR, MI, PL, BV, LI, UI) and ENDATA.
+#   LP   - CPLEX LP: objective, Subject To (including ranged rows), Bounds,
+#          General/Integer, Binary and End.
+
+import gzip
+import io
+import logging
+import math
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload at a time
+CHUNK_SIZE = 1 << 16
+
+MPS_FORMAT = "mps"
+LP_FORMAT = "lp"
+
+# PuLP's values for senses and categories. Parsing needs only these, so pulp
+# (which loads its solver libraries on import) is imported when a problem is built.
+MINIMIZE, MAXIMIZE = 1, -1
+LE, EQ, GE = -1, 0, 1
+CONTINUOUS, INTEGER = "Continuous", "Integer"
+
+
+class ModelFileError(ValueError):
+    """Raised for files that cannot be parsed, with the offending line number when known."""
+
+    def __init__(self, message: str, line: int = None):
+        super().__init__(f"line {line}: {message}" if line else message)
+        self.line = line
+
+
+def detect_format(filename: str) -> str:
+    """Guesses the file format from its name (".mps", ".lp", optionally followed by ".gz")."""
+    name = (filename or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".mps", ".fixed", ".free")):
+        return MPS_FORMAT
+    if name.endswith(".lp"):
+        return LP_FORMAT
+    raise ModelFileError(f"Cannot tell the format of {filename!r}; expected a .mps or .lp file")
+
+
+def _text_lines(stream):
+    """Yields decoded lines of a binary or text stream, reading it in chunks; gzip is detected."""
+    if isinstance(stream, (str, bytes)):
+        stream = io.BytesIO(stream.encode("utf-8") if isinstance(stream, str) else stream)
+    if isinstance(stream, io.TextIOBase):
+        yield from stream
+        return
+    reader = io.BufferedReader(stream, buffer_size=CHUNK_SIZE) if not hasattr(stream, "peek") else stream
+    if reader.peek(2)[:2] == b"\x1f\x8b":
+        reader = gzip.GzipFile(fileobj=reader)
+    yield from io.TextIOWrapper(reader, encoding="utf-8", errors="replace")
+
+
+class ModelBuilder:
+    """Collects rows and columns as they are parsed and turns them into an LpProblem."""
+
+    def __init__(self, name: str = "Model"):
+        self.name = name
+        self.sense = MINIMIZE
+        self.objective = {}           # column -> coefficient
+        self.objective_constant = 0.0
+        self.rows = {}                # row -> [sense, rhs, range]
+        self.coefficients = {}        # row -> {column: coefficient}
+        self.columns = {}             # column -> [lower, upper, category]
+
+    def column(self, name: str) -> list:
+        entry = self.columns.get(name)
+        if entry is None:
+            entry = self.columns[name] = [0.0, None, CONTINUOUS]
+        return entry
+
+    def row(self, name: str, sense: int):
+        if name in self.rows:
+            raise ModelFileError(f"duplicate row {name!r}")
+        self.rows[name] = [sense, 0.0, None]
+        self.coefficients[name] = {}
+
+    def to_problem(self):
+        """Returns (problem, {pulp variable name: original column name})."""
+        import pulp
+
+        problem = pulp.LpProblem(_pulp_name(self.name) or "Model", self.sense)
+        variables = {}
+        names = {}
+        for name, (lower, upper, category) in self.columns.items():
+            lower = None if lower == -math.inf else lower
+            upper = None if upper == math.inf else upper
+            variable = pulp.LpVariable(name, lowBound=lower, upBound=upper, cat=category)
+            if variable.name in names:
+                raise ModelFileError(f"column names {name!r} and {names[variable.name]!r} clash in PuLP")
+            variables[name] = variable
+            names[variable.name] = name
+
+        problem.setObjective(pulp.LpAffineExpression(
+            [(variables[c], v) for c, v in self.objective.items()], constant=self.objective_constant
+        ))
+        for row, (sense, rhs, rng) in self.rows.items():
+            expression = pulp.LpAffineExpression(
+                [(variables[c], v) for c, v in self.coefficients[row].items()]
+            )
+            if rng is None:
+                problem.addConstraint(pulp.LpConstraint(expression, sense, rhs=rhs), _pulp_name(row))
+                continue
+            lower, upper = rng
+            problem.addConstraint(pulp.LpConstraint(expression, GE, rhs=lower),
+                                  _pulp_name(f"{row}_lo"))
+            problem.addConstraint(pulp.LpConstraint(expression.copy(), LE, rhs=upper),
+                                  _pulp_name(f"{row}_hi"))
+        return problem, names
+
+
+def _pulp_name(name: str) -> str:
+    import pulp
+
+    return pulp.LpElement.expression.sub("_", name)
+
+
+def _number(text: str, line: int) -> float:
+    lowered = text.lower()
+    if lowered in ("inf", "+inf", "infinity", "+infinity", "1e30", "1e+30"):
+        return math.inf
+    if lowered in ("-inf", "-infinity", "-1e30", "-1e+30"):
+        return -math.inf
+    try:
+        return float(text)
+    except ValueError:
+        raise ModelFileError(f"expected a number, found {text!r}", line)
+
+
+# --- MPS ---------------------------------------------------------------------
+
+_MPS_SECTIONS = {"NAME", "OBJSENSE", "OBJSENS", "ROWS", "COLUMNS", "RHS", "RANGES", "BOUNDS", "ENDATA"}
+_MPS_ROW_SENSES = {"E": EQ, "L": LE, "G": GE}
+
+
+def read_mps(stream) -> ModelBuilder:
+    """Parses an MPS file from a stream, one line at a time."""
+    builder = ModelBuilder()
+    section = None
+    objective_row = None
+    integer_block = False
+
+    for number, raw in enumerate(_text_lines(stream), start=1):
+        line = raw.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if line.startswith("*"):
+            if line.upper().startswith("*SENSE:MAX"):  # written by PuLP
+                builder.sense = MAXIMIZE
+            continue
+        tokens = line.split()
+        if not line[0].isspace() and tokens[0].upper() in _MPS_SECTIONS:
+            section = tokens[0].upper()
+            if section == "NAME" and len(tokens) > 1:
+                builder.name = tokens[1]
+            elif section in ("OBJSENSE", "OBJSENS") and len(tokens) > 1:
+                builder.sense = MAXIMIZE if tokens[1].upper().startswith("MAX") else MINIMIZE
+            elif section == "ENDATA":
+                break
+            continue
+
+        if section in ("OBJSENSE", "OBJSENS"):
+            builder.sense = MAXIMIZE if tokens[0].upper().startswith("MAX") else MINIMIZE
+        elif section == "ROWS":
+            kind, name = tokens[0].upper(), tokens[1]
+            if kind == "N":
+                objective_row = objective_row or name  # further free rows are ignored
+            elif kind in _MPS_ROW_SENSES:
+                builder.row(name, _MPS_ROW_SENSES[kind])
+            else:
+                raise ModelFileError(f"unknown row type {kind!r}", number)
+        elif section == "COLUMNS":
+            if len(tokens) >= 3 and tokens[1].strip("'").upper() == "MARKER":
+                marker = tokens[2].strip("'").upper()
+                integer_block = marker == "INTORG"
+                continue
+            column = builder.column(tokens[0])
+            if integer_block:
+                column[2] = INTEGER
+            for row, value in zip(tokens[1::2], tokens[2::2]):
+                coefficient = _number(value, number)
+                if row == objective_row:
+                    builder.objective[tokens[0]] = coefficient
+                elif row in builder.coefficients:  # coefficients in further free rows are dropped
+                    builder.coefficients[row][tokens[0]] = coefficient
+        elif section == "RHS":
+            pairs = tokens[1:] if len(tokens) % 2 else tokens
+            for row, value in zip(pairs[0::2], pairs[1::2]):
+                if row == objective_row:
+                    builder.objective_constant = -_number(value, number)
+                elif row in builder.rows:
+                    builder.rows[row][1] = _number(value, number)
+        elif section == "RANGES":
+            pairs = tokens[1:] if len(tokens) % 2 else tokens
+            for row, value in zip(pairs[0::2], pairs[1::2]):
+                if row in builder.rows:
+                    builder.rows[row][2] = _number(value, number)  # resolved below, once RHS is known
+        elif section == "BOUNDS":
+            _apply_mps_bound(builder, tokens, number)
+        else:
+            raise ModelFileError(f"data outside of any section: {line.strip()[:40]!r}", number)
+
+    # Ranges are relative to the final right-hand side
+    for entry in builder.rows.values():
+        if entry[2] is not None:
+            sense, rhs, width = entry
+            if sense == LE:
+                entry[2] = (rhs - abs(width), rhs)
+            elif sense == GE:
+                entry[2] = (rhs, rhs + abs(width))
+            else:
+                entry[2] = (rhs, rhs + width) if width >= 0 else (rhs + width, rhs)
+    return builder
+
+
+_BOUNDS_WITHOUT_VALUE = {"FR", "MI", "PL", "BV"}
+
+
+def _apply_mps_bound(builder: ModelBuilder, tokens: list, line: int):
+    kind = tokens[0].upper()
+    if kind in _BOUNDS_WITHOUT_VALUE:
+        name = tokens[-1] if len(tokens) <= 3 else tokens[2]
+        value = None
+    else:
+        if len(tokens) < 3:
+            raise ModelFileError(f"bound {kind} without a value", line)
+        name, value = (tokens[1], tokens[2]) if len(tokens) == 3 else (tokens[2], tokens[3])
+        value = _number(value, line)
+    column = builder.column(name)
+    if kind == "UP":
+        column[1] = value
+        if value < 0 and column[0] == 0:
+            column[0] = -math.inf
+    elif kind == "LO":
+        column[0] = value
+    elif kind == "FX":
+        column[0] = column[1] = value
+    elif kind == "FR":
+        column[0], column[1] = -math.inf, math.inf
+    elif kind == "MI":
+        column[0] = -math.inf
+    elif kind == "PL":
+        column[1] = math.inf
+    elif kind == "BV":
+        column[0], column[1], column[2] = 0.0, 1.0, INTEGER
+    elif kind == "LI":
+        column[0], column[2] = value, INTEGER
+    elif kind == "UI":
+        column[1], column[2] = value, INTEGER
+    else:
+        raise ModelFileError(f"unsupported bound type {kind!r}", line)
+
+
+# --- CPLEX LP ----------------------------------------------------------------
+
+_LP_SECTIONS = [
+    (re.compile(r"^\s*(maximize|maximise|maximum|max)\b", re.I), "max"),
+    (re.compile(r"^\s*(minimize|minimise|minimum|min)\b", re.I), "min"),
+    (re.compile(r"^\s*(subject\s+to|such\s+that|s\.t\.|st)\b:?", re.I), "constraints"),
+    (re.compile(r"^\s*(bounds|bound)\b", re.I), "bounds"),
+    (re.compile(r"^\s*(generals|general|gen|integers|integer)\b", re.I), "general"),
+    (re.compile(r"^\s*(binaries|binary|bin)\b", re.I), "binary"),
+    (re.compile(r"^\s*(semi-continuous|semis|semi|sos)\b", re.I), "unsupported"),
+    (re.compile(r"^\s*end\s*$", re.I), "end"),
+]
+_LP_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<num>[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|[+-]?inf(?:inity)?\b)"
+    r"|(?P<op><=|=<|>=|=>|<|>|=)"
+    r"|(?P<sign>[+-])"
+    r"|(?P<colon>:)"
+    r"|(?P<name>[A-Za-z_!\"#$%&()/,.;?@'`{}|~\[\]][\w!\"#$%&()/,.;?@'`{}|~\[\]]*)"
+    r")",
+    re.I,
+)
+_LP_SENSES = {"<=": LE, "=<": LE, "<": LE,
+              ">=": GE, "=>": GE, ">": GE,
+              "=": EQ}
+
+
+def _lp_tokens(stream):
+    """Yields (line, kind, value) tokens; section keywords are only recognized at line starts."""
+    for number, raw in enumerate(_text_lines(stream), start=1):
+        line = raw.split("\\", 1)[0].rstrip()
+        if not line.strip():
+            continue
+        for pattern, section in _LP_SECTIONS:
+            match = pattern.match(line)
+            if match:
+                yield number, "section", section
+                line = line[match.end():]
+                break
+        position = 0
+        while position < len(line):
+            if line[position:].isspace():
+                break
+            match = _LP_TOKEN.match(line, position)
+            if match is None or match.end() == position:
+                raise ModelFileError(f"unexpected text {line[position:].strip()[:20]!r}", number)
+            position = match.end()
+            yield number, match.lastgroup, match.group(match.lastgroup)
+    yield None, "section", "end"
+
+
+class _LPReader:
+    def __init__(self, stream):
+        self.tokens = _lp_tokens(stream)
+        self.pushed = []
+        self.builder = ModelBuilder()
+        self.row_count = 0
+
+    def next(self):
+        return self.pushed.pop() if self.pushed else next(self.tokens)
+
+    def push(self, token):
+        self.pushed.append(token)
+
+    def read(self) -> ModelBuilder:
+        line, kind, value = self.next()
+        if (kind, value) not in (("section", "max"), ("section", "min")):
+            raise ModelFileError("LP file must start with Minimize or Maximize", line)
+        self.builder.sense = MAXIMIZE if value == "max" else MINIMIZE
+        section = "objective"
+        while True:
+            line, kind, value = self.next()
+            if kind == "section":
+                if value == "end":
+                    return self.builder
+                if value in ("unsupported", "max", "min"):
+                    raise ModelFileError("unsupported LP section", line)
+                section = value
+                continue
+            self.push((line, kind, value))
+            if section == "objective":
+                terms, constant, _ = self._expression(allow_name=True)
+                for column, coefficient in terms.items():
+                    self.builder.column(column)
+                    self.builder.objective[column] = self.builder.objective.get(column, 0) + coefficient
+                self.builder.objective_constant += constant
+            elif section == "constraints":
+                self._constraint()
+            elif section == "bounds":
+                self._bound()
+            else:
+                line, kind, value = self.next()
+                if kind != "name":
+                    raise ModelFileError(f"expected a variable name, found {value!r}", line)
+                column = self.builder.column(value)
+                if section == "binary":
+                    column[0], column[1] = 0.0, 1.0
+                column[2] = INTEGER
+
+    def _expression(self, allow_name: bool):
+        """Reads `[name:] terms` up to a relation or section; returns (terms, constant, name)."""
+        name = None
+        terms = {}
+        constant = 0.0
+        sign = 1.0
+        coefficient = None
+        while True:
+            line, kind, value = self.next()
+            if kind == "name" and allow_name and name is None and not terms and coefficient is None:
+                following = self.next()
+                if following[1] == "colon":
+                    name = value
+                    continue
+                self.push(following)
+            if kind == "sign":
+                if coefficient is not None:  # a constant term ends here
+                    constant += sign * coefficient
+                    sign, coefficient = 1.0, None
+                if value == "-":
+                    sign = -sign
+            elif kind == "num":
+                if coefficient is not None:
+                    constant += sign * coefficient
+                    sign = 1.0
+                coefficient = _number(value, line)
+            elif kind == "name":
+                terms[value] = terms.get(value, 0.0) + sign * (1.0 if coefficient is None else coefficient)
+                sign, coefficient = 1.0, None
+            else:
+                if coefficient is not None:
+                    constant += sign * coefficient
+                self.push((line, kind, value))
+                return terms, constant, name
+
+    def _value(self):
+        """Reads a (possibly signed) number."""
+        line, kind, value = self.next()
+        sign = 1.0
+        if kind == "sign":
+            sign = -1.0 if value == "-" else 1.0
+            line, kind, value = self.next()
+        if kind != "num":
+            raise ModelFileError(f"expected a number, found {value!r}", line)
+        return sign * _number(value, line)
+
+    def _relation(self):
+        line, kind, value = self.next()
+        if kind != "op":
+            raise ModelFileError(f"expected a relation, found {value!r}", line)
+        return _LP_SENSES[value]
+
+    def _constraint(self):
+        terms, constant, name = self._expression(allow_name=True)
+        sense = self._relation()
+        if not terms:
+            # Ranged row: lower <= expression <= upper (or the mirrored >= form)
+            first = constant
+            terms, constant, _ = self._expression(allow_name=False)
+            self._relation()
+            second = self._value()
+            low, high = (first, second) if sense != GE else (second, first)
+            row = self._new_row(name, EQ, terms)
+            self.builder.rows[row][1:] = [low - constant, (low - constant, high - constant)]
+            return
+        row = self._new_row(name, sense, terms)
+        self.builder.rows[row][1] = self._value() - constant
+
+    def _new_row(self, name, sense, terms) -> str:
+        self.row_count += 1
+        name = name or f"R{self.row_count}"
+        self.builder.row(name, sense)
+        for column in terms:
+            self.builder.column(column)
+        self.builder.coefficients[name] = terms
+        return name
+
+    def _bound(self):
+        line, kind, value = self.next()
+        if kind == "name":
+            column = self.builder.column(value)
+            following = self.next()
+            if following[1] == "name" and following[2].lower() == "free":
+                column[0], column[1] = -math.inf, math.inf
+                return
+            self.push(following)
+            sense = self._relation()
+            bound = self._value()
+            if sense == EQ:
+                column[0] = column[1] = bound
+            elif sense == LE:
+                column[1] = bound
+            else:
+                column[0] = bound
+            return
+
+        self.push((line, kind, value))
+        first = self._value()
+        sense = self._relation()
+        line, kind, value = self.next()
+        if kind != "name":
+            raise ModelFileError(f"expected a variable name, found {value!r}", line)
+        column = self.builder.column(value)
+        following = self.next()
+        self.push(following)
+        if following[1] != "op":
+            if sense == EQ:
+                column[0] = column[1] = first
+            elif sense == LE:
+                column[0] = first
+            else:
+                column[1] = first
+            return
+        self._relation()
+        second = self._value()
+        low, high = (first, second) if sense != GE else (second, first)
+        column[0], column[1] = low, high
+
+
+def read_lp(stream) -> ModelBuilder:
+    """Parses a CPLEX LP file from a stream, one line at a time."""
+    return _LPReader(stream).read()
+
+
+def read_model(stream, file_format: str):
+    """
+    Parses an MPS or LP model and builds the PuLP problem from it.
+
+    Returns:
+        tuple: (LpProblem, {pulp variable name: original column name}, parse seconds)
+    """
+    started = time.perf_counter()
+    if file_format == MPS_FORMAT:
+        builder = read_mps(stream)
+    elif file_format == LP_FORMAT:
+        builder = read_lp(stream)
+    else:
+        raise ModelFileError(f"Unknown model format {file_format!r}")
+    problem, names = builder.to_problem()
+    return problem, names, time.perf_counter() - started
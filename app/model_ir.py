@@ -0,0 +1,479 @@
+# Typed intermediate representation of a formulated OR model.
+#
+# Gemini returns the model as loosely typed JSON: sets and constraints as
+# LaTeX strings, parameters and variables as {symbol: description} dicts, and
+# the numeric data as (possibly nested) dicts keyed by strings such as
+# "W1,R1". `ModelIR` turns that into `__slots__` classes whose index labels
+# are interned and whose numeric data lives in NumPy arrays: 1-D tables are
+# dense arrays aligned with a label tuple, 2-D tables are stored in CSR form.
+# Anything the IR does not understand is kept verbatim, so `ModelIR.to_dict()`
+# reproduces the dict it was built from.
+
+import re
+import sys
+
+# NumPy is imported by the functions that use it, so importing this module (and the
+# web app with it) does not load it.
+
+_MATH_DELIMS = re.compile(r"^\$(.*)\$$", re.DOTALL)
+_SET_ENTRY = re.compile(r"^(?P<name>.*?)\s*\(\s*\$?(?P<symbol>[^$()]+?)\$?\s*\)\s*$")
+_DOMAIN = re.compile(r"\b(binary|integer|continuous)\b", re.IGNORECASE)
+_NUMBER = r"(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+_LOWER = re.compile(r"(?:\\geq|\\ge|>=|≥)\s*" + _NUMBER)
+_UPPER = re.compile(r"(?:\\leq|\\le|<=|≤)\s*" + _NUMBER)
+
+
+def strip_math(text) -> str:
+    """Removes one pair of surrounding $...$ delimiters, if present."""
+    if not isinstance(text, str):
+        return str(text)
+    match = _MATH_DELIMS.match(text.strip())
+    return match.group(1) if match else text
+
+
+def split_symbol(key: str):
+    """Splits a LaTeX symbol such as "$c_{wr}$" into its base ("c") and subscript ("wr")."""
+    body = strip_math(key).strip()
+    if "_" not in body:
+        return body, ""
+    base, subscript = body.split("_", 1)
+    subscript = subscript.strip()
+    if subscript.startswith("{") and subscript.endswith("}"):
+        subscript = subscript[1:-1]
+    return base.strip(), subscript.strip()
+
+
+def split_subscript(subscript: str) -> tuple:
+    """Splits a subscript into index names: "w,r" and "wr" both give ("w", "r")."""
+    if not subscript:
+        return ()
+    if "," in subscript:
+        return tuple(part.strip() for part in subscript.split(",") if part.strip())
+    if subscript.isalpha() and subscript.islower():
+        return tuple(subscript)
+    return (subscript,)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _LabelPool:
+    """Interns index labels and label tuples so identical axes share memory."""
+
+    __slots__ = ("_axes",)
+
+    def __init__(self):
+        self._axes = {}
+
+    def axis(self, labels) -> tuple:
+        labels = tuple(sys.intern(str(label)) for label in labels)
+        return self._axes.setdefault(labels, labels)
+
+
+class IndexSet:
+    """A model set such as "Warehouses ($W$)", with its elements when the data provides them."""
+
+    __slots__ = ("raw", "name", "symbol", "elements", "_positions")
+
+    def __init__(self, raw, name: str, symbol: str, elements: tuple = ()):
+        self.raw = raw
+        self.name = name
+        self.symbol = symbol
+        self.elements = elements
+        self._positions = None
+
+    @classmethod
+    def from_entry(cls, entry):
+        if isinstance(entry, str):
+            match = _SET_ENTRY.match(entry)
+            if match:
+                return cls(entry, match.group("name"), match.group("symbol").strip())
+            return cls(entry, entry, strip_math(entry).strip())
+        return cls(entry, str(entry), "")
+
+    def position(self, label) -> int:
+        """Returns the position of `label` in the set's elements."""
+        if self._positions is None:
+            self._positions = {element: i for i, element in enumerate(self.elements)}
+        return self._positions[label]
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __repr__(self):
+        return f"IndexSet({self.symbol!r}, {len(self.elements)} elements)"
+
+
+class Parameter:
+    """A parameter declaration: its symbol (e.g. "$c_{wr}$") and description."""
+
+    __slots__ = ("key", "description", "base", "indices")
+
+    def __init__(self, key: str, description):
+        self.key = key
+        self.description = description
+        self.base, subscript = split_symbol(key)
+        self.indices = split_subscript(subscript)
+
+    def __repr__(self):
+        return f"Parameter({self.key!r})"
+
+
+class Variable:
+    """A decision variable with the domain and bounds stated in its description."""
+
+    __slots__ = ("key", "description", "base", "indices", "domain", "lower", "upper")
+
+    def __init__(self, key: str, description):
+        self.key = key
+        self.description = description
+        self.base, subscript = split_symbol(key)
+        self.indices = split_subscript(subscript)
+        text = description if isinstance(description, str) else str(description)
+        domain = _DOMAIN.search(text)
+        self.domain = domain.group(1).capitalize() if domain else "Continuous"
+        lower = _LOWER.search(text)
+        upper = _UPPER.search(text)
+        self.lower = float(lower.group(1)) if lower else None
+        self.upper = float(upper.group(1)) if upper else None
+        if self.domain == "Binary":
+            self.lower, self.upper = 0.0, 1.0
+
+    def __repr__(self):
+        return f"Variable({self.key!r}, {self.domain})"
+
+
+class Objective:
+    """The objective: sense ("Minimize"/"Maximize") and LaTeX expression."""
+
+    __slots__ = ("raw", "sense", "expression")
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self.sense = raw.get("type", "Objective")
+        self.expression = raw.get("expression", "N/A")
+
+    def __repr__(self):
+        return f"Objective({self.sense!r})"
+
+
+class Constraint:
+    """A constraint entry, split into its formula and trailing "(description)" when it is a string."""
+
+    __slots__ = ("raw", "formula", "description")
+
+    def __init__(self, raw):
+        self.raw = raw
+        if isinstance(raw, str):
+            parts = raw.split("(", 1)
+            self.formula = parts[0].strip()
+            self.description = f"({parts[1]}" if len(parts) > 1 else ""
+        else:
+            self.formula = str(raw)
+            self.description = ""
+
+    def __repr__(self):
+        return f"Constraint({self.formula[:40]!r})"
+
+
+class DataTable:
+    """
+    One entry of the model's data section.
+
+    kind is one of:
+        "list"   - labels of an index set (`labels`)
+        "dense"  - numbers keyed by a single label (`labels`, `values`)
+        "csr"    - numbers keyed by a pair of labels, stored as CSR
+                   (`row_labels`, `col_labels`, `indptr`, `indices`, `values`)
+        "raw"    - anything else, kept as the original Python object (`raw`)
+    """
+
+    __slots__ = ("kind", "raw", "labels", "values", "int_mask", "row_labels", "col_labels",
+                 "indptr", "indices", "order", "nested", "_lookup")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.raw = None
+        self.labels = None
+        self.values = None
+        self.int_mask = None
+        self.row_labels = None
+        self.col_labels = None
+        self.indptr = None
+        self.indices = None
+        self.order = None
+        self.nested = False
+        self._lookup = None
+
+    # --- construction ---
+
+    @staticmethod
+    def _numeric_array(numbers: list):
+        """Packs Python numbers into an int64 or float64 array, remembering which were ints."""
+        import numpy as np
+        if all(isinstance(n, int) for n in numbers):
+            return np.array(numbers, dtype=np.int64), None
+        values = np.array(numbers, dtype=np.float64)
+        int_mask = np.fromiter((isinstance(n, int) for n in numbers), dtype=bool, count=len(numbers))
+        return values, (int_mask if int_mask.any() else None)
+
+    @classmethod
+    def _raw(cls, value):
+        table = cls("raw")
+        table.raw = value
+        return table
+
+    @classmethod
+    def from_value(cls, value, pool: _LabelPool):
+        if isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+            table = cls("list")
+            table.labels = pool.axis(value)
+            return table
+
+        if isinstance(value, dict) and value:
+            items = list(value.items())
+            if all(_is_number(v) for _, v in items):
+                keys = [k for k, _ in items]
+                split = [tuple(part.strip() for part in str(k).split(",")) for k in keys]
+                arity = len(split[0])
+                if all(len(s) == arity for s in split) and all(",".join(s) == k for s, k in zip(split, keys)):
+                    numbers = [v for _, v in items]
+                    if arity == 1:
+                        table = cls("dense")
+                        table.labels = pool.axis(keys)
+                        table.values, table.int_mask = cls._numeric_array(numbers)
+                        return table
+                    if arity == 2:
+                        return cls._csr(split, numbers, pool, nested=False)
+            elif all(isinstance(v, dict) and v and all(_is_number(x) for x in v.values()) for _, v in items) \
+                    and all(isinstance(k, str) for _, inner in items for k in inner):
+                pairs, numbers = [], []
+                for row, inner in items:
+                    for col, number in inner.items():
+                        pairs.append((row, col))
+                        numbers.append(number)
+                return cls._csr(pairs, numbers, pool, nested=True)
+        return cls._raw(value)
+
+    @classmethod
+    def _csr(cls, pairs: list, numbers: list, pool: _LabelPool, nested: bool):
+        import numpy as np
+        rows = list(dict.fromkeys(p[0] for p in pairs))
+        cols = list(dict.fromkeys(p[1] for p in pairs))
+        row_pos = {label: i for i, label in enumerate(rows)}
+        col_pos = {label: i for i, label in enumerate(cols)}
+        row_idx = np.fromiter((row_pos[p[0]] for p in pairs), dtype=np.int64, count=len(pairs))
+        col_idx = np.fromiter((col_pos[p[1]] for p in pairs), dtype=np.int32, count=len(pairs))
+        values, int_mask = cls._numeric_array(numbers)
+
+        order = np.argsort(row_idx, kind="stable")  # CSR position -> original position
+        table = cls("csr")
+        table.row_labels = pool.axis(rows)
+        table.col_labels = pool.axis(cols)
+        table.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_idx, minlength=len(rows)), out=table.indptr[1:])
+        table.indices = col_idx[order]
+        table.values = values[order]
+        table.int_mask = int_mask[order] if int_mask is not None else None
+        table.order = order
+        table.nested = nested
+        return table
+
+    # --- access ---
+
+    def _python_values(self, values, int_mask) -> list:
+        numbers = values.tolist()
+        if int_mask is not None:
+            numbers = [int(n) if is_int else n for n, is_int in zip(numbers, int_mask.tolist())]
+        return numbers
+
+    def _positions(self, axis: str) -> dict:
+        if self._lookup is None:
+            self._lookup = {}
+        if axis not in self._lookup:
+            self._lookup[axis] = {label: i for i, label in enumerate(getattr(self, axis))}
+        return self._lookup[axis]
+
+    def get(self, *labels):
+        """Looks up one numeric entry by its label(s); raises KeyError when absent."""
+        import numpy as np
+        if self.kind == "dense":
+            return self.values[self._positions("labels")[labels[0]]].item()
+        if self.kind == "csr":
+            row = self._positions("row_labels")[labels[0]]
+            col = self._positions("col_labels")[labels[1]]
+            start, end = self.indptr[row], self.indptr[row + 1]
+            hits = np.nonzero(self.indices[start:end] == col)[0]
+            if hits.size:
+                return self.values[start + hits[0]].item()
+        raise KeyError(labels)
+
+    def to_dense(self):
+        """Returns the numeric data as a dense array (rows x cols for CSR; missing entries are 0)."""
+        import numpy as np
+        if self.kind == "dense":
+            return self.values
+        if self.kind == "csr":
+            dense = np.zeros((len(self.row_labels), len(self.col_labels)), dtype=self.values.dtype)
+            rows = np.repeat(np.arange(len(self.row_labels)), np.diff(self.indptr))
+            dense[rows, self.indices] = self.values
+            return dense
+        raise TypeError(f"DataTable of kind {self.kind!r} has no numeric data")
+
+    def items(self) -> list:
+        """Returns (key, value) pairs in the original order, as they appeared in the dict."""
+        import numpy as np
+        if self.kind == "dense":
+            return list(zip(self.labels, self._python_values(self.values, self.int_mask)))
+        if self.kind == "csr":
+            original = np.empty_like(self.order)
+            original[self.order] = np.arange(len(self.order))  # original position -> CSR position
+            rows = np.repeat(np.arange(len(self.row_labels)), np.diff(self.indptr))[original]
+            row_labels = np.array(self.row_labels, dtype=object)[rows]
+            col_labels = np.array(self.col_labels, dtype=object)[self.indices[original]]
+            int_mask = self.int_mask[original] if self.int_mask is not None else None
+            numbers = self._python_values(self.values[original], int_mask)
+            return list(zip(zip(row_labels.tolist(), col_labels.tolist()), numbers))
+        raise TypeError(f"DataTable of kind {self.kind!r} has no items")
+
+    def to_python(self):
+        """Rebuilds the original JSON-compatible value."""
+        if self.kind == "raw":
+            return self.raw
+        if self.kind == "list":
+            return list(self.labels)
+        if self.kind == "dense":
+            return dict(self.items())
+        if self.nested:
+            nested = {}
+            for (row, col), number in self.items():
+                nested.setdefault(row, {})[col] = number
+            return nested
+        return {f"{row},{col}": number for (row, col), number in self.items()}
+
+    def python_repr(self) -> str:
+        """Returns `repr(self.to_python())`, built from the arrays without materializing the dict."""
+        if self.kind == "dense":
+            return "{" + ", ".join(
+                f"{label!r}: {value!r}" for label, value in self.items()
+            ) + "}"
+        plain_labels = self.kind == "csr" and not self.nested and not any(
+            "'" in label or "\\" in label or not label.isprintable()
+            for label in self.row_labels + self.col_labels
+        )
+        if not plain_labels:
+            return repr(self.to_python())
+        # Keys are "row,col"; with plain labels their repr is just the quoted string
+        return "{" + ", ".join(
+            f"'{row},{col}': {value!r}" for (row, col), value in self.items()
+        ) + "}"
+
+    def __repr__(self):
+        size = {"list": lambda: len(self.labels), "dense": lambda: len(self.labels),
+                "csr": lambda: len(self.values)}.get(self.kind, lambda: 1)()
+        return f"DataTable({self.kind}, {size})"
+
+
+class ModelIR:
+    """
+    Typed representation of a formulated model.
+
+    Sections Gemini returned in an unexpected shape are kept as-is in
+    `extras`, and the original key order is remembered, so `to_dict()` gives
+    back the dict the IR was built from.
+    """
+
+    __slots__ = ("sets", "parameters", "variables", "objective", "constraints", "data",
+                 "extras", "key_order", "_pool")
+
+    SECTION_TYPES = {
+        "sets": list,
+        "parameters": dict,
+        "variables": dict,
+        "objective": dict,
+        "constraints": list,
+        "data": dict,
+    }
+
+    def __init__(self):
+        self.sets = []
+        self.parameters = []
+        self.variables = []
+        self.objective = None
+        self.constraints = []
+        self.data = {}
+        self.extras = {}
+        self.key_order = []
+        self._pool = _LabelPool()
+
+    @classmethod
+    def from_dict(cls, model: dict):
+        """Builds the IR from the dict produced by `parse_problem_statement`."""
+        ir = cls()
+        ir.key_order = list(model.keys())
+        for key, value in model.items():
+            expected = cls.SECTION_TYPES.get(key)
+            if expected is None or not isinstance(value, expected):
+                ir.extras[key] = value
+            elif key == "sets":
+                ir.sets = [IndexSet.from_entry(entry) for entry in value]
+            elif key == "parameters":
+                ir.parameters = [Parameter(k, v) for k, v in value.items()]
+            elif key == "variables":
+                ir.variables = [Variable(k, v) for k, v in value.items()]
+            elif key == "objective":
+                ir.objective = Objective(value)
+            elif key == "constraints":
+                ir.constraints = [Constraint(entry) for entry in value]
+            elif key == "data":
+                ir.data = {k: DataTable.from_value(v, ir._pool) for k, v in value.items()}
+        ir._link_set_elements()
+        return ir
+
+    def _link_set_elements(self):
+        """Attaches element labels from the data section to the sets they belong to."""
+        for index_set in self.sets:
+            for key in (f"${index_set.symbol}$", index_set.symbol):
+                table = self.data.get(key)
+                if table is not None and table.kind == "list":
+                    index_set.elements = table.labels
+                    break
+
+    def to_dict(self) -> dict:
+        """Converts the IR back to the dict format used by the rest of the app."""
+        sections = {
+            "sets": lambda: [s.raw for s in self.sets],
+            "parameters": lambda: {p.key: p.description for p in self.parameters},
+            "variables": lambda: {v.key: v.description for v in self.variables},
+            "objective": lambda: self.objective.raw,
+            "constraints": lambda: [c.raw for c in self.constraints],
+            "data": lambda: {k: t.to_python() for k, t in self.data.items()},
+        }
+        result = {}
+        for key in self.key_order:
+            if key in self.extras:
+                result[key] = self.extras[key]
+            elif key in sections:
+                result[key] = sections[key]()
+        return result
+
+    def has_section(self, key: str) -> bool:
+        """True when the section is present and non-empty, mirroring `model.get(key)` truthiness."""
+        if key in self.extras:
+            return bool(self.extras[key])
+        if key == "objective":
+            return bool(self.objective is not None and self.objective.raw)
+        return bool(getattr(self, key, None)) if key in self.SECTION_TYPES else False
+
+    def index_set(self, symbol: str):
+        """Returns the IndexSet with the given symbol, or None."""
+        for index_set in self.sets:
+            if index_set.symbol == symbol:
+                return index_set
+        return None
+
+    def __repr__(self):
+        return (f"ModelIR({len(self.sets)} sets, {len(self.parameters)} parameters, "
+                f"{len(self.variables)} variables, {len(self.constraints)} constraints, "
+                f"{len(self.data)} data tables)")
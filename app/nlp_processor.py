@@ -1,46 +1,32 @@
 # Handles interaction with Gemini API for NLP tasks
 
+import ast
+import json
 import os
-from dotenv import load_dotenv
+import re
+from llm_provider import get_model, key_required
+from response_cache import cached_generate, invalidate_cached
 
-# Load environment variables from .env file
-load_dotenv()
+# Model names used for the global client and for user-provided API keys
+DEFAULT_MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
+USER_KEY_MODEL_NAME = 'gemini-2.0-flash-exp'
 
-# Get Gemini API Key from environment variables
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+def server_api_key():
+    """The server's own Gemini API key, GEMINI_API_KEY; read on use, after the entry point has loaded .env."""
+    return os.getenv("GEMINI_API_KEY")
 
-# Initialize Gemini client (google.generativeai)
-genai_model = None
-if GEMINI_API_KEY:
+def optimize_problem_statement(raw_problem_statement: str, api_key: str = None, use_cache: bool = True) -> str:
+    """Calls Gemini API to refine and optimize the raw problem statement for OR modeling.
+    Identical requests are answered from the response cache unless use_cache is False."""
+    # Use provided API key or fall back to the server's key
     try:
-        import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-        # You can specify the model here, e.g., 'gemini-1.5-flash', 'gemini-pro', etc.
-        genai_model = genai.GenerativeModel('gemini-2.5-flash-preview-04-17') 
-        print("Gemini client initialized successfully.")
-    except ImportError:
-        print("ERROR: The 'google-generativeai' library is not installed. Please install it by running: pip install google-generativeai")
+        model, model_name = _model_for(api_key)
     except Exception as e:
-        print(f"ERROR: Failed to initialize Gemini client: {e}")
-else:
-    print("WARNING: GEMINI_API_KEY environment variable is not set. Please set it in your .env file. AI functionalities will be limited.")
-
-def optimize_problem_statement(raw_problem_statement: str, api_key: str = None) -> str:
-    """Calls Gemini API to refine and optimize the raw problem statement for OR modeling."""
-    # Use provided API key or fall back to global model
-    if api_key:
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        except Exception as e:
-            print(f"ERROR: Failed to initialize Gemini with provided API key: {e}")
-            return raw_problem_statement
-    else:
-        model = genai_model
-        if not model:
-            print("ERROR: No API key provided and global Gemini model not initialized.")
-            return raw_problem_statement
+        print(f"ERROR: Failed to initialize Gemini with provided API key: {e}")
+        return raw_problem_statement
+    if not model:
+        print("ERROR: No API key provided and GEMINI_API_KEY is not set.")
+        return raw_problem_statement
 
     prompt = f"""You are an expert Operations Research modeler. Your task is to refine and clarify the following problem statement to make it highly suitable for automatic mathematical model formulation. 
     Do not solve the problem or create the mathematical model yourself. 
@@ -61,8 +47,7 @@ def optimize_problem_statement(raw_problem_statement: str, api_key: str = None)
     """
 
     try:
-        response = model.generate_content(prompt)
-        optimized_statement = response.text.strip()
+        optimized_statement = cached_generate(model, prompt, model_name, use_cache=use_cache).strip()
         # Basic cleaning, sometimes LLMs add extra quotes or markers
         if optimized_statement.startswith("Refined Problem Statement for OR Modeling:"):
             optimized_statement = optimized_statement.replace("Refined Problem Statement for OR Modeling:", "").strip()
@@ -74,22 +59,18 @@ def optimize_problem_statement(raw_problem_statement: str, api_key: str = None)
         print(f"ERROR: Failed to optimize problem statement with Gemini: {e}")
         return raw_problem_statement # Fallback to original statement
 
-def parse_problem_statement(problem_statement: str, api_key: str = None) -> dict:
-    """Calls Gemini API to parse the problem statement into structured components."""
-    # Use provided API key or fall back to global model
-    if api_key:
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        except Exception as e:
-            print(f"ERROR: Failed to initialize Gemini with provided API key: {e}")
-            return {"error": f"Failed to initialize Gemini: {e}"}
-    else:
-        model = genai_model
-        if not model:
-            print("ERROR: No API key provided and global Gemini model not initialized.")
-            return {"error": "No API key provided and Gemini model not initialized"}
+def parse_problem_statement(problem_statement: str, api_key: str = None, use_cache: bool = True) -> dict:
+    """Calls Gemini API to parse the problem statement into structured components.
+    Identical requests are answered from the response cache unless use_cache is False."""
+    # Use provided API key or fall back to the server's key
+    try:
+        model, model_name = _model_for(api_key)
+    except Exception as e:
+        print(f"ERROR: Failed to initialize Gemini with provided API key: {e}")
+        return {"error": f"Failed to initialize Gemini: {e}"}
+    if not model:
+        print("ERROR: No API key provided and GEMINI_API_KEY is not set.")
+        return {"error": "No API key provided and GEMINI_API_KEY is not set"}
     
     prompt = f"""As an Operations Research expert, you are tasked with converting a problem statement into a structured OR model ready for LaTeX rendering. Follow these strict guidelines:
 
@@ -195,11 +176,11 @@ Example of desired JSON structure (adapt for the specific problem):
 """
     
     try:
-        response = model.generate_content(prompt)
+        raw_text = cached_generate(model, prompt, model_name, use_cache=use_cache)
         
         # Attempt to parse the response text as JSON
         # Gemini might return the JSON within triple backticks or with other surrounding text
-        response_text = response.text.strip()
+        response_text = raw_text.strip()
         if response_text.startswith("```json"):
             response_text = response_text[7:] # Remove ```json
         if response_text.startswith("```"):
@@ -234,7 +215,9 @@ Example of desired JSON structure (adapt for the specific problem):
         return parsed_output
     except Exception as e:
         print(f"ERROR: Failed to parse problem statement with Gemini or parse its JSON output: {e}")
-        print(f"Gemini raw response was: {response.text if 'response' in locals() else 'No response object'}")
+        # Don't keep serving an unparseable response from the cache on the next attempt
+        invalidate_cached(prompt, model_name)
+        print(f"Gemini raw response was: {raw_text if 'raw_text' in locals() else 'No response object'}")
         
         # If JSON parsing failed, attempt to fix the most common issues with escape sequences
         if 'response_text' in locals():
@@ -251,7 +234,7 @@ Example of desired JSON structure (adapt for the specific problem):
                     # Extract model parts from raw text to build a simplified model
                     simplified_model = {
                         "error": f"JSON parsing error, but partial extraction was attempted: {e}",
-                        "raw_output": response.text if 'response' in locals() else 'N/A'
+                        "raw_output": raw_text if 'raw_text' in locals() else 'N/A'
                     }
                     
                     # Try to identify basic components from the raw text
@@ -276,22 +259,166 @@ Example of desired JSON structure (adapt for the specific problem):
                     return simplified_model
                 except:
                     # Final fallback
-                    return {"error": f"Failed to process with Gemini: {e}. Raw output: {response.text if 'response' in locals() else 'N/A'}"}
+                    return {"error": f"Failed to process with Gemini: {e}. Raw output: {raw_text if 'raw_text' in locals() else 'N/A'}"}
         
         # Fallback or re-throw
-        return {"error": f"Failed to process with Gemini: {e}. Raw output: {response.text if 'response' in locals() else 'N/A'}"}
+        return {"error": f"Failed to process with Gemini: {e}. Raw output: {raw_text if 'raw_text' in locals() else 'N/A'}"}
 
-def suggest_code_revision(error_traceback: str, current_code: str) -> str:
-    """Calls Gemini API to suggest revisions for erroneous solver code."""
-    # TODO: Implement API call to Gemini
-    print(f"Suggesting code revision for error (not yet implemented): {error_traceback[:50]}...")
-    return "# Revised code to be filled by Gemini API"
+# Lines of context shown around the failing line when the enclosing statement is too long to send whole
+REVISION_CONTEXT_LINES = 8
+REVISION_MAX_SLICE_LINES = 60
 
-def diagnose_infeasibility(model_details: dict) -> str:
-    """Calls Gemini API to diagnose infeasibility/unboundedness issues."""
-    # TODO: Implement API call to Gemini
-    print(f"Diagnosing infeasibility (not yet implemented)...")
-    return "Suggested model revisions for infeasibility to be filled by Gemini API"
+def _model_for(api_key: str = None):
+    """Returns (model, model_name) for the given API key or the server's key, or (None, None)."""
+    if api_key:
+        return get_model(api_key, USER_KEY_MODEL_NAME), USER_KEY_MODEL_NAME
+    server_key = server_api_key()
+    if server_key or not key_required():
+        return get_model(server_key, DEFAULT_MODEL_NAME), DEFAULT_MODEL_NAME
+    return None, None
+
+def failing_line(error_traceback: str):
+    """The line of the generated program an error points at (the innermost '<string>' frame), or None."""
+    matches = re.findall(r'File "<string>", line (\d+)', error_traceback or "")
+    if matches:
+        return int(matches[-1])
+    match = re.search(r"^line (\d+), col \d+:", error_traceback or "", re.MULTILINE)  # pre-flight issues
+    return int(match.group(1)) if match else None
+
+def code_slice(code: str, line: int = None) -> tuple:
+    """
+    Picks the part of `code` worth showing for an error at `line`: the top-level
+    statement containing it, or a window around it when that statement is long.
+
+    Returns:
+        tuple: (first_line, last_line), 1-based and inclusive
+    """
+    total = max(1, len(code.splitlines()))
+    if line is None:
+        return 1, min(total, REVISION_MAX_SLICE_LINES)
+    line = min(max(line, 1), total)
+    first, last = line - REVISION_CONTEXT_LINES, line + REVISION_CONTEXT_LINES
+    try:
+        for statement in ast.parse(code).body:
+            if statement.lineno <= line <= statement.end_lineno:
+                if statement.end_lineno - statement.lineno < REVISION_MAX_SLICE_LINES:
+                    first = min(first, statement.lineno)
+                    last = max(last, statement.end_lineno)
+                break
+    except SyntaxError:
+        pass
+    return max(1, first), min(total, last)
+
+def apply_line_patch(code: str, patch: dict, allowed: tuple) -> str:
+    """
+    Replaces lines patch['start_line']..patch['end_line'] (1-based, inclusive) with
+    patch['replacement']. Returns None when the patch is malformed or reaches
+    outside the `allowed` (first, last) range.
+    """
+    try:
+        start, end = int(patch["start_line"]), int(patch["end_line"])
+        replacement = patch["replacement"]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not isinstance(replacement, str) or not (allowed[0] <= start <= end + 1 and end <= allowed[1]):
+        return None
+    lines = code.splitlines()
+    new_lines = replacement.splitlines()
+    return "\n".join(lines[:start - 1] + new_lines + lines[end:]) + "\n"
+
+def suggest_code_revision(error_traceback: str, current_code: str, api_key: str = None,
+                          use_cache: bool = True) -> str:
+    """
+    Calls Gemini API to suggest revisions for erroneous solver code.
+
+    Only the traceback and the slice of the code around the failing line are sent;
+    Gemini answers with a line-range patch, which is applied to the full code here.
+
+    Args:
+        error_traceback: The error output of the failed run (or pre-flight issues)
+        current_code: The full code that failed
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response cache for this call
+
+    Returns:
+        str: The revised code, or the current code unchanged when no usable patch came back
+    """
+    try:
+        model, model_name = _model_for(api_key)
+    except Exception as e:
+        print(f"ERROR: Failed to initialize Gemini with provided API key: {e}")
+        return current_code
+    if not model:
+        print("ERROR: No API key provided and global Gemini model not initialized.")
+        return current_code
+
+    first, last = code_slice(current_code, failing_line(error_traceback))
+    lines = current_code.splitlines()
+    numbered = "\n".join(f"{number:4d}| {lines[number - 1]}" for number in range(first, last + 1))
+    prompt = f"""You are an expert Python and PuLP programmer. A generated optimization program failed.
+
+ERROR:
+{error_traceback.strip()[-3000:]}
+
+RELEVANT LINES OF THE PROGRAM (line numbers on the left; the program has {len(lines)} lines in total):
+{numbered}
+
+Fix the error with the smallest possible change to lines {first}-{last}.
+Return ONLY a JSON object of this form, without markdown fences or explanations:
+{{"start_line": <first line to replace>, "end_line": <last line to replace>, "replacement": "<the new code for those lines, without line numbers, keeping the original indentation>"}}
+"""
+    try:
+        response_text = cached_generate(model, prompt, model_name, use_cache=use_cache)
+        match = re.search(r"\{.*\}", response_text or "", re.DOTALL)
+        patch = json.loads(match.group(0)) if match else None
+    except Exception as e:
+        print(f"ERROR: Failed to get a code revision from Gemini: {e}")
+        return current_code
+    revised = apply_line_patch(current_code, patch, (first, last)) if isinstance(patch, dict) else None
+    if revised is None:
+        print("WARNING: Gemini did not return a usable patch for the code.")
+        invalidate_cached(prompt, model_name)
+        return current_code
+    return revised
+
+def diagnose_infeasibility(model_details: dict, api_key: str = None, use_cache: bool = True) -> str:
+    """
+    Calls Gemini API to diagnose infeasibility/unboundedness issues.
+
+    Args:
+        model_details: 'status', and optionally 'model_plaintext', 'python_code' and 'output'
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response cache for this call
+
+    Returns:
+        str: The likely causes and suggested model revisions, or an error message
+    """
+    try:
+        model, model_name = _model_for(api_key)
+    except Exception as e:
+        return f"Could not diagnose the model: {e}"
+    if not model:
+        return "Could not diagnose the model: no API key provided and Gemini model not initialized."
+
+    status = model_details.get("status", "Infeasible")
+    prompt = f"""You are an expert Operations Research modeler. The following optimization model was solved and the solver reported the status "{status}".
+
+MATHEMATICAL MODEL:
+{model_details.get("model_plaintext") or "(not available)"}
+
+PULP CODE:
+{model_details.get("python_code") or "(not available)"}
+
+SOLVER OUTPUT:
+{(model_details.get("output") or "(not available)")[-2000:]}
+
+In at most 150 words, name the constraints, bounds or data most likely responsible for this status and suggest concrete revisions to the model. Use short bullet points.
+"""
+    try:
+        return cached_generate(model, prompt, model_name, use_cache=use_cache).strip()
+    except Exception as e:
+        print(f"ERROR: Failed to diagnose infeasibility with Gemini: {e}")
+        return f"Could not diagnose the model: {e}"
 
 def comment_on_reasonableness(solution_details: dict) -> str:
     """Calls Gemini API to comment on model reasonableness and suggest sensitivity analysis."""
@@ -0,0 +1,278 @@
+# Cheap in-process checks for generated code, run before it is worth a solver process.
+#
+# Everything here works on the source text and its AST only: nothing is
+# executed. The checks are deliberately conservative; they flag code that will
+# certainly fail or must not run (syntax errors, names that are never bound
+# anywhere in the program, imports of modules that are not installed or not
+# allowed, a model that is never solved, loops that can never end) and let
+# everything else through to the executor. Code that passes is compiled here
+# once and handed to the executor as marshalled bytecode.
+
+import ast
+import builtins
+import importlib.util
+import marshal
+import os
+import time
+from functools import lru_cache
+
+# Names the executor's globals provide besides the builtins (see solver_pool._execute_job)
+_EXECUTOR_GLOBALS = {"__name__", "__builtins__"}
+_BUILTIN_NAMES = frozenset(dir(builtins)) | _EXECUTOR_GLOBALS
+
+# Modules generated model code has no use for and that reach outside the solver process
+DEFAULT_FORBIDDEN_MODULES = (
+    "os", "subprocess", "shutil", "socket", "ctypes", "multiprocessing", "signal", "pty",
+    "importlib", "pickle", "marshal", "urllib", "http", "requests", "ftplib", "smtplib",
+    "telnetlib", "webbrowser",
+)
+
+# Calls that solve a PuLP model (problem.solve(...), solver.actualSolve(problem))
+_SOLVE_METHODS = {"solve", "actualSolve"}
+
+
+def _issue(category: str, message: str, line: int = None, col: int = None) -> dict:
+    return {"line": line, "col": col, "category": category, "message": message}
+
+
+def format_issues(issues: list) -> str:
+    """Renders issues one per line, like compiler diagnostics."""
+    return "\n".join(
+        (f"line {issue['line']}, col {issue['col'] or 1}: " if issue["line"] else "")
+        + f"[{issue['category']}] {issue['message']}"
+        for issue in issues
+    )
+
+
+@lru_cache(maxsize=512)
+def module_available(name: str) -> bool:
+    """Whether a top-level module can be imported by the executor (which shares this interpreter)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _walk(tree: ast.AST) -> list:
+    """All nodes of the tree in breadth-first order, like ast.walk but without its generators."""
+    nodes = [tree]
+    for node in nodes:  # grows while it is being iterated
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if value.__class__ is list:
+                nodes.extend(item for item in value if isinstance(item, ast.AST))
+            elif isinstance(value, ast.AST):
+                nodes.append(value)
+    return nodes
+
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_LOOPS = (ast.For, ast.AsyncFor, ast.While)
+# Pattern nodes that bind a name; `match` only exists from Python 3.10
+_CAPTURE_PATTERNS = tuple(getattr(ast, name) for name in ("MatchAs", "MatchStar") if hasattr(ast, name))
+_MAPPING_PATTERN = getattr(ast, "MatchMapping", None)
+
+
+def _index(tree: ast.AST) -> dict:
+    """
+    Collects what the checks look at in one pass over the tree: the names loaded,
+    every name the program binds anywhere (regardless of scope), whether it uses
+    `from x import *` (which makes that set unknowable), imports, calls and loops.
+    """
+    index = {"loads": [], "bound": set(), "star_import": False, "imports": [], "calls": [], "loops": []}
+    bound = index["bound"]
+    for node in _walk(tree):
+        kind = node.__class__
+        if kind is ast.Name:
+            if node.ctx.__class__ is ast.Load:
+                index["loads"].append(node)
+            else:
+                bound.add(node.id)
+        elif kind is ast.Call:
+            index["calls"].append(node)
+            module = _dunder_import(node)
+            if module:
+                index["imports"].append((node, module))
+        elif kind is ast.arg:
+            bound.add(node.arg)
+        elif kind in _LOOPS:
+            index["loops"].append(node)
+        elif kind in _DEFINITIONS:
+            bound.add(node.name)
+        elif kind is ast.Import:
+            index["imports"].extend((node, alias.name) for alias in node.names)
+        elif kind is ast.ImportFrom:
+            if not node.level and node.module:
+                index["imports"].append((node, node.module))
+        elif kind is ast.alias:
+            if node.name == "*":
+                index["star_import"] = True
+            else:
+                bound.add(node.asname or node.name.split(".")[0])
+        elif kind is ast.ExceptHandler:
+            if node.name:
+                bound.add(node.name)
+        elif kind is ast.Global or kind is ast.Nonlocal:
+            bound.update(node.names)
+        elif kind in _CAPTURE_PATTERNS:
+            if node.name:
+                bound.add(node.name)
+        elif kind is _MAPPING_PATTERN:
+            if node.rest:
+                bound.add(node.rest)
+    return index
+
+
+def _check_names(index: dict) -> list:
+    if index["star_import"]:
+        return []
+    bound = index["bound"]
+    issues, reported = [], set()
+    for node in index["loads"]:
+        name = node.id
+        if name not in bound and name not in _BUILTIN_NAMES and name not in reported:
+            reported.add(name)
+            issues.append(_issue("undefined_name", f"name '{name}' is never defined",
+                                 node.lineno, node.col_offset + 1))
+    return issues
+
+
+def forbidden_modules() -> frozenset:
+    """Top-level modules generated code may not import (PREFLIGHT_FORBIDDEN_IMPORTS, comma-separated)."""
+    configured = os.getenv("PREFLIGHT_FORBIDDEN_IMPORTS")
+    names = configured.split(",") if configured is not None else DEFAULT_FORBIDDEN_MODULES
+    return frozenset(name.strip() for name in names if name.strip())
+
+
+def _dunder_import(node: ast.Call):
+    """The module named by `__import__("name")`, else None."""
+    if (isinstance(node.func, ast.Name) and node.func.id == "__import__"
+            and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+        return node.args[0].value
+    return None
+
+
+def _check_imports(index: dict) -> list:
+    forbidden = forbidden_modules()
+    issues = []
+    for node, module in index["imports"]:
+        top = module.split(".")[0]
+        if top in forbidden:
+            issues.append(_issue("forbidden_import", f"importing '{top}' is not allowed",
+                                 node.lineno, node.col_offset + 1))
+        elif not module_available(top):
+            issues.append(_issue("unresolved_import", f"module '{top}' is not installed",
+                                 node.lineno, node.col_offset + 1))
+    return issues
+
+
+def _call_name(node: ast.Call):
+    func = node.func
+    return func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+
+
+def _check_solve(index: dict) -> list:
+    if any(_call_name(node) in _SOLVE_METHODS for node in index["calls"]):
+        return []
+    return [_issue("missing_solve", "the code never calls solve()")]
+
+
+def _leaves_loop(loop: ast.AST) -> bool:
+    """Whether anything in the loop's body can end it: a break of its own, return, raise or exit()."""
+    def scan(nodes, nested: bool) -> bool:
+        for node in nodes:
+            if isinstance(node, (ast.Return, ast.Raise)) or (isinstance(node, ast.Break) and not nested):
+                return True
+            if isinstance(node, ast.Call) and _call_name(node) in ("exit", "quit", "_exit"):
+                return True
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                continue  # returns in there end a different frame
+            # a break inside a nested loop only ends that loop
+            if scan(ast.iter_child_nodes(node), nested or isinstance(node, _LOOPS)):
+                return True
+        return False
+
+    return scan(loop.body, False)
+
+
+def _is_endless(loop: ast.AST) -> bool:
+    if isinstance(loop, ast.While):
+        test = loop.test
+        return isinstance(test, ast.Constant) and bool(test.value)
+    if isinstance(loop.iter, ast.Call):
+        func = loop.iter.func  # itertools.count() or a bare count() imported from it
+        return _call_name(loop.iter) == "count" and (
+            isinstance(func, ast.Name) or getattr(func.value, "id", None) == "itertools")
+    return False
+
+
+def _check_loops(index: dict) -> list:
+    return [
+        _issue("unbounded_loop", "this loop has no way to end (no break, return or raise)",
+               node.lineno, node.col_offset + 1)
+        for node in index["loops"]
+        if _is_endless(node) and not _leaves_loop(node)
+    ]
+
+
+def _sort_key(issue: dict):
+    return (issue["line"] or 0, issue["col"] or 0)
+
+
+def preflight(code: str, require_solve: bool = True) -> dict:
+    """
+    Statically checks generated code and, if it passes, compiles it for the executor.
+
+    The code is parsed once, and compiled once if it passes; the executor runs the
+    returned bytecode instead of compiling the source again (see solver_pool._execute_job).
+    Tracebacks still refer to `File "<string>"`, as they would for source.
+
+    Args:
+        code: The Python source to check
+        require_solve: Whether code that never calls solve() is rejected
+
+    Returns:
+        dict: 'ok' (bool), 'issues' (each a dict with 'line', 'col' (1-based), 'category' and
+              'message', sorted by position), 'bytecode' (marshalled code object, None unless
+              ok) and 'seconds' the checks took. Categories: syntax, undefined_name,
+              unresolved_import, forbidden_import, missing_solve, unbounded_loop.
+    """
+    started = time.perf_counter()
+    bytecode = None
+    try:
+        tree = ast.parse(code, "<string>")
+    except SyntaxError as e:
+        issues = [_issue("syntax", e.msg, e.lineno, e.offset)]
+    except ValueError as e:  # e.g. source containing null bytes
+        issues = [_issue("syntax", str(e))]
+    else:
+        index = _index(tree)
+        issues = _check_imports(index) + _check_names(index) + _check_loops(index)
+        if require_solve:
+            issues += _check_solve(index)
+        issues.sort(key=_sort_key)
+        if not issues:  # only code that will run is worth compiling
+            try:
+                bytecode = marshal.dumps(compile(tree, "<string>", "exec"))
+            except SyntaxError as e:  # errors only the compiler finds, e.g. 'return' outside a function
+                issues = [_issue("syntax", e.msg, e.lineno, e.offset)]
+    return {
+        "ok": not issues,
+        "issues": issues,
+        "bytecode": bytecode,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def check_code(code: str, require_solve: bool = True) -> list:
+    """
+    Statically checks generated code without running it.
+
+    Args:
+        code: The Python source to check
+        require_solve: Whether code that never calls solve() is an issue
+
+    Returns:
+        list: The issues `preflight` finds. An empty list means the code may be executed.
+    """
+    return preflight(code, require_solve)["issues"]
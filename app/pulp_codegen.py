@@ -0,0 +1,741 @@
+# Deterministic translation of a formulated model (ModelIR) into PuLP code.
+#
+# Gemini writes the objective and constraints as LaTeX, e.g.
+#     "$\sum_{r \in R} x_{wr} \leq s_w$ for all $w \in W$ (Supply constraints)"
+# For structurally complete models (sets with elements, parameters with data,
+# variables with domains, linear objective and constraints) this module parses
+# that LaTeX into linear expressions and emits the equivalent PuLP program,
+# which takes milliseconds instead of a Gemini round-trip. Anything it cannot
+# translate with certainty raises `UnsupportedModel`, and the caller falls back
+# to LLM code generation.
+
+import keyword
+import re
+
+from model_ir import ModelIR, split_subscript, strip_math
+
+
+class UnsupportedModel(Exception):
+    """Raised for model constructs the local generator does not translate."""
+
+
+# Names the generated program itself uses
+_RESERVED = {"pulp", "model", "status", "sum", "range", "print", "len", "value"}
+
+_TEXT_WRAPPERS = re.compile(
+    r"\\(?:text|textrm|textit|mathrm|mathit|mathbf|mathcal|boldsymbol|operatorname)\s*\{([^{}]*)\}"
+)
+_FORALL_WORDS = re.compile(r"\b(?:for\s+(?:all|each|every)|for)\b", re.IGNORECASE)
+_DOMAIN_STATEMENT = re.compile(
+    r"^(?P<symbol>.+?)\s*\\in\s*(?P<domain>\\\{\s*0\s*,\s*1\s*\\\}|\\mathbb\s*\{?\s*[ZNR]\s*\}?.*)$"
+)
+_DESCRIPTION = re.compile(r"\(([^()$]*)\)\s*\.?\s*$")
+_LABEL = re.compile(r"^\s*([^$]+?)\s*:\s*(?=\$)")
+_INDEX_BINDING = re.compile(r"([A-Za-z])\s*\\in\s*\\?([A-Za-z]\w*)")
+
+_TOKEN = re.compile(
+    r"(?P<num>\d+(?:\.\d+)?|\.\d+)"
+    r"|(?P<cmd>\\[A-Za-z]+|\\[,;:! ])"
+    r"|(?P<name>[A-Za-z]+)"
+    r"|(?P<rel><=|>=|!=|=|<|>)"
+    r"|(?P<op>[-+*/^_,:(){}\[\]])"
+    r"|(?P<ws>\s+)"
+)
+
+_COMMANDS = {
+    "sum": ("sum", None), "frac": ("frac", None), "dfrac": ("frac", None), "tfrac": ("frac", None),
+    "in": ("in", None), "forall": ("forall", None),
+    "leq": ("rel", "<="), "le": ("rel", "<="), "leqslant": ("rel", "<="),
+    "geq": ("rel", ">="), "ge": ("rel", ">="), "geqslant": ("rel", ">="),
+    "neq": ("rel", "!="), "ne": ("rel", "!="),
+    "cdot": ("op", "*"), "times": ("op", "*"), "ast": ("op", "*"),
+    "min": ("name", "min"), "max": ("name", "max"),
+}
+_SPACING = {"quad", "qquad", "limits", "displaystyle", "left", "right", "big", "Big", "bigg", "Bigg",
+            ",", ";", ":", "!", " "}
+_UNICODE = {"≤": r"\leq ", "≥": r"\geq ", "≠": r"\neq ", "∀": r"\forall ", "∈": r"\in ",
+            "∑": r"\sum", "·": r"\cdot ", "×": r"\times ", "−": "-"}
+_SPACING_COMMANDS = re.compile(r"\\(?:q?quad|[,;:! ])")
+_SENSE_WORDS = {"min", "max", "minimize", "maximize", "minimise", "maximise"}
+
+
+def _normalize(text: str) -> str:
+    """Flattens the LaTeX of one formula into something the tokenizer understands."""
+    for char, replacement in _UNICODE.items():
+        text = text.replace(char, replacement)
+    text = _SPACING_COMMANDS.sub(" ", text.replace("$", " "))
+    previous = None
+    while previous != text:
+        previous = text
+        text = _TEXT_WRAPPERS.sub(r" \1 ", text)
+    text = _FORALL_WORDS.sub(r" \\forall ", text)
+    return text.strip().rstrip(".;,").strip()
+
+
+def _tokenize(text: str) -> list:
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise UnsupportedModel(f"unexpected character {text[position]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "ws":
+            continue
+        if kind == "cmd":
+            command = value[1:]
+            if command in _SPACING:
+                continue
+            if command in _COMMANDS:
+                kind, mapped = _COMMANDS[command]
+                value = mapped if mapped is not None else command
+            elif command.isalpha():
+                kind, value = "name", command  # Greek letters and other symbol names
+            else:
+                raise UnsupportedModel(f"unsupported LaTeX command {value}")
+        tokens.append((kind, value))
+    tokens.append(("end", None))
+    return tokens
+
+
+def _python_name(symbol: str) -> str:
+    name = symbol.replace("\\", "")
+    if not name.isidentifier():
+        raise UnsupportedModel(f"symbol {symbol!r} has no Python equivalent")
+    if keyword.iskeyword(name) or name in _RESERVED:
+        name += "_"
+    return name
+
+
+def _number(value) -> str:
+    value = float(value)
+    return repr(int(value)) if value.is_integer() else repr(value)
+
+
+def _comment(text) -> str:
+    text = strip_math(str(text)).replace("\\$", "\0").replace("$", "").replace("\0", "$")
+    return " ".join(text.split())
+
+
+class _Expr:
+    """A translated (sub)expression: Python source, degree in the decision variables and precedence."""
+
+    __slots__ = ("code", "degree", "precedence", "summation")
+
+    def __init__(self, code: str, degree: int, precedence: int, summation: tuple = None):
+        self.code = code
+        self.degree = degree
+        self.precedence = precedence  # 0: sum of terms, 1: product, 2: atom
+        self.summation = summation  # (body, loops) of a sum, so nested sums can be flattened
+
+    def wrapped(self, precedence: int) -> str:
+        return f"({self.code})" if self.precedence < precedence else self.code
+
+
+class _Symbols:
+    """Everything a formula may refer to: sets, index names, parameters and variables."""
+
+    def __init__(self, ir: ModelIR):
+        self.sets = {}          # set symbol -> elements
+        self.set_comments = {}
+        self.index_sets = {}    # index name -> set symbol
+        self.params = {}        # base symbol -> {"name", "table", "description"}
+        self.variables = {}     # base symbol (or full symbol for literal subscripts) -> info
+        self.used_params = {}   # base symbol -> set of index-set tuples it is used with
+        self.used_sets = set()
+        self.python_names = {}
+
+        for index_set in ir.sets:
+            symbol = _normalize(index_set.symbol)
+            elements = index_set.elements
+            if not elements:
+                table = ir.data.get(f"${index_set.symbol}$", ir.data.get(index_set.symbol))
+                if table is not None and table.kind == "raw" and isinstance(table.raw, list) and table.raw \
+                        and all(isinstance(e, (int, str)) and not isinstance(e, bool) for e in table.raw):
+                    elements = tuple(str(e) for e in table.raw)
+            if not elements:
+                raise UnsupportedModel(f"no elements given for set {index_set.symbol}")
+            if len(set(elements)) != len(elements):
+                raise UnsupportedModel(f"set {index_set.symbol} has duplicate elements")
+            self.sets[symbol] = list(elements)
+            self.set_comments[symbol] = _comment(index_set.name)
+            self._claim_name(symbol)
+            if len(symbol) == 1:
+                self.index_sets.setdefault(symbol.lower(), symbol)
+
+        texts = [ir.objective.expression if ir.objective else ""]
+        texts += [c.raw for c in ir.constraints if isinstance(c.raw, str)]
+        learned = {}
+        for text in texts:
+            for index, set_symbol in _INDEX_BINDING.findall(_normalize(text)):
+                if set_symbol in self.sets:
+                    learned.setdefault(index, set()).add(set_symbol)
+        for index, set_symbols in learned.items():
+            if len(set_symbols) == 1:
+                self.index_sets[index] = next(iter(set_symbols))
+
+        declared = {p.base: p for p in ir.parameters}
+        for key, table in ir.data.items():
+            base = _normalize(strip_math(key).split("_", 1)[0]).replace("\\", "")
+            if table.kind == "list" or base in self.sets:
+                continue
+            parameter = declared.get(base) or declared.get("\\" + base)
+            self.params[base] = {
+                "name": None,
+                "table": table,
+                "description": _comment(parameter.description) if parameter else "",
+            }
+
+        for variable in ir.variables:
+            base = _normalize(variable.base).replace("\\", "")
+            index_sets = []
+            for index in variable.indices:
+                if index in self.index_sets:
+                    index_sets.append(self.index_sets[index])
+                else:
+                    index_sets = None
+                    break
+            if index_sets is None:
+                # Literal subscripts such as x_1, x_2 declare separate scalar variables
+                base = f"{base}_{'_'.join(variable.indices)}"
+                index_sets = []
+            if base in self.variables:
+                raise UnsupportedModel(f"variable {variable.key} is declared twice")
+            self.variables[base] = {
+                "name": self._claim_name(base),
+                "sets": tuple(index_sets),
+                "domain": variable.domain,
+                "lower": variable.lower,
+                "upper": variable.upper,
+                "description": _comment(variable.description),
+            }
+
+    def _claim_name(self, symbol: str) -> str:
+        name = _python_name(symbol)
+        if name in self.python_names and self.python_names[name] != symbol:
+            raise UnsupportedModel(f"symbols {symbol!r} and {self.python_names[name]!r} clash")
+        self.python_names[name] = symbol
+        return name
+
+    def param_name(self, base: str) -> str:
+        info = self.params[base]
+        if info["name"] is None:
+            info["name"] = self._claim_name(base)
+        return info["name"]
+
+    def check_index_name(self, index: str):
+        if not index.isidentifier() or keyword.iskeyword(index) or index in self.python_names \
+                or index in _RESERVED:
+            raise UnsupportedModel(f"index {index!r} cannot be used as a loop variable")
+
+
+class _Parser:
+    """Recursive-descent parser from LaTeX tokens to linear PuLP expressions."""
+
+    def __init__(self, tokens: list, symbols: _Symbols, bound: dict):
+        self.tokens = tokens
+        self.position = 0
+        self.symbols = symbols
+        self.bound = dict(bound)  # index name -> set symbol
+
+    # --- token helpers ---
+
+    def peek(self, offset: int = 0):
+        return self.tokens[min(self.position + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def accept(self, kind: str, value=None) -> bool:
+        token = self.peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, kind: str, value=None):
+        if not self.accept(kind, value):
+            raise UnsupportedModel(f"expected {value or kind}, found {self.peek()[1]!r}")
+
+    def group(self) -> list:
+        """Tokens of a `{...}` group or of a single token, as used after `_` and `^`."""
+        if not self.accept("op", "{"):
+            return [self.next()]
+        depth, tokens = 1, []
+        while True:
+            token = self.next()
+            if token[0] == "end":
+                raise UnsupportedModel("unbalanced braces")
+            if token == ("op", "{"):
+                depth += 1
+            elif token == ("op", "}"):
+                depth -= 1
+                if depth == 0:
+                    return tokens
+            tokens.append(token)
+
+    # --- grammar ---
+
+    def relation(self):
+        lhs = self.expression()
+        token = self.next()
+        if token[0] != "rel" or token[1] not in ("<=", ">=", "="):
+            raise UnsupportedModel(f"expected a relation, found {token[1]!r}")
+        rhs = self.expression()
+        if self.peek()[0] != "end":
+            raise UnsupportedModel(f"unexpected {self.peek()[1]!r} after constraint")
+        if lhs.degree == 0 and rhs.degree == 0:
+            raise UnsupportedModel("constraint without decision variables")
+        operator = "==" if token[1] == "=" else token[1]
+        return f"{lhs.code} {operator} {rhs.code}"
+
+    def objective(self) -> _Expr:
+        while self.peek()[0] == "name" and self.peek()[1].lower() in _SENSE_WORDS:
+            self.next()
+        # "Z = ..." names the objective value
+        if self.peek()[0] == "name" and self.peek(1) == ("rel", "=") \
+                and self.peek()[1] not in self.symbols.variables:
+            self.position += 2
+        expression = self.expression()
+        if self.peek()[0] != "end":
+            raise UnsupportedModel(f"unexpected {self.peek()[1]!r} in objective")
+        return expression
+
+    def expression(self) -> _Expr:
+        parts = []
+        degree = 0
+        sign = "-" if self.accept("op", "-") else ("+" if self.accept("op", "+") else "+")
+        while True:
+            term = self.term()
+            degree = max(degree, term.degree)
+            parts.append((sign, term))
+            if self.accept("op", "+"):
+                sign = "+"
+            elif self.accept("op", "-"):
+                sign = "-"
+            else:
+                break
+        code = ""
+        for i, (sign, term) in enumerate(parts):
+            text = term.wrapped(1)
+            if i == 0:
+                code = f"-{text}" if sign == "-" else text
+            else:
+                code += f" {sign} {text}"
+        if len(parts) == 1 and parts[0][0] == "+":
+            return parts[0][1]
+        return _Expr(code, degree, 0 if len(parts) > 1 else 1)
+
+    def term(self) -> _Expr:
+        factors = [self.factor()]
+        while True:
+            token = self.peek()
+            if token == ("op", "*"):
+                self.next()
+                factors.append(self.factor())
+            elif token == ("op", "/"):
+                self.next()
+                denominator = self.factor()
+                if denominator.degree:
+                    raise UnsupportedModel("division by a decision variable")
+                previous = factors.pop()
+                factors.append(_Expr(f"{previous.wrapped(1)} / {denominator.wrapped(2)}", previous.degree, 1))
+            elif token[0] in ("num", "name", "sum", "frac") or token in (("op", "("), ("op", "{")):
+                factors.append(self.factor())  # juxtaposition is multiplication
+            else:
+                break
+        if len(factors) == 1:
+            return factors[0]
+        degree = sum(f.degree for f in factors)
+        if degree > 1:
+            raise UnsupportedModel("nonlinear term")
+        return _Expr(" * ".join(f.wrapped(1) for f in factors), degree, 1)
+
+    def factor(self) -> _Expr:
+        kind, value = self.peek()
+        if kind == "num":
+            self.next()
+            return _Expr(_number(value), 0, 2)
+        if kind == "op" and value in ("(", "{", "["):
+            self.next()
+            inner = self.expression()
+            self.expect("op", {"(": ")", "{": "}", "[": "]"}[value])
+            return _Expr(f"({inner.code})" if inner.precedence == 0 else inner.code, inner.degree, 2)
+        if kind == "sum":
+            self.next()
+            return self.summation()
+        if kind == "frac":
+            self.next()
+            numerator = _Parser(self.group() + [("end", None)], self.symbols, self.bound).expression()
+            denominator = _Parser(self.group() + [("end", None)], self.symbols, self.bound).expression()
+            if denominator.degree:
+                raise UnsupportedModel("division by a decision variable")
+            return _Expr(f"{numerator.wrapped(1)} / {denominator.wrapped(2)}", numerator.degree, 1)
+        if kind == "name":
+            self.next()
+            return self.symbol(value)
+        raise UnsupportedModel(f"unexpected {value!r}")
+
+    def summation(self) -> _Expr:
+        if not self.accept("op", "_"):
+            raise UnsupportedModel("summation without index")
+        bindings, conditions = _parse_bindings(self.group(), self.symbols)
+        if self.peek() == ("op", "^"):
+            raise UnsupportedModel("summation with an upper limit")
+        outer = self.bound
+        self.bound = dict(outer)
+        for index, set_symbol in bindings:
+            self.bound[index] = set_symbol
+        body = self.term()
+        self.bound = outer
+        loops = " ".join(f"for {index} in {_python_name(set_symbol)}" for index, set_symbol in bindings)
+        loops += "".join(f" if {condition}" for condition in conditions)
+        inner = body.code
+        if body.summation is not None:
+            # sum_i sum_j a_ij x_ij becomes a single lpSum over both indices
+            inner, inner_loops = body.summation
+            loops = f"{loops} {inner_loops}"
+        function = "pulp.lpSum" if body.degree else "sum"
+        return _Expr(f"{function}({inner} {loops})", body.degree, 2, (inner, loops))
+
+    def symbol(self, name: str) -> _Expr:
+        indices = ()
+        if self.accept("op", "_"):
+            subscript = "".join(str(value) for _, value in self.group())
+            indices = split_subscript(subscript)
+        if self.peek() == ("op", "^"):
+            raise UnsupportedModel(f"superscript on {name}")
+
+        variables = self.symbols.variables
+        literal = f"{name}_{'_'.join(indices)}" if indices else None
+        if literal in variables and not variables[literal]["sets"]:
+            return _Expr(variables[literal]["name"], 1, 2)
+        if name in variables:
+            info = variables[name]
+            self._check_indices(name, indices, info["sets"])
+            access = "".join(f"[{index}]" for index in indices)
+            return _Expr(f"{info['name']}{access}", 1, 2)
+        if name in self.symbols.params:
+            return self._parameter(name, indices)
+        if name in self.bound and not indices:
+            raise UnsupportedModel(f"index {name} used as a number")
+        if not indices and len(name) > 1 and all(
+                char in variables or char in self.symbols.params for char in name):
+            # "cx" is c * x
+            factors = [self.symbol(char) for char in name]
+            degree = sum(f.degree for f in factors)
+            if degree > 1:
+                raise UnsupportedModel("nonlinear term")
+            return _Expr(" * ".join(f.code for f in factors), degree, 1)
+        raise UnsupportedModel(f"unknown symbol {name!r}")
+
+    def _check_indices(self, name: str, indices: tuple, expected_sets: tuple):
+        if len(indices) != len(expected_sets):
+            raise UnsupportedModel(f"{name} used with {len(indices)} indices, declared with {len(expected_sets)}")
+        for index, set_symbol in zip(indices, expected_sets):
+            if index not in self.bound:
+                raise UnsupportedModel(f"index {index} of {name} is not bound")
+            if self.bound[index] != set_symbol:
+                raise UnsupportedModel(f"index {index} of {name} ranges over {self.bound[index]}, not {set_symbol}")
+
+    def _parameter(self, name: str, indices: tuple) -> _Expr:
+        info = self.symbols.params[name]
+        table = info["table"]
+        python_name = self.symbols.param_name(name)
+        for index in indices:
+            if index not in self.bound:
+                raise UnsupportedModel(f"index {index} of {name} is not bound")
+        index_sets = tuple(self.bound[index] for index in indices)
+        _check_coverage(name, table, index_sets, self.symbols)
+        self.symbols.used_params.setdefault(name, set()).add(index_sets)
+        if not indices:
+            return _Expr(python_name, 0, 2)
+        return _Expr(python_name + "".join(f"[{index}]" for index in indices), 0, 2)
+
+
+def _parse_bindings(tokens: list, symbols: _Symbols):
+    """Parses "i \\in I, j \\in J : i \\neq j" into [(index, set)] and Python conditions."""
+    items, current = [], []
+    for token in tokens:
+        if token in (("op", ","), ("op", ":")):
+            items.append(current)
+            current = []
+        else:
+            current.append(token)
+    items.append(current)
+
+    bindings, pending, conditions = [], [], []
+    for item in items:
+        if not item:
+            continue
+        shape = [kind for kind, _ in item]
+        if shape == ["name"]:
+            pending.append(item[0][1])
+        elif shape == ["name", "in", "name"]:
+            set_symbol = item[2][1]
+            if set_symbol not in symbols.sets:
+                raise UnsupportedModel(f"unknown set {set_symbol!r}")
+            for index in pending + [item[0][1]]:
+                bindings.append((index, set_symbol))
+            pending = []
+        elif shape == ["name", "rel", "name"] and item[1][1] == "!=":
+            conditions.append((item[0][1], item[2][1]))
+        else:
+            raise UnsupportedModel("unsupported index specification")
+    for index in pending:
+        if index not in symbols.index_sets:
+            raise UnsupportedModel(f"cannot tell which set index {index} ranges over")
+        bindings.append((index, symbols.index_sets[index]))
+    if not bindings:
+        raise UnsupportedModel("empty index specification")
+
+    bound = {index for index, _ in bindings}
+    for index, set_symbol in bindings:
+        symbols.check_index_name(index)
+        symbols.used_sets.add(set_symbol)
+    for left, right in conditions:
+        if left not in bound and right not in bound:
+            raise UnsupportedModel("condition does not refer to a bound index")
+    return bindings, [f"{left} != {right}" for left, right in conditions]
+
+
+def _check_coverage(name: str, table, index_sets: tuple, symbols: _Symbols):
+    """Makes sure the data defines the parameter for every index combination it is used with."""
+    if not index_sets:
+        if table.kind != "raw" or isinstance(table.raw, bool) or not isinstance(table.raw, (int, float)):
+            raise UnsupportedModel(f"parameter {name} has no scalar value")
+        return
+    if len(index_sets) == 1 and table.kind == "dense":
+        missing = set(symbols.sets[index_sets[0]]) - set(table.labels)
+    elif len(index_sets) == 2 and table.kind == "csr":
+        present = {key for key, _ in table.items()}
+        missing = {(r, c) for r in symbols.sets[index_sets[0]] for c in symbols.sets[index_sets[1]]} - present
+    else:
+        raise UnsupportedModel(f"data for {name} does not match its {len(index_sets)} indices")
+    if missing:
+        raise UnsupportedModel(f"data for {name} misses {len(missing)} index combinations")
+
+
+def _split_constraint(raw: str):
+    """Splits a constraint entry into its LaTeX formula and its descriptive name."""
+    description = ""
+    match = _DESCRIPTION.search(raw)
+    if match and raw[:match.start()].count("$") % 2 == 0:
+        description = match.group(1).strip()
+        raw = raw[:match.start()]
+    label = _LABEL.match(raw)
+    if label:
+        description = description or label.group(1)
+        raw = raw[label.end():]
+    return raw, description
+
+
+def _split_quantifier(text: str):
+    """Separates "body \\forall i \\in I" (or "\\forall i \\in I: body") into body and quantifier."""
+    marker = text.find("\\forall")
+    if marker == -1:
+        return text, ""
+    if marker == 0 or not text[:marker].strip().strip(",").strip():
+        rest = text[marker + len("\\forall"):]
+        if ":" not in rest:
+            raise UnsupportedModel("cannot find the end of the quantifier")
+        quantifier, body = rest.split(":", 1)
+        return body, quantifier
+    body = text[:marker].rstrip().rstrip(",").rstrip()
+    quantifier = text[marker + len("\\forall"):]
+    return body, re.sub(r"\band\b|\\forall", ",", quantifier)
+
+
+def _constraint_name(description: str, number: int, used: set) -> str:
+    name = re.sub(r"\W+", "_", description).strip("_") or f"C{number}"
+    unique, suffix = name, 2
+    while unique in used:
+        unique, suffix = f"{name}_{suffix}", suffix + 1
+    used.add(unique)
+    return unique
+
+
+def _domain_statement(formula: str, symbols: _Symbols) -> bool:
+    """Applies statements such as "x_{ij} \\in \\{0,1\\}" to the variable's domain."""
+    match = _DOMAIN_STATEMENT.match(formula.strip())
+    if not match:
+        return False
+    symbol = match.group("symbol").split("_", 1)[0].strip().replace("\\", "")
+    if symbol not in symbols.variables:
+        raise UnsupportedModel(f"domain statement for unknown symbol {symbol!r}")
+    domain = match.group("domain")
+    info = symbols.variables[symbol]
+    if "{" in domain and "0" in domain:
+        info["domain"], info["lower"], info["upper"] = "Binary", 0.0, 1.0
+    elif re.search(r"[ZN]", domain):
+        if info["domain"] != "Binary":
+            info["domain"] = "Integer"
+        if re.search(r"\+|\\geq\s*0|N", domain):
+            info["lower"] = 0.0 if info["lower"] is None else info["lower"]
+    return True
+
+
+def _objective_sense(sense: str, expression: str) -> str:
+    """Reads the sense from the objective's type, or from a leading min/max in its expression."""
+    for text in (sense.lower(), expression.lstrip("\\").lower()[:8]):
+        has_min, has_max = text.startswith("min") or " min" in text, text.startswith("max") or " max" in text
+        if has_min != has_max:
+            return "pulp.LpMinimize" if has_min else "pulp.LpMaximize"
+    raise UnsupportedModel(f"objective sense {sense!r} is not minimize or maximize")
+
+
+def _variable_lines(symbols: _Symbols) -> list:
+    lines = []
+    categories = {"Binary": "pulp.LpBinary", "Integer": "pulp.LpInteger", "Continuous": "pulp.LpContinuous"}
+    for base, info in symbols.variables.items():
+        lower, upper = info["lower"], info["upper"]
+        if lower is None and info["domain"] != "Binary" and not re.search(
+                r"\b(free|unrestricted)\b", info["description"], re.IGNORECASE):
+            lower = 0.0  # OR convention: decision variables are non-negative unless stated otherwise
+        arguments = []
+        if info["domain"] != "Binary":
+            if lower is not None:
+                arguments.append(f"lowBound={_number(lower)}")
+            if upper is not None:
+                arguments.append(f"upBound={_number(upper)}")
+        arguments.append(f"cat={categories[info['domain']]}")
+        comment = f"  # {info['description']}" if info["description"] else ""
+        if info["sets"]:
+            sets = [_python_name(s) for s in info["sets"]]
+            index = sets[0] if len(sets) == 1 else f"({', '.join(sets)})"
+            lines.append(f"{info['name']} = pulp.LpVariable.dicts({base!r}, {index}, {', '.join(arguments)}){comment}")
+        else:
+            lines.append(f"{info['name']} = pulp.LpVariable({base!r}, {', '.join(arguments)}){comment}")
+    return lines
+
+
+def _data_literal(table) -> str:
+    if table.kind == "raw":
+        return _number(table.raw)
+    if table.kind == "dense":
+        return table.python_repr()
+    nested = {}
+    for (row, col), number in table.items():
+        nested.setdefault(row, {})[col] = number
+    return repr(nested)
+
+
+def translate_model(ir: ModelIR) -> str:
+    """
+    Translates a formulated model into an executable PuLP program.
+
+    Args:
+        ir: The model, as returned by `formulate_model_from_nlp`
+
+    Returns:
+        str: PuLP code that builds, solves and prints the model
+
+    Raises:
+        UnsupportedModel: When part of the model cannot be translated with certainty
+    """
+    if not ir.sets or not ir.variables or ir.objective is None or not ir.constraints:
+        raise UnsupportedModel("model is missing sets, variables, objective or constraints")
+    expression_text = _normalize(str(ir.objective.expression))
+    sense_code = _objective_sense(str(ir.objective.sense), expression_text)
+
+    symbols = _Symbols(ir)
+    objective = _Parser(_tokenize(expression_text), symbols, {}).objective()
+    if objective.degree == 0:
+        raise UnsupportedModel("objective without decision variables")
+
+    constraint_blocks = []
+    used_names = set()
+    for number, constraint in enumerate(ir.constraints, start=1):
+        raw = constraint.raw
+        if not isinstance(raw, str):
+            raise UnsupportedModel("constraint is not a LaTeX string")
+        formula, description = _split_constraint(raw)
+        body, quantifier = _split_quantifier(_normalize(formula))
+        if _domain_statement(body, symbols):
+            continue
+        bindings, conditions = [], []
+        if quantifier.strip():
+            bindings, conditions = _parse_bindings(_tokenize(quantifier)[:-1], symbols)
+        bound = dict(bindings)
+        relation = _Parser(_tokenize(body), symbols, bound).relation()
+        name = _constraint_name(_comment(description), number, used_names)
+        if bindings:
+            name_code = "f" + repr(name + "".join(f"_{{{index}}}" for index, _ in bindings))
+        else:
+            name_code = repr(name)
+        lines = [f"# {_comment(description) or _comment(raw)}"]
+        indent = ""
+        for index, set_symbol in bindings:
+            lines.append(f"{indent}for {index} in {_python_name(set_symbol)}:")
+            indent += "    "
+        for condition in conditions:
+            lines.append(f"{indent}if {condition}:")
+            indent += "    "
+        lines.append(f"{indent}model += {relation}, {name_code}")
+        constraint_blocks.append(lines)
+
+    variable_lines = _variable_lines(symbols)
+
+    code = [
+        "# PuLP model generated from the structured formulation.",
+        "import pulp",
+        "",
+        "# Sets",
+    ]
+    used_sets = symbols.used_sets | {s for info in symbols.variables.values() for s in info["sets"]}
+    for set_symbol, elements in symbols.sets.items():
+        if set_symbol in used_sets:
+            comment = f"  # {symbols.set_comments[set_symbol]}" if symbols.set_comments[set_symbol] else ""
+            code.append(f"{_python_name(set_symbol)} = {elements!r}{comment}")
+    if symbols.used_params:
+        code += ["", "# Parameters"]
+        for base, info in symbols.params.items():
+            if base in symbols.used_params:
+                comment = f"  # {info['description']}" if info["description"] else ""
+                code.append(f"{info['name']} = {_data_literal(info['table'])}{comment}")
+    code += [
+        "",
+        "# Model",
+        f"model = pulp.LpProblem(\"OR_Model\", {sense_code})",
+        "",
+        "# Decision variables",
+        *variable_lines,
+        "",
+        "# Objective function",
+        f"model += {objective.code}, \"Objective_Function\"",
+        "",
+        "# Constraints",
+    ]
+    for block in constraint_blocks:
+        code += block
+    code += [
+        "",
+        "# Solve the model",
+        "status = model.solve()",
+        "",
+        "print(f\"Status: {pulp.LpStatus[status]}\")",
+        "print(f\"Objective Value: {pulp.value(model.objective)}\")",
+    ]
+    for base, info in symbols.variables.items():
+        if not info["sets"]:
+            code.append(f"print(f\"{base} = {{{info['name']}.varValue}}\")")
+            continue
+        indices = [f"_{i}" for i in range(len(info["sets"]))]
+        indent = ""
+        for index, set_symbol in zip(indices, info["sets"]):
+            code.append(f"{indent}for {index} in {_python_name(set_symbol)}:")
+            indent += "    "
+        access = "".join(f"[{index}]" for index in indices)
+        label = ",".join(f"{{{index}}}" for index in indices)
+        code.append(f"{indent}print(f\"{base}[{label}] = {{{info['name']}{access}.varValue}}\")")
+
+    source = "\n".join(code) + "\n"
+    try:
+        compile(source, "<generated>", "exec")
+    except SyntaxError as e:
+        raise UnsupportedModel(f"generated code does not compile: {e}")
+    return source
@@ -0,0 +1,342 @@
+# Disk-backed, content-addressed cache for Gemini responses.
+#
+# Every Gemini call site (problem optimization, parsing, code generation and
+# validation) goes through `cached_generate` so that re-sending the exact same
+# prompt to the same model with the same generation config is answered from a
+# local SQLite file instead of the network. The SQLite file is shared by all
+# worker processes on the machine, and entries are evicted by TTL and by an
+# LRU size bound.
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "auto-modeler", "llm_cache.sqlite3"
+)
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalizes a prompt so that insignificant whitespace differences hash equally."""
+    lines = [line.rstrip() for line in str(prompt).strip().splitlines()]
+    return "\n".join(lines)
+
+
+def make_cache_key(prompt: str, model_name: str, generation_config: dict = None) -> str:
+    """Returns the content hash of (normalized prompt, model name, generation config)."""
+    payload = json.dumps(
+        {
+            "prompt": normalize_prompt(prompt),
+            "model": model_name or "",
+            "config": generation_config or {},
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    A small key/value store on top of SQLite with TTL and LRU eviction.
+
+    Values are JSON-serializable objects. The database is opened per call, so a
+    single file can safely be shared between threads and worker processes.
+    Hit/miss counters are kept in the database as well, which makes them
+    reflect the whole deployment rather than a single process.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, table: str = "responses"):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_idx"
+                    f" ON {self.table} (accessed_at)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_stats ("
+                    " name TEXT PRIMARY KEY,"
+                    " hits INTEGER NOT NULL DEFAULT 0,"
+                    " misses INTEGER NOT NULL DEFAULT 0)"
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO cache_stats (name, hits, misses) VALUES (?, 0, 0)",
+                    (self.table,),
+                )
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def _count(self, conn: sqlite3.Connection, column: str):
+        conn.execute(
+            f"UPDATE cache_stats SET {column} = {column} + 1 WHERE name = ?", (self.table,)
+        )
+
+    def get(self, key: str, count_stats: bool = True):
+        """Returns the cached value for `key`, or None on a miss or expired entry."""
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                if count_stats:
+                    self._count(conn, "misses")
+                return None
+            conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            if count_stats:
+                self._count(conn, "hits")
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def set(self, key: str, value):
+        """Stores `value` under `key` and evicts expired and least recently used entries."""
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            if self.ttl_seconds:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,)
+                )
+            if self.max_entries:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f" SELECT key FROM {self.table} ORDER BY accessed_at DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def delete(self, key: str):
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Removes every entry and resets the hit/miss counters."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.execute(
+                "UPDATE cache_stats SET hits = 0, misses = 0 WHERE name = ?", (self.table,)
+            )
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current number of entries."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            hits, misses = conn.execute(
+                "SELECT hits, misses FROM cache_stats WHERE name = ?", (self.table,)
+            ).fetchone()
+            entries = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        finally:
+            conn.close()
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide Gemini response cache configured from the environment."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    path=os.path.expanduser(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                    ttl_seconds=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                )
+    return _response_cache
+
+
+def cache_enabled() -> bool:
+    return os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+
+
+def extract_response_text(response) -> str:
+    """Pulls the text out of a Gemini response, falling back to the first part."""
+    try:
+        if hasattr(response, 'text') and response.text:
+            return response.text
+    except ValueError:
+        # response.text raises when the candidate has no text parts (e.g. blocked output)
+        pass
+    if hasattr(response, 'parts') and response.parts and hasattr(response.parts[0], 'text'):
+        return response.parts[0].text or ""
+    return ""
+
+
+def cached_generate(model, prompt: str, model_name: str, generation_config: dict = None,
+                    use_cache: bool = True) -> str:
+    """
+    Returns the text Gemini produces for `prompt`, answering from the response cache when possible.
+
+    Args:
+        model: A configured `GenerativeModel` used on a cache miss
+        prompt: The prompt to send
+        model_name: The model name, part of the cache key
+        generation_config: The generation config the model was built with, part of the cache key
+        use_cache: Set to False to bypass the cache for this call (the fresh answer is still stored)
+
+    Returns:
+        str: The response text, or an empty string when Gemini returned no text
+    """
+    cache = get_response_cache() if cache_enabled() else None
+    key = make_cache_key(prompt, model_name, generation_config)
+    cached = _lookup(cache, key, model_name) if use_cache else None
+    if cached is not None:
+        return cached
+
+    response = model.generate_content(prompt)
+    text = extract_response_text(response)
+    _store(cache, key, model_name, text)
+    return text
+
+
+def cached_generate_stream(model, prompt: str, model_name: str, generation_config: dict = None,
+                           use_cache: bool = True):
+    """
+    Streaming variant of `cached_generate`: yields the response text in chunks as Gemini produces it.
+
+    A cache hit is yielded as a single chunk. A streamed response is stored once it
+    is complete, under the same key `cached_generate` uses, so both variants share
+    cache entries.
+
+    Args:
+        model: A configured `GenerativeModel` used on a cache miss
+        prompt: The prompt to send
+        model_name: The model name, part of the cache key
+        generation_config: The generation config the model was built with, part of the cache key
+        use_cache: Set to False to bypass the cache for this call (the fresh answer is still stored)
+
+    Yields:
+        str: Non-empty chunks of the response text
+    """
+    cache = get_response_cache() if cache_enabled() else None
+    key = make_cache_key(prompt, model_name, generation_config)
+    cached = _lookup(cache, key, model_name) if use_cache else None
+    if cached is not None:
+        if cached:
+            yield cached
+        return
+
+    parts = []
+    for chunk in model.generate_content(prompt, stream=True):
+        text = extract_response_text(chunk)
+        if text:
+            parts.append(text)
+            yield text
+    _store(cache, key, model_name, "".join(parts))
+
+
+def _lookup(cache, key: str, model_name: str):
+    if cache is None:
+        return None
+    try:
+        cached = cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM response cache lookup failed, calling Gemini directly: {e}")
+        return None
+    CACHE_LOOKUPS.inc(cache="llm", result="miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    logger.info(f"LLM response cache hit for {model_name} (key {key[:12]}).")
+    return cached["text"]
+
+
+def _store(cache, key: str, model_name: str, text: str):
+    if cache is None or not text:
+        return
+    try:
+        cache.set(key, {"text": text, "model": model_name})
+    except sqlite3.Error as e:
+        logger.warning(f"Could not store Gemini response in cache: {e}")
+
+
+def invalidate_cached(prompt: str, model_name: str, generation_config: dict = None):
+    """Drops a cached response, e.g. when its text turned out to be unusable downstream."""
+    if not cache_enabled():
+        return
+    try:
+        get_response_cache().delete(make_cache_key(prompt, model_name, generation_config))
+    except sqlite3.Error as e:
+        logger.warning(f"Could not invalidate cached Gemini response: {e}")
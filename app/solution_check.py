@@ -0,0 +1,300 @@
+# Deterministic check of a solved model's numbers, without the LLM.
+#
+# The solve hooks record every model generated code solves as plain lists
+# (see solve_hooks.capture_problem). This module turns them into NumPy arrays
+# and computes the activity, slack and violation of every constraint at once,
+# plus bound and integrality violations and the objective value, so checking a
+# solution is a few vector operations instead of a Gemini round trip.
+#
+# `run_rules` applies the sanity rules (bounds, integrality, unused variables,
+# constraints that can never bind, coefficient ranges, big-M bounds) the same
+# way: every rule is a handful of array operations over all rows or columns.
+
+import logging
+import os
+import re
+import time
+from typing import TYPE_CHECKING
+
+# numpy is loaded by the first check, not when the module is imported.
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOLERANCE = 1e-6
+INTEGRALITY_TOLERANCE = 1e-5
+# How many violated or binding constraints are listed by name
+MAX_LISTED = 10
+
+SENSE_SYMBOLS = {-1: "<=", 0: "=", 1: ">="}
+
+# Bounds at least this large are treated as artificial ("big-M") rather than real limits
+BIG_M_THRESHOLD = 1e6
+# Largest/smallest nonzero magnitude within a constraint beyond which it is flagged
+COEFFICIENT_RATIO_LIMIT = 1e8
+
+SEVERITY_ORDER = {"error": 0, "warning": 1, "info": 2}
+
+_REPORTED_OBJECTIVE = re.compile(
+    r"objective[^\n:=]*[:=]\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)", re.IGNORECASE
+)
+
+
+def reported_objective(execution_output: str):
+    """
+    The objective value the program printed (the last "Objective ...: <number>" line).
+
+    Returns:
+        tuple: (value, absolute tolerance implied by the printed precision), or (None, None)
+    """
+    matches = _REPORTED_OBJECTIVE.findall(execution_output or "")
+    if not matches:
+        return None, None
+    text = matches[-1]
+    mantissa, _, exponent = text.lower().partition("e")
+    decimals = len(mantissa.partition(".")[2])
+    rounding = 0.5 * 10.0 ** (int(exponent or 0) - decimals)
+    return float(text), rounding
+
+
+def latest_captured_model(solve_report: dict):
+    """The model recorded for the last solve in a run's solve report, or None."""
+    for entry in reversed((solve_report or {}).get("solves") or []):
+        if entry.get("model"):
+            return entry
+    return None
+
+
+def _floats(values) -> "np.ndarray":
+    import numpy as np
+    return np.array(values, dtype=float)  # None (unset values, missing bounds) becomes NaN
+
+
+def model_arrays(model: dict) -> dict:
+    """
+    Converts a recorded model's lists into NumPy arrays once, so `verify_solution`
+    and `run_rules` can share them. Missing values and bounds are NaN.
+    """
+    import numpy as np
+    variables, constraints, objective = model["variables"], model["constraints"], model["objective"]
+    return {
+        "names": variables["names"],
+        "values": _floats(variables["values"]),
+        "lower": _floats(variables["lower"]),
+        "upper": _floats(variables["upper"]),
+        "integer": np.array(variables["integer"], dtype=bool),
+        "row_names": constraints["names"],
+        "senses": np.array(constraints["senses"], dtype=int),
+        "rhs": _floats(constraints["rhs"]),
+        "rows": np.array(constraints["rows"], dtype=int),
+        "cols": np.array(constraints["cols"], dtype=int),
+        "coefs": _floats(constraints["coefs"]),
+        "objective_cols": np.array(objective["cols"], dtype=int),
+        "objective_coefs": _floats(objective["coefs"]),
+        "objective_constant": float(objective["constant"]),
+    }
+
+
+def verify_solution(model: dict, execution_output: str = None, tolerance: float = None,
+                    arrays: dict = None) -> dict:
+    """
+    Checks a recorded solution against its model.
+
+    A constraint counts as violated when it is off by more than `tolerance` relative
+    to its right-hand side (tolerance * (1 + |rhs|)), and as binding when it holds
+    with a slack within that margin. Variables without a value count as zero.
+
+    Args:
+        model: A model recorded by solve_hooks.capture_problem
+        execution_output: The program's stdout, to compare the objective it printed
+        tolerance: Feasibility tolerance. Defaults to VALIDATION_TOLERANCE (1e-6).
+        arrays: `model_arrays(model)`, if already computed
+
+    Returns:
+        dict: 'feasible' (bool), 'constraints' and 'variables' (counts), 'violated_constraints',
+              'max_violation', 'violations' (the worst, each 'name', 'sense', 'activity', 'rhs',
+              'violation'), 'binding_constraints' and 'binding' (names), 'unset_values',
+              'bound_violations' and 'integrality_violations' (each 'name', 'value'),
+              'objective' ('computed', 'reported', 'consistent'), 'tolerance' and 'seconds'.
+    """
+    import numpy as np
+    started = time.perf_counter()
+    if tolerance is None:
+        tolerance = float(os.getenv("VALIDATION_TOLERANCE", DEFAULT_TOLERANCE))
+    a = arrays or model_arrays(model)
+    names, row_names = a["names"], a["row_names"]
+    unset = np.isnan(a["values"])
+    x = np.where(unset, 0.0, a["values"])
+
+    # Constraint activities from the sparse rows: one weighted bincount
+    senses, rhs, rows, cols, coefs = a["senses"], a["rhs"], a["rows"], a["cols"], a["coefs"]
+    activity = np.bincount(rows, weights=coefs * x[cols], minlength=len(rhs))
+    residual = activity - rhs
+    violation = np.where(senses < 0, np.maximum(residual, 0.0),
+                         np.where(senses > 0, np.maximum(-residual, 0.0), np.abs(residual)))
+    margin = tolerance * (1.0 + np.abs(rhs))
+    violated = violation > margin
+    binding = ~violated & (np.abs(residual) <= margin)
+
+    worst = np.flatnonzero(violated)
+    worst = worst[np.argsort(-violation[worst], kind="stable")][:MAX_LISTED]
+    violations = [
+        {
+            "name": row_names[i],
+            "sense": SENSE_SYMBOLS.get(int(senses[i]), str(senses[i])),
+            "activity": float(activity[i]),
+            "rhs": float(rhs[i]),
+            "violation": float(violation[i]),
+        }
+        for i in worst
+    ]
+
+    # Bounds (None means unbounded on that side) and integrality
+    lower, upper = a["lower"], a["upper"]
+    with np.errstate(invalid="ignore"):
+        below = (lower - x) > tolerance * (1.0 + np.abs(lower))
+        above = (x - upper) > tolerance * (1.0 + np.abs(upper))
+    integer = a["integer"]
+    fractional = integer & (np.abs(x - np.round(x)) > INTEGRALITY_TOLERANCE)
+
+    def listed(mask):
+        return [{"name": names[j], "value": float(x[j])} for j in np.flatnonzero(mask)[:MAX_LISTED]]
+
+    computed = float(np.dot(a["objective_coefs"], x[a["objective_cols"]]) + a["objective_constant"])
+    reported, rounding = reported_objective(execution_output)
+    consistent = None
+    if reported is not None:
+        consistent = abs(computed - reported) <= max(tolerance * (1.0 + abs(computed)), rounding)
+
+    feasible = not (violated.any() or below.any() or above.any() or fractional.any())
+    return {
+        "feasible": bool(feasible),
+        "constraints": int(len(rhs)),
+        "variables": len(names),
+        "violated_constraints": int(violated.sum()),
+        "max_violation": float(violation.max()) if len(violation) else 0.0,
+        "violations": violations,
+        "binding_constraints": int(binding.sum()),
+        "binding": [row_names[i] for i in np.flatnonzero(binding)[:MAX_LISTED]],
+        "unset_values": int(unset.sum()),
+        "bound_violations": listed(below | above),
+        "integrality_violations": listed(fractional),
+        "objective": {"computed": computed, "reported": reported, "consistent": consistent},
+        "tolerance": tolerance,
+        "seconds": round(time.perf_counter() - started, 6),
+    }
+
+
+def _finding(rule: str, severity: str, message: str, names: list, count: int) -> dict:
+    return {"rule": rule, "severity": severity, "message": message, "count": int(count),
+            "items": [str(name) for name in names[:MAX_LISTED]]}
+
+
+def _named(names: list, mask: "np.ndarray") -> list:
+    import numpy as np
+    return [names[j] for j in np.flatnonzero(mask)[:MAX_LISTED]]
+
+
+def run_rules(model: dict, values=None, tolerance: float = None, arrays: dict = None) -> list:
+    """
+    Applies the sanity rules to a recorded model and its solution.
+
+    Rules: bound_violation and integrality_violation (errors), variable_at_big_m_bound
+    and coefficient_range (warnings), unused_variable and never_binding (info). A
+    constraint is never binding when the variable bounds alone keep it satisfied, so
+    it cannot influence any solution.
+
+    Args:
+        model: A model recorded by solve_hooks.capture_problem
+        values: Optional solution to check instead of the recorded one: a mapping from
+                variable name to value, or a sequence in the model's variable order
+        tolerance: Feasibility tolerance. Defaults to VALIDATION_TOLERANCE (1e-6).
+        arrays: `model_arrays(model)`, if already computed
+
+    Returns:
+        list: Findings, most severe first, each a dict with 'rule', 'severity', 'message',
+              'count' and 'items' (up to MAX_LISTED variable or constraint names)
+    """
+    import numpy as np
+    if tolerance is None:
+        tolerance = float(os.getenv("VALIDATION_TOLERANCE", DEFAULT_TOLERANCE))
+    a = arrays or model_arrays(model)
+    names, row_names = a["names"], a["row_names"]
+    if values is None:
+        x = a["values"]
+    elif isinstance(values, dict):
+        x = _floats([values.get(name) for name in names])
+    else:
+        x = _floats(values)
+    x = np.nan_to_num(x, nan=0.0)
+    lower, upper, integer = a["lower"], a["upper"], a["integer"]
+    rhs, senses = a["rhs"], a["senses"]
+    rows, cols, coefs = a["rows"], a["cols"], a["coefs"]
+    nonzero = coefs != 0
+    rows, cols, coefs = rows[nonzero], cols[nonzero], coefs[nonzero]
+    n, m = len(names), len(rhs)
+    findings = []
+
+    # Bounds and integrality of the solution
+    with np.errstate(invalid="ignore"):
+        outside = ((lower - x) > tolerance * (1.0 + np.abs(lower))) | ((x - upper) > tolerance * (1.0 + np.abs(upper)))
+    if outside.any():
+        findings.append(_finding("bound_violation", "error",
+                                 f"{int(outside.sum())} variables lie outside their bounds.",
+                                 _named(names, outside), outside.sum()))
+    fractional = integer & (np.abs(x - np.round(x)) > INTEGRALITY_TOLERANCE)
+    if fractional.any():
+        findings.append(_finding("integrality_violation", "error",
+                                 f"{int(fractional.sum())} integer or binary variables have fractional values.",
+                                 _named(names, fractional), fractional.sum()))
+
+    # Solution values sitting on bounds that are only there to make a big-M formulation work
+    with np.errstate(invalid="ignore"):
+        at_big_m = ((np.abs(lower) >= BIG_M_THRESHOLD) & (np.abs(x - lower) <= tolerance * (1.0 + np.abs(lower)))) | \
+                   ((np.abs(upper) >= BIG_M_THRESHOLD) & (np.abs(x - upper) <= tolerance * (1.0 + np.abs(upper))))
+    if at_big_m.any():
+        findings.append(_finding("variable_at_big_m_bound", "warning",
+                                 f"{int(at_big_m.sum())} variables sit at a bound of {BIG_M_THRESHOLD:g} or more, "
+                                 "which looks artificial; the model may be missing a real limit.",
+                                 _named(names, at_big_m), at_big_m.sum()))
+
+    # Variables that no constraint or the objective refers to
+    used = np.bincount(cols, minlength=n) > 0
+    used[a["objective_cols"][a["objective_coefs"] != 0]] = True
+    if (~used).any():
+        findings.append(_finding("unused_variable", "info",
+                                 f"{int((~used).sum())} variables appear in no constraint and not in the objective.",
+                                 _named(names, ~used), (~used).sum()))
+
+    if m and len(coefs):
+        # Activity range of every row over the variable bounds; a row whose range lies
+        # inside its feasible side can never be binding
+        low = np.where(np.isnan(lower), -np.inf, lower)[cols]
+        high = np.where(np.isnan(upper), np.inf, upper)[cols]
+        min_activity = np.bincount(rows, weights=np.where(coefs > 0, coefs * low, coefs * high), minlength=m)
+        max_activity = np.bincount(rows, weights=np.where(coefs > 0, coefs * high, coefs * low), minlength=m)
+        margin = tolerance * (1.0 + np.abs(rhs))
+        never = ((senses < 0) & (max_activity < rhs - margin)) | ((senses > 0) & (min_activity > rhs + margin))
+        if never.any():
+            findings.append(_finding("never_binding", "info",
+                                     f"{int(never.sum())} constraints are implied by the variable bounds alone and "
+                                     "can never be binding.",
+                                     _named(row_names, never), never.sum()))
+
+        # Magnitude spread within each row; rows are recorded in order, so reduceat works per row
+        magnitude = np.abs(coefs)
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        ratio = np.maximum.reduceat(magnitude, starts) / np.minimum.reduceat(magnitude, starts)
+        wide = ratio > COEFFICIENT_RATIO_LIMIT
+        if wide.any():
+            wide_rows = rows[starts][wide]
+            order = np.argsort(-ratio[wide], kind="stable")
+            findings.append(_finding("coefficient_range", "warning",
+                                     f"{int(wide.sum())} constraints mix coefficients more than "
+                                     f"{COEFFICIENT_RATIO_LIMIT:g} apart (overall range {magnitude.min():.3g} to "
+                                     f"{magnitude.max():.3g}), which invites numerical trouble in the solver.",
+                                     [row_names[i] for i in wide_rows[order]], wide.sum()))
+
+    findings.sort(key=lambda finding: SEVERITY_ORDER[finding["severity"]])
+    return findings
@@ -0,0 +1,320 @@
+# Two-level cache for solver runs.
+#
+# Level 1 is keyed by a hash of the normalized solver code (comments and
+# insignificant whitespace removed) and stores the whole execution result, so
+# re-running identical code from the UI never starts a process.
+#
+# Level 2 is keyed by a hash of the canonical LP actually built by the code,
+# captured from the `LpProblem` right before `solve()` inside the solver child
+# (see solve_hooks.py). Textually different programs that build the same model
+# share a solution, which is written back into the problem's variables so the
+# program's own printing code runs unchanged.
+#
+# Identical in-flight computations are coalesced at both levels: threads of one
+# process wait on each other directly, and processes coordinate through a claim
+# row in the shared SQLite file. A claim names the process that holds it, so the
+# claim of a solver child killed on a timeout is dropped as soon as it is seen.
+
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import tokenize
+
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOLVE_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "auto-modeler", "solve_cache.sqlite3"
+)
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# How long a claim on an in-flight computation is honoured, even while its owner
+# lives, before other processes compute the result themselves.
+DEFAULT_CLAIM_TIMEOUT = 300
+CLAIM_POLL_SECONDS = 0.05
+
+
+def normalize_code(code: str) -> str:
+    """Returns `code` with comments, blank lines and insignificant whitespace removed."""
+    try:
+        tokens = tokenize.generate_tokens(io.StringIO(code).readline)
+        parts = []
+        for tok in tokens:
+            if tok.type in (tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER):
+                continue
+            if tok.type == tokenize.NEWLINE:
+                parts.append("\n")
+            elif tok.type == tokenize.INDENT:
+                parts.append("<INDENT>")
+            elif tok.type == tokenize.DEDENT:
+                parts.append("<DEDENT>")
+            else:
+                parts.append(tok.string)
+        return " ".join(parts)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Broken code is not worth normalizing; hash it verbatim
+        return code.strip()
+
+
+def code_cache_key(code: str, extra: dict = None) -> str:
+    """Level-1 key: hash of the normalized code plus anything else that affects the run."""
+    payload = json.dumps({"code": normalize_code(code), "extra": extra or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _num(value):
+    """Canonical JSON-friendly form of a bound or coefficient."""
+    if value is None:
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def canonicalize_problem(problem):
+    """
+    Builds the canonical form of a PuLP `LpProblem`.
+
+    Returns:
+        tuple: (hash of the canonical model, list of constraint names in canonical order)
+    """
+    variables = sorted(problem.variables(), key=lambda v: v.name)
+    var_rows = [[v.name, _num(v.lowBound), _num(v.upBound), str(v.cat)] for v in variables]
+
+    rows = []
+    for name, constraint in problem.constraints.items():
+        coefficients = sorted((v.name, _num(c)) for v, c in constraint.items())
+        row = json.dumps([coefficients, constraint.sense, _num(-constraint.constant)])
+        rows.append((row, name))
+    rows.sort()
+
+    objective = []
+    objective_constant = 0
+    if problem.objective is not None:
+        objective = sorted((v.name, _num(c)) for v, c in problem.objective.items())
+        objective_constant = _num(problem.objective.constant)
+
+    canonical = json.dumps(
+        {
+            "sense": problem.sense,
+            "variables": var_rows,
+            "constraints": [row for row, _ in rows],
+            "objective": objective,
+            "objective_constant": objective_constant,
+        },
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest(), [name for _, name in rows]
+
+
+def snapshot_solution(problem, status: int, constraint_order: list) -> dict:
+    """Captures what a solve produced so it can be replayed into an identical problem."""
+    return {
+        "status": status,
+        "sol_status": getattr(problem, "sol_status", None),
+        "values": {v.name: v.varValue for v in problem.variables()},
+        "reduced_costs": {v.name: getattr(v, "dj", None) for v in problem.variables()},
+        "duals": [getattr(problem.constraints[name], "pi", None) for name in constraint_order],
+        "slacks": [getattr(problem.constraints[name], "slack", None) for name in constraint_order],
+    }
+
+
+def apply_solution(problem, snapshot: dict, constraint_order: list) -> int:
+    """Writes a cached solution into `problem` as if it had just been solved."""
+    values = snapshot["values"]
+    reduced_costs = snapshot.get("reduced_costs") or {}
+    for v in problem.variables():
+        v.varValue = values.get(v.name)
+        v.dj = reduced_costs.get(v.name)
+    for name, pi, slack in zip(constraint_order, snapshot["duals"], snapshot["slacks"]):
+        problem.constraints[name].pi = pi
+        problem.constraints[name].slack = slack
+    problem.status = snapshot["status"]
+    if snapshot.get("sol_status") is not None:
+        problem.sol_status = snapshot["sol_status"]
+    return snapshot["status"]
+
+
+def is_cacheable_solution(snapshot: dict) -> bool:
+    """Only definitive outcomes are cached; time-limited or aborted solves are not."""
+    if snapshot["status"] == 1:  # Optimal: require a proven optimum, not just a feasible incumbent
+        return snapshot.get("sol_status") in (None, 1)
+    return snapshot["status"] in (-1, -2)  # Infeasible, Unbounded
+
+
+def cache_enabled() -> bool:
+    return os.getenv("SOLVE_CACHE_ENABLED", "true").lower() == "true"
+
+
+def _make_cache(table: str) -> ResponseCache:
+    return ResponseCache(
+        path=os.path.expanduser(os.getenv("SOLVE_CACHE_PATH", DEFAULT_SOLVE_CACHE_PATH)),
+        max_entries=int(os.getenv("SOLVE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv("SOLVE_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        table=table,
+    )
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_code_cache() -> ResponseCache:
+    """Level-1 cache: execution results keyed by normalized code."""
+    with _caches_lock:
+        if "code" not in _caches:
+            _caches["code"] = _make_cache("code_results")
+        return _caches["code"]
+
+
+def get_lp_cache() -> ResponseCache:
+    """Level-2 cache: solutions keyed by canonical LP."""
+    with _caches_lock:
+        if "lp" not in _caches:
+            _caches["lp"] = _make_cache("lp_solutions")
+        return _caches["lp"]
+
+
+# --- Coalescing of identical in-flight computations ------------------------
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _owner_alive(pid: int) -> bool:
+    """Whether the process holding a claim still exists (assumed where that cannot be checked)."""
+    if os.name != "posix":
+        return True  # os.kill would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # it exists, under another user
+    return True
+
+
+def _claim(cache: ResponseCache, key: str, claim_timeout: float) -> bool:
+    """Tries to become the one process computing `key`; stale claims and those of dead owners are taken over."""
+    conn = sqlite3.connect(cache.path, timeout=10, isolation_level=None)
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS inflight_claims ("
+            " key TEXT PRIMARY KEY, owner INTEGER NOT NULL, claimed_at REAL NOT NULL)"
+        )
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "DELETE FROM inflight_claims WHERE key = ? AND claimed_at < ?",
+            (key, now - claim_timeout),
+        )
+        held = conn.execute("SELECT owner FROM inflight_claims WHERE key = ?", (key,)).fetchone()
+        if held is not None and not _owner_alive(held[0]):
+            conn.execute("DELETE FROM inflight_claims WHERE key = ? AND owner = ?", (key, held[0]))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO inflight_claims (key, owner, claimed_at) VALUES (?, ?, ?)",
+            (key, os.getpid(), now),
+        )
+        conn.execute("COMMIT")
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def _release(cache: ResponseCache, key: str):
+    conn = sqlite3.connect(cache.path, timeout=10, isolation_level=None)
+    try:
+        conn.execute("DELETE FROM inflight_claims WHERE key = ? AND owner = ?", (key, os.getpid()))
+    finally:
+        conn.close()
+
+
+def _claim_held(cache: ResponseCache, key: str) -> bool:
+    """Whether a live process holds the claim on `key`."""
+    conn = sqlite3.connect(cache.path, timeout=10, isolation_level=None)
+    try:
+        held = conn.execute(
+            "SELECT owner FROM inflight_claims WHERE key = ?", (key,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return held is not None and _owner_alive(held[0])
+
+
+def _compute_across_processes(cache: ResponseCache, key: str, compute, should_store,
+                              claim_timeout: float, wait_timeout: float):
+    try:
+        claimed = _claim(cache, key, claim_timeout)
+    except sqlite3.Error as e:
+        logger.warning(f"Solve cache claim failed, computing without coalescing: {e}")
+        return compute()
+
+    if not claimed:
+        # Another process is computing the same thing: wait for its result
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(CLAIM_POLL_SECONDS)
+            cached = cache.get(key, count_stats=False)
+            if cached is not None:
+                return cached
+            if not _claim_held(cache, key):
+                break  # owner gave up without a cacheable result, or was killed
+        return compute()
+
+    try:
+        result = compute()
+        if should_store(result):
+            cache.set(key, result)
+        return result
+    finally:
+        _release(cache, key)
+
+
+def coalesced(cache: ResponseCache, key: str, compute, should_store=lambda result: True,
+              claim_timeout: float = DEFAULT_CLAIM_TIMEOUT, wait_timeout: float = None):
+    """
+    Returns the cached value for `key`, or computes it exactly once across all
+    threads and processes that ask for the same key at the same time.
+
+    Args:
+        cache: Cache the result is read from and stored in
+        key: Cache key
+        compute: Zero-argument callable producing the (JSON-serializable) result
+        should_store: Predicate deciding whether a computed result is cached
+        claim_timeout: Seconds after which another process' claim is considered stale
+        wait_timeout: Seconds to wait for another thread's or process' computation before
+                      computing here instead. Defaults to `claim_timeout`.
+    """
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    with _inflight_lock:
+        entry = _inflight.get(key)
+        leader = entry is None
+        if leader:
+            entry = {"event": threading.Event(), "result": None, "ok": False}
+            _inflight[key] = entry
+
+    if wait_timeout is None:
+        wait_timeout = claim_timeout
+    if not leader:
+        entry["event"].wait(wait_timeout)
+        if entry["ok"]:
+            return entry["result"]
+        return compute()
+
+    try:
+        entry["result"] = _compute_across_processes(cache, key, compute, should_store, claim_timeout,
+                                                    wait_timeout)
+        entry["ok"] = True
+        return entry["result"]
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        entry["event"].set()
@@ -0,0 +1,222 @@
+# Hooks installed into the solver child process before generated code runs.
+#
+# Generated code builds a PuLP model and calls `model.solve()` itself, so the
+# execution layer cannot pass anything to the solver directly. Instead, the
+# child patches `pulp.LpProblem.solve` before executing the code, which lets
+# the execution layer observe the model that was built and change how it is
+# solved. What the hooks learn is collected in a report that the executor
+# sends back to the parent together with stdout/stderr.
+#
+# Job options understood here:
+#   use_cache    - reuse solutions of identical canonical LPs (default True)
+#   export_path  - write the first model solved to this path as MPS
+#   export_only  - stop the program right after the export instead of solving
+#   solver_options - per-request solver options (see solver_options.py); the
+#                  server defaults and the run's time limit apply either way
+#
+# The solver the code chose is replaced by the backend the options select
+# (see solver_backends.py). Each solve's report entry says which backend ran and
+# why, with which options, how long it took, and whether the solve ended on the
+# time limit with a feasible but unproven solution ('limit_reached').
+# With the `portfolio` option the model is raced on several configurations
+# instead (see solver_portfolio.py), and the entry's 'portfolio' says which won.
+#
+# Every solve also records the solved model's numbers (variable values and
+# bounds, constraint rows, objective) in the report, for the local solution
+# check in solution_check.py. Models with more than SOLUTION_CAPTURE_MAX_NONZEROS
+# coefficients are not recorded.
+
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+
+from solve_cache import (apply_solution, cache_enabled, canonicalize_problem, coalesced,
+                         get_lp_cache, is_cacheable_solution, snapshot_solution)
+from solver_backends import solver_for
+from solver_portfolio import race
+from solver_options import cache_variant, resolve_options
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPTURE_MAX_NONZEROS = 200000
+
+_report = {"solves": []}
+
+
+def get_report() -> dict:
+    return _report
+
+
+def write_report(path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(_report, f, default=str)
+
+
+def solve_with_lp_cache(original_solve, problem, solver, kwargs, entry: dict, variant: dict = None,
+                        wait_timeout: float = None) -> int:
+    """
+    Solves `problem`, reusing the solution of an identical canonical LP when one is cached.
+    Solutions found under different `variant` options (e.g. a MIP gap) are cached apart.
+    An identical solve in progress elsewhere is waited for at most `wait_timeout` seconds.
+    """
+    lp_hash, constraint_order = canonicalize_problem(problem)
+    if variant:
+        lp_hash = hashlib.sha256(f"{lp_hash}:{json.dumps(variant, sort_keys=True)}".encode("utf-8")).hexdigest()
+    entry["lp_hash"] = lp_hash
+    solved_here = []
+
+    def compute():
+        status = original_solve(problem, solver, **kwargs)
+        solved_here.append(status)
+        return snapshot_solution(problem, status, constraint_order)
+
+    snapshot = coalesced(get_lp_cache(), lp_hash, compute, should_store=is_cacheable_solution,
+                         wait_timeout=wait_timeout)
+    if solved_here:
+        return solved_here[0]
+    entry["lp_cache_hit"] = True
+    return apply_solution(problem, snapshot, constraint_order)
+
+
+def _export(problem, path: str, entry: dict):
+    """Writes the first model the code solves to `path` in MPS format."""
+    problem.writeMPS(path, with_objsense=True)
+    entry["exported"] = {
+        "name": problem.name,
+        "rows": len(problem.constraints),
+        "columns": len(problem.variables()),
+    }
+
+
+def _finite(value):
+    """JSON has no infinities or NaN: those (and unset bounds or values) become None."""
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def capture_problem(problem) -> dict:
+    """
+    Records the numbers of a solved problem in plain lists: variables (values, bounds,
+    integrality), constraint rows as sparse triplets with senses and right-hand sides,
+    and the objective. Returns None when the model exceeds the capture size limit.
+    """
+    limit = int(os.getenv("SOLUTION_CAPTURE_MAX_NONZEROS", DEFAULT_CAPTURE_MAX_NONZEROS))
+    variables = problem.variables()
+    column = {v.name: j for j, v in enumerate(variables)}
+    rows, cols, coefs = [], [], []
+    names, senses, rhs = [], [], []
+    for i, (name, constraint) in enumerate(problem.constraints.items()):
+        for v, c in constraint.items():
+            rows.append(i)
+            cols.append(column[v.name])
+            coefs.append(float(c))
+        if len(coefs) > limit:
+            return None
+        names.append(name)
+        senses.append(constraint.sense)
+        rhs.append(float(-constraint.constant))
+    objective = problem.objective
+    return {
+        "sense": problem.sense,
+        "variables": {
+            "names": [v.name for v in variables],
+            "values": [_finite(v.varValue) for v in variables],
+            "lower": [_finite(v.lowBound) for v in variables],
+            "upper": [_finite(v.upBound) for v in variables],
+            "integer": [v.cat == "Integer" for v in variables],
+        },
+        "constraints": {"names": names, "senses": senses, "rhs": rhs, "rows": rows, "cols": cols, "coefs": coefs},
+        "objective": {
+            "cols": [column[v.name] for v in objective.keys()] if objective is not None else [],
+            "coefs": [float(c) for c in objective.values()] if objective is not None else [],
+            "constant": float(objective.constant) if objective is not None else 0.0,
+        },
+    }
+
+
+def limit_reached(status: int, sol_status) -> bool:
+    """A solve that stopped before proving its answer: a feasible incumbent or nothing yet."""
+    import pulp
+
+    if status == pulp.LpStatusOptimal:
+        return sol_status == pulp.LpSolutionIntegerFeasible
+    return status == pulp.LpStatusNotSolved
+
+
+def install(job: dict):
+    """Patches pulp for the job about to run. Does nothing if pulp is not installed."""
+    try:
+        import pulp
+    except ImportError:
+        return
+
+    original_solve = pulp.LpProblem.solve
+    use_lp_cache = job.get("use_cache", True) and cache_enabled()
+    export_path = job.get("export_path")
+    overrides = job.get("solver_options")
+    deadline = time.monotonic() + job["timeout"] if job.get("timeout") else None
+
+    def solve(self, solver=None, **kwargs):
+        entry = {"lp_cache_hit": False}
+        _report["solves"].append(entry)
+        if export_path and len(_report["solves"]) == 1:
+            _export(self, export_path, entry)
+            if job.get("export_only"):
+                raise SystemExit(0)  # the model is all that was asked for
+        options = resolve_options(overrides, deadline - time.monotonic() if deadline else None)
+        members = options.get("portfolio")
+        if members:
+            run = lambda problem, solver, **kwargs: race(original_solve, problem, members, options, entry)
+            solver = None
+            entry["backend"], entry["backend_reason"] = "portfolio", f"{len(members)} members"
+            entry["options"] = options
+        else:
+            run = original_solve
+            code_solver = solver or self.solver or pulp.LpSolverDefault
+            solver, entry["backend"], entry["backend_reason"] = solver_for(self, code_solver, options)
+            entry["solver"] = solver.name
+            entry["options"] = dict(options, timeLimit=solver.timeLimit) if solver.timeLimit else options
+        started = time.perf_counter()
+        status = None
+        if use_lp_cache:
+            attempted = []
+
+            def run_once(problem, solver, **kwargs):
+                attempted.append(True)
+                if deadline is not None:  # time spent waiting for another process' solve is gone
+                    time_limit = resolve_options(overrides, deadline - time.monotonic())["timeLimit"]
+                    options["timeLimit"] = min(options.get("timeLimit") or time_limit, time_limit)
+                    if solver is not None and solver.timeLimit and solver.timeLimit > time_limit:
+                        solver.timeLimit = time_limit
+                return run(problem, solver, **kwargs)
+
+            # Half of the time left may go to waiting for an identical solve elsewhere,
+            # which leaves the other half to solve here if that one never answers
+            wait_timeout = (deadline - time.monotonic()) / 2 if deadline is not None else None
+            try:
+                status = solve_with_lp_cache(run_once, self, solver, kwargs, entry,
+                                             variant=cache_variant(options), wait_timeout=wait_timeout)
+            except Exception as e:  # the cache must never break a solve
+                if attempted:
+                    raise  # the solve itself failed; doing it again would not help
+                logger.warning(f"LP solution cache unavailable: {e}")
+        if status is None:
+            status = run(self, solver, **kwargs)
+        entry["solve_seconds"] = round(time.perf_counter() - started, 4)
+        entry["status"] = pulp.LpStatus.get(status, str(status))
+        sol_status = getattr(self, "sol_status", None)
+        entry["solution_status"] = pulp.LpSolution.get(sol_status) if sol_status is not None else None
+        entry["limit_reached"] = limit_reached(status, sol_status)
+        try:
+            entry["model"] = capture_problem(self)
+        except Exception as e:  # nor may recording what it produced
+            logger.warning(f"Could not record the solved model: {e}")
+        return status
+
+    solve.__doc__ = original_solve.__doc__
+    pulp.LpProblem.solve = solve
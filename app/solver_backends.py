@@ -0,0 +1,126 @@
+# Registry of the solver backends that generated code's solves are redirected to.
+#
+# The solve hooks (solve_hooks.py) replace the solver the code passes to
+# `model.solve()` with a fresh, silent solver from this registry, configured
+# with the run's options (see solver_options.py). The backend is chosen per
+# solve by the `backend` option (SOLVER_BACKEND):
+#
+#   auto       - pick by problem class and size, from the backends installed (default)
+#   code       - keep the solver the generated code chose
+#   cbc        - CBC bundled with PuLP, run as a command on an MPS file
+#   highs      - HiGHS in-process through highspy: no temp files, no extra process
+#   highs_cmd  - the HiGHS command-line binary, for builds without highspy
+#
+# "auto" follows AUTO_POLICY. HiGHS solved our LPs 1.5-2x faster than CBC
+# (transport models of 100 to 40000 variables), while on MIPs neither was
+# consistently faster and CBC won most small ones, so LPs go to HiGHS and MIPs
+# to CBC. Models above SOLVER_AUTO_INPROCESS_MAX_NONZEROS skip the in-process
+# HiGHS, which would hold a second copy of the model in the solver child.
+#
+# Every backend is a local library or binary; none needs a service.
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+AUTO, CODE = "auto", "code"
+DEFAULT_INPROCESS_MAX_NONZEROS = 1000000
+
+
+def _cbc():
+    import pulp
+    return pulp.PULP_CBC_CMD(msg=False)
+
+
+def _highs():
+    import pulp
+    return pulp.HiGHS(msg=False)
+
+
+def _highs_cmd():
+    import pulp
+    return pulp.HiGHS_CMD(msg=False)
+
+
+# name -> function returning a new PuLP solver that prints nothing
+BACKENDS = {"cbc": _cbc, "highs": _highs, "highs_cmd": _highs_cmd}
+
+# problem class -> backends to use, most preferred first
+AUTO_POLICY = {
+    "lp": ("highs", "highs_cmd", "cbc"),
+    "mip": ("cbc", "highs", "highs_cmd"),
+    "large_lp": ("highs_cmd", "cbc", "highs"),
+    "large_mip": ("cbc", "highs_cmd", "highs"),
+}
+
+_available = {}
+
+
+def register_backend(name: str, factory):
+    """Adds (or replaces) a backend: `factory()` returns a new PuLP solver object."""
+    BACKENDS[name] = factory
+    _available.pop(name, None)
+
+
+def backend_names() -> list:
+    """Every registered backend, installed or not."""
+    return list(BACKENDS)
+
+
+def is_available(name: str) -> bool:
+    """Whether the backend's solver is installed here; checked once per process."""
+    if name not in _available:
+        try:
+            _available[name] = bool(BACKENDS[name]().available())
+        except Exception as e:
+            logger.debug(f"Solver backend {name} is not usable: {e}")
+            _available[name] = False
+    return _available[name]
+
+
+def available_backends() -> list:
+    return [name for name in BACKENDS if is_available(name)]
+
+
+def problem_class(problem) -> str:
+    """'lp' or 'mip', prefixed with 'large_' above SOLVER_AUTO_INPROCESS_MAX_NONZEROS coefficients."""
+    kind = "mip" if problem.isMIP() else "lp"
+    limit = int(os.getenv("SOLVER_AUTO_INPROCESS_MAX_NONZEROS", DEFAULT_INPROCESS_MAX_NONZEROS))
+    nonzeros = sum(len(constraint) for constraint in problem.constraints.values())
+    return f"large_{kind}" if nonzeros > limit else kind
+
+
+def choose_backend(problem) -> tuple:
+    """The "auto" choice for `problem`: (backend name, problem class)."""
+    kind = problem_class(problem)
+    for name in AUTO_POLICY[kind]:
+        if is_available(name):
+            return name, kind
+    return "cbc", kind
+
+
+def solver_for(problem, code_solver, options: dict) -> tuple:
+    """
+    The solver to solve `problem` with, given the solver the code chose (None for
+    PuLP's default) and the run's options, whose 'backend' picks the backend.
+
+    Returns:
+        tuple: (configured PuLP solver, backend name, reason: 'code', 'requested' or
+               'auto:<problem class>')
+    """
+    from solver_options import apply_options
+
+    options = dict(options)
+    options.pop("portfolio", None)
+    backend = options.pop("backend", AUTO)
+    if backend == CODE and code_solver is not None:
+        return apply_options(code_solver, options), CODE, "code"
+    if backend in (AUTO, CODE):
+        backend, kind = choose_backend(problem)
+        reason = f"auto:{kind}"
+    else:
+        reason = "requested"
+    if code_solver is not None and code_solver.timeLimit:  # a shorter limit in the code still holds
+        options["timeLimit"] = min(options.get("timeLimit") or code_solver.timeLimit, code_solver.timeLimit)
+    return apply_options(BACKENDS[backend](), options), backend, reason
@@ -1,13 +1,29 @@
 # Generates solver-specific code (e.g., PuLP) and executes it.
-import pulp
-import google.generativeai as genai
-from nlp_processor import GEMINI_API_KEY
+from llm_provider import get_model
+from nlp_processor import diagnose_infeasibility, suggest_code_revision
+from response_cache import cached_generate, cached_generate_stream
+from llm_stream import CodeFenceStripper, strip_code_fences
 import logging # Added for logging
-import subprocess # For running code in a separate process
-import sys # To get current python executable
-
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+import metrics
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from model_formulator import render_model_plaintext
+from model_io import ModelFileError, read_model
+from model_ir import ModelIR
+from preflight import format_issues, preflight
+from pulp_codegen import UnsupportedModel, translate_model
+from solver_pool import DEFAULT_TIMEOUT, get_solver_pool, run_in_subprocess
+from solve_cache import cache_enabled as solve_cache_enabled, code_cache_key, coalesced, get_code_cache
+from solve_hooks import limit_reached, solve_with_lp_cache
+# The backend registry lives in its own module, which the solver children load without the rest of this one
+from solver_backends import AUTO_POLICY, backend_names, is_available, solver_for
+from solver_options import cache_variant, resolve_options, validate_options
 
 # Configure logging for this module specifically if needed, or rely on root logger
 logger = logging.getLogger(__name__)
@@ -21,19 +37,11 @@ logger = logging.getLogger(__name__)
 # handler.setFormatter(formatter)
 # logger.addHandler(handler)
 
-def generate_pulp_code(model_plaintext: str, api_key: str = None) -> str:
+def _pulp_code_request(model_plaintext: str, api_key: str = None, **config_overrides):
     """
-    Uses Gemini API to generate PuLP Python code from a mathematical model plaintext.
-    
-    Args:
-        model_plaintext: The mathematical model in plaintext format
-        api_key: Optional API key to use instead of global configuration
-        
-    Returns:
-        str: Generated PuLP Python optimization code
+    Builds the Gemini model, prompt and generation config for PuLP code generation.
+    Keyword arguments (e.g. temperature) override entries of the generation config.
     """
-    logger.info("Attempting to generate PuLP code...")
-    logger.debug(f"Input model_plaintext (first 200 chars):\\n{model_plaintext[:200]}...")
     # Create a prompt for Gemini to convert the model to PuLP code
     prompt = f"""
 You are an expert Operations Research professional and Python programmer. 
@@ -93,10 +101,6 @@ Return ONLY the complete, executable Python code. Do not include any of your own
     logger.debug(f"Gemini Prompt (first 200 chars):\\n{prompt[:200]}...")
 
     # Call Gemini API to generate the code
-    # Configure API key if provided
-    if api_key:
-        genai.configure(api_key=api_key)
-        
     generation_config = {
         "temperature": 0.2,
         "top_p": 0.9,
@@ -104,47 +108,46 @@ Return ONLY the complete, executable Python code. Do not include any of your own
         "max_output_tokens": 16384,
         "response_mime_type": "text/plain"
     }
+    generation_config.update(config_overrides)
     
-    model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash-exp",
-        generation_config=generation_config
-    )
+    model = get_model(api_key, "gemini-2.0-flash-exp", generation_config)
+    return model, prompt, generation_config
+
+def generate_pulp_code(model_plaintext: str, api_key: str = None, use_cache: bool = True,
+                       **config_overrides) -> str:
+    """
+    Uses Gemini API to generate PuLP Python code from a mathematical model plaintext.
+    
+    Args:
+        model_plaintext: The mathematical model in plaintext format
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response cache for this call
+        **config_overrides: Generation config entries to override (e.g. temperature, max_output_tokens)
+        
+    Returns:
+        str: Generated PuLP Python optimization code
+    """
+    logger.info("Attempting to generate PuLP code...")
+    logger.debug(f"Input model_plaintext (first 200 chars):\\n{model_plaintext[:200]}...")
+    model, prompt, generation_config = _pulp_code_request(model_plaintext, api_key, **config_overrides)
     
     generated_code = "" # Initialize to empty string
     try:
         logger.info("Sending request to Gemini API...")
-        response = model.generate_content(prompt)
+        generated_code = cached_generate(
+            model, prompt, "gemini-2.0-flash-exp", generation_config, use_cache=use_cache
+        )
         logger.info("Received response from Gemini API.")
-        logger.debug(f"Raw Gemini API response object: {response}") # Log the whole response object for inspection
-
-        # Extract the PuLP code from the response
-        if hasattr(response, 'text') and response.text:
-            generated_code = response.text
-            logger.debug(f"Extracted code from response.text (first 200 chars): {generated_code[:200]}...")
-        elif hasattr(response, 'parts') and response.parts and hasattr(response.parts[0], 'text') and response.parts[0].text:
-            generated_code = response.parts[0].text
-            logger.debug(f"Extracted code from response.parts[0].text (first 200 chars): {generated_code[:200]}...")
-        else:
+
+        if not generated_code:
             logger.warning("Gemini response does not contain 'text' or 'parts[0].text', or it is empty.")
-            logger.debug(f"Response candidates: {response.candidates if hasattr(response, 'candidates') else 'N/A'}")
-            logger.debug(f"Response prompt feedback: {response.prompt_feedback if hasattr(response, 'prompt_feedback') else 'N/A'}")
             return "" # Return empty if no usable code part found
 
         # Log the first few characters of potentially successful code
         logger.debug(f"Code snippet received (pre-cleaning, first 200 chars): {generated_code[:200]}...")
 
         # Clean the generated code: remove markdown fences
-        cleaned_code = generated_code.strip()
-        if cleaned_code.startswith("```python"):
-            cleaned_code = cleaned_code[len("```python"):].lstrip() # Remove prefix and leading whitespace
-            logger.debug("Removed '```python' prefix.")
-        elif cleaned_code.startswith("```"):
-            cleaned_code = cleaned_code[len("```"):].lstrip()
-            logger.debug("Removed '```' prefix.")
-
-        if cleaned_code.endswith("```"):
-            cleaned_code = cleaned_code[:-len("```")].rstrip() # Remove suffix and trailing whitespace
-            logger.debug("Removed '```' suffix.")
+        cleaned_code = strip_code_fences(generated_code)
         
         logger.info(f"Successfully generated and cleaned PuLP code (length: {len(cleaned_code)}).")
         logger.debug(f"Cleaned code snippet (first 200 chars): {cleaned_code[:200]}...")
@@ -152,60 +155,464 @@ Return ONLY the complete, executable Python code. Do not include any of your own
 
     except Exception as e:
         logger.error(f"Exception during Gemini API call or code processing: {e}", exc_info=True)
-        # It's useful to log the response even on error, if available
-        if 'response' in locals() and response:
-             logger.error(f"Gemini response object at time of error: {response}")
-             logger.error(f"Response candidates at error: {response.candidates if hasattr(response, 'candidates') else 'N/A'}")
-             logger.error(f"Response prompt feedback at error: {response.prompt_feedback if hasattr(response, 'prompt_feedback') else 'N/A'}")
         return "" # Return empty string on failure/blockage
 
+def generate_pulp_code_stream(model_plaintext: str, api_key: str = None, use_cache: bool = True):
+    """
+    Streaming variant of `generate_pulp_code`.
+
+    Yields the cleaned code in chunks as Gemini produces it; the chunks joined
+    together equal what `generate_pulp_code` returns for the same response.
+    Unlike the non-streaming function, errors are raised to the caller, which
+    may already have forwarded part of the code.
+
+    Args:
+        model_plaintext: The mathematical model in plaintext format
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response cache for this call
+
+    Yields:
+        str: Non-empty chunks of the generated PuLP code
+    """
+    logger.info("Streaming PuLP code generation from Gemini...")
+    model, prompt, generation_config = _pulp_code_request(model_plaintext, api_key)
+    stripper = CodeFenceStripper()
+    for chunk in cached_generate_stream(model, prompt, "gemini-2.0-flash-exp", generation_config,
+                                        use_cache=use_cache):
+        cleaned = stripper.feed(chunk)
+        if cleaned:
+            yield cleaned
+    rest = stripper.finish()
+    if rest:
+        yield rest
+
+DEFAULT_MAX_CANDIDATES = 5
+
+def candidate_temperatures(n: int) -> list:
+    """Sampling temperatures for n speculative candidates: the regular 0.2 first, then spread up to 1.0."""
+    if n <= 1:
+        return [0.2]
+    return [round(0.2 + 0.8 * i / (n - 1), 2) for i in range(n)]
+
+def _reached_optimum(result: dict) -> bool:
+    if result["returncode"] != 0 or result["timed_out"] or result.get("cancelled"):
+        return False
+    solves = (result.get("solve_report") or {}).get("solves", [])
+    if solves:
+        return solves[-1].get("status") == "Optimal" and not solves[-1].get("limit_reached")
+    return "Status: Optimal" in result["stdout"]
+
+def _last_line(text: str) -> str:
+    lines = [line for line in (text or "").strip().splitlines() if line.strip()]
+    return lines[-1] if lines else ""
+
+def generate_code_speculatively(model_plaintext: str, candidates: int = 3, api_key: str = None,
+                                use_cache: bool = True, timeout: float = None,
+                                max_output_tokens: int = None, llm_slots=None, solver_slots=None) -> dict:
+    """
+    Generates several candidate programs concurrently and returns the first one that solves to optimality.
+
+    Candidates differ in sampling temperature. Each one is pre-flighted as soon as
+    it arrives and, if it passes, runs in its own solver worker while the others are
+    still being generated. The first candidate whose solve reports an optimal
+    status wins; the remaining runs are killed and generations not yet started
+    are dropped. Requests already sent to Gemini cannot be recalled, so
+    `candidates` and `max_output_tokens` are what bounds the extra token cost.
+    Every candidate counts against both concurrency limits: its Gemini call holds
+    one of `llm_slots` and its run one of `solver_slots`.
+
+    Args:
+        model_plaintext: The mathematical model in plaintext format
+        candidates: Number of candidates, capped by CODEGEN_MAX_CANDIDATES
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response and solve caches
+        timeout: Seconds before a candidate's run is killed. Defaults to SOLVER_TIMEOUT.
+        max_output_tokens: Optional per-candidate output token limit
+        llm_slots: Optional context manager (e.g. a Semaphore) held around each candidate's Gemini call
+        solver_slots: Optional context manager held around each candidate's run
+
+    Returns:
+        dict: 'python_code' (the winner, else the first candidate that ran cleanly, else
+              the first that compiled, else ''), 'winner' (candidate index or None),
+              'execution' (the raw run result of the returned code, or None),
+              'candidates' (per candidate: 'index', 'temperature', 'status', 'error',
+              'generate_seconds', 'run_seconds') and 'elapsed_seconds'.
+              Candidate statuses: optimal, not_optimal, failed, rejected, cancelled.
+    """
+    limit = int(os.getenv("CODEGEN_MAX_CANDIDATES", DEFAULT_MAX_CANDIDATES))
+    count = max(1, min(int(candidates), limit))
+    timeout = timeout or float(os.getenv("SOLVER_TIMEOUT", DEFAULT_TIMEOUT))
+    overrides = {"max_output_tokens": int(max_output_tokens)} if max_output_tokens else {}
+    llm_slots = llm_slots or nullcontext()
+    solver_slots = solver_slots or nullcontext()
+    records = [{"index": i, "temperature": temperature, "status": "cancelled", "error": None,
+                "generate_seconds": None, "run_seconds": None}
+               for i, temperature in enumerate(candidate_temperatures(count))]
+    codes, bytecodes, executions = {}, {}, {}
+    cancel = threading.Event()
+    started = time.perf_counter()
+    logger.info(f"Generating {count} candidate programs speculatively...")
+
+    def timed(fn, *args, **kwargs):
+        begun = time.perf_counter()
+        value = fn(*args, **kwargs)
+        return value, round(time.perf_counter() - begun, 4)
+
+    def generate(i):
+        with llm_slots:
+            if cancel.is_set():  # decided while this candidate waited for a slot
+                return "", None
+            return timed(generate_pulp_code, model_plaintext, api_key, use_cache=use_cache,
+                         temperature=records[i]["temperature"], **overrides)
+
+    def run(i):
+        with solver_slots:
+            return timed(_execute_uncached, codes[i], timeout, use_cache, cancel=cancel, bytecode=bytecodes[i])
+
+    executor = ThreadPoolExecutor(max_workers=2 * count, thread_name_prefix="candidate")
+    tasks = {executor.submit(generate, i): ("generate", i) for i in range(count)}
+    winner = None
+    try:
+        pending = set(tasks)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, i = tasks[future]
+                record = records[i]
+                if kind == "generate":
+                    code, record["generate_seconds"] = future.result()
+                    checked = preflight(code)
+                    if not checked["ok"]:
+                        record.update(status="rejected", error=format_issues(checked["issues"]))
+                        continue
+                    codes[i] = code
+                    bytecodes[i] = checked["bytecode"]
+                    run_future = executor.submit(run, i)
+                    tasks[run_future] = ("run", i)
+                    pending.add(run_future)
+                    continue
+                try:
+                    result, record["run_seconds"] = future.result()
+                except Exception as e:
+                    record.update(status="failed", error=str(e))
+                    continue
+                executions[i] = result
+                if _reached_optimum(result):
+                    record["status"] = "optimal"
+                    winner = i if winner is None else winner
+                elif result["returncode"] == 0 and not result["timed_out"]:
+                    record["status"] = "not_optimal"
+                else:
+                    error = "timed out" if result["timed_out"] else _last_line(result["stderr"])
+                    record.update(status="failed", error=error or "non-zero exit code")
+    finally:
+        cancel.set()  # kills the runs still in progress
+        for future in tasks:  # drops the generations not yet started
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    if winner is not None:
+        chosen = winner
+    else:
+        clean = [i for i, result in sorted(executions.items()) if result["returncode"] == 0]
+        chosen = clean[0] if clean else min(codes, default=None)
+    execution = executions.get(chosen)
+    if execution is not None and use_cache and solve_cache_enabled() and _is_cacheable_result(execution):
+        try:  # a later execute_code of the returned code is answered without running it again
+            get_code_cache().set(_code_key(codes[chosen]), execution)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store the winning candidate's run: {e}")
+
+    elapsed = round(time.perf_counter() - started, 4)
+    logger.info(f"Speculative code generation finished in {elapsed:.2f}s, winner: {winner}")
+    return {
+        "python_code": codes.get(chosen, ""),
+        "winner": winner,
+        "execution": execution,
+        "candidates": records,
+        "elapsed_seconds": elapsed,
+    }
+
 # Placeholder for a sandboxed execution environment if needed.
 # For now, we'll execute directly.
 
-def generate_python_code(model_representation: dict, solver: str = "pulp") -> str:
+_codegen_counts = {"local": 0, "gemini": 0}
+_codegen_lock = threading.Lock()
+
+def generate_python_code(model_representation, solver: str = "pulp", model_plaintext: str = None,
+                         api_key: str = None, use_cache: bool = True, candidates: int = None,
+                         max_output_tokens: int = None, llm_slots=None, solver_slots=None) -> dict:
     """
     Generates Python code for the specified solver from the internal model representation.
+
+    Structurally complete models are translated locally (see pulp_codegen.py);
+    models with constructs the local generator cannot translate, or requests
+    without a structured model, fall back to Gemini via `generate_pulp_code`.
+
+    Args:
+        model_representation: ModelIR or model dict from `formulate_model_from_nlp` (may be None)
+        solver: Target solver library; only "pulp" is supported
+        model_plaintext: Plaintext model for the Gemini fallback. Rendered from the model if omitted.
+        api_key: Optional API key for the Gemini fallback
+        use_cache: Set to False to bypass the Gemini response cache in the fallback
+        candidates: Number of Gemini candidates to race in the fallback (see
+                    `generate_code_speculatively`). Defaults to CODEGEN_CANDIDATES (1).
+        max_output_tokens: Optional output token limit for each Gemini candidate
+        llm_slots: Optional context manager (e.g. a Semaphore) held around each Gemini call
+        solver_slots: Optional context manager held around each candidate's run
+
+    Returns:
+        dict: 'python_code', 'generator' ('local' or 'gemini') and 'fallback_reason'
+              (why the local generator was not used, None when it was). With more than
+              one candidate, also 'speculation': the winner, per-candidate outcomes and time.
     """
-    # TODO: Implement code generation logic for PuLP (and potentially OR-Tools).
-    # This will involve translating the structured model (variables, objective, constraints)
-    # into PuLP syntax.
-    print(f"Generating Python code for {solver} (not yet implemented)...")
-    if solver == "pulp":
-        code = """
-import pulp
-
-# Create the model
-model = pulp.LpProblem("MyORProblem", pulp.LpMinimize) # Or LpMaximize
-
-# Define variables (example)
-# x = pulp.LpVariable("x", lowBound=0, cat=pulp.LpContinuous)
-# y = pulp.LpVariable.dicts("y", [1, 2, 3], lowBound=0, cat=pulp.LpInteger)
-
-# Define objective function (example)
-# model += x + pulp.lpSum(y[i] for i in [1,2,3]), "Objective Function"
-
-# Define constraints (example)
-# model += 2*x + y[1] <= 10, "Constraint1"
-
-# Solve the problem
-# status = model.solve()
-
-# print(f"Status: {pulp.LpStatus[status]}")
-# print(f"Objective value: {pulp.value(model.objective)}")
-# for v in model.variables():
-#     print(f"{v.name} = {v.varValue}")
-"""
-        return code
+    result, model_plaintext, reason = _generate_locally(model_representation, solver, model_plaintext)
+    if result is not None:
+        return result
+    if candidates is None:
+        candidates = int(os.getenv("CODEGEN_CANDIDATES", 1))
+    if candidates > 1:
+        speculation = generate_code_speculatively(model_plaintext, candidates, api_key, use_cache=use_cache,
+                                                  max_output_tokens=max_output_tokens, llm_slots=llm_slots,
+                                                  solver_slots=solver_slots)
+        return {
+            "python_code": speculation["python_code"],
+            "generator": "gemini",
+            "fallback_reason": reason,
+            "speculation": {key: speculation[key] for key in ("winner", "candidates", "elapsed_seconds")},
+        }
+    overrides = {"max_output_tokens": int(max_output_tokens)} if max_output_tokens else {}
+    with llm_slots or nullcontext():
+        code = generate_pulp_code(model_plaintext, api_key, use_cache=use_cache, **overrides)
+    return {"python_code": code, "generator": "gemini", "fallback_reason": reason}
+
+def generate_python_code_stream(model_representation, solver: str = "pulp", model_plaintext: str = None,
+                                api_key: str = None, use_cache: bool = True):
+    """
+    Streaming variant of `generate_python_code`.
+
+    Yields (event, payload) pairs: ("chunk", text) for each piece of code as it
+    becomes available, ("error", {"error": message}) if the Gemini stream fails,
+    and finally ("done", result) where result is the dict `generate_python_code`
+    returns. Locally generated code arrives as a single chunk.
+    """
+    result, model_plaintext, reason = _generate_locally(model_representation, solver, model_plaintext)
+    if result is not None:
+        if result["python_code"]:
+            yield "chunk", result["python_code"]
+        yield "done", result
+        return
+
+    parts = []
+    try:
+        for chunk in generate_pulp_code_stream(model_plaintext, api_key, use_cache=use_cache):
+            parts.append(chunk)
+            yield "chunk", chunk
+        code = "".join(parts)
+    except Exception as e:
+        logger.error(f"Exception during streamed Gemini code generation: {e}", exc_info=True)
+        yield "error", {"error": str(e)}
+        code = ""  # same as generate_pulp_code on failure
+    yield "done", {"python_code": code, "generator": "gemini", "fallback_reason": reason}
+
+def _generate_locally(model_representation, solver: str, model_plaintext: str):
+    """
+    Tries the local generator. Returns (result, model_plaintext, fallback_reason);
+    result is None when the caller has to ask Gemini with the returned plaintext.
+    """
+    if solver != "pulp":
+        return ({"python_code": f"# Code generation for {solver} not implemented.",
+                 "generator": None, "fallback_reason": None}, model_plaintext, None)
+
+    if isinstance(model_representation, dict) and "error" not in model_representation:
+        model_representation = ModelIR.from_dict(model_representation)
+    if isinstance(model_representation, ModelIR):
+        try:
+            started = time.perf_counter()
+            code = translate_model(model_representation)
+            logger.info(f"Generated PuLP code locally in {(time.perf_counter() - started) * 1000:.1f} ms.")
+            _count_codegen("local")
+            return {"python_code": code, "generator": "local", "fallback_reason": None}, model_plaintext, None
+        except UnsupportedModel as e:
+            reason = str(e)
+        if model_plaintext is None:
+            model_plaintext = render_model_plaintext(model_representation)
     else:
-        return f"# Code generation for {solver} not implemented."
+        reason = "no structured model available"
+
+    if not model_plaintext:
+        return {"python_code": "", "generator": "gemini", "fallback_reason": reason}, model_plaintext, reason
+    logger.info(f"Falling back to Gemini code generation: {reason}")
+    _count_codegen("gemini")
+    return None, model_plaintext, reason
+
+def _count_codegen(generator: str):
+    with _codegen_lock:
+        _codegen_counts[generator] += 1
 
-def run_solver_code(python_code: str) -> dict:
+def codegen_stats() -> dict:
+    """How often this process generated code locally versus through Gemini."""
+    with _codegen_lock:
+        local, gemini = _codegen_counts["local"], _codegen_counts["gemini"]
+    total = local + gemini
+    return {"local": local, "gemini": gemini, "llm_avoidance_rate": (local / total) if total else 0.0}
+
+def _execute_uncached(python_code: str, timeout: float, use_cache: bool, **job) -> dict:
+    pool = get_solver_pool()
+    if pool is not None:
+        result = pool.run(python_code, timeout=timeout, use_cache=use_cache, **job)
+    else:
+        result = run_in_subprocess(python_code, timeout=timeout, use_cache=use_cache, **job)
+    _observe_run(result, "fork" if pool is not None else "subprocess")
+    return result
+
+def _observe_run(result: dict, mode: str):
+    """Adds a run's waiting, spawn, run and solve times and its peak RSS to the metrics and the request's timings."""
+    if result.get("wait_seconds") is not None:
+        metrics.SOLVER_WAIT_SECONDS.observe(result["wait_seconds"])
+        metrics.record_timing("solver_wait", result["wait_seconds"])
+    if result.get("spawn_seconds") is None:
+        return  # the run never started
+    metrics.SOLVER_SPAWN_SECONDS.observe(result["spawn_seconds"], mode=mode)
+    metrics.record_timing("spawn", result["spawn_seconds"])
+    outcome = ("cancelled" if result.get("cancelled") else "timeout" if result["timed_out"]
+               else "ok" if result["returncode"] == 0 else "error")
+    metrics.SOLVER_RUN_SECONDS.observe(result["run_seconds"], outcome=outcome)
+    metrics.record_timing("run", result["run_seconds"])
+    if result.get("max_rss_kb"):
+        metrics.SOLVER_CHILD_PEAK_RSS_BYTES.observe(result["max_rss_kb"] * 1024)
+    for entry in (result.get("solve_report") or {}).get("solves", []):
+        if "lp_hash" in entry:  # the solve looked its model up in the LP cache
+            metrics.CACHE_LOOKUPS.inc(cache="lp", result="hit" if entry.get("lp_cache_hit") else "miss")
+        if entry.get("solve_seconds") is not None:
+            metrics.SOLVE_SECONDS.observe(entry["solve_seconds"], backend=entry.get("backend") or "unknown",
+                                          status=entry.get("status") or "unknown")
+            metrics.record_timing("solve", entry["solve_seconds"])
+
+def _is_cacheable_result(result: dict) -> bool:
+    # a solve stopped by its time limit could do better with more time
+    solves = (result.get("solve_report") or {}).get("solves", [])
+    return (result["returncode"] == 0 and not result["timed_out"]
+            and not any(entry.get("limit_reached") for entry in solves))
+
+def _code_key(python_code: str, solver_options: dict = None) -> str:
+    """The code cache key; runs under options that change the answer (a MIP gap) are kept apart."""
+    variant = cache_variant(resolve_options(solver_options))
+    return code_cache_key(python_code, {"solver": variant} if variant else None)
+
+def execute_code(python_code: str, timeout: float = None, use_cache: bool = True,
+                 bytecode: bytes = None, solver_options: dict = None) -> dict:
     """
-    Executes the generated Python solver code in a separate process using subprocess.
+    Executes Python code in an isolated process and returns its raw results.
+
+    Uses the shared warm worker pool (see solver_pool.py) when it is available and
+    falls back to a fresh interpreter otherwise. Successful runs are cached by the
+    normalized code, solutions by the canonical LP the code builds (see
+    solve_cache.py), and identical runs in flight are coalesced into one.
+
+    Args:
+        python_code (str): The Python code string to execute.
+        timeout (float): Seconds before the execution is killed. Defaults to SOLVER_TIMEOUT.
+        use_cache (bool): Set to False to force a fresh run and a fresh solve.
+        bytecode (bytes): The code compiled by preflight.preflight, run instead of compiling it again.
+        solver_options (dict): Solver options for this run (see solver_options.py), on top of
+                               the server defaults. Raises ValueError when one is invalid.
+
+    Returns:
+        dict: 'returncode', 'stdout', 'stderr', 'timed_out', 'max_rss_kb', 'cpu_seconds',
+              'solve_report' and 'cache' ('code', 'lp' or None, telling which cache level answered).
+    """
+    timeout = timeout or float(os.getenv("SOLVER_TIMEOUT", DEFAULT_TIMEOUT))
+    solver_options = validate_options(solver_options)
+    if not (use_cache and solve_cache_enabled()):
+        result = _execute_uncached(python_code, timeout, use_cache=False, bytecode=bytecode,
+                                   solver_options=solver_options)
+        result["cache"] = None
+        return result
+
+    ran_here = []
+
+    def compute():
+        result = _execute_uncached(python_code, timeout, use_cache=True, bytecode=bytecode,
+                                   solver_options=solver_options)
+        ran_here.append(True)
+        return result
+
+    try:
+        result = coalesced(get_code_cache(), _code_key(python_code, solver_options), compute,
+                           should_store=_is_cacheable_result, wait_timeout=timeout)
+    except sqlite3.Error as e:
+        logger.warning(f"Solve cache unavailable, running without it: {e}")
+        result = compute()
+    result = dict(result)
+    metrics.CACHE_LOOKUPS.inc(cache="code", result="miss" if ran_here else "hit")
+    solves = (result.get("solve_report") or {}).get("solves", [])
+    if not ran_here:
+        result["cache"] = "code"
+    elif solves and all(entry.get("lp_cache_hit") for entry in solves):
+        result["cache"] = "lp"
+    else:
+        result["cache"] = None
+    return result
+
+def solver_backends_info() -> dict:
+    """The registered solver backends with whether each is installed, the default and the "auto" policy."""
+    return {
+        "backends": {name: is_available(name) for name in backend_names()},
+        "default": resolve_options()["backend"],
+        "auto_policy": {kind: list(names) for kind, names in AUTO_POLICY.items()},
+    }
+
+def solver_summary(solve_report: dict):
+    """
+    What the last solve of a run reported: 'backend' (and 'backend_reason', why it was
+    chosen), 'solver', 'options', 'status', 'solution_status', 'solve_seconds' (of all the
+    run's solves) and 'limit_reached' (the solver stopped on its time limit before proving
+    its answer, so the solution is its best incumbent) and 'portfolio' (the members raced and
+    which of them won, when the run used a portfolio). None when nothing was solved.
+    """
+    solves = (solve_report or {}).get("solves") or []
+    if not solves:
+        return None
+    last = solves[-1]
+    return {
+        "backend": last.get("backend"),
+        "backend_reason": last.get("backend_reason"),
+        "solver": last.get("solver"),
+        "options": last.get("options"),
+        "status": last.get("status"),
+        "solution_status": last.get("solution_status"),
+        "solve_seconds": round(sum(entry.get("solve_seconds") or 0 for entry in solves), 4),
+        "limit_reached": any(entry.get("limit_reached") for entry in solves),
+        "portfolio": last.get("portfolio"),
+    }
+
+def _child_resources(result: dict):
+    """CPU seconds and peak RSS (kB) of the process that ran the code; None when none did."""
+    if result["cache"] == "code" or not result.get("max_rss_kb"):
+        return None
+    return {"cpu_seconds": result.get("cpu_seconds"), "max_rss_kb": result["max_rss_kb"]}
+
+def run_solver_code(python_code: str, timeout: float = None, use_cache: bool = True,
+                    solver_options: dict = None, portfolio=None) -> dict:
+    """
+    Executes the generated Python solver code in a separate process.
     Captures stdout and stderr.
 
+    The code is pre-flighted first (see preflight.py); code that fails the checks
+    is rejected without starting a process, and code that passes is run from the
+    bytecode the checks compiled.
+
     Args:
         python_code (str): The Python code string to execute.
+        timeout (float): Seconds before the execution is killed. Defaults to SOLVER_TIMEOUT.
+        use_cache (bool): Set to False to bypass the code and LP solution caches.
+        solver_options (dict): Solver options for this run (see solver_options.py). The solver's
+                               time limit always ends before `timeout`, so a search that runs
+                               out of time returns its best solution instead of being killed.
+        portfolio: Race several solver configurations on the model instead of solving it once
+                   (see solver_portfolio.py): a spec such as "cbc highs cbc:presolve=false", True
+                   for SOLVER_PORTFOLIO_MEMBERS, or False to turn a server-wide portfolio off.
 
     Returns:
         dict: A dictionary containing:
@@ -213,42 +620,64 @@ def run_solver_code(python_code: str) -> dict:
               'output' (str): The stdout from the executed code.
               'error_details' (str): The stderr from the executed code or an error message.
               'raw_output' (str): Concatenation of stdout and stderr for debugging.
+              'cache' (str): 'code' or 'lp' when the result came from the solve cache, else None.
+              'solve_report' (dict): What the solve hooks recorded, including the solved models
+                                     (see solve_hooks.capture_problem). Only present after a run.
+              'solver' (dict): The last solve's options and outcome (see solver_summary), including
+                               'limit_reached' when the output is an unproven incumbent.
+              'resources' (dict): 'cpu_seconds' and 'max_rss_kb' of the process that ran the
+                                  code, or None when it did not run (a code cache hit).
+              'preflight_issues' (list): Only present when the pre-flight checks rejected the code.
     """
-    logging.info("Attempting to run solver code via subprocess...")
+    timeout = timeout or float(os.getenv("SOLVER_TIMEOUT", DEFAULT_TIMEOUT))
+    if portfolio is not None:
+        solver_options = dict(solver_options or {}, portfolio=portfolio)
+    checked = preflight(python_code)
+    if not checked["ok"]:
+        details = format_issues(checked["issues"])
+        logging.error(f"Solver code rejected by pre-flight checks:\n{details}")
+        return {
+            "error": True,
+            "output": "",
+            "error_details": details,
+            "raw_output": details,
+            "cache": None,
+            "preflight_issues": checked["issues"],
+        }
+    logging.info("Attempting to run solver code...")
     try:
-        # Use the same Python interpreter that's running the Flask app
-        python_executable = sys.executable
-        
-        process = subprocess.Popen(
-            [python_executable, "-c", python_code],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True, # Decode stdout/stderr as text
-            universal_newlines=True # Ensure cross-platform newline handling (might be redundant with text=True)
-        )
-        
-        # Communicate with the process, get output and errors
-        # Set a timeout to prevent hanging indefinitely (e.g., 30 seconds)
-        stdout, stderr = process.communicate(timeout=30) 
-        
-        return_code = process.returncode
+        result = execute_code(python_code, timeout=timeout, use_cache=use_cache,
+                              bytecode=checked["bytecode"], solver_options=solver_options)
+        if result["timed_out"]:
+            logging.error("Code execution timed out.")
+            return {
+                "error": True, 
+                "output": "", 
+                "error_details": f"Code execution timed out after {timeout:g} seconds.",
+                "raw_output": "Timeout occurred.",
+                "timed_out": True
+            }
+
+        stdout, stderr = result["stdout"], result["stderr"]
+        return_code = result["returncode"]
         raw_output = f"--- STDOUT ---\n{stdout}\n--- STDERR ---\n{stderr}"
-        logging.info(f"Subprocess finished with return code: {return_code}")
-        logging.debug(f"Raw output from subprocess:\n{raw_output}")
+        logging.info(f"Solver process finished with return code: {return_code}")
+        logging.debug(f"Raw output from solver process:\n{raw_output}")
+        solver = solver_summary(result.get("solve_report"))
+        if solver and solver["limit_reached"]:
+            logging.warning("The solver stopped at its time limit; the output is its best solution so far.")
 
         if return_code != 0:
             # Error occurred during execution
-            error_message = f"Code execution failed with return code {return_code}."
-            if stderr:
-                error_message += f"\nDetails:\n{stderr.strip()}"
-            elif stdout: # Sometimes errors are printed to stdout
-                error_message += f"\nOutput (may contain error info):\n{stdout.strip()}"
-            
             return {
                 "error": True,
                 "output": stdout.strip(), 
                 "error_details": stderr.strip() if stderr else "Execution failed with non-zero exit code. Check raw output.",
-                "raw_output": raw_output
+                "raw_output": raw_output,
+                "cache": result["cache"],
+                "solver": solver,
+                "resources": _child_resources(result),
+                "solve_report": result.get("solve_report")
             }
         else:
             # Successful execution
@@ -256,22 +685,244 @@ def run_solver_code(python_code: str) -> dict:
                 "error": False, 
                 "output": stdout.strip(), 
                 "error_details": stderr.strip(), # Stderr might contain warnings even on success
-                "raw_output": raw_output
+                "raw_output": raw_output,
+                "cache": result["cache"],
+                "solver": solver,
+                "resources": _child_resources(result),
+                "solve_report": result.get("solve_report")
             }
             
-    except subprocess.TimeoutExpired:
-        logging.error("Code execution timed out.")
-        return {
-            "error": True, 
-            "output": "", 
-            "error_details": "Code execution timed out after 30 seconds.",
-            "raw_output": "Timeout occurred."
-        }
     except Exception as e:
-        logging.error(f"Exception during subprocess execution: {e}", exc_info=True)
+        logging.error(f"Exception during solver execution: {e}", exc_info=True)
         return {
             "error": True, 
             "output": "", 
             "error_details": f"An unexpected error occurred while trying to run the code: {str(e)}",
             "raw_output": f"Exception: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+DEFAULT_REPAIR_ITERATIONS = 2
+DEFAULT_REPAIR_TIME_BUDGET = 120
+
+def run_with_repair(python_code: str, model_plaintext: str = None, api_key: str = None,
+                    use_cache: bool = True, timeout: float = None, max_iterations: int = None,
+                    time_budget: float = None, solver_options: dict = None, llm_slots=None,
+                    solver_slots=None) -> dict:
+    """
+    Runs solver code and, when it fails, lets Gemini patch it and tries again.
+
+    Every attempt is pre-flighted by `run_solver_code` (see preflight.py), so a
+    patch that is still broken costs no solver run. Failures are sent to
+    `suggest_code_revision` as the error plus the slice of code it points at, and
+    runs go through the warm worker pool like any other execution. The loop stops when the code runs, when Gemini returns no usable
+    patch, when a run times out, or when the iteration or time budget is spent.
+    An infeasible or unbounded result is not patched; the model is diagnosed
+    with `diagnose_infeasibility` instead, since fixing it would change its meaning.
+
+    Args:
+        python_code: The code to run
+        model_plaintext: Optional plaintext model, used for the infeasibility diagnosis
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response and solve caches
+        timeout: Seconds before each run is killed. Defaults to SOLVER_TIMEOUT.
+        max_iterations: Repair attempts allowed. Defaults to REPAIR_MAX_ITERATIONS (2).
+        time_budget: Seconds after which no further repair is started. Defaults to REPAIR_TIME_BUDGET (120).
+        solver_options: Solver options for every run (see solver_options.py)
+        llm_slots: Optional context manager (e.g. a Semaphore) held around each Gemini call
+        solver_slots: Optional context manager held around each run, and released while Gemini works
+
+    Returns:
+        dict: The keys of `run_solver_code` for the last attempt, plus 'python_code' (the
+              code that was run last) and 'repair': 'iterations', 'seconds', 'stopped'
+              ('succeeded', 'no_patch', 'timed_out', 'iteration_budget' or 'time_budget'),
+              'history' (one entry per repair: 'iteration', 'stage', 'error') and
+              'diagnosis' (for infeasible or unbounded results, else None).
+    """
+    if max_iterations is None:
+        max_iterations = int(os.getenv("REPAIR_MAX_ITERATIONS", DEFAULT_REPAIR_ITERATIONS))
+    if time_budget is None:
+        time_budget = float(os.getenv("REPAIR_TIME_BUDGET", DEFAULT_REPAIR_TIME_BUDGET))
+    started = time.perf_counter()
+    code = python_code
+    history = []
+    iteration = 0
+    diagnosis = None
+    llm_slots = llm_slots or nullcontext()
+    solver_slots = solver_slots or nullcontext()
+
+    while True:
+        with solver_slots:
+            result = run_solver_code(code, timeout=timeout, use_cache=use_cache, solver_options=solver_options)
+        stage = "preflight" if "preflight_issues" in result else "run"
+        error = result["error_details"]
+        if not result["error"]:
+            stopped = "succeeded"
+            status = re.search(r"Status:\s*(Infeasible|Unbounded)", result["output"])
+            if status:
+                with llm_slots:
+                    diagnosis = diagnose_infeasibility({
+                        "status": status.group(1),
+                        "model_plaintext": model_plaintext,
+                        "python_code": code,
+                        "output": result["output"],
+                    }, api_key=api_key, use_cache=use_cache)
+            break
+        if result.get("timed_out"):
+            stopped = "timed_out"
+            break
+        if iteration >= max_iterations:
+            stopped = "iteration_budget"
+            break
+        if time.perf_counter() - started >= time_budget:
+            stopped = "time_budget"
+            break
+
+        iteration += 1
+        logger.info(f"Repair iteration {iteration}: {stage} failed, asking Gemini for a patch.")
+        history.append({"iteration": iteration, "stage": stage, "error": error})
+        with llm_slots:
+            revised = suggest_code_revision(error, code, api_key=api_key, use_cache=use_cache)
+        if not revised or revised.strip() == code.strip():
+            stopped = "no_patch"
+            break
+        code = revised
+
+    seconds = round(time.perf_counter() - started, 4)
+    logger.info(f"Repair loop finished after {iteration} iterations in {seconds:.2f}s ({stopped}).")
+    result["python_code"] = code
+    result["repair"] = {
+        "iterations": iteration,
+        "seconds": seconds,
+        "stopped": stopped,
+        "history": history,
+        "diagnosis": diagnosis,
+    }
+    return result
+
+def run_model_file(stream, file_format: str, timeout: float = None, use_cache: bool = True,
+                   max_variables: int = 1000, solver_options: dict = None) -> dict:
+    """
+    Solves an MPS or LP model file directly, without generating Python code.
+
+    The file is parsed from `stream` line by line (see model_io.py) and the
+    PuLP problem is built and solved in this process.
+
+    Args:
+        stream: Binary or text stream with the model, optionally gzip-compressed
+        file_format (str): 'mps' or 'lp'
+        timeout (float): Solver time limit in seconds. Defaults to SOLVER_TIMEOUT.
+        use_cache (bool): Set to False to bypass the LP solution cache.
+        max_variables (int): At most this many nonzero variable values are returned.
+        solver_options (dict): Solver options (see solver_options.py); the time limit is at most `timeout`.
+
+    Returns:
+        dict: The keys of run_solver_code ('error', 'output', 'error_details', 'raw_output',
+              'cache', 'solver'), where 'output' is formatted like the output of generated code, plus
+              'status', 'objective_value', 'variables' (nonzero values by column name),
+              'variables_truncated', 'rows', 'columns', 'parse_seconds' and 'solve_seconds'.
+    """
+    import pulp  # loads the solver libraries, so only when a file is solved
+
+    timeout = timeout or float(os.getenv("SOLVER_TIMEOUT", DEFAULT_TIMEOUT))
+    try:
+        problem, names, parse_seconds = read_model(stream, file_format)
+    except ModelFileError as e:
+        return {"error": True, "output": "", "error_details": f"Could not read the model file: {e}",
+                "raw_output": str(e)}
+    logger.info(f"Read {file_format.upper()} model with {len(problem.constraints)} rows and "
+                f"{len(names)} columns in {parse_seconds:.2f} s.")
+
+    options = resolve_options(solver_options)
+    options["timeLimit"] = min(options.get("timeLimit") or timeout, timeout)
+    solver, backend, backend_reason = solver_for(problem, None, options)
+    entry = {"lp_cache_hit": False}
+    started = time.perf_counter()
+    try:
+        if use_cache and solve_cache_enabled():
+            status = solve_with_lp_cache(pulp.LpProblem.solve, problem, solver, {}, entry,
+                                         variant=cache_variant(options))
+        else:
+            status = problem.solve(solver)
+    except Exception as e:
+        logger.error(f"Exception while solving model file: {e}", exc_info=True)
+        return {"error": True, "output": "", "error_details": f"The solver failed: {e}",
+                "raw_output": f"Exception: {e}"}
+    solve_seconds = time.perf_counter() - started
+
+    values = {}
+    truncated = False
+    for variable in problem.variables():
+        if variable.varValue:
+            if len(values) == max_variables:
+                truncated = True
+                break
+            values[names.get(variable.name, variable.name)] = variable.varValue
+    objective_value = pulp.value(problem.objective)
+    lines = [f"Status: {pulp.LpStatus[status]}", f"Objective Value: {objective_value}"]
+    lines += [f"{name} = {value}" for name, value in values.items()]
+    if truncated:
+        lines.append(f"... only the first {max_variables} nonzero variables are listed")
+    output = "\n".join(lines)
+    return {
+        "error": False,
+        "output": output,
+        "error_details": "",
+        "raw_output": output,
+        "cache": "lp" if entry["lp_cache_hit"] else None,
+        "solver": {
+            "backend": backend,
+            "backend_reason": backend_reason,
+            "solver": solver.name,
+            "options": options,
+            "status": pulp.LpStatus[status],
+            "solution_status": pulp.LpSolution.get(problem.sol_status),
+            "solve_seconds": solve_seconds,
+            "limit_reached": limit_reached(status, problem.sol_status),
+        },
+        "status": pulp.LpStatus[status],
+        "objective_value": objective_value,
+        "variables": values,
+        "variables_truncated": truncated,
+        "rows": len(problem.constraints),
+        "columns": len(names),
+        "parse_seconds": parse_seconds,
+        "solve_seconds": solve_seconds,
+    }
+
+def export_model_mps(python_code: str, timeout: float = None, bytecode: bytes = None) -> dict:
+    """
+    Runs generated code up to its first `solve()` and returns the model it built as MPS.
+
+    Args:
+        python_code (str): PuLP code, e.g. from generate_python_code
+        timeout (float): Seconds before the execution is killed. Defaults to SOLVER_TIMEOUT.
+        bytecode (bytes): The code compiled by preflight.preflight, run instead of compiling it again.
+
+    Returns:
+        dict: 'error' (bool), 'mps' (str, the model in MPS format), 'error_details' (str)
+              and 'model' (name, rows and columns of the exported model)
+    """
+    timeout = timeout or float(os.getenv("SOLVER_TIMEOUT", DEFAULT_TIMEOUT))
+    fd, path = tempfile.mkstemp(prefix="auto-modeler-", suffix=".mps")
+    os.close(fd)
+    try:
+        result = _execute_uncached(python_code, timeout, use_cache=False, bytecode=bytecode,
+                                   export_path=path, export_only=True)
+        solves = (result.get("solve_report") or {}).get("solves") or []
+        exported = solves[0].get("exported") if solves else None
+        if exported is None:
+            if result["timed_out"]:
+                details = f"Code execution timed out after {timeout:g} seconds."
+            elif result["returncode"] != 0:
+                details = result["stderr"].strip() or "Execution failed with non-zero exit code."
+            else:
+                details = "The code did not build and solve a PuLP model."
+            return {"error": True, "mps": "", "error_details": details, "model": None}
+        with open(path, "r", encoding="utf-8") as f:
+            mps = f.read()
+        return {"error": False, "mps": mps, "error_details": "", "model": exported}
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
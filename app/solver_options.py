@@ -0,0 +1,207 @@
+# Solver options applied to every solve that generated code runs.
+#
+# Generated code calls `model.solve()` (or `model.solve(pulp.PULP_CBC_CMD(msg=False))`)
+# on its own, so by default CBC ran single-threaded, without a gap tolerance,
+# and without a time limit: a long search was simply killed at the run's timeout
+# and its incumbent lost. The solve hooks (solve_hooks.py) now set these options
+# on whatever solver the code uses:
+#
+#   threads    - solver threads (SOLVER_THREADS; default: the CPUs shared by the solver pool)
+#   timeLimit  - seconds the solver may search (SOLVER_TIME_LIMIT); never more than
+#                the time left before the run is killed, less SOLVER_TIME_LIMIT_MARGIN,
+#                so the solver stops itself and its best solution comes back
+#   gapRel     - relative MIP gap at which the search stops (SOLVER_GAP_REL)
+#   presolve   - turn presolve on or off (SOLVER_PRESOLVE; default: the solver's own)
+#   warmStart  - start from the values the code set with setInitialValue (SOLVER_WARM_START)
+#   backend    - the solver to use (SOLVER_BACKEND, default "auto"; see solver_backends.py)
+#   portfolio  - race several backend/option combinations instead (SOLVER_PORTFOLIO, off by
+#                default; see solver_portfolio.py and parse_portfolio below)
+#
+# Requests can override each option; the environment gives the server-wide defaults.
+
+import os
+
+from solver_backends import AUTO, CODE, backend_names, is_available
+
+OPTION_NAMES = ("threads", "timeLimit", "gapRel", "presolve", "warmStart", "backend", "portfolio")
+DEFAULT_TIME_LIMIT_MARGIN = 2.0
+DEFAULT_PORTFOLIO = "cbc highs cbc:presolve=false"
+MIN_TIME_LIMIT = 1.0
+
+
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_flag(name: str):
+    value = os.getenv(name, "").strip()
+    return _flag(value) if value else None
+
+
+def default_threads() -> int:
+    """SOLVER_THREADS, else the CPUs left to each process of the solver pool."""
+    if os.getenv("SOLVER_THREADS"):
+        return int(os.getenv("SOLVER_THREADS"))
+    cpus = os.cpu_count() or 1
+    pool_size = int(os.getenv("SOLVER_POOL_SIZE", min(4, cpus))) or 1
+    return max(1, cpus // pool_size)
+
+
+def server_defaults() -> dict:
+    """The options configured for the whole server, with None for the unset ones."""
+    return {
+        "threads": default_threads(),
+        "timeLimit": float(os.getenv("SOLVER_TIME_LIMIT")) if os.getenv("SOLVER_TIME_LIMIT") else None,
+        "gapRel": float(os.getenv("SOLVER_GAP_REL")) if os.getenv("SOLVER_GAP_REL") else None,
+        "presolve": _env_flag("SOLVER_PRESOLVE"),
+        "warmStart": bool(_env_flag("SOLVER_WARM_START")),
+        "backend": os.getenv("SOLVER_BACKEND") or AUTO,
+        "portfolio": parse_portfolio(os.getenv("SOLVER_PORTFOLIO", "")),
+    }
+
+
+def validate_options(options: dict) -> dict:
+    """
+    Checks per-request overrides and returns them without the unset (None) ones.
+    Raises ValueError for unknown names and out-of-range values.
+    """
+    checked = {}
+    for name, value in (options or {}).items():
+        if name not in OPTION_NAMES:
+            raise ValueError(f"Unknown solver option {name!r}; expected one of {', '.join(OPTION_NAMES)}")
+        if value is None:
+            continue
+        if name == "threads":
+            value = int(value)
+            if value < 1:
+                raise ValueError("threads must be at least 1")
+        elif name == "timeLimit":
+            value = float(value)
+            if value <= 0:
+                raise ValueError("timeLimit must be positive")
+        elif name == "gapRel":
+            value = float(value)
+            if not 0 <= value < 1:
+                raise ValueError("gapRel must be between 0 and 1")
+        elif name == "backend":
+            if value not in (AUTO, CODE, *backend_names()):
+                raise ValueError(f"Unknown solver backend {value!r}; expected one of "
+                                 f"{', '.join((AUTO, CODE, *backend_names()))}")
+            if value not in (AUTO, CODE) and not is_available(value):
+                raise ValueError(f"Solver backend {value!r} is not installed here")
+        elif name == "portfolio":
+            value = parse_portfolio(value)
+            if value is None:
+                continue
+        else:
+            value = _flag(value) if isinstance(value, str) else bool(value)
+        checked[name] = value
+    return checked
+
+
+def parse_portfolio(spec):
+    """
+    Portfolio members from a spec such as "cbc highs cbc:presolve=false,gapRel=0.01": members
+    are separated by spaces, each a backend optionally followed by its own options. True (or
+    "true") stands for SOLVER_PORTFOLIO_MEMBERS, whose members are skipped when their backend
+    is not installed; lists of option dicts are checked as they are.
+
+    Returns:
+        list: One dict of options (with 'backend') per member; [] for "false" (no portfolio,
+              even if the server races by default) and None when `spec` is empty.
+    """
+    if spec is None or spec == "":
+        return None
+    if isinstance(spec, str) and spec.strip().lower() in ("false", "0", "no", "off"):
+        return []
+    if spec is True or (isinstance(spec, str) and _flag(spec)):
+        members = [_parse_member(text) for text in
+                   (os.getenv("SOLVER_PORTFOLIO_MEMBERS") or DEFAULT_PORTFOLIO).split()]
+        return parse_portfolio([member for member in members
+                                if member["backend"] in (AUTO, CODE) or is_available(member["backend"])])
+    if spec is False:
+        return []
+    if isinstance(spec, str):
+        spec = [_parse_member(text) for text in spec.split()]
+    members = []
+    for member in spec:
+        member = validate_options(dict(member))
+        if "portfolio" in member:
+            raise ValueError("Portfolio members cannot race portfolios of their own")
+        members.append(dict(member, backend=member.get("backend", AUTO)))
+    return members
+
+
+def _parse_member(text: str) -> dict:
+    backend, _, settings = text.partition(":")
+    member = {"backend": backend}
+    for setting in filter(None, settings.split(",")):
+        name, equals, value = setting.partition("=")
+        if not equals:
+            raise ValueError(f"Portfolio member {text!r}: expected option=value, got {setting!r}")
+        member[name.strip()] = value.strip()
+    return member
+
+
+def format_member(member: dict) -> str:
+    """The spec of one portfolio member, as parse_portfolio reads it."""
+    settings = ",".join(f"{name}={value}" for name, value in member.items() if name != "backend")
+    return f"{member.get('backend', AUTO)}:{settings}" if settings else member.get("backend", AUTO)
+
+
+def resolve_options(overrides: dict = None, time_left: float = None) -> dict:
+    """
+    The options for one solve: the server defaults updated with `overrides`, and the
+    time limit capped so the solver stops before the run is killed.
+
+    Args:
+        overrides: Per-request options (see validate_options)
+        time_left: Seconds before the run is killed, if it is bounded
+
+    Returns:
+        dict: The set options, by their PuLP names
+    """
+    options = server_defaults()
+    options.update(validate_options(overrides))
+    if time_left is not None:
+        margin = float(os.getenv("SOLVER_TIME_LIMIT_MARGIN", DEFAULT_TIME_LIMIT_MARGIN))
+        cap = round(max(MIN_TIME_LIMIT, time_left - margin), 1)
+        options["timeLimit"] = min(options["timeLimit"] or cap, cap)
+    return {name: value for name, value in options.items() if value is not None}
+
+
+def cache_variant(options: dict):
+    """The options that change which solution counts as an answer, for cache keys; None if none do."""
+    options = options or {}
+    variant = {}
+    if options.get("gapRel"):
+        variant["gapRel"] = options["gapRel"]
+    member_gaps = [member.get("gapRel") for member in options.get("portfolio") or []]
+    if any(member_gaps):
+        variant["portfolio_gapRel"] = member_gaps
+    return variant or None
+
+
+def apply_options(solver, options: dict):
+    """
+    Sets `options` on a PuLP solver object. A time limit the code set itself is kept
+    when it is shorter; the other options replace what the code chose. Options the
+    solver has no setting for (warm starts in the in-process HiGHS) are left out.
+    """
+    for name, value in options.items():
+        if name in ("backend", "portfolio"):
+            continue
+        if name == "timeLimit":
+            if solver.timeLimit is None or value < solver.timeLimit:
+                solver.timeLimit = value
+        elif solver.name == "HiGHS":  # in-process: attributes, and HiGHS's own option names
+            if name in ("threads", "gapRel"):
+                setattr(solver, name, value)
+            elif name == "presolve":
+                solver.optionsDict["presolve"] = "on" if value else "off"
+        elif solver.name == "HiGHS_CMD" and name == "presolve":
+            solver.options = [option for option in solver.options if not option.startswith("presolve=")]
+            solver.options.append(f"presolve={'on' if value else 'off'}")
+        else:
+            solver.optionsDict[name] = value
+    return solver
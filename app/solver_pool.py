@@ -0,0 +1,592 @@
+# Pool of pre-started ("warm") solver worker processes.
+#
+# Starting a fresh `python -c <code>` interpreter per execution pays for
+# interpreter startup, `import pulp` and CBC discovery on every run. Instead,
+# each worker here is started once, imports pulp and touches the CBC binary,
+# and then waits for jobs on a socket. Every job runs in a child forked from
+# the warm worker, so generated code still executes in an isolated process
+# (its own globals, its own process group that is killed on timeout) but
+# starts in microseconds rather than hundreds of milliseconds.
+#
+# The pool needs os.fork and is therefore only used on POSIX systems; callers
+# fall back to a plain subprocess elsewhere (see `fork_available`).
+
+import base64
+import json
+import logging
+import marshal
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from multiprocessing.connection import Connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_TASKS_PER_WORKER = 50
+# Extra time the pool waits for a worker beyond the job timeout before
+# declaring the worker itself hung and replacing it.
+WORKER_GRACE_SECONDS = 5
+WORKER_START_TIMEOUT = 60
+
+
+def fork_available() -> bool:
+    return hasattr(os, "fork") and hasattr(os, "killpg")
+
+
+def _exit_code_from_status(status: int) -> int:
+    """Converts a waitpid status into a subprocess-style return code."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return 1
+
+
+# --- Worker side -----------------------------------------------------------
+
+def _warm_up():
+    """Imports pulp and locates the CBC binary once so forked jobs inherit them."""
+    try:
+        import pulp
+        pulp.PULP_CBC_CMD(msg=False).available()
+    except Exception as e:  # pulp missing or broken: jobs will report the ImportError themselves
+        sys.stderr.write(f"solver worker warm-up incomplete: {e}\n")
+
+
+def _job_code(job: dict):
+    """
+    The code object to run: job['bytecode'] (marshalled by preflight.preflight, as
+    bytes or base64 text) when present, so the source is not compiled a second time.
+    """
+    bytecode = job.get("bytecode")
+    if bytecode:
+        return marshal.loads(base64.b64decode(bytecode) if isinstance(bytecode, str) else bytecode)
+    return compile(job["code"], "<string>", "exec")
+
+
+def _execute_job(job: dict) -> int:
+    """
+    Runs one job's code in the current (child) process and returns its exit code.
+
+    Solve hooks are installed first, and the report they collect is written to
+    job['report_path'] afterwards, whatever the outcome.
+    """
+    exit_code = 0
+    code_globals = {"__name__": "__main__", "__builtins__": __builtins__}
+    try:
+        try:
+            import solve_hooks
+            solve_hooks.install(job)
+        except Exception as e:
+            solve_hooks = None
+            print(f"Solve hooks unavailable: {e}", file=sys.stderr)
+        try:
+            exec(_job_code(job), code_globals)
+        except SystemExit as e:
+            if e.code is None:
+                exit_code = 0
+            elif isinstance(e.code, int):
+                exit_code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except BaseException:
+            # Drop this frame from the traceback so it reads like `python -c` output
+            etype, value, tb = sys.exc_info()
+            traceback.print_exception(etype, value, tb.tb_next)
+            exit_code = 1
+    finally:
+        if job.get("report_path") and solve_hooks is not None:
+            try:
+                solve_hooks.write_report(job["report_path"])
+            except Exception as e:
+                print(f"Could not write solve report: {e}", file=sys.stderr)
+    return exit_code
+
+
+def _exec_in_child(job: dict, stdout_fd: int, stderr_fd: int, conn: Connection = None):
+    """Prepares the forked child's process state, runs the job and never returns."""
+    exit_code = 1
+    try:
+        os.setpgid(0, 0)  # own process group, so a timeout also kills CBC
+        if conn is not None:
+            os.close(conn.fileno())  # generated code has no business talking to the pool
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False, encoding="utf-8", errors="backslashreplace")
+        sys.stderr = open(2, "w", closefd=False, encoding="utf-8", errors="backslashreplace")
+        sys.argv = ["-c"]
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        exit_code = _execute_job(job)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def _read_report(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return json.loads(content) if content else {}
+    except (OSError, ValueError):
+        return {}
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _read_back(f) -> str:
+    f.seek(0)
+    return f.read().decode("utf-8", errors="replace")
+
+
+def run_job_in_fork(job: dict, conn: Connection = None) -> dict:
+    """
+    Forks a child to execute `job['code']` and waits for it.
+
+    While waiting, a "cancel" message on `conn` kills the child early. Right after the
+    fork, {"job_pid", "report_path"} is sent on `conn`, so that the pool can still kill
+    the child's process group and remove its report should this worker hang.
+
+    Returns:
+        dict: 'returncode', 'stdout', 'stderr', 'timed_out', 'cancelled', 'max_rss_kb' and
+              'cpu_seconds' of the child (including the solver processes it waited for),
+              'spawn_seconds' (the fork) and 'run_seconds' (fork to exit) of the child,
+              and the 'solve_report' collected by the solve hooks
+    """
+    timeout = job.get("timeout") or DEFAULT_TIMEOUT
+    report_fd, report_path = tempfile.mkstemp(prefix="solve-report-", suffix=".json")
+    os.close(report_fd)
+    job = dict(job, report_path=report_path)
+    with tempfile.TemporaryFile() as out_f, tempfile.TemporaryFile() as err_f:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            _exec_in_child(job, out_f.fileno(), err_f.fileno(), conn)
+        try:
+            os.setpgid(pid, pid)  # the child does so too; whoever is first, a cancel right away finds the group
+        except OSError:
+            pass  # the child has already set it, or has exited
+        spawned = time.perf_counter()
+        if conn is not None:
+            conn.send({"job_pid": pid, "report_path": report_path})
+
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        timed_out = cancelled = False
+        while True:
+            waited_pid, status, rusage = os.wait4(pid, os.WNOHANG)
+            if waited_pid == pid:
+                break
+            if conn is not None and conn.poll() and conn.recv() == "cancel":
+                cancelled = True
+            if cancelled or time.monotonic() >= deadline:
+                timed_out = not cancelled
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                _, status, rusage = os.wait4(pid, 0)
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 0.02)
+
+        return {
+            "returncode": _exit_code_from_status(status),
+            "stdout": _read_back(out_f),
+            "stderr": _read_back(err_f),
+            "timed_out": timed_out,
+            "cancelled": cancelled,
+            "max_rss_kb": rusage.ru_maxrss,
+            "cpu_seconds": round(rusage.ru_utime + rusage.ru_stime, 4),
+            "spawn_seconds": round(spawned - started, 6),
+            "run_seconds": round(time.perf_counter() - spawned, 4),
+            "solve_report": _read_report(report_path),
+        }
+
+
+def _worker_main(fd: int):
+    """Entry point of a warm worker process: warm up, then serve jobs until told to stop."""
+    conn = Connection(fd)
+    # Keep stray prints from the worker itself away from the parent's stdout
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    sys.stdout = open(1, "w", closefd=False)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the parent
+    _warm_up()
+    conn.send({"ready": True, "pid": os.getpid()})
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        if job == "cancel":
+            continue  # arrived after the job it was meant for had already finished
+        try:
+            result = run_job_in_fork(job, conn)
+        except Exception as e:
+            result = {
+                "returncode": 1,
+                "stdout": "",
+                "stderr": f"Solver worker failed to run the job: {e}",
+                "timed_out": False,
+                "cancelled": False,
+                "max_rss_kb": 0,
+                "cpu_seconds": 0.0,
+                "solve_report": {},
+            }
+        conn.send(result)
+
+
+# --- Pool side -------------------------------------------------------------
+
+class _Worker:
+    """Handle to one warm worker process held by the pool."""
+
+    def __init__(self):
+        parent_sock, child_sock = socket.socketpair()
+        child_fd = child_sock.fileno()
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(child_fd)],
+            pass_fds=(child_fd,),
+            stdin=subprocess.DEVNULL,
+            close_fds=True,
+        )
+        child_sock.close()
+        self.conn = Connection(parent_sock.detach())
+        self.tasks_done = 0
+        self.ready = False
+        # {"job_pid", "report_path"} of the job running in this worker, as the worker reported it
+        self.job = None
+
+    def wait_ready(self, timeout: float = WORKER_START_TIMEOUT) -> bool:
+        if not self.ready and self.conn.poll(timeout):
+            self.ready = bool(self.conn.recv().get("ready"))
+        return self.ready
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+        self.conn.close()
+        job, self.job = self.job, None
+        if job:  # the job and its solver live on in their own process group without the worker's watchdog
+            try:
+                os.killpg(job["job_pid"], signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            try:
+                os.unlink(job["report_path"])
+            except OSError:
+                pass
+
+
+class SolverPool:
+    """
+    A fixed-size pool of warm solver workers shared by all request threads.
+
+    Args:
+        size: Number of worker processes
+        max_tasks_per_worker: Jobs a worker runs before it is replaced by a fresh one
+        timeout: Default per-job timeout in seconds
+    """
+
+    def __init__(self, size: int, max_tasks_per_worker: int = DEFAULT_MAX_TASKS_PER_WORKER,
+                 timeout: float = DEFAULT_TIMEOUT):
+        if size < 1:
+            raise ValueError("SolverPool size must be at least 1")
+        self.size = size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+
+    def start(self):
+        """Starts all workers; called lazily by the first `run`."""
+        with self._lock:
+            if self._started:
+                return
+            workers = [_Worker() for _ in range(self.size)]
+            for worker in workers:
+                self._idle.put(worker)
+            self._started = True
+        logger.info(f"Started solver pool with {self.size} warm workers.")
+
+    def _replace(self, worker: _Worker, kill: bool = False):
+        """Retires `worker` and puts a fresh one in the idle queue, off the request path."""
+        def replace():
+            try:
+                worker.kill() if kill else worker.stop()
+            except Exception as e:
+                logger.warning(f"Error while retiring solver worker: {e}")
+            if not self._closed:
+                self._idle.put(_Worker())
+        threading.Thread(target=replace, daemon=True).start()
+
+    def run(self, code: str, timeout: float = None, cancel: threading.Event = None, **job) -> dict:
+        """
+        Executes `code` in a child of a warm worker. Extra keyword arguments are
+        passed to the solve hooks as job options (e.g. use_cache); a `bytecode`
+        option from preflight.preflight is run instead of compiling `code` again.
+        Setting the `cancel` event kills the job early; the worker itself is kept.
+
+        Returns:
+            dict: 'returncode', 'stdout', 'stderr', 'timed_out', 'cancelled', 'max_rss_kb',
+                  'cpu_seconds' and 'solve_report'; when the job ran, also 'wait_seconds'
+                  (for an idle worker), 'spawn_seconds' and 'run_seconds'
+        """
+        if self._closed:
+            raise RuntimeError("SolverPool has been shut down")
+        self.start()
+        timeout = timeout or self.timeout
+        started = time.perf_counter()
+        worker = self._acquire(timeout, cancel)
+        wait_seconds = round(time.perf_counter() - started, 6)
+        if worker is None:
+            cancelled = cancel is not None and cancel.is_set()
+            return {
+                "returncode": -signal.SIGKILL,
+                "stdout": "",
+                "stderr": "" if cancelled else f"No solver worker became free within {timeout:g} seconds.",
+                "timed_out": not cancelled,
+                "cancelled": cancelled,
+                "max_rss_kb": 0,
+                "cpu_seconds": 0.0,
+                "solve_report": {},
+                "wait_seconds": wait_seconds,
+            }
+        try:
+            if not worker.alive() or not worker.wait_ready():
+                logger.warning("Solver worker was not usable, replacing it.")
+                worker.kill()
+                worker = _Worker()
+                if not worker.wait_ready():
+                    raise RuntimeError("Solver worker failed to start")
+
+            worker.conn.send(dict(job, code=code, timeout=timeout))
+            result = self._wait_for_result(worker, timeout + WORKER_GRACE_SECONDS, cancel)
+            if result is None:
+                logger.error("Solver worker did not answer in time, killing it.")
+                self._replace(worker, kill=True)
+                worker = None
+                return {
+                    "returncode": -signal.SIGKILL,
+                    "stdout": "",
+                    "stderr": "",
+                    "timed_out": True,
+                    "cancelled": False,
+                    "max_rss_kb": 0,
+                    "cpu_seconds": 0.0,
+                    "solve_report": {},
+                }
+            result["wait_seconds"] = wait_seconds
+        except (EOFError, OSError) as e:
+            logger.error(f"Lost connection to solver worker: {e}")
+            if worker is not None:
+                self._replace(worker, kill=True)
+                worker = None
+            raise
+        finally:
+            if worker is not None:
+                worker.tasks_done += 1
+                if worker.tasks_done >= self.max_tasks_per_worker:
+                    self._replace(worker)
+                else:
+                    self._idle.put(worker)
+        return result
+
+    def _acquire(self, timeout: float, cancel: threading.Event = None):
+        """Takes an idle worker, waiting up to `timeout` seconds; None if none came or `cancel` was set meanwhile."""
+        deadline = time.monotonic() + timeout
+        while cancel is None or not cancel.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                return self._idle.get(timeout=remaining if cancel is None else min(0.05, remaining))
+            except queue.Empty:
+                continue
+        return None
+
+    @staticmethod
+    def _wait_for_result(worker: _Worker, timeout: float, cancel: threading.Event = None):
+        """
+        Waits for the worker's answer, forwarding a cancellation once, and notes the job's
+        pid and report file the worker announces on the way. None if the answer never came.
+        """
+        deadline = time.monotonic() + timeout
+        cancel_sent = False
+        while True:
+            remaining = deadline - time.monotonic()
+            if worker.conn.poll(max(0.0, remaining) if cancel is None else 0.01):
+                message = worker.conn.recv()
+                if isinstance(message, dict) and "job_pid" in message:
+                    worker.job = message
+                    continue
+                worker.job = None
+                return message
+            if remaining <= 0:
+                return None
+            if not cancel_sent and cancel is not None and cancel.is_set():
+                worker.conn.send("cancel")
+                cancel_sent = True
+
+    def shutdown(self):
+        """Stops all idle workers. Jobs still running finish, and their workers are then discarded."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.stop()
+            except Exception:
+                worker.kill()
+
+
+_solver_pool = None
+_solver_pool_lock = threading.Lock()
+
+
+def get_solver_pool():
+    """
+    Returns the process-wide solver pool configured from the environment, or None
+    when the pool is disabled (SOLVER_POOL_SIZE=0) or unsupported on this platform.
+    """
+    global _solver_pool
+    if _solver_pool is None:
+        with _solver_pool_lock:
+            if _solver_pool is None:
+                size = int(os.getenv("SOLVER_POOL_SIZE", min(4, os.cpu_count() or 1)))
+                if size <= 0 or not fork_available():
+                    return None
+                _solver_pool = SolverPool(
+                    size=size,
+                    max_tasks_per_worker=int(
+                        os.getenv("SOLVER_POOL_MAX_TASKS", DEFAULT_MAX_TASKS_PER_WORKER)
+                    ),
+                    timeout=float(os.getenv("SOLVER_TIMEOUT", DEFAULT_TIMEOUT)),
+                )
+    return _solver_pool
+
+
+def run_in_subprocess(code: str, timeout: float = None, cancel: threading.Event = None, **job) -> dict:
+    """
+    Runs a job in a fresh interpreter, for platforms without fork or when the pool is disabled.
+    Setting the `cancel` event kills the interpreter early.
+
+    Returns:
+        dict: Same keys as `SolverPool.run`; 'spawn_seconds' is the time to start the
+              interpreter process and 'run_seconds' includes the interpreter's startup
+    """
+    timeout = timeout or DEFAULT_TIMEOUT
+    report_fd, report_path = tempfile.mkstemp(prefix="solve-report-", suffix=".json")
+    os.close(report_fd)
+    if isinstance(job.get("bytecode"), bytes):
+        job["bytecode"] = base64.b64encode(job["bytecode"]).decode("ascii")  # JSON has no bytes
+    job_fd, job_path = tempfile.mkstemp(prefix="solve-job-", suffix=".json")
+    with os.fdopen(job_fd, "w", encoding="utf-8") as f:
+        json.dump(dict(job, code=code, timeout=timeout, report_path=report_path), f)
+    try:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--run-job", job_path],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        spawned = time.perf_counter()
+        finished = threading.Event()
+        cancelled = []
+        if cancel is not None:
+            def kill_on_cancel():
+                while not finished.wait(0.05):
+                    if cancel.is_set():
+                        cancelled.append(True)
+                        process.kill()
+                        return
+            threading.Thread(target=kill_on_cancel, daemon=True).start()
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            timed_out = True
+        finally:
+            finished.set()
+        exited = time.perf_counter()
+    finally:
+        os.unlink(job_path)
+    return {
+        "returncode": process.returncode,
+        "stdout": stdout,
+        "stderr": stderr,
+        "timed_out": timed_out and not cancelled,
+        "cancelled": bool(cancelled),
+        "max_rss_kb": 0,
+        "cpu_seconds": 0.0,
+        "spawn_seconds": round(spawned - started, 6),
+        "run_seconds": round(exited - spawned, 4),
+        "solve_report": _read_report(report_path),
+    }
+
+
+def shutdown_solver_pool():
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is not None:
+            _solver_pool.shutdown()
+            _solver_pool = None
+
+
+if __name__ == "__main__" and len(sys.argv) == 3:
+    if sys.argv[1] == "--worker":
+        _worker_main(int(sys.argv[2]))
+    elif sys.argv[1] == "--run-job":
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            _job = json.load(f)
+        sys.argv = ["-c"]
+        _exit_code = _execute_job(_job)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(_exit_code)
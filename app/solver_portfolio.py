@@ -0,0 +1,200 @@
+# Racing several solver configurations on one model.
+#
+# How long a hard MIP takes differs a lot between CBC and HiGHS and between
+# their settings, and there is no telling in advance which will be fast. With
+# the `portfolio` solver option, the solve hook (solve_hooks.py) hands the
+# model the generated code built to `race`, which forks one process per
+# portfolio member. The forks share the built model, so it is built only once.
+#
+# Each member solves with its own backend and options (see
+# solver_options.parse_portfolio) on its share of the run's threads. The
+# first member to prove its answer (an optimum, infeasibility or
+# unboundedness) wins, and the others are killed. When no member proves its
+# answer before the time limit, the best incumbent wins. The winning solution
+# is written into the problem as if it had been solved in place, so the
+# generated code carries on unchanged.
+#
+# Every member runs in its own process group, so killing it also stops the
+# solver command it started. Members are limited to the run's time limit, so
+# even members orphaned by a killed run stop on their own.
+
+import json
+import logging
+import os
+import selectors
+import signal
+import sys
+import time
+
+from solve_cache import apply_solution, is_cacheable_solution, snapshot_solution
+from solver_backends import solver_for
+from solver_options import format_member
+
+logger = logging.getLogger(__name__)
+
+# Seconds the members get beyond their time limit to report before they are killed
+REPORT_GRACE_SECONDS = 1.0
+
+
+def member_options(member: dict, options: dict, members: int) -> dict:
+    """
+    The options one member solves with: the run's, overridden by the member's own.
+    Unless the member sets threads, it gets SOLVER_PORTFOLIO_THREADS or an equal
+    share of the run's threads; its time limit never exceeds the run's.
+    """
+    combined = {name: value for name, value in options.items() if name != "portfolio"}
+    if "threads" not in member:
+        share = os.getenv("SOLVER_PORTFOLIO_THREADS")
+        combined["threads"] = int(share) if share else max(1, combined.get("threads", 1) // members)
+    combined.update(member)
+    if options.get("timeLimit"):
+        combined["timeLimit"] = min(combined.get("timeLimit") or options["timeLimit"], options["timeLimit"])
+    return combined
+
+
+def _run_member(original_solve, problem, options: dict, constraint_order: list, write_fd: int):
+    """Body of a member process: solve, send the solution as JSON, exit without cleanup."""
+    exit_code = 0
+    try:
+        import pulp
+
+        started = time.perf_counter()
+        solver, backend, _ = solver_for(problem, None, options)
+        status = original_solve(problem, solver)
+        result = snapshot_solution(problem, status, constraint_order)
+        result.update(backend=backend, solver=solver.name, objective=pulp.value(problem.objective),
+                      seconds=round(time.perf_counter() - started, 4))
+    except BaseException as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+        exit_code = 1
+    try:
+        data = json.dumps(result, default=str).encode("utf-8")
+        while data:
+            data = data[os.write(write_fd, data):]
+    finally:
+        os._exit(exit_code)  # no atexit handlers or buffered output of the parent
+
+
+def _kill(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    try:
+        os.waitpid(pid, 0)
+    except ChildProcessError:
+        pass
+
+
+def _better(candidate: dict, best: dict, sense: int) -> bool:
+    """Whether `candidate` beats `best`: solutions over none, then the better objective."""
+    if best is None:
+        return True
+    has_solution = lambda result: result["status"] == 1 and result.get("objective") is not None
+    if has_solution(candidate) != has_solution(best):
+        return has_solution(candidate)
+    if not has_solution(candidate):
+        return False
+    return candidate["objective"] * sense < best["objective"] * sense  # sense: 1 minimize, -1 maximize
+
+
+def race(original_solve, problem, members: list, options: dict, entry: dict) -> int:
+    """
+    Solves `problem` with every portfolio member at once and keeps the winner's solution.
+
+    Args:
+        original_solve: PuLP's own LpProblem.solve
+        problem: The problem the generated code built
+        members: Option dicts from solver_options.parse_portfolio
+        options: The run's options; 'timeLimit' bounds every member
+        entry: The solve's report entry; 'portfolio' and 'solver' are filled in
+
+    Returns:
+        int: The PuLP status of the winning solution
+    """
+    constraint_order = list(problem.constraints)
+    configured = [member_options(member, options, len(members)) for member in members]
+    report = [{"member": i, "spec": format_member(member), "threads": configured[i].get("threads"),
+               "outcome": "running"} for i, member in enumerate(members)]
+    entry["portfolio"] = {"members": report, "winner": None, "won_by": None}
+
+    if not hasattr(os, "fork"):  # one member after the other would defeat the purpose: solve with the first
+        solver, _, _ = solver_for(problem, None, configured[0])
+        entry["solver"] = solver.name
+        report[0]["outcome"] = "won"
+        entry["portfolio"].update(winner=0, won_by="only_member")
+        return original_solve(problem, solver)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    selector = selectors.DefaultSelector()
+    pids, chunks = {}, {}
+    started = time.monotonic()
+    for i, member in enumerate(configured):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.setpgid(0, 0)
+            os.close(read_fd)
+            _run_member(original_solve, problem, member, constraint_order, write_fd)
+        try:
+            os.setpgid(pid, pid)  # also here, so a kill right after the fork reaches the group
+        except (PermissionError, ProcessLookupError):
+            pass
+        os.close(write_fd)
+        pids[i], chunks[i] = pid, []
+        selector.register(read_fd, selectors.EVENT_READ, i)
+
+    time_limit = options.get("timeLimit")
+    deadline = started + time_limit + REPORT_GRACE_SECONDS if time_limit else None
+    results, winner = {}, None
+    try:
+        while selector.get_map() and winner is None:
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                break
+            for key, _ in selector.select(wait):
+                i = key.data
+                chunk = os.read(key.fd, 1 << 16)
+                if chunk:
+                    chunks[i].append(chunk)
+                    continue
+                selector.unregister(key.fd)
+                os.close(key.fd)
+                os.waitpid(pids.pop(i), 0)
+                try:
+                    result = json.loads(b"".join(chunks[i]) or b"null")
+                except ValueError:
+                    result = None
+                if not result or "error" in result:
+                    report[i].update(outcome="error", error=(result or {}).get("error", "no result"))
+                    continue
+                results[i] = result
+                report[i].update(outcome="finished", backend=result["backend"], seconds=result["seconds"],
+                                 objective=result["objective"], sol_status=result["sol_status"])
+                if is_cacheable_solution(result):  # proven: no other member can do better
+                    winner = i
+                    break
+    finally:
+        for i, pid in pids.items():
+            _kill(pid)
+            report[i]["outcome"] = "killed"
+        for key in list(selector.get_map().values()):
+            os.close(key.fd)
+        selector.close()
+
+    won_by = "proven"
+    if winner is None:
+        won_by = "best_incumbent"
+        for i, result in results.items():
+            if _better(result, results.get(winner), problem.sense):
+                winner = i
+    if winner is None:
+        errors = "; ".join(f"{member['spec']}: {member.get('error', member['outcome'])}" for member in report)
+        raise RuntimeError(f"No portfolio member returned a solution ({errors})")
+
+    report[winner]["outcome"] = "won"
+    entry["solver"] = results[winner]["solver"]
+    entry["portfolio"].update(winner=winner, won_by=won_by, seconds=round(time.monotonic() - started, 4))
+    logger.info(f"Portfolio member {report[winner]['spec']} won ({won_by}).")
+    return apply_solution(problem, results[winner], constraint_order)
@@ -0,0 +1,125 @@
+# Cold-start import profile of the web app, the CLI and the solver workers.
+#
+# Workers are started and stopped on demand, so the time a fresh interpreter
+# needs before it can serve is paid again and again. `profile_target` imports a
+# target in a new interpreter under `python -X importtime` and turns the log
+# into per-module self and cumulative times; `main startup` (see main.py) runs
+# it for every target and fails when one exceeds its budget.
+
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+UI_DIR = os.path.join(APP_DIR, "ui")
+
+# What each kind of process imports before it can do its work
+TARGETS = {
+    "web": (UI_DIR, "import app"),
+    "cli": (APP_DIR, "import main"),
+    "worker": (APP_DIR, "import solver_pool, solve_hooks; solver_pool._warm_up()"),
+}
+
+DEFAULT_TOP = 15
+
+
+def parse_importtime(log: str) -> list:
+    """
+    Parses `-X importtime` output into one dict per import, in log order: 'module',
+    'depth' (0 for imports made by the profiled code itself), 'self_us' and
+    'cumulative_us' (microseconds). Lines that are not import timings are skipped.
+    """
+    entries = []
+    for line in log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append({
+            "module": stripped,
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+        })
+    return entries
+
+
+def _run_once(target: str) -> tuple:
+    """Imports the target in a fresh interpreter; returns (parsed log, wall seconds)."""
+    directory, statement = TARGETS[target]
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", statement],
+        cwd=directory, capture_output=True, text=True,
+    )
+    seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing the {target} target failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr), seconds
+
+
+def profile_target(target: str, runs: int = 3, top: int = DEFAULT_TOP) -> dict:
+    """
+    Measures how long a target takes to import from a cold interpreter.
+
+    Args:
+        target: One of TARGETS ('web', 'cli', 'worker')
+        runs: Fresh interpreters to start; every figure is the median over them
+        top: How many modules to list
+
+    Returns:
+        dict: 'target', 'runs', 'import_ms' (all imports, interpreter startup included),
+              'process_ms' (wall time of the whole process) and 'modules', the `top`
+              modules by cumulative time, each with 'module', 'depth', 'self_ms' and
+              'cumulative_ms'.
+    """
+    logs, walls = [], []
+    for _ in range(max(1, runs)):
+        entries, seconds = _run_once(target)
+        logs.append(entries)
+        walls.append(seconds)
+
+    samples = {}
+    for entries in logs:
+        for entry in entries:
+            sample = samples.setdefault(entry["module"], {"depth": entry["depth"], "self": [], "cumulative": []})
+            sample["self"].append(entry["self_us"])
+            sample["cumulative"].append(entry["cumulative_us"])
+    totals = [sum(entry["cumulative_us"] for entry in entries if entry["depth"] == 0) for entries in logs]
+
+    modules = [
+        {
+            "module": module,
+            "depth": sample["depth"],
+            "self_ms": round(statistics.median(sample["self"]) / 1000, 2),
+            "cumulative_ms": round(statistics.median(sample["cumulative"]) / 1000, 2),
+        }
+        for module, sample in samples.items()
+    ]
+    modules.sort(key=lambda module: module["cumulative_ms"], reverse=True)
+    return {
+        "target": target,
+        "runs": len(logs),
+        "import_ms": round(statistics.median(totals) / 1000, 2),
+        "process_ms": round(statistics.median(walls) * 1000, 2),
+        "modules": modules[:top],
+    }
+
+
+def format_profile(profile: dict) -> str:
+    """Renders a profile as a small table, deeper imports indented under their importers."""
+    lines = [f"{profile['target']}: imports {profile['import_ms']:.1f} ms, "
+             f"process {profile['process_ms']:.1f} ms (median of {profile['runs']})",
+             f"  {'cumulative':>10}  {'self':>8}  module"]
+    for module in profile["modules"]:
+        lines.append(f"  {module['cumulative_ms']:>8.1f}ms  {module['self_ms']:>6.1f}ms  "
+                     f"{'  ' * module['depth']}{module['module']}")
+    return "\n".join(lines)
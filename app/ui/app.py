@@ -1,42 +1,152 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, g, render_template, request, jsonify, session, stream_with_context
 import sys
 import os
+import time
 import logging # For better logging
-import subprocess # Added for running code
 import traceback # Added for error handling
 
 # Adjust path to import modules from the 'app' directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from nlp_processor import parse_problem_statement, GEMINI_API_KEY, optimize_problem_statement
-from model_formulator import formulate_model_from_nlp, render_model_plaintext
+# Environment variables from a .env file, loaded at start-up before anything reads them
+from dotenv import load_dotenv
+load_dotenv()
+
+from llm_provider import key_required, validate_key as validate_gemini_key
+from nlp_processor import parse_problem_statement, optimize_problem_statement, server_api_key
+from model_formulator import formulate_model_from_nlp, recall_formulated_model, remember_formulated_model, render_model_plaintext
 # solver_engine and validator imports will be used later
-from solver_engine import generate_pulp_code
+from solver_engine import (codegen_stats, execute_code, export_model_mps, generate_python_code,
+                           generate_python_code_stream, run_model_file, run_with_repair, solver_backends_info,
+                           solver_summary)
+from solver_options import validate_options
+from model_io import ModelFileError, detect_format
+from preflight import format_issues, preflight
 # from validator import perform_sanity_checks, check_model_reasonableness
-from validator import validate_execution_results
+from validator import validate_execution_results, validate_execution_results_stream
+from llm_stream import sse_event
+from main import run_pipeline
+from job_queue import get_job_queue, time_limit_for
+from response_cache import get_response_cache
+import metrics
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
 # Configure secret key for sessions
 app.secret_key = os.environ.get('SECRET_KEY', 'auto-modeler-dev-key-change-in-production')
 
+# Limit the size of uploaded model files
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MODEL_UPLOAD_MAX_MB', 512)) * 1024 * 1024
+
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
 
-# Configure Gemini (ensure the API key is set in nlp_processor.py)
-# This setup is from nlp_processor.py, ensuring it's initialized when the app starts.
-if GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE" or not GEMINI_API_KEY:
-    app.logger.warning("Gemini API Key is not set or is placeholder in app/nlp_processor.py. AI features may not work.")
-else:
+# Gemini requests go through the provider LLM_PROVIDER selects (see llm_provider.py);
+# Gemini clients are created per API key on first use, nothing is configured globally here.
+if server_api_key() in (None, "", "YOUR_GEMINI_API_KEY_HERE") and key_required():
+    app.logger.warning("GEMINI_API_KEY is not set or is a placeholder. Please set it in your .env file. AI features may not work.")
+
+@app.before_request
+def _start_request_timing():
+    g.request_started = time.perf_counter()
+    metrics.start_request()
+
+@app.after_request
+def _add_server_timing(response):
+    """Records the request in the metrics and reports where its time went in a Server-Timing header."""
+    timings = metrics.finish_request()
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUEST_SECONDS.observe(seconds, route=route, method=request.method, status=response.status_code)
+    timings["total"] = seconds
+    response.headers["Server-Timing"] = metrics.server_timing(timings)
+    return response
+
+def _use_cache():
+    """Requests can send bypass_cache=true to force a fresh Gemini call or solver run."""
+    return request.form.get('bypass_cache', 'false').lower() != 'true'
+
+def _form_int(name):
+    """An optional integer form field; None when it is missing or empty. Raises ValueError naming the field."""
+    value = request.form.get(name, '').strip()
     try:
-        import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-        # model = genai.GenerativeModel('gemini-pro') # or your chosen model from nlp_processor.py
-        app.logger.info("Gemini API configured via nlp_processor settings.")
-    except ImportError:
-        app.logger.error("google-generativeai library not found. Please install it: pip install google-generativeai")
-    except Exception as e:
-        app.logger.error(f"Could not configure Gemini API: {e}")
+        return int(value) if value else None
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number, not {value!r}") from None
+
+def _form_float(name):
+    """An optional number form field; None when it is missing or empty. Raises ValueError naming the field."""
+    value = request.form.get(name, '').strip()
+    try:
+        return float(value) if value else None
+    except ValueError:
+        raise ValueError(f"{name} must be a number, not {value!r}") from None
+
+def _form_flag(name):
+    """An optional boolean form field, false unless it is 'true'."""
+    return request.form.get(name, 'false').lower() == 'true'
+
+def _form_tristate(name):
+    """An optional boolean form field; None when it is missing or empty."""
+    value = request.form.get(name, '').strip().lower()
+    return value == 'true' if value else None
+
+def _solver_options():
+    """
+    Per-request solver options from the backend, threads, gap_rel, solver_time_limit, presolve,
+    warm_start and portfolio fields; unset ones keep the server defaults. Raises ValueError for bad values.
+    """
+    return validate_options({
+        "backend": request.form.get('backend', '').strip() or None,
+        "threads": _form_int('threads'),
+        "gapRel": _form_float('gap_rel'),
+        "timeLimit": _form_float('solver_time_limit'),
+        "presolve": _form_tristate('presolve'),
+        "warmStart": _form_tristate('warm_start'),
+        "portfolio": request.form.get('portfolio', '').strip() or None,
+    })
+
+def _run_time_limit():
+    """
+    The time limit of a synchronous run: the time_limit field, else SOLVER_TIMEOUT, which also
+    caps it since the request stays open while the code runs. Raises ValueError for bad values.
+    """
+    maximum = float(os.environ.get('SOLVER_TIMEOUT', 30))
+    requested = _form_float('time_limit')
+    if requested is None:
+        return maximum
+    if not 0 < requested <= maximum:
+        raise ValueError(f"time_limit must be between 0 and {maximum:g} seconds; queue longer solves with POST /jobs")
+    return requested
+
+def _sse_response(events, route: str):
+    """
+    Streams (event, payload) pairs as server-sent events.
+
+    The final "done" event carries the complete result together with the
+    time to the first chunk ('ttft_ms') and the total time ('total_ms').
+    """
+    def stream():
+        started = time.perf_counter()
+        first_chunk_ms = None
+        try:
+            for event, payload in events:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if event == "chunk" and first_chunk_ms is None:
+                    first_chunk_ms = elapsed_ms
+                    app.logger.info(f"{route}: first chunk after {first_chunk_ms:.0f} ms")
+                if event == "done":
+                    payload = dict(payload, ttft_ms=first_chunk_ms, total_ms=elapsed_ms)
+                yield sse_event(event, payload)
+        except Exception as e:
+            app.logger.error(f"Error in {route}: {e}", exc_info=True)
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/')
 def index():
@@ -56,25 +166,17 @@ def set_api_key():
         if not api_key.startswith('AIzaSy'):
             return jsonify({"error": "Invalid API key format. Gemini API keys start with 'AIzaSy'."}), 400
         
-        # Test the API key by making a simple request
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            
-            # Simple test to validate the key
-            response = model.generate_content("Hello")
-            
-            # If we get here, the API key works
-            session['gemini_api_key'] = api_key
-            app.logger.info("API key successfully validated and stored in session.")
-            
-            return jsonify({"success": True, "message": "API key validated and saved successfully!"})
-            
-        except Exception as e:
-            app.logger.error(f"API key validation failed: {e}")
-            return jsonify({"error": f"Invalid API key or API error: {str(e)}"}), 400
-            
+        # Check the key with a metadata call, or from memory if it passed recently
+        check = validate_gemini_key(api_key, 'gemini-2.0-flash-exp', use_cache=_use_cache())
+        if not check["valid"]:
+            app.logger.error(f"API key validation failed: {check['error']}")
+            return jsonify({"error": f"Invalid API key or API error: {check['error']}"}), 400
+
+        session['gemini_api_key'] = api_key
+        app.logger.info(f"API key validated ({'cached' if check['cached'] else 'checked with Gemini'}) and stored in session.")
+
+        return jsonify({"success": True, "message": "API key validated and saved successfully!"})
+
     except Exception as e:
         app.logger.error(f"Error in /set_api_key: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
@@ -101,7 +203,7 @@ def optimize_statement_route():
             return jsonify({"error": "Problem statement cannot be empty."}), 400
             
         app.logger.info(f"Optimizing raw statement: {problem_statement_raw[:100]}...")
-        optimized_statement = optimize_problem_statement(problem_statement_raw, api_key)
+        optimized_statement = optimize_problem_statement(problem_statement_raw, api_key, use_cache=_use_cache())
         app.logger.info(f"Optimized statement: {optimized_statement[:100]}...")
         
         return jsonify({"optimized_statement": optimized_statement})
@@ -124,7 +226,7 @@ def formulate_model_route():
         app.logger.info(f"Formulating model from: {optimized_statement[:100]}...")
 
         # STEP 1: Parse problem statement (NLP) using the optimized version
-        parsed_components = parse_problem_statement(optimized_statement, api_key)
+        parsed_components = parse_problem_statement(optimized_statement, api_key, use_cache=_use_cache())
         
         if 'error' in parsed_components or not isinstance(parsed_components, dict):
             error_detail = parsed_components.get('error', 'Unknown parsing error or invalid format.') if isinstance(parsed_components, dict) else "Invalid format received from parser."
@@ -142,6 +244,7 @@ def formulate_model_route():
         
         # STEP 3: Generate plaintext representation only
         model_plaintext = render_model_plaintext(model_representation)
+        remember_formulated_model(model_plaintext, model_representation)
         app.logger.info("Model rendered to plaintext.")
 
         return jsonify({
@@ -164,10 +267,21 @@ def generate_code_route():
         if not model_plaintext.strip():
             return jsonify({"error": "Mathematical model is missing."}), 400
 
+        try:
+            candidates, max_output_tokens = _form_int('candidates'), _form_int('max_output_tokens')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         app.logger.info("Generating PuLP Python code...")
         
-        # Generate the PuLP code using Gemini
-        python_code = generate_pulp_code(model_plaintext, api_key)
+        # Generate the PuLP code locally from the structured model when possible, else using Gemini.
+        # candidates > 1 races several Gemini programs and keeps the first that solves to optimality.
+        generated = generate_python_code(
+            recall_formulated_model(model_plaintext), model_plaintext=model_plaintext,
+            api_key=api_key, use_cache=_use_cache(),
+            candidates=candidates, max_output_tokens=max_output_tokens
+        )
+        python_code = generated["python_code"]
         
         if not python_code or not python_code.strip():
             app.logger.error("Code generation by AI failed: Received empty or whitespace-only code from solver_engine.")
@@ -175,16 +289,37 @@ def generate_code_route():
                 "error": "AI code generation failed to produce code. The model might have encountered an internal issue, or the request could have been filtered. Please check server logs for more detailed information from the AI service."
             }), 500
         
-        app.logger.info("Successfully generated PuLP Python code.")
+        app.logger.info(f"Successfully generated PuLP Python code ({generated['generator']} generator).")
         
         return jsonify({
-            "python_code": python_code
+            "python_code": python_code,
+            "generator": generated["generator"],
+            "fallback_reason": generated["fallback_reason"],
+            "speculation": generated.get("speculation")
         })
         
     except Exception as e:
         app.logger.error(f"Error in /generate_code: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate_code_stream', methods=['POST'])
+def generate_code_stream_route():
+    """Same as /generate_code, but streams the code as server-sent events while Gemini writes it."""
+    api_key = session.get('gemini_api_key')
+    if not api_key:
+        return jsonify({"error": "Please provide your Gemini API key first."}), 400
+
+    model_plaintext = request.form.get('model_plaintext', '')
+    if not model_plaintext.strip():
+        return jsonify({"error": "Mathematical model is missing."}), 400
+
+    app.logger.info("Streaming PuLP Python code generation...")
+    events = generate_python_code_stream(
+        recall_formulated_model(model_plaintext), model_plaintext=model_plaintext,
+        api_key=api_key, use_cache=_use_cache()
+    )
+    return _sse_response(events, '/generate_code_stream')
+
 @app.route('/run_code', methods=['POST'])
 def run_code_route():
     # IMPORTANT SECURITY WARNING:
@@ -204,45 +339,64 @@ def run_code_route():
 
         # Placeholder for actual secure code execution.
         # For a real application, you MUST use a secure, sandboxed environment.
-        # Example using subprocess (still needs careful handling):
+        # Execution goes through the same warm worker pool as run_solver_code,
+        # after the same pre-flight checks, so broken code never starts a process.
+        checked = preflight(python_code)
+        if not checked["ok"]:
+            details = format_issues(checked["issues"])
+            app.logger.info(f"Code rejected by pre-flight checks:\n{details}")
+            return jsonify({
+                "error": "Code rejected by pre-flight checks.",
+                "error_details": details,
+                "raw_output": details,
+                "preflight_issues": checked["issues"]
+            }), 200 # Like a failed run: the API call itself was fine.
         try:
-            # Using sys.executable to ensure we're using the same Python interpreter
-            # as the Flask app. Timeout is important to prevent long-running scripts.
-            process = subprocess.run(
-                [sys.executable, '-c', python_code],
-                capture_output=True,
-                text=True,
-                timeout=30, # Set a timeout (e.g., 30 seconds)
-                check=False # Do not raise CalledProcessError for non-zero exit codes
-            )
-            
-            if process.returncode == 0:
+            solver_options = _solver_options()
+        except ValueError as e:
+            return jsonify({"error": "Invalid solver options.", "error_details": str(e)}), 400
+        try:
+            # Long solves belong in POST /jobs; this request stays open while the code runs.
+            timeout = _run_time_limit()
+        except ValueError as e:
+            return jsonify({"error": "Invalid time limit.", "error_details": str(e)}), 400
+        try:
+            # The solver's own time limit ends before the timeout, so a long search
+            # returns its best solution rather than being killed.
+            result = execute_code(python_code, timeout=timeout, use_cache=_use_cache(),
+                                  bytecode=checked["bytecode"], solver_options=solver_options)
+            solver = solver_summary(result.get("solve_report"))
+
+            if result["timed_out"]:
+                app.logger.error("Code execution timed out.")
+                return jsonify({
+                    "error": "Execution timed out.",
+                    "error_details": "The submitted code took too long to execute.",
+                    "raw_output": f"Timeout occurred after {timeout:g} seconds."
+                }), 200 # API call itself is fine.
+
+            if result["returncode"] == 0:
                 app.logger.info("Code executed successfully.")
                 return jsonify({
-                    "output": process.stdout,
+                    "output": result["stdout"],
                     "error": None, # Explicitly state no error
                     "error_details": None,
-                    "raw_output": process.stdout # For consistency if needed
+                    "raw_output": result["stdout"], # For consistency if needed
+                    "solver": solver # 'limit_reached' when the output is the best solution found in time
                 })
             else:
-                app.logger.error(f"Code execution failed with return code {process.returncode}")
-                app.logger.error(f"Stderr: {process.stderr}")
+                app.logger.error(f"Code execution failed with return code {result['returncode']}")
+                app.logger.error(f"Stderr: {result['stderr']}")
                 return jsonify({
                     "error": "Code execution failed.", 
-                    "error_details": process.stderr or "Unknown execution error (non-zero return code).",
-                    "raw_output": process.stdout + "\n" + process.stderr # Combine stdout and stderr for context
+                    "error_details": result["stderr"] or "Unknown execution error (non-zero return code).",
+                    "raw_output": result["stdout"] + "\n" + result["stderr"], # Combine stdout and stderr for context
+                    "solver": solver
                 }), 200 # Return 200 because the API call itself was successful, but code execution failed
                        # The client-side JS checks for the 'error' key in the JSON.
 
-        except subprocess.TimeoutExpired:
-            app.logger.error("Code execution timed out.")
-            return jsonify({
-                "error": "Execution timed out.",
-                "error_details": "The submitted code took too long to execute.",
-                "raw_output": "Timeout occurred after 30 seconds."
-            }), 200 # As above, API call itself is fine.
         except Exception as exec_e:
-            app.logger.error(f"Exception during subprocess execution: {exec_e}", exc_info=True)
+            app.logger.error(f"Exception during code execution: {exec_e}", exc_info=True)
             return jsonify({
                 "error": "Failed to execute code due to an internal error.",
                 "error_details": str(exec_e),
@@ -256,11 +410,57 @@ def run_code_route():
         app.logger.error(f"Error in /run_code: {e}", exc_info=True)
         return jsonify({"error": "An unexpected error occurred on the server.", "error_details": str(e)}), 500
 
+@app.route('/repair_code', methods=['POST'])
+def repair_code_route():
+    """
+    Runs python_code and, if it fails, has Gemini patch it and retries within a
+    bounded budget (max_iterations, time_budget). Returns the last run, the code
+    that produced it, and the repair report.
+    """
+    try:
+        api_key = session.get('gemini_api_key')
+        if not api_key:
+            return jsonify({"error": "Please provide your Gemini API key first."}), 400
+
+        python_code = request.form.get('python_code', '')
+        if not python_code.strip():
+            return jsonify({"error": "No Python code provided.", "error_details": "Code string is empty."}), 400
+
+        try:
+            solver_options = _solver_options()
+        except ValueError as e:
+            return jsonify({"error": "Invalid solver options.", "error_details": str(e)}), 400
+
+        try:
+            max_iterations, time_budget = _form_int('max_iterations'), _form_float('time_budget')
+        except ValueError as e:
+            return jsonify({"error": "Invalid repair budget.", "error_details": str(e)}), 400
+
+        result = run_with_repair(
+            python_code,
+            model_plaintext=request.form.get('model_plaintext') or None,
+            api_key=api_key,
+            use_cache=_use_cache(),
+            max_iterations=max_iterations,
+            time_budget=time_budget,
+            solver_options=solver_options,
+        )
+        app.logger.info(f"Repair loop: {result['repair']['iterations']} iterations, "
+                        f"{result['repair']['seconds']:.2f}s, {result['repair']['stopped']}")
+        result.pop('solve_report', None)  # the solved model's numbers, not for the browser
+        return jsonify(result)
+
+    except Exception as e:
+        app.logger.error(f"Error in /repair_code: {e}", exc_info=True)
+        return jsonify({"error": "An unexpected error occurred on the server.", "error_details": str(e)}), 500
+
 @app.route('/validate_results', methods=['POST'])
 def validate_results_route():
     """
-    Endpoint to validate model execution results using Gemini AI.
+    Endpoint to validate model execution results.
     Expects problem_statement, model_plaintext, python_code, and execution_output in the request.
+    The solution is checked numerically against the model the code solves; with
+    reasonableness=true Gemini also judges whether it makes practical sense.
     Returns a validation analysis with assessment, suggestions, and confidence level.
     """
     try:
@@ -279,9 +479,10 @@ def validate_results_route():
             
         app.logger.info("Validating optimization model results...")
         
-        # Check if user has provided API key
+        # Only the reasonableness assessment needs Gemini, and with it an API key
+        reasonableness = _form_flag('reasonableness')
         api_key = session.get('gemini_api_key')
-        if not api_key:
+        if reasonableness and not api_key:
             return jsonify({"error": "Please provide your Gemini API key first."}), 400
             
         # Call the validation function
@@ -290,7 +491,9 @@ def validate_results_route():
             model_plaintext=model_plaintext,
             python_code=python_code,
             execution_output=execution_output,
-            api_key=api_key
+            api_key=api_key,
+            use_cache=_use_cache(),
+            reasonableness=reasonableness
         )
         
         app.logger.info(f"Validation complete. Validity status: {validation_results.get('validity_status', 'Unknown')}")
@@ -304,6 +507,229 @@ def validate_results_route():
             "error_details": str(e)
         }), 500
 
+@app.route('/validate_results_stream', methods=['POST'])
+def validate_results_stream_route():
+    """Same as /validate_results, but streams the local check's sections and then Gemini's analysis as server-sent events."""
+    execution_output = request.form.get('execution_output', '')
+    if not execution_output.strip():
+        return jsonify({
+            "error": "No execution output provided.",
+            "error_details": "Model execution output is required for validation."
+        }), 400
+
+    reasonableness = _form_flag('reasonableness')
+    api_key = session.get('gemini_api_key')
+    if reasonableness and not api_key:
+        return jsonify({"error": "Please provide your Gemini API key first."}), 400
+
+    app.logger.info("Streaming validation of optimization model results...")
+    events = validate_execution_results_stream(
+        problem_statement=request.form.get('problem_statement', ''),
+        model_plaintext=request.form.get('model_plaintext', ''),
+        python_code=request.form.get('python_code', ''),
+        execution_output=execution_output,
+        api_key=api_key,
+        use_cache=_use_cache(),
+        reasonableness=reasonableness
+    )
+    return _sse_response(events, '/validate_results_stream')
+
+@app.route('/pipeline', methods=['POST'])
+def pipeline_route():
+    """
+    Runs optimize → formulate → generate code → run → validate in a single request.
+    Expects problem_statement; optimize=false and validate=false skip those stages,
+    reasonableness=true adds Gemini's practical reasonableness assessment to the validation.
+    Returns every stage's result together with per-stage timings.
+    """
+    try:
+        api_key = session.get('gemini_api_key')
+        if not api_key:
+            return jsonify({"error": "Please provide your Gemini API key first."}), 400
+
+        problem_statement = request.form.get('problem_statement', '')
+        if not problem_statement.strip():
+            return jsonify({"error": "Problem statement cannot be empty."}), 400
+
+        try:
+            solver_options = _solver_options()
+        except ValueError as e:
+            return jsonify({"error": f"Invalid solver options: {e}"}), 400
+        try:
+            candidates = _form_int('candidates')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        app.logger.info(f"Running full pipeline for: {problem_statement[:100]}...")
+        result = run_pipeline(
+            problem_statement,
+            api_key=api_key,
+            use_cache=_use_cache(),
+            optimize=request.form.get('optimize', 'true').lower() != 'false',
+            validate=request.form.get('validate', 'true').lower() != 'false',
+            candidates=candidates,
+            reasonableness=_form_flag('reasonableness'),
+            solver_options=solver_options,
+        )
+        app.logger.info(f"Pipeline finished in {result['total_seconds']:.2f}s, timings: {result['timings']}")
+        for stage, seconds in result["timings"].items():  # the stages ran on other threads
+            metrics.record_timing(stage, seconds)
+        return jsonify(result)
+
+    except Exception as e:
+        app.logger.error(f"Error in /pipeline: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/run_model_file', methods=['POST'])
+def run_model_file_route():
+    """Solves an uploaded MPS or LP file directly, skipping Gemini and code generation."""
+    try:
+        upload = request.files.get('model_file')
+        if upload is None or not upload.filename:
+            return jsonify({"error": "No model file uploaded.", "error_details": "Send the file as 'model_file'."}), 400
+        file_format = request.form.get('format') or detect_format(upload.filename)
+        if file_format not in ('mps', 'lp'):
+            return jsonify({"error": f"Unsupported model format: {file_format}"}), 400
+
+        app.logger.info(f"Solving uploaded {file_format.upper()} model {upload.filename}...")
+        try:
+            solver_options = _solver_options()
+        except ValueError as e:
+            return jsonify({"error": f"Invalid solver options: {e}"}), 400
+        timeout = float(os.environ.get('SOLVER_TIMEOUT', 30))
+        result = run_model_file(upload.stream, file_format, timeout=timeout, use_cache=_use_cache(),
+                                solver_options=solver_options)
+        if result["error"]:
+            return jsonify(dict(result, error="Could not solve the model file.")), 200
+        result["error"] = None
+        return jsonify(result)
+
+    except ModelFileError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error in /run_model_file: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/export_mps', methods=['POST'])
+def export_mps_route():
+    """Returns the model built by the given PuLP code as an MPS file."""
+    try:
+        python_code = request.form.get('python_code', '')
+        if not python_code.strip():
+            return jsonify({"error": "No Python code provided.", "error_details": "Code string is empty."}), 400
+        # The same pre-flight checks as /run_code: rejected code never reaches a solver process
+        checked = preflight(python_code)
+        if not checked["ok"]:
+            return jsonify({
+                "error": "Code rejected by pre-flight checks.",
+                "error_details": format_issues(checked["issues"]),
+                "preflight_issues": checked["issues"]
+            }), 400
+
+        timeout = float(os.environ.get('SOLVER_TIMEOUT', 30))
+        result = export_model_mps(python_code, timeout=timeout, bytecode=checked["bytecode"])
+        if result["error"]:
+            return jsonify({"error": "Could not export the model.", "error_details": result["error_details"]}), 200
+        return Response(
+            result["mps"],
+            mimetype='text/plain',
+            headers={"Content-Disposition": "attachment; filename=model.mps"}
+        )
+
+    except Exception as e:
+        app.logger.error(f"Error in /export_mps: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job_route():
+    """
+    Queues a solve (python_code) or a full pipeline (problem_statement) and returns its id at once.
+    kind defaults to 'solve' when python_code is sent; time_limit (seconds) bounds the solver run
+    and defaults to JOB_TIME_LIMIT. The solver options of /run_code apply as well.
+    Jobs are run by `python app/main.py worker`; poll GET /jobs/<id>.
+    """
+    try:
+        python_code = request.form.get('python_code', '')
+        kind = request.form.get('kind') or ('solve' if python_code.strip() else 'pipeline')
+        try:
+            time_limit = time_limit_for(_form_float('time_limit'))
+            solver_options = _solver_options()
+            candidates = _form_int('candidates')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        api_key = None
+        if kind == 'solve':
+            if not python_code.strip():
+                return jsonify({"error": "No Python code provided."}), 400
+            checked = preflight(python_code)
+            if not checked["ok"]:
+                return jsonify({
+                    "error": "Code rejected by pre-flight checks.",
+                    "error_details": format_issues(checked["issues"]),
+                    "preflight_issues": checked["issues"]
+                }), 400
+            payload = {"python_code": python_code, "use_cache": _use_cache(), "solver_options": solver_options}
+        elif kind == 'pipeline':
+            api_key = session.get('gemini_api_key')
+            if not api_key:
+                return jsonify({"error": "Please provide your Gemini API key first."}), 400
+            problem_statement = request.form.get('problem_statement', '')
+            if not problem_statement.strip():
+                return jsonify({"error": "Problem statement cannot be empty."}), 400
+            payload = {
+                "problem_statement": problem_statement,
+                "use_cache": _use_cache(),
+                "optimize": request.form.get('optimize', 'true').lower() != 'false',
+                "validate": request.form.get('validate', 'true').lower() != 'false',
+                "candidates": candidates,
+                "reasonableness": _form_flag('reasonableness'),
+                "solver_options": solver_options,
+            }
+        else:
+            return jsonify({"error": f"Unknown job kind '{kind}'. Use 'solve' or 'pipeline'."}), 400
+
+        job_id = get_job_queue().submit(kind, payload, time_limit, api_key=api_key)
+        app.logger.info(f"Queued {kind} job {job_id} with a {time_limit:g}s time limit.")
+        return jsonify({"job_id": job_id, "status": "queued", "time_limit": time_limit,
+                        "status_url": f"/jobs/{job_id}"}), 202
+    except Exception as e:
+        app.logger.error(f"Error in /jobs: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    """Returns a job's status (queued, running, done or failed) and, once done, its result."""
+    try:
+        job = get_job_queue().get(job_id)
+        if job is None:
+            return jsonify({"error": f"No job with id '{job_id}'."}), 404
+        return jsonify(job)
+    except Exception as e:
+        app.logger.error(f"Error in /jobs/{job_id}: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/solver_backends', methods=['GET'])
+def solver_backends_route():
+    """Lists the solver backends, which are installed here, and how "auto" picks one."""
+    return jsonify(solver_backends_info())
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats_route():
+    """Returns hit/miss counters of the shared Gemini response cache and how code was generated."""
+    try:
+        stats = get_response_cache().stats()
+        stats["codegen"] = codegen_stats()
+        return jsonify(stats)
+    except Exception as e:
+        app.logger.error(f"Error in /cache_stats: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Latency, token, cache, solver and queue metrics in Prometheus' text format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     # Make sure to create the 'static' and 'templates' directories in 'app/ui/'
     # This check might be redundant if you ensure they exist, but good for robustness.
@@ -313,8 +739,8 @@ if __name__ == '__main__':
     if not os.path.exists(os.path.join(ui_dir, 'templates')):
         os.makedirs(os.path.join(ui_dir, 'templates'))
     
-    # Get port from environment variable (for deployment) or use 5000 for local
+    # Flask's development server; production runs under gunicorn (see gunicorn.conf.py)
     port = int(os.environ.get('PORT', 5000))
-    debug = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
-    
-    app.run(host='0.0.0.0', port=port, debug=debug) 
\ No newline at end of file
+    debug = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
+
+    app.run(host='0.0.0.0', port=port, debug=debug)
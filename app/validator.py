@@ -1,69 +1,78 @@
 # Validates solutions and model reasonableness.
-import google.generativeai as genai
 import logging
-from nlp_processor import GEMINI_API_KEY
+import re
+from llm_provider import get_model
+from response_cache import cached_generate, cached_generate_stream
+from llm_stream import SectionExtractor
+from preflight import preflight
+from solution_check import latest_captured_model, model_arrays, run_rules, verify_solution
+from solver_engine import execute_code
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API (already configured in app.py, but good to have as a fallback)
-try:
-    genai.configure(api_key=GEMINI_API_KEY)
-except Exception as e:
-    logger.error(f"Could not configure Gemini API in validator.py: {e}")
-
-def perform_sanity_checks(model_representation: dict, solution: dict) -> list:
-    """
-    Performs sanity checks on the solution (e.g., constraint satisfaction, edge cases, units).
-    Returns a list of issues found, or an empty list if all checks pass.
-    """
-    # TODO: Implement sanity checks.
-    # - Constraint satisfaction: Check if solution variables satisfy all constraints.
-    # - Edge cases: Test with extreme values if applicable.
-    # - Units: If units are part of the model, check consistency (requires model to include unit info).
-    print(f"Performing sanity checks (not yet implemented)...")
-    issues = []
-    # Example check (conceptual):
-    # if not solution_satisfies_constraints(model_representation, solution):
-    #     issues.append("Solution does not satisfy all constraints.")
-    return issues
-
-def check_model_reasonableness(model_representation: dict, solution: dict, problem_statement: str) -> str:
+def perform_sanity_checks(model_representation: dict, solution: dict = None) -> list:
     """
-    Uses Gemini API (via nlp_processor) to comment on model reasonableness
-    and recommend sensitivity analysis if needed.
+    Performs sanity checks on the solution: bounds, integrality, unused variables,
+    constraints that can never be binding, coefficient ranges and big-M bounds.
+
+    The rules run over the whole model at once on arrays (see solution_check.run_rules),
+    so they take milliseconds even for models with 100k variables.
+
+    Args:
+        model_representation: The solved model as recorded by the solve hooks
+                              (solve_hooks.capture_problem)
+        solution: Optional variable values (name -> value) to check instead of the recorded ones
+
+    Returns:
+        list: Findings, most severe first, each a dict with 'rule', 'severity' ('error',
+              'warning' or 'info'), 'message', 'count' and 'items'. Empty if all checks pass.
     """
-    # This will likely call a function in nlp_processor.py
-    # from . import nlp_processor # Assuming nlp_processor is in the same package
-    # reasonableness_comment = nlp_processor.comment_on_reasonableness({"model": model_representation, "solution": solution, "problem": problem_statement})
-    print(f"Checking model reasonableness (not yet implemented)...")
-    return "Comments on reasonableness to be provided by Gemini API via nlp_processor."
+    return run_rules(model_representation, solution)
 
-def validate_execution_results(problem_statement: str, model_plaintext: str, python_code: str, execution_output: str, api_key: str = None) -> dict:
+def check_model_reasonableness(model_representation: dict, solution: dict = None, problem_statement: str = None,
+                               findings: list = None) -> str:
     """
-    Uses Gemini API to validate the optimization model results.
-    
+    Comments on the modeling side of the sanity checks (everything but outright
+    violations) and recommends a sensitivity analysis where the solution leans on
+    artificial bounds. Practical reasonableness in terms of the problem statement
+    is Gemini's part, see validate_execution_results(reasonableness=True).
+
     Args:
-        problem_statement: The original problem statement
-        model_plaintext: The mathematical model 
-        python_code: The PuLP code used
-        execution_output: The output from running the code
-        api_key: Optional API key to use instead of global configuration
-        
+        model_representation: The solved model as recorded by the solve hooks
+        solution: Optional variable values (name -> value) to check instead of the recorded ones
+        problem_statement: Unused by the rules; accepted for symmetry with the Gemini assessment
+        findings: Results of perform_sanity_checks for the same model, to avoid running the rules again
+
     Returns:
-        dict: A dictionary containing validation results, including:
-            'is_valid': Boolean indicating if results are valid
-            'assessment': Detailed assessment of the results
-            'suggestions': Suggestions for improving the model if needed
-            'confidence': Confidence level in the validation (high, medium, low)
-            'explanation': Overall explanation of the results in user-friendly terms
+        str: One line per concern, or a statement that there are none
     """
-    logger.info("Validating optimization model results with Gemini...")
-    
-    try:
-        # Create a prompt for Gemini to analyze the results
-        prompt = f"""
-You are an expert Operations Research validator. Provide a CONCISE analysis of the following optimization problem and solution.
+    if findings is None:
+        findings = perform_sanity_checks(model_representation, solution)
+    lines = []
+    for finding in findings:
+        if finding["severity"] == "error":
+            continue
+        items = ", ".join(finding["items"])
+        more = finding["count"] - len(finding["items"])
+        if more > 0:
+            items += f" and {more} more"
+        lines.append(f"- {finding['message']} ({items})")
+    if any(finding["rule"] == "variable_at_big_m_bound" for finding in findings):
+        lines.append("- Consider a sensitivity analysis on those bounds: the optimum depends on values chosen for the formulation, not for the problem.")
+    return "\n".join(lines) or "No modeling concerns found."
+
+REASONABLENESS_SECTIONS = [
+    ("reasonableness", "PRACTICAL REASONABLENESS:"),
+    ("suggestions", "SUGGESTIONS:"),
+]
+
+def _reasonableness_request(problem_statement: str, model_plaintext: str, execution_output: str,
+                            verification: str, api_key: str = None):
+    """Builds the Gemini model, prompt and generation config for judging practical reasonableness."""
+    # The arithmetic has already been checked locally; Gemini only judges the result
+    prompt = f"""
+You are an expert Operations Research analyst. The solution below has already been checked numerically; do NOT re-verify constraints or arithmetic. Judge only whether it makes sense in practice.
 
 PROBLEM STATEMENT:
 {problem_statement}
@@ -71,139 +80,297 @@ PROBLEM STATEMENT:
 MATHEMATICAL MODEL:
 {model_plaintext}
 
-PYTHON CODE USED:
-```python
-{python_code}
-```
-
 EXECUTION OUTPUT:
 ```
 {execution_output}
 ```
 
-Your task is to verify the solution's validity in a BRIEF and INSIGHTFUL manner. Limit your analysis to the most important aspects.
+NUMERICAL CHECK:
+{verification}
 
-Provide a short analysis with exactly the following structure, keeping each section to 3-5 sentences maximum:
+Provide a short analysis with exactly the following structure:
 
-1. VALIDITY ASSESSMENT: A single sentence stating if the solution is valid (Yes/No/Partially).
+1. PRACTICAL REASONABLENESS: In 2-3 sentences, evaluate if the solution makes sense in real-world terms and for stakeholders.
 
-2. CONSTRAINT VERIFICATION: Verify key constraints ONLY - check if they are satisfied by the solution values. Include only the most important calculations. Use a compact tabular format where appropriate.
+2. SUGGESTIONS: If there are issues, provide 1-3 specific, actionable suggestions. Otherwise, state "No suggestions needed."
 
-3. PRACTICAL REASONABLENESS: In 2-3 sentences, evaluate if the solution makes sense in real-world terms and for stakeholders.
+Keep your ENTIRE response under 250 words. Use bullet points and short sentences.
+"""
 
-4. SUGGESTIONS: If there are issues, provide 1-3 specific, actionable suggestions. Otherwise, state "No suggestions needed."
+    generation_config = {
+        "temperature": 0.2,
+        "top_p": 0.9,
+        "top_k": 40,
+        "max_output_tokens": 2048,
+    }
 
-5. CONFIDENCE LEVEL: One sentence - high, medium, or low confidence with brief justification.
+    model = get_model(api_key, "gemini-2.5-flash-preview-04-17", generation_config)
+    return model, prompt, generation_config
 
-Keep your ENTIRE response under 500 words. Prioritize clarity and precision over length. Focus on the most critical insights only. Use bullet points and short sentences.
-"""
+def _solve_report_for(python_code: str, use_cache: bool):
+    """Runs the code (normally answered by the solve cache) to get the models it solved."""
+    checked = preflight(python_code or "")
+    if not checked["ok"]:
+        return None
+    result = execute_code(python_code, use_cache=use_cache, bytecode=checked["bytecode"])
+    return result.get("solve_report")
+
+def _format_number(value) -> str:
+    return f"{value:.6g}"
+
+def _describe_check(status: str, check: dict) -> str:
+    """The constraint verification text: a summary line per check, bullets for what failed."""
+    lines = []
+    if check["violated_constraints"]:
+        lines.append(f"{check['violated_constraints']} of {check['constraints']} constraints are violated "
+                     f"(largest violation {_format_number(check['max_violation'])}):")
+        for v in check["violations"]:
+            lines.append(f"- **{v['name']}**: {_format_number(v['activity'])} {v['sense']} "
+                         f"{_format_number(v['rhs'])} is off by {_format_number(v['violation'])}")
+    else:
+        binding = ", ".join(check["binding"])
+        more = check["binding_constraints"] - len(check["binding"])
+        if more > 0:
+            binding += f" and {more} more"
+        lines.append(f"All {check['constraints']} constraints hold within tolerance {check['tolerance']:g}"
+                     + (f"; binding ({check['binding_constraints']}): {binding}." if binding else "."))
+    if check["bound_violations"]:
+        lines.append("Variables outside their bounds:")
+        lines.extend(f"- **{v['name']}** = {_format_number(v['value'])}" for v in check["bound_violations"])
+    else:
+        lines.append(f"All {check['variables']} variables are within their bounds.")
+    if check["integrality_violations"]:
+        lines.append("Integer variables with fractional values:")
+        lines.extend(f"- **{v['name']}** = {_format_number(v['value'])}" for v in check["integrality_violations"])
+    if check["unset_values"]:
+        lines.append(f"{check['unset_values']} variables have no value in the solution (counted as 0).")
+    objective = check["objective"]
+    if objective["reported"] is None:
+        lines.append(f"Objective value recomputed from the solution: {_format_number(objective['computed'])} "
+                     "(the output does not print one to compare).")
+    elif objective["consistent"]:
+        lines.append(f"The printed objective {_format_number(objective['reported'])} matches the value "
+                     "recomputed from the solution.")
+    else:
+        lines.append(f"The printed objective {_format_number(objective['reported'])} does not match the value "
+                     f"recomputed from the solution, {_format_number(objective['computed'])}.")
+    lines.append(f"Solver status: {status}.")
+    return "\n".join(lines)
+
+def check_solution_locally(python_code: str, execution_output: str, solve_report: dict = None,
+                           use_cache: bool = True) -> dict:
+    """
+    Verifies a solution numerically against the model the code solved, without Gemini.
 
-        # Configure API key if provided
-        if api_key:
-            genai.configure(api_key=api_key)
-            
-        # Call Gemini API
-        generation_config = {
-            "temperature": 0.2,
-            "top_p": 0.9,
-            "top_k": 40,
-            "max_output_tokens": 8192,
+    Args:
+        python_code: The PuLP code that produced the output
+        execution_output: The output from running the code
+        solve_report: The run's solve report, if at hand. Otherwise the code is run
+                      again, which the solve cache normally answers without solving.
+        use_cache: Set to False to bypass the solve cache when the code has to be run
+
+    Returns:
+        dict: 'validity_status' ('Valid', 'Partially Valid', 'Invalid' or 'Unknown'),
+              'constraint_verification' (text), 'confidence', 'suggestions',
+              'numerical_check' (the verify_solution result, or None if no model was recorded),
+              'sanity_checks' (perform_sanity_checks findings) and 'model_checks' (their text)
+    """
+    if solve_report is None:
+        solve_report = _solve_report_for(python_code, use_cache)
+    entry = latest_captured_model(solve_report)
+    if entry is None:
+        return {
+            "validity_status": "Unknown",
+            "constraint_verification": "The solved model could not be recorded, so the solution was not checked numerically.",
+            "confidence": "Low",
+            "suggestions": "Make sure the code builds a PuLP model and calls solve() on it.",
+            "numerical_check": None,
+            "sanity_checks": [],
+            "model_checks": "Not available.",
         }
-        
-        model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash-preview-04-17",
-            generation_config=generation_config
-        )
-        
-        logger.info("Sending validation request to Gemini API...")
-        response = model.generate_content(prompt)
-        
-        if hasattr(response, 'text') and response.text:
-            analysis_text = response.text
-            logger.info("Received validation analysis from Gemini.")
-            
-            # Parse the AI response into structured components
-            # This is a simplified parsing approach - in production you might want
-            # to use a more robust approach or structured output format from the API
-            sections = {
-                "validity": "Valid",
-                "constraints": "",
-                "reasonableness": "",
-                "suggestions": "",
-                "confidence": "Medium"  # Default if not found
-            }
-            
-            # Extract sections from text
-            if "VALIDITY ASSESSMENT" in analysis_text:
-                validity_section = analysis_text.split("VALIDITY ASSESSMENT:")[1].split("\n\n")[0].strip()
-                if "yes" in validity_section.lower():
-                    sections["validity"] = "Valid"
-                elif "no" in validity_section.lower():
-                    sections["validity"] = "Invalid"
-                elif "partial" in validity_section.lower():
-                    sections["validity"] = "Partially Valid"
-            
-            # Extract constraint verification    
-            if "CONSTRAINT VERIFICATION" in analysis_text and "PRACTICAL REASONABLENESS" in analysis_text:
-                try:
-                    sections["constraints"] = analysis_text.split("CONSTRAINT VERIFICATION:")[1].split("PRACTICAL REASONABLENESS:")[0].strip()
-                except:
-                    sections["constraints"] = "Constraint verification not available."
-                
-            # Extract practical reasonableness
-            if "PRACTICAL REASONABLENESS" in analysis_text and "SUGGESTIONS" in analysis_text:
-                try:
-                    sections["reasonableness"] = analysis_text.split("PRACTICAL REASONABLENESS:")[1].split("SUGGESTIONS:")[0].strip()
-                except:
-                    sections["reasonableness"] = "Practical reasonableness assessment not available."
-                    
-            if "SUGGESTIONS" in analysis_text:
-                try:
-                    sections["suggestions"] = analysis_text.split("SUGGESTIONS:")[1].split("CONFIDENCE LEVEL")[0].strip()
-                    if "no suggestions needed" in sections["suggestions"].lower():
-                        sections["suggestions"] = "No suggestions needed."
-                except:
-                    sections["suggestions"] = "No specific suggestions provided."
-                    
-            if "CONFIDENCE LEVEL" in analysis_text:
-                confidence_section = analysis_text.split("CONFIDENCE LEVEL:")[1].strip().split("\n\n")[0].lower()
-                if "high" in confidence_section:
-                    sections["confidence"] = "High"
-                elif "medium" in confidence_section:
-                    sections["confidence"] = "Medium"
-                elif "low" in confidence_section:
-                    sections["confidence"] = "Low"
-            
-            # Create the result dictionary
-            result = {
-                "is_valid": sections["validity"] == "Valid",
-                "validity_status": sections["validity"],
-                "constraint_verification": sections["constraints"],
-                "practical_reasonableness": sections["reasonableness"],
-                "suggestions": sections["suggestions"],
-                "confidence": sections["confidence"],
-                "full_analysis": analysis_text  # Include the full text as well
-            }
-            
-            return result
-        else:
-            logger.warning("Gemini response for validation does not contain text or is empty.")
-            return {
-                "is_valid": False,
-                "validity_status": "Unknown",
-                "assessment": "The AI validator could not analyze the results. This may be due to issues with the execution output format or content filtering.",
-                "suggestions": "Try simplifying your model or providing more structured output.",
-                "confidence": "Low",
-                "full_analysis": "No analysis generated."
-            }
-            
+
+    status = entry.get("status", "Unknown")
+    arrays = model_arrays(entry["model"])  # shared by the numerical check and the rules
+    check = verify_solution(entry["model"], execution_output, arrays=arrays)
+    findings = run_rules(entry["model"], arrays=arrays)
+    suggestions = []
+    if status in ("Infeasible", "Unbounded"):
+        validity, confidence = "Invalid", "High"
+        suggestions.append(f"The model is {status.lower()}; review its constraints and bounds.")
+    elif not check["feasible"]:
+        validity, confidence = "Invalid", "High"
+        suggestions.append("The reported solution violates the model; re-run the solver or check the variable values the code prints.")
+    elif check["objective"]["consistent"] is False:
+        validity, confidence = "Partially Valid", "High"
+        suggestions.append("The solution is feasible, but the printed objective value is wrong; check how the code prints it.")
+    else:
+        validity = "Valid"
+        confidence = "High" if status == "Optimal" and not check["unset_values"] else "Medium"
+        if status != "Optimal":
+            suggestions.append(f"The solution is feasible but the solver reported '{status}', so it may not be optimal.")
+    return {
+        "validity_status": validity,
+        "constraint_verification": _describe_check(status, check),
+        "confidence": confidence,
+        "suggestions": "\n".join(f"- {s}" for s in suggestions) or "No suggestions needed.",
+        "numerical_check": check,
+        "sanity_checks": findings,
+        "model_checks": check_model_reasonableness(entry["model"], findings=findings),
+    }
+
+def _verification_summary(local: dict) -> str:
+    return f"Validity: {local['validity_status']}\n{local['constraint_verification']}"
+
+def _parse_reasonableness(analysis_text: str) -> tuple:
+    """Splits Gemini's reasonableness analysis into (reasonableness, suggestions)."""
+    extractor = SectionExtractor(REASONABLENESS_SECTIONS)
+    sections = dict(extractor.feed(analysis_text or "") + extractor.finish())
+    reasonableness = re.sub(r"\s*\d+\.$", "", sections.get("reasonableness", "")).strip()
+    return (reasonableness or (analysis_text or "").strip() or "Practical reasonableness assessment not available.",
+            sections.get("suggestions", ""))
+
+def _assemble(local: dict, analysis_text: str = None, llm_error: str = None) -> dict:
+    """Combines the local check and, if requested, Gemini's reasonableness analysis into the result dict."""
+    suggestions = local["suggestions"]
+    if analysis_text is not None:
+        reasonableness, llm_suggestions = _parse_reasonableness(analysis_text)
+        if llm_suggestions and "no suggestions needed" not in llm_suggestions.lower():
+            suggestions = llm_suggestions if suggestions == "No suggestions needed." else f"{suggestions}\n{llm_suggestions}"
+    elif llm_error:
+        reasonableness = f"Practical reasonableness assessment not available: {llm_error}"
+    else:
+        reasonableness = "Not requested."
+
+    full_analysis = "\n\n".join([
+        f"VALIDITY ASSESSMENT: {local['validity_status']}",
+        f"CONSTRAINT VERIFICATION:\n{local['constraint_verification']}",
+        f"MODEL CHECKS:\n{local['model_checks']}",
+        f"PRACTICAL REASONABLENESS:\n{reasonableness}",
+        f"SUGGESTIONS:\n{suggestions}",
+        f"CONFIDENCE LEVEL: {local['confidence']}",
+    ])
+    return {
+        "is_valid": local["validity_status"] == "Valid",
+        "validity_status": local["validity_status"],
+        "constraint_verification": local["constraint_verification"],
+        "practical_reasonableness": reasonableness,
+        "suggestions": suggestions,
+        "confidence": local["confidence"],
+        "full_analysis": full_analysis,
+        "numerical_check": local["numerical_check"],
+        "sanity_checks": local["sanity_checks"],
+        "model_checks": local["model_checks"],
+    }
+
+def _error_result(e: Exception) -> dict:
+    return {
+        "is_valid": False,
+        "validity_status": "Error",
+        "assessment": f"An error occurred during validation: {str(e)}",
+        "suggestions": "Please check server logs for more details.",
+        "confidence": "None",
+        "full_analysis": f"Error: {str(e)}"
+    }
+
+def validate_execution_results(problem_statement: str, model_plaintext: str, python_code: str, execution_output: str,
+                               api_key: str = None, use_cache: bool = True, reasonableness: bool = False,
+                               solve_report: dict = None) -> dict:
+    """
+    Validates the optimization model results.
+
+    Constraints, bounds, integrality and the printed objective are checked numerically
+    against the model the code solved (see check_solution_locally). Gemini is only asked
+    about the practical reasonableness of the solution, and only when `reasonableness` is set.
+
+    Args:
+        problem_statement: The original problem statement
+        model_plaintext: The mathematical model
+        python_code: The PuLP code used
+        execution_output: The output from running the code
+        api_key: Optional API key to use instead of global configuration
+        use_cache: Set to False to bypass the Gemini response and solve caches for this call
+        reasonableness: Whether to ask Gemini about the practical reasonableness of the solution
+        solve_report: The run's solve report, if at hand (saves running the code again)
+
+    Returns:
+        dict: A dictionary containing validation results, including:
+            'is_valid': Boolean indicating if results are valid
+            'validity_status': 'Valid', 'Partially Valid', 'Invalid' or 'Unknown'
+            'constraint_verification': What the numerical check found
+            'practical_reasonableness': Gemini's assessment, or 'Not requested.'
+            'suggestions': Suggestions for improving the model if needed
+            'confidence': Confidence level in the validation (High, Medium, Low)
+            'full_analysis': All of the above as one text
+            'numerical_check': The raw numbers of the check (see solution_check.verify_solution)
+            'sanity_checks': Findings of perform_sanity_checks ('rule', 'severity', 'message', 'count', 'items')
+            'model_checks': check_model_reasonableness's comments on those findings
+    """
+    logger.info("Validating optimization model results...")
+
+    try:
+        local = check_solution_locally(python_code, execution_output, solve_report, use_cache=use_cache)
     except Exception as e:
         logger.error(f"Exception during validation: {e}", exc_info=True)
-        return {
-            "is_valid": False,
-            "validity_status": "Error",
-            "assessment": f"An error occurred during validation: {str(e)}",
-            "suggestions": "Please check server logs for more details.",
-            "confidence": "None",
-            "full_analysis": f"Error: {str(e)}"
-        } 
\ No newline at end of file
+        return _error_result(e)
+    if not reasonableness:
+        return _assemble(local)
+
+    try:
+        model, prompt, generation_config = _reasonableness_request(
+            problem_statement, model_plaintext, execution_output, _verification_summary(local), api_key
+        )
+        logger.info("Asking Gemini about the practical reasonableness of the solution...")
+        analysis_text = cached_generate(
+            model, prompt, "gemini-2.5-flash-preview-04-17", generation_config, use_cache=use_cache
+        )
+        return _assemble(local, analysis_text)
+    except Exception as e:
+        logger.error(f"Exception during reasonableness assessment: {e}", exc_info=True)
+        return _assemble(local, llm_error=str(e))
+
+def validate_execution_results_stream(problem_statement: str, model_plaintext: str, python_code: str,
+                                      execution_output: str, api_key: str = None, use_cache: bool = True,
+                                      reasonableness: bool = False, solve_report: dict = None):
+    """
+    Streaming variant of `validate_execution_results`.
+
+    Yields (event, payload) pairs: ("section", {"name": ..., "text": ...}) for the
+    validity, constraints, model_checks and confidence sections of the local check right away,
+    then, if `reasonableness` is set, ("chunk", text) as Gemini's analysis arrives
+    and ("section", ...) for its reasonableness and suggestions sections, and finally
+    ("done", result) where result is the dict `validate_execution_results` returns.
+    """
+    logger.info("Validating optimization model results (streamed)...")
+    try:
+        local = check_solution_locally(python_code, execution_output, solve_report, use_cache=use_cache)
+    except Exception as e:
+        logger.error(f"Exception during streamed validation: {e}", exc_info=True)
+        yield "done", _error_result(e)
+        return
+    yield "section", {"name": "validity", "text": local["validity_status"]}
+    yield "section", {"name": "constraints", "text": local["constraint_verification"]}
+    yield "section", {"name": "model_checks", "text": local["model_checks"]}
+    yield "section", {"name": "confidence", "text": local["confidence"]}
+    if not reasonableness:
+        yield "done", _assemble(local)
+        return
+
+    parts = []
+    try:
+        model, prompt, generation_config = _reasonableness_request(
+            problem_statement, model_plaintext, execution_output, _verification_summary(local), api_key
+        )
+        extractor = SectionExtractor(REASONABLENESS_SECTIONS)
+        for chunk in cached_generate_stream(model, prompt, "gemini-2.5-flash-preview-04-17",
+                                            generation_config, use_cache=use_cache):
+            parts.append(chunk)
+            yield "chunk", chunk
+            for name, text in extractor.feed(chunk):
+                yield "section", {"name": name, "text": text}
+        for name, text in extractor.finish():
+            yield "section", {"name": name, "text": text}
+        result = _assemble(local, "".join(parts))
+    except Exception as e:
+        logger.error(f"Exception during streamed reasonableness assessment: {e}", exc_info=True)
+        result = _assemble(local, llm_error=str(e))
+    yield "done", result
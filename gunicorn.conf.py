@@ -0,0 +1,58 @@
+# Gunicorn settings for serving the web app in production.
+#
+#   gunicorn            (run from the repository root; this file is picked up automatically)
+#
+# The app is imported once in the master and forked into the workers
+# (preload_app), so workers start in milliseconds and share the imported code.
+# Nothing that must not cross a fork is created at import time: Gemini clients,
+# the solver pool and SQLite connections are all made on first use, in the
+# worker. Each worker serves requests from a few threads, since most of a
+# request's time is spent waiting for Gemini or for a solver process.
+#
+# Every setting can be overridden from the environment (see env.example).
+
+import os
+import sys
+import tempfile
+
+_cpus = os.cpu_count() or 1
+
+wsgi_app = "app.ui.app:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+preload_app = True
+
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", 2 * _cpus + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# Each worker process keeps its own warm solver pool: share the CPUs between them
+# unless the pool size is set explicitly.
+os.environ.setdefault("SOLVER_POOL_SIZE", str(max(1, _cpus // workers)))
+
+# Workers add their metrics up through files in one directory, so GET /metrics
+# reports the whole server whichever worker answers it (see app/metrics.py).
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="auto-modeler-metrics-"))
+
+# Generating code, repairing it and solving can take minutes: the request timeout
+# leaves room for a full solver timeout on top of the Gemini calls.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", int(float(os.getenv("SOLVER_TIMEOUT", 300))) + 300))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 120))
+keepalive = 5
+
+# Workers are replaced after a number of requests (staggered by the jitter) to
+# bound memory growth; a replaced worker finishes its requests first.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+accesslog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def worker_exit(server, worker):
+    """Stops the worker's solver processes along with it, and writes out its last metrics."""
+    solver_pool = sys.modules.get("solver_pool")
+    if solver_pool is not None:
+        solver_pool.shutdown_solver_pool()
+    metrics = sys.modules.get("metrics")
+    if metrics is not None:
+        metrics.flush()
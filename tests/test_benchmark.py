@@ -0,0 +1,135 @@
+"""Tests for recorded Gemini responses and the pipeline benchmark."""
+
+import copy
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import llm_recordings
+from benchmark import DEFAULT_CORPUS, benchmark_problem, compare_results, format_comparison, read_corpus
+from llm_provider import get_model
+from llm_recordings import RecordingMissing, ReplayModel, get_recordings
+from response_cache import cached_generate, cached_generate_stream, make_cache_key
+
+
+class _LiveModel:
+    """Stands in for Gemini in record mode: answers every prompt with its length."""
+
+    def generate_content(self, prompt, stream=False):
+        class Response:
+            def __init__(self, text):
+                self.text = text
+                self.parts = []
+
+        if stream:
+            return iter([Response("chunk "), Response(str(len(prompt)))])
+        return Response(str(len(prompt)))
+
+
+class TestRecordings(unittest.TestCase):
+    """Replay answers by prompt key, falls back to recorded order, and record mode writes replayable files."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "recordings.jsonl")
+        llm_recordings.reset()
+        self.addCleanup(llm_recordings.reset)
+        environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false", "LLM_RECORDINGS": self.path,
+                                              "LLM_PROVIDER": "replay", "LLM_RECORDINGS_STRICT": ""})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def write(self, *exchanges):
+        with open(self.path, "w", encoding="utf-8") as f:
+            for prompt, model_name, text in exchanges:
+                f.write(json.dumps({"key": make_cache_key(prompt, model_name), "model": model_name, "text": text}) + "\n")
+
+    def test_replay_by_key_and_stale_fallback(self):
+        self.write(("first prompt", "m", "first answer"), ("second prompt", "m", "second answer"))
+        model = get_model("any key", "m")
+        self.assertIsInstance(model.model, ReplayModel)
+        self.assertEqual(cached_generate(model, "second prompt", "m"), "second answer")
+        self.assertEqual(cached_generate(model, "edited first prompt", "m"), "first answer")
+        self.assertEqual(get_recordings(self.path).stats()["misses"], 1)
+        with self.assertRaises(RecordingMissing):
+            cached_generate(model, "yet another prompt", "m")
+
+    def test_strict_replay_raises_on_a_changed_prompt(self):
+        self.write(("first prompt", "m", "first answer"))
+        with patch.dict(os.environ, {"LLM_RECORDINGS_STRICT": "true"}):
+            with self.assertRaises(RecordingMissing):
+                cached_generate(get_model("any key", "m"), "edited first prompt", "m")
+
+    def test_record_then_replay(self):
+        config = {"temperature": 0.2}
+        with patch.dict(os.environ, {"LLM_PROVIDER": "record"}), \
+                patch("gemini_clients.get_model", return_value=_LiveModel()):
+            self.assertEqual(cached_generate(get_model("key", "m", config), "hello", "m", config), "5")
+            streamed = "".join(cached_generate_stream(get_model("key", "m", config), "hello world", "m", config))
+        self.assertEqual(streamed, "chunk 11")
+        llm_recordings.reset()
+        self.assertEqual(cached_generate(get_model("key", "m", config), "hello world", "m", config), "chunk 11")
+        self.assertEqual(list(cached_generate_stream(get_model("key", "m", config), "hello", "m", config)), ["5"])
+        self.assertEqual(get_recordings(self.path).stats()["misses"], 0)
+
+
+def _results(**stages):
+    return {"runs": 1, "problems": {"p": {"ok": True, "stages": stages}}}
+
+
+class TestCompare(unittest.TestCase):
+    """Comparisons flag changes beyond the threshold and the noise floor."""
+
+    def test_regressions_and_improvements(self):
+        baseline = _results(parse={"wall_seconds": 0.100, "cpu_seconds": 0.001},
+                            run={"wall_seconds": 0.050, "child_peak_rss_kb": 30000})
+        current = _results(parse={"wall_seconds": 0.150, "cpu_seconds": 0.008},
+                           run={"wall_seconds": 0.030, "child_peak_rss_kb": 31000})
+        comparison = compare_results(baseline, current, threshold=0.10)
+        self.assertEqual([(entry["stage"], entry["metric"], entry["change"]) for entry in comparison["regressions"]],
+                         [("parse", "wall_seconds", 0.5)])  # +7ms of CPU and +1MB of RSS are noise
+        self.assertEqual([(entry["stage"], entry["metric"]) for entry in comparison["improvements"]],
+                         [("run", "wall_seconds")])
+        self.assertIn("REGRESSION p/parse wall_seconds: 100.0ms -> 150.0ms (+50%)", format_comparison(comparison))
+
+    def test_failures_and_missing_problems(self):
+        baseline = _results(total={"wall_seconds": 1.0})
+        baseline["problems"]["q"] = copy.deepcopy(baseline["problems"]["p"])
+        current = _results(total={"wall_seconds": 1.0})
+        current["problems"]["p"]["ok"] = False
+        comparison = compare_results(baseline, current)
+        self.assertEqual((comparison["failures"], comparison["missing"], comparison["regressions"]), (["p"], ["q"], []))
+
+
+class TestBenchmark(unittest.TestCase):
+    """The corpus runs offline from its recordings and reaches the expected objectives."""
+
+    def test_corpus(self):
+        problems = read_corpus(DEFAULT_CORPUS)
+        self.assertEqual([problem["id"] for problem in problems],
+                         ["product_mix", "transport", "assignment", "knapsack", "scheduling"])
+        self.assertEqual([problem["id"] for problem in read_corpus(DEFAULT_CORPUS, ["knapsack"])], ["knapsack"])
+        with self.assertRaises(ValueError):
+            read_corpus(DEFAULT_CORPUS, ["unknown"])
+
+    def test_problem_with_gemini_generated_code(self):
+        result = benchmark_problem(read_corpus(DEFAULT_CORPUS, ["scheduling"])[0], runs=1, timeout=30)
+        self.assertTrue(result["ok"], result)
+        self.assertEqual((result["objective"], result["generator"], result["replay_misses"]), (23.0, "gemini", 0))
+        self.assertEqual(list(result["stages"]),
+                         ["optimize", "parse", "formulate", "render", "generate_code", "run", "validate", "total"])
+        run = result["stages"]["run"]
+        self.assertGreater(run["wall_seconds"], 0)
+        self.assertGreater(run["child_peak_rss_kb"], 0)
+        self.assertIn("peak_rss_kb", result["stages"]["parse"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Tests for the per-API-key Gemini client registry."""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import gemini_clients
+from gemini_clients import forget, get_model, key_fingerprint, stats, validate_key
+
+KEY_A = "AIzaSy-test-key-a"
+KEY_B = "AIzaSy-test-key-b"
+
+
+class TestGeminiClients(unittest.TestCase):
+    """Models are reused per (key, model, config) and never share a key."""
+
+    def setUp(self):
+        gemini_clients.clear()
+        self.addCleanup(gemini_clients.clear)
+
+    def test_same_key_model_and_config_is_reused(self):
+        first = get_model(KEY_A, "m", {"temperature": 0.2, "top_k": 40})
+        self.assertIs(get_model(KEY_A, "m", {"top_k": 40, "temperature": 0.2}), first)
+        self.assertIsNot(get_model(KEY_A, "m", {"temperature": 0.5}), first)
+        self.assertEqual(stats(), {"clients": 1, "models": 2})
+
+    def test_models_of_one_key_share_its_client(self):
+        self.assertIs(get_model(KEY_A, "m1")._client, get_model(KEY_A, "m2")._client)
+
+    def test_keys_get_separate_clients(self):
+        client_a, client_b = get_model(KEY_A, "m")._client, get_model(KEY_B, "m")._client
+        self.assertIsNot(client_a, client_b)
+        self.assertEqual((client_a._client_options.api_key, client_b._client_options.api_key), (KEY_A, KEY_B))
+        self.assertEqual(stats()["clients"], 2)
+
+    def test_never_configures_globally(self):
+        with patch("google.generativeai.configure") as configure:
+            get_model(KEY_A, "m")
+            get_model(KEY_B, "m")
+        configure.assert_not_called()
+
+    def test_idle_entries_are_evicted(self):
+        with patch.dict(os.environ, {"GEMINI_CLIENT_IDLE_SECONDS": "60"}), \
+                patch.object(gemini_clients.time, "monotonic", side_effect=[0.0, 30.0, 100.0]):
+            first = get_model(KEY_A, "m")
+            get_model(KEY_B, "m")
+            self.assertEqual(stats(), {"clients": 2, "models": 2})
+            get_model(KEY_B, "m")  # at t=100 only key A has been idle for longer than 60 s
+        self.assertEqual(stats(), {"clients": 1, "models": 1})
+        self.assertIsNot(get_model(KEY_A, "m"), first)
+
+    def test_forget_drops_only_that_key(self):
+        get_model(KEY_A, "m1")
+        get_model(KEY_A, "m2")
+        get_model(KEY_B, "m1")
+        forget(KEY_A)
+        self.assertEqual(stats(), {"clients": 1, "models": 1})
+
+    def test_falls_back_to_server_key(self):
+        with patch.dict(os.environ, {"GEMINI_API_KEY": KEY_A}):
+            self.assertIs(get_model(None, "m"), get_model(KEY_A, "m"))
+
+    def test_concurrent_callers_get_one_model_per_key(self):
+        results = {KEY_A: set(), KEY_B: set()}
+
+        def fetch(key):
+            for _ in range(20):
+                results[key].add(id(get_model(key, "m")))
+
+        threads = [threading.Thread(target=fetch, args=(key,)) for key in (KEY_A, KEY_B) * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([len(ids) for ids in results.values()], [1, 1])
+        self.assertNotEqual(results[KEY_A], results[KEY_B])
+
+    def test_fingerprint_does_not_contain_the_key(self):
+        self.assertNotIn(KEY_A, key_fingerprint(KEY_A))
+        self.assertEqual(key_fingerprint(None), "")
+
+
+class TestValidateKey(unittest.TestCase):
+    """Keys are checked with a metadata call and known-good keys are remembered."""
+
+    def setUp(self):
+        gemini_clients.clear()
+        self.addCleanup(gemini_clients.clear)
+        service = patch("google.ai.generativelanguage.ModelServiceClient")
+        self.service = service.start()
+        self.addCleanup(service.stop)
+
+    def test_known_good_key_needs_no_call(self):
+        self.assertEqual(validate_key(KEY_A, "m"), {"valid": True, "cached": False, "error": None})
+        self.assertEqual(validate_key(KEY_A, "m"), {"valid": True, "cached": True, "error": None})
+        self.service.assert_called_once_with(client_options={"api_key": KEY_A})
+        self.assertEqual(self.service.return_value.get_model.call_args.kwargs["name"], "models/m")
+        self.service.return_value.generate_content.assert_not_called()
+
+    def test_bypassing_the_cache_checks_again(self):
+        validate_key(KEY_A, "m")
+        self.assertFalse(validate_key(KEY_A, "m", use_cache=False)["cached"])
+        self.assertEqual(self.service.call_count, 2)
+
+    def test_rejected_key_is_not_remembered(self):
+        self.service.return_value.get_model.side_effect = ValueError("API key not valid")
+        get_model(KEY_A, "m")
+        self.assertEqual(validate_key(KEY_A, "m"), {"valid": False, "cached": False, "error": "API key not valid"})
+        self.assertEqual(stats(), {"clients": 0, "models": 0})
+        self.assertFalse(validate_key(KEY_A, "m")["valid"])
+        self.assertEqual(self.service.call_count, 2)
+
+    def test_validation_expires(self):
+        with patch.dict(os.environ, {"GEMINI_KEY_VALIDATION_TTL": "60"}), \
+                patch.object(gemini_clients.time, "monotonic", side_effect=[0.0, 0.0, 30.0, 100.0, 100.0]):
+            validate_key(KEY_A, "m")
+            self.assertTrue(validate_key(KEY_A, "m")["cached"])
+            self.assertFalse(validate_key(KEY_A, "m")["cached"])
+
+    def test_only_salted_hashes_are_kept(self):
+        validate_key(KEY_A, "m")
+        stored = list(gemini_clients._validated)
+        self.assertEqual(len(stored), 1)
+        self.assertNotIn(stored[0], (KEY_A, key_fingerprint(KEY_A)))
+
+
+if __name__ == '__main__':
+    unittest.main()
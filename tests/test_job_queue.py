@@ -0,0 +1,145 @@
+"""Tests for the persistent job queue, the job runner and the /jobs endpoints."""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import job_queue
+from job_queue import JobQueue, time_limit_for
+
+CODE = """import pulp
+model = pulp.LpProblem("m", pulp.LpMaximize)
+x = pulp.LpVariable("x", 0, 4)
+model += 3 * x
+model += x <= 3, "cap"
+status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+print(f"Status: {pulp.LpStatus[status]}")
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+
+
+class TestJobQueue(unittest.TestCase):
+    """Jobs are claimed oldest first, survive in the file and are retried when a worker dies."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "jobs.sqlite3")
+        self.queue = JobQueue(self.path, max_attempts=2, stale_seconds=60)
+
+    def test_submit_claim_complete(self):
+        first = self.queue.submit("solve", {"python_code": "a"}, 30)
+        second = self.queue.submit("solve", {"python_code": "b"}, 30)
+        self.assertEqual((self.queue.get(first)["position"], self.queue.get(second)["position"]), (1, 2))
+
+        job = self.queue.claim("w1")
+        self.assertEqual((job["id"], job["payload"], job["time_limit"], job["attempts"]),
+                         (first, {"python_code": "a"}, 30.0, 1))
+        self.assertEqual(self.queue.get(first)["status"], "running")
+        self.queue.complete(first, {"objective": 9}, "w1")
+
+        # a new queue object on the same file sees the same jobs (e.g. after a restart)
+        reopened = JobQueue(self.path)
+        done = reopened.get(first)
+        self.assertEqual((done["status"], done["result"]), ("done", {"objective": 9}))
+        self.assertEqual(reopened.stats(), {"queued": 1, "running": 0, "done": 1, "failed": 0})
+        self.assertIsNone(reopened.get("missing"))
+
+    def test_api_key_is_erased_when_the_job_ends(self):
+        job_id = self.queue.submit("pipeline", {"problem_statement": "p"}, 30, api_key="AIzaSy-secret")
+        self.assertEqual(self.queue.claim("w")["api_key"], "AIzaSy-secret")
+        self.queue.fail(job_id, "boom", "w")
+        self.assertEqual(self.queue.get(job_id)["error"], "boom")
+        conn = self.queue._connect()
+        self.assertEqual(conn.execute("SELECT api_key FROM jobs").fetchone(), (None,))
+        conn.close()
+
+    def test_stale_jobs_are_retried_then_failed(self):
+        job_id = self.queue.submit("solve", {"python_code": "a"}, 30)
+        with patch.object(job_queue.time, "time", return_value=1000.0):
+            self.queue.claim("dead-worker")
+        with patch.object(job_queue.time, "time", return_value=1100.0):
+            retry = self.queue.claim("w2")
+        self.assertEqual((retry["id"], retry["attempts"]), (job_id, 2))
+        # the first worker can no longer overwrite the job
+        self.queue.complete(job_id, {"late": True}, "dead-worker")
+        self.assertEqual(self.queue.get(job_id)["status"], "running")
+        with patch.object(job_queue.time, "time", return_value=1200.0):
+            self.assertIsNone(self.queue.claim("w3"))
+        failed = self.queue.get(job_id)
+        self.assertEqual(failed["status"], "failed")
+        self.assertIn("stopped responding", failed["error"])
+
+    def test_work_runs_jobs_until_stopped(self):
+        ids = [self.queue.submit("solve", {"n": n}, 30) for n in range(3)]
+        stop = threading.Event()
+
+        def handler(job):
+            if job["payload"]["n"] == 1:
+                raise RuntimeError("bad job")
+            if job["payload"]["n"] == 2:
+                stop.set()
+            return {"n": job["payload"]["n"]}
+
+        self.queue.work(handler, stop, worker="w", poll_interval=0.01)
+        self.assertEqual([self.queue.get(job_id)["status"] for job_id in ids], ["done", "failed", "done"])
+        self.assertEqual(self.queue.get(ids[1])["error"], "bad job")
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.queue.submit("train", {}, 30)
+
+    def test_time_limits(self):
+        with patch.dict(os.environ, {"JOB_TIME_LIMIT": "120", "JOB_MAX_TIME_LIMIT": "600"}):
+            self.assertEqual(time_limit_for(), 120.0)
+            self.assertEqual(time_limit_for(450), 450.0)
+            for bad in (0, -5, 601):
+                with self.assertRaises(ValueError):
+                    time_limit_for(bad)
+
+
+class TestJobEndpoints(unittest.TestCase):
+    """POST /jobs queues work that a worker completes and GET /jobs/<id> reports."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false", "SOLVE_CACHE_ENABLED": "false"})
+        environment.start()
+        self.addCleanup(environment.stop)
+        queue = patch.object(job_queue, "_job_queue", JobQueue(os.path.join(self.tmpdir.name, "jobs.sqlite3")))
+        queue.start()
+        self.addCleanup(queue.stop)
+        from app.ui.app import app
+        self.client = app.test_client()
+
+    def test_solve_job_round_trip(self):
+        response = self.client.post("/jobs", data={"python_code": CODE, "time_limit": "20"})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()["job_id"]
+        self.assertEqual(self.client.get(f"/jobs/{job_id}").get_json()["status"], "queued")
+
+        from main import run_job
+        queue = job_queue.get_job_queue()
+        queue.run(queue.claim("w"), run_job, "w")
+
+        job = self.client.get(f"/jobs/{job_id}").get_json()
+        self.assertEqual((job["status"], job["time_limit"]), ("done", 20.0))
+        self.assertIn("Objective Value: 9.0", job["result"]["output"])
+        self.assertNotIn("solve_report", job["result"])
+
+    def test_rejections(self):
+        self.assertEqual(self.client.post("/jobs", data={"python_code": "print(1)"}).status_code, 400)
+        self.assertEqual(self.client.post("/jobs", data={"python_code": CODE, "time_limit": "-1"}).status_code, 400)
+        self.assertEqual(self.client.post("/jobs", data={"problem_statement": "p"}).status_code, 400)  # no API key
+        self.assertEqual(self.client.get("/jobs/nope").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
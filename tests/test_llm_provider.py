@@ -0,0 +1,136 @@
+"""Tests for the LLM provider interface and the local HTTP stand-in."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import llm_provider
+from llm_provider import get_model, get_provider, key_required, validate_key
+from llm_standin import StandIn, StandInError, load_recorded, load_responses, server_url, start
+from response_cache import cached_generate, cached_generate_stream, make_cache_key
+
+
+class TestProviders(unittest.TestCase):
+    """LLM_PROVIDER picks the provider every call site goes through."""
+
+    def test_selection(self):
+        with patch.dict(os.environ, {"LLM_PROVIDER": ""}):
+            self.assertIs(get_provider(), llm_provider.PROVIDERS["gemini"])
+            self.assertTrue(key_required())
+        with patch.dict(os.environ, {"LLM_PROVIDER": "Replay"}):
+            self.assertFalse(key_required())
+        with patch.dict(os.environ, {"LLM_PROVIDER": "openai"}):
+            with self.assertRaises(ValueError):
+                get_model("key", "m")
+        with patch.dict(os.environ, {"LLM_PROVIDER": "replay", "LLM_RECORDINGS": ""}):
+            with self.assertRaises(ValueError):
+                get_model("key", "m")
+
+    def test_registered_provider_is_timed(self):
+        class Echo(llm_provider.Provider):
+            requires_key = False
+
+            def model(self, api_key, model_name, generation_config=None):
+                class Model:
+                    def generate_content(self, prompt, stream=False):
+                        class Response:
+                            text = prompt.upper()
+                            parts = []
+                        return iter([Response(), Response()]) if stream else Response()
+                return Model()
+
+        llm_provider.register_provider("echo", Echo())
+        self.addCleanup(llm_provider.PROVIDERS.pop, "echo")
+        llm_provider.reset_stats()
+        with patch.dict(os.environ, {"LLM_PROVIDER": "echo", "LLM_CACHE_ENABLED": "false"}):
+            self.assertEqual(cached_generate(get_model(None, "m"), "hi", "m"), "HI")
+            self.assertEqual("".join(cached_generate_stream(get_model(None, "m"), "ho", "m")), "HOHO")
+            self.assertEqual(validate_key("any", "m")["valid"], True)
+            stats = llm_provider.stats()
+        self.assertEqual((stats["provider"], stats["calls"], stats["errors"]), ("echo", 2, 0))
+
+    def test_incomplete_provider_fails_when_constructed(self):
+        class NoModel(llm_provider.Provider):
+            requires_key = False
+
+        with self.assertRaises(TypeError):
+            NoModel()
+
+
+class TestStandIn(unittest.TestCase):
+    """The stand-in answers from recordings and templated rules, slowly and unreliably on request."""
+
+    def serve(self, **options):
+        stand_in = StandIn(**options)
+        server = start(stand_in)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        environment = patch.dict(os.environ, {"LLM_PROVIDER": "http", "LLM_STANDIN_URL": server_url(server),
+                                              "LLM_CACHE_ENABLED": "false"})
+        environment.start()
+        self.addCleanup(environment.stop)
+        return stand_in
+
+    def write(self, name: str, content) -> str:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        return path
+
+    def test_recorded_and_templated_answers(self):
+        recordings = self.write("p.jsonl", json.dumps({"key": make_cache_key("known prompt", "m", {"t": 1}),
+                                                       "model": "m", "text": "recorded"}) + "\n")
+        rules = self.write("rules.json", [
+            {"model": "other", "text": "wrong model"},
+            {"match": r"Problem: (?P<name>\w+)", "text": "$name for $model, request $request"},
+        ])
+        stand_in = self.serve(responses=load_responses(rules), recorded=load_recorded([os.path.dirname(recordings)]))
+        self.assertEqual(cached_generate(get_model(None, "m", {"t": 1}), "known prompt", "m", {"t": 1}), "recorded")
+        self.assertEqual(cached_generate(get_model(None, "m"), "Problem: knapsack", "m"), "knapsack for m, request 2")
+        with self.assertRaises(StandInError) as raised:
+            cached_generate(get_model(None, "m"), "something else", "m")
+        self.assertEqual(raised.exception.status, 404)
+        self.assertEqual(stand_in.stats(), {"requests": 3, "recorded": 1, "templated": 1, "errors": 0, "not_found": 1})
+
+    def test_streamed_chunks_and_latency(self):
+        self.serve(responses=[{"match": None, "text": "abcdefghij"}], chunk_chars=4, latency=0.05)
+        llm_provider.reset_stats()
+        chunks = list(cached_generate_stream(get_model(None, "m"), "prompt", "m"))
+        self.assertEqual(chunks, ["abcd", "efgh", "ij"])
+        self.assertGreaterEqual(llm_provider.stats()["seconds"], 0.05)
+
+    def test_injected_errors(self):
+        stand_in = self.serve(responses=[{"match": None, "text": "ok"}], error_rate=1.0, error_status=429)
+        with self.assertRaises(StandInError) as raised:
+            cached_generate(get_model(None, "m"), "prompt", "m")
+        self.assertEqual(raised.exception.status, 429)
+        self.assertFalse(validate_key("any", "m")["valid"])
+        stand_in.error_rate = 0
+        self.assertEqual(validate_key("any", "m"), {"valid": True, "cached": False, "error": None})
+
+    def test_call_site_through_the_stand_in(self):
+        from nlp_processor import optimize_problem_statement
+
+        self.serve(responses=[{"match": r"---BEGIN ORIGINAL STATEMENT---\s*(?P<statement>.*?)\s*---END",
+                               "text": "Refined: $statement"}])
+        with patch.dict(os.environ, {"GEMINI_API_KEY": ""}):
+            refined = optimize_problem_statement("Maximize 3x + 2y.", use_cache=False)
+        self.assertEqual(refined, "Refined: Maximize 3x + 2y.")
+
+    def test_bad_rules(self):
+        with self.assertRaises(ValueError):
+            load_responses(self.write("rules.json", {"text": "not a list"}))
+        with self.assertRaises(ValueError):
+            load_responses(self.write("rules.json", [{"match": "x"}]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Tests for incremental processing of streamed Gemini output."""
+
+import os
+import random
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import solver_engine
+import validator
+from llm_stream import CodeFenceStripper, SectionExtractor, strip_code_fences
+
+CODE_RESPONSES = [
+    "```python\nimport pulp\nprint('x')\n```\n",
+    "  ```\nx = 1\n```",
+    "import pulp\nx = '```'\n",
+    "```python```",
+    "```pyth\nx = 1",
+    "x = 1\n\n```  \n\n",
+    "``````",
+    "```py",
+    "   \n",
+    "",
+]
+
+ANALYSIS = """1. VALIDITY ASSESSMENT: Yes, the solution is valid.
+
+2. CONSTRAINT VERIFICATION:
+| Constraint | LHS | RHS |
+| Wood | 400 | 400 |
+
+3. PRACTICAL REASONABLENESS: The plan is sensible.
+
+4. SUGGESTIONS: No suggestions needed.
+
+5. CONFIDENCE LEVEL: High - all constraints check out."""
+ANALYSIS_SECTIONS = [
+    ("validity", "VALIDITY ASSESSMENT:"),
+    ("constraints", "CONSTRAINT VERIFICATION:"),
+    ("reasonableness", "PRACTICAL REASONABLENESS:"),
+    ("suggestions", "SUGGESTIONS:"),
+    ("confidence", "CONFIDENCE LEVEL:"),
+]
+
+
+def random_chunks(text, rng):
+    """Splits text at random points, including into empty and single-character chunks."""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, len(text) + 1)))
+    bounds = [0] + cuts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def fake_model(text, rng):
+    """A GenerativeModel stand-in answering with `text`, streamed in random chunks."""
+    model = Mock()
+
+    def generate_content(prompt, stream=False):
+        if stream:
+            return [Mock(text=chunk, parts=[]) for chunk in random_chunks(text, rng)]
+        return Mock(text=text, parts=[])
+
+    model.generate_content.side_effect = generate_content
+    return model
+
+
+class TestCodeFenceStripper(unittest.TestCase):
+    """The streamed output must equal strip_code_fences on the whole text, however it is chunked."""
+
+    def test_matches_one_shot_cleaning(self):
+        rng = random.Random(7)
+        for text in CODE_RESPONSES:
+            for _ in range(200):
+                stripper = CodeFenceStripper()
+                streamed = "".join(stripper.feed(chunk) for chunk in random_chunks(text, rng))
+                self.assertEqual(streamed + stripper.finish(), strip_code_fences(text), repr(text))
+
+    def test_code_is_released_before_the_end(self):
+        stripper = CodeFenceStripper()
+        self.assertEqual(stripper.feed("```py"), "")
+        self.assertEqual(stripper.feed("thon\nimport pulp\n"), "import pulp")
+        self.assertEqual(stripper.feed("```"), "")
+        self.assertEqual(stripper.finish(), "")
+
+
+class TestSectionExtractor(unittest.TestCase):
+    """Sections are reported once complete and match the text between the headings."""
+
+    def test_sections_from_random_chunks(self):
+        rng = random.Random(11)
+        for _ in range(100):
+            extractor = SectionExtractor(ANALYSIS_SECTIONS)
+            sections = []
+            for chunk in random_chunks(ANALYSIS, rng):
+                sections.extend(extractor.feed(chunk))
+            sections.extend(extractor.finish())
+            self.assertEqual([name for name, _ in sections],
+                             ["validity", "constraints", "reasonableness", "suggestions", "confidence"])
+            self.assertEqual(dict(sections)["reasonableness"], "The plan is sensible.\n\n4.")
+
+    def test_section_completes_when_next_heading_arrives(self):
+        extractor = SectionExtractor(ANALYSIS_SECTIONS)
+        self.assertEqual(extractor.feed("VALIDITY ASSESSMENT: Yes. SUGGES"), [])
+        self.assertEqual(extractor.feed("TIONS: none"), [("validity", "Yes.")])
+        self.assertEqual(extractor.finish(), [("suggestions", "none")])
+
+
+class TestStreamingEndpointsMatchOneShot(unittest.TestCase):
+    """The final event of each stream carries what the non-streaming function returns."""
+
+    def setUp(self):
+        environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false"})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_generate_pulp_code_stream(self):
+        rng = random.Random(3)
+        for text in CODE_RESPONSES[:6]:
+            with patch.object(solver_engine, "get_model", return_value=fake_model(text, rng)):
+                expected = solver_engine.generate_python_code(None, model_plaintext="model")
+                events = list(solver_engine.generate_python_code_stream(
+                    None, model_plaintext="model"))
+            self.assertEqual(events[-1], ("done", expected))
+            chunks = [payload for event, payload in events if event == "chunk"]
+            self.assertEqual("".join(chunks), expected["python_code"])
+
+    def test_validate_execution_results_stream(self):
+        rng = random.Random(5)
+        for text in (ANALYSIS, "", "VALIDITY ASSESSMENT without colon"):
+            with patch.object(validator, "get_model", return_value=fake_model(text, rng)):
+                expected = validator.validate_execution_results("p", "m", "c", "out", reasonableness=True)
+                events = list(validator.validate_execution_results_stream("p", "m", "c", "out",
+                                                                          reasonableness=True))
+            self.assertEqual(events[-1], ("done", expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Tests for the Prometheus metrics and the Server-Timing headers."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import job_queue
+import llm_provider
+import metrics
+from job_queue import JobQueue
+from response_cache import cached_generate
+
+CODE = """import pulp
+model = pulp.LpProblem("m", pulp.LpMinimize)
+x = pulp.LpVariable("x", 0)
+model += x
+model += x >= 3
+status = model.solve()
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+
+
+def use_private_files(test: unittest.TestCase) -> str:
+    """Points the job queue and the cache files at a temporary directory, and returns it."""
+    tmpdir = tempfile.TemporaryDirectory()
+    test.addCleanup(tmpdir.cleanup)
+    paths = {"JOB_QUEUE_PATH": "jobs.sqlite3", "LLM_CACHE_PATH": "llm_cache.sqlite3",
+             "SOLVE_CACHE_PATH": "solve_cache.sqlite3"}
+    environment = patch.dict(os.environ, {name: os.path.join(tmpdir.name, file) for name, file in paths.items()})
+    queue = patch.object(job_queue, "_job_queue", JobQueue(os.path.join(tmpdir.name, "jobs.sqlite3")))
+    for patcher in (environment, queue):
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return tmpdir.name
+
+
+def _samples(text: str) -> dict:
+    """Sample line -> value of a rendered exposition."""
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+class TestExposition(unittest.TestCase):
+    """Counters and histograms render in Prometheus' text format and add up across processes."""
+
+    def setUp(self):
+        use_private_files(self)  # the queue depth is part of every exposition
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_render(self):
+        metrics.CACHE_LOOKUPS.inc(cache="llm", result="hit")
+        metrics.CACHE_LOOKUPS.inc(2, cache="llm", result="hit")
+        metrics.SOLVE_SECONDS.observe(0.02, backend='say "cbc"', status="Optimal")
+        metrics.SOLVE_SECONDS.observe(7, backend='say "cbc"', status="Optimal")
+        with patch.dict(os.environ, {"METRICS_DIR": ""}):
+            text = metrics.render()
+        samples = _samples(text)
+        self.assertIn("# TYPE automodeler_cache_lookups_total counter", text)
+        self.assertEqual(samples['automodeler_cache_lookups_total{cache="llm",result="hit"}'], 3)
+        labels = 'backend="say \\"cbc\\"",status="Optimal"'
+        self.assertEqual(samples[f'automodeler_solve_seconds_bucket{{{labels},le="0.01"}}'], 0)
+        self.assertEqual(samples[f'automodeler_solve_seconds_bucket{{{labels},le="0.025"}}'], 1)
+        self.assertEqual(samples[f'automodeler_solve_seconds_bucket{{{labels},le="10"}}'], 2)
+        self.assertEqual(samples[f'automodeler_solve_seconds_bucket{{{labels},le="+Inf"}}'], 2)
+        self.assertEqual(samples[f'automodeler_solve_seconds_sum{{{labels}}}'], 7.02)
+        self.assertEqual(samples[f'automodeler_solve_seconds_count{{{labels}}}'], 2)
+        with self.assertRaises(ValueError):
+            metrics.CACHE_LOOKUPS.inc(cache="llm")
+
+    def test_processes_add_up(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        counts = {"automodeler_cache_lookups_total": [[["code", "hit"], 2]]}
+        for pid in (os.getppid(), exited.pid):  # one running process and one that has exited
+            with open(os.path.join(directory.name, f"{pid}.json"), "w") as f:
+                json.dump(counts, f)
+        metrics.CACHE_LOOKUPS.inc(cache="code", result="hit")
+        with patch.dict(os.environ, {"METRICS_DIR": directory.name}):
+            for _ in range(2):  # the exited process's counts are folded once and still reported
+                samples = _samples(metrics.render())
+                self.assertEqual(samples['automodeler_cache_lookups_total{cache="code",result="hit"}'], 5)
+            self.assertFalse(os.path.exists(os.path.join(directory.name, f"{exited.pid}.json")))
+            metrics.flush()
+        with open(os.path.join(directory.name, f"{os.getpid()}.json")) as f:
+            self.assertEqual(json.load(f), {"automodeler_cache_lookups_total": [[["code", "hit"], 1]]})
+
+    def test_llm_calls_are_timed_and_counted(self):
+        class Echo(llm_provider.Provider):
+            requires_key = False
+
+            def model(self, api_key, model_name, generation_config=None):
+                class Model:
+                    def generate_content(self, prompt, stream=False):
+                        class Response:
+                            text = "x" * 10
+                            parts = []
+                        return Response()
+                return Model()
+
+        llm_provider.register_provider("echo", Echo())
+        self.addCleanup(llm_provider.PROVIDERS.pop, "echo")
+        with patch.dict(os.environ, {"LLM_PROVIDER": "echo", "LLM_CACHE_ENABLED": "false"}):
+            metrics.start_request()
+            cached_generate(llm_provider.get_model(None, "m"), "p" * 9, "m")
+            timings = metrics.finish_request()
+        self.assertEqual(list(timings), ["llm"])
+        self.assertEqual(metrics.LLM_TOKENS.values, {("m", "prompt", "estimated"): 3, ("m", "response", "estimated"): 3})
+        self.assertEqual(sum(metrics.LLM_REQUEST_SECONDS.values[("echo", "m", "ok")][:-1]), 1)
+
+
+class TestWebMetrics(unittest.TestCase):
+    """Responses carry Server-Timing headers, and GET /metrics reports the solver runs and the queue."""
+
+    def setUp(self):
+        use_private_files(self)
+        environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false", "SOLVE_CACHE_ENABLED": "false",
+                                              "METRICS_DIR": ""})
+        environment.start()
+        self.addCleanup(environment.stop)
+        metrics.reset()
+        from app.ui.app import app
+        self.client = app.test_client()
+
+    def test_run_code_timings_and_metrics(self):
+        response = self.client.post("/run_code", data={"python_code": CODE})
+        self.assertIsNone(response.get_json()["error"])
+        timings = dict(part.split(";dur=") for part in response.headers["Server-Timing"].split(", "))
+        self.assertTrue({"solver_wait", "spawn", "run", "solve", "total"} <= set(timings), timings)
+        self.assertGreaterEqual(float(timings["total"]), float(timings["run"]))
+
+        self.client.post("/jobs", data={"python_code": CODE, "time_limit": "20"})
+        text = self.client.get("/metrics").get_data(as_text=True)
+        samples = _samples(text)
+        self.assertEqual(samples['automodeler_http_request_seconds_count{route="/run_code",method="POST",status="200"}'], 1)
+        self.assertEqual(samples['automodeler_solver_run_seconds_count{outcome="ok"}'], 1)
+        self.assertEqual(samples["automodeler_solver_child_peak_rss_bytes_count"], 1)
+        self.assertEqual(samples['automodeler_job_queue_jobs{status="queued"}'], 1)
+        self.assertIn('automodeler_solve_seconds_count{backend="', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
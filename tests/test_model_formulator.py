@@ -0,0 +1,90 @@
+"""Tests for the typed model IR and the renderers built on it."""
+
+import os
+import sys
+import unittest
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from model_formulator import formulate_model_from_nlp, render_model_latex, render_model_plaintext
+from model_ir import DataTable, ModelIR
+
+SAMPLE_MODEL = {
+    "sets": ["Products ($I$)", "Resources ($J$)"],
+    "parameters": {
+        "$p_i$": "Profit per unit of product i",
+        "$a_{ij}$": "Amount of resource j used by product i",
+        "$b_j$": "Availability of resource j",
+    },
+    "variables": {"$x_i$": "Units of product i to make (continuous, non-negative)"},
+    "objective": {"type": "maximize", "expression": "$\\sum_{i \\in I} p_i x_i$"},
+    "constraints": [
+        "$\\sum_{i \\in I} a_{ij} x_i \\le b_j \\quad \\forall j \\in J$ (Resource limits)",
+    ],
+    "data": {
+        "$I$": ["chairs", "tables"],
+        "$J$": ["wood", "labor"],
+        "$p_i$": {"chairs": 45, "tables": 80.5},
+        "$a_{ij}$": {"chairs,wood": 5, "chairs,labor": 10, "tables,wood": 20, "tables,labor": 15},
+        "$b_j$": {"wood": 400, "labor": 450},
+        "nested": {"chairs": {"wood": 1, "labor": 2.5}},
+        "note": "free text",
+    },
+    "unexpected_section": {"kept": True},
+}
+
+
+class TestModelIR(unittest.TestCase):
+    """Test cases for ModelIR construction, round-tripping and data access."""
+
+    def test_round_trip(self):
+        ir = ModelIR.from_dict(SAMPLE_MODEL)
+        self.assertEqual(ir.to_dict(), SAMPLE_MODEL)
+        self.assertEqual(list(ir.to_dict()), list(SAMPLE_MODEL))
+
+    def test_typed_sections(self):
+        ir = ModelIR.from_dict(SAMPLE_MODEL)
+        self.assertEqual(ir.index_set("I").elements, ("chairs", "tables"))
+        self.assertEqual(ir.objective.sense, "maximize")
+        self.assertEqual(ir.data["$p_i$"].kind, "dense")
+        self.assertEqual(ir.data["$a_{ij}$"].kind, "csr")
+        self.assertEqual(ir.data["nested"].kind, "csr")
+        self.assertEqual(ir.data["note"].kind, "raw")
+
+    def test_csr_access(self):
+        table = ModelIR.from_dict(SAMPLE_MODEL).data["$a_{ij}$"]
+        self.assertEqual(table.get("tables", "wood"), 20)
+        with self.assertRaises(KeyError):
+            table.get("tables", "steel")
+        self.assertEqual(table.to_dense().tolist(), [[5, 10], [20, 15]])
+
+    def test_mixed_int_and_float_values_keep_their_types(self):
+        table = ModelIR.from_dict(SAMPLE_MODEL).data["$p_i$"]
+        values = table.to_python()
+        self.assertIsInstance(values["chairs"], int)
+        self.assertIsInstance(values["tables"], float)
+
+    def test_python_repr_matches_dict_repr(self):
+        for value in ({"a,b": 1, "c,d": 2.5}, {"it's,x": 1}, {"x": 3, "y": 4.0}):
+            table = DataTable.from_value(value, ModelIR()._pool)
+            self.assertEqual(table.python_repr(), repr(value))
+
+
+class TestRenderers(unittest.TestCase):
+    """Renderers accept both the IR and the plain dict and produce the same output."""
+
+    def test_ir_and_dict_render_identically(self):
+        ir = formulate_model_from_nlp(SAMPLE_MODEL)
+        self.assertIsInstance(ir, ModelIR)
+        self.assertEqual(render_model_latex(ir), render_model_latex(SAMPLE_MODEL))
+        self.assertEqual(render_model_plaintext(ir), render_model_plaintext(SAMPLE_MODEL))
+
+    def test_error_dicts_pass_through(self):
+        error = {"error": "Gemini API key not configured."}
+        self.assertIs(formulate_model_from_nlp(error), error)
+        self.assertEqual(render_model_plaintext(error), "No model components found to render.")
+
+
+if __name__ == '__main__':
+    unittest.main()
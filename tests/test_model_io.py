@@ -0,0 +1,160 @@
+"""Tests for the MPS/LP readers and the model-file solve and export paths."""
+
+import gzip
+import io
+import os
+import sys
+import unittest
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import pulp
+
+from model_io import ModelFileError, detect_format, read_model
+
+MPS_MODEL = """NAME          TESTMIP
+OBJSENSE
+    MAX
+ROWS
+ N  PROFIT
+ L  LIM1
+ G  LIM2
+ E  BAL
+ L  RNG
+COLUMNS
+    MARKER                 'MARKER'                 'INTORG'
+    X         PROFIT    3.0        LIM1      1.0
+    X         BAL       1.0        RNG       1.0
+    MARKER                 'MARKER'                 'INTEND'
+    Y         PROFIT    2.0        LIM1      1.0
+    Y         LIM2      1.0        BAL       -1.0
+    Z         PROFIT    -1.0       RNG       1.0
+RHS
+    RHS       LIM1      4.5        LIM2      1.0
+    RHS       BAL       0.0        RNG       6.0
+RANGES
+    RNG       RNG       2.0
+BOUNDS
+ UP BND       X         10.0
+ MI BND       Z
+ UP BND       Z         3.0
+ENDATA
+"""
+
+LP_MODEL = """\\ Same model as MPS_MODEL
+Maximize
+ obj: 3 X + 2 Y - Z
+Subject To
+ LIM1: X + Y <= 4.5
+ LIM2: Y >= 1
+ BAL: X - Y = 0
+ RNG: 4 <= X
+    + Z <= 6
+Bounds
+ X <= 10
+ -inf <= Z <= 3
+General
+ X
+End
+"""
+
+
+class TestModelReaders(unittest.TestCase):
+    """Test cases for read_model."""
+
+    def _solve(self, problem):
+        problem.solve(pulp.PULP_CBC_CMD(msg=False))
+        return pulp.LpStatus[problem.status], pulp.value(problem.objective), \
+            {v.name: v.varValue for v in problem.variables()}
+
+    def test_mps_and_lp_describe_the_same_model(self):
+        mps, names, _ = read_model(io.BytesIO(MPS_MODEL.encode()), "mps")
+        lp, _, _ = read_model(io.BytesIO(LP_MODEL.encode()), "lp")
+        self.assertEqual(set(names.values()), {"X", "Y", "Z"})
+        self.assertEqual(mps.sense, pulp.LpMaximize)
+        self.assertEqual(mps.variablesDict()["X"].cat, pulp.LpInteger)
+        # X = Y, X + Y <= 4.5, 4 <= X + Z <= 6, Z <= 3 -> X = Y = 2, Z = 2
+        self.assertEqual(self._solve(mps), ("Optimal", 8.0, {"X": 2.0, "Y": 2.0, "Z": 2.0}))
+        self.assertEqual(self._solve(lp), self._solve(mps))
+
+    def test_gzip_and_text_streams(self):
+        compressed = gzip.compress(MPS_MODEL.encode())
+        from_gzip, _, _ = read_model(io.BytesIO(compressed), "mps")
+        from_text, _, _ = read_model(io.StringIO(MPS_MODEL), "mps")
+        self.assertEqual(self._solve(from_gzip), self._solve(from_text))
+
+    def test_round_trip_of_pulp_written_files(self):
+        problem = pulp.LpProblem("rt", pulp.LpMinimize)
+        x = pulp.LpVariable("x", lowBound=1)
+        y = pulp.LpVariable("y", cat=pulp.LpBinary)
+        free = pulp.LpVariable("free_var", lowBound=None)
+        problem += 2 * x + 3 * y + free
+        problem += x + y >= 2, "cover"
+        problem += free >= -4, "floor"
+        expected = self._solve(problem)
+        for suffix in ("mps", "lp"):
+            path = os.path.join(os.path.dirname(__file__), f"_roundtrip.{suffix}")
+            try:
+                if suffix == "mps":
+                    problem.writeMPS(path, with_objsense=True)
+                else:
+                    problem.writeLP(path)
+                with open(path, "rb") as f:
+                    reread, _, _ = read_model(f, detect_format(path))
+            finally:
+                os.unlink(path)
+            self.assertEqual(self._solve(reread), expected)
+
+    def test_errors_report_the_line(self):
+        broken = MPS_MODEL.replace(" L  LIM1", " Q  LIM1")
+        with self.assertRaisesRegex(ModelFileError, "line 6"):
+            read_model(io.BytesIO(broken.encode()), "mps")
+        with self.assertRaises(ModelFileError):
+            detect_format("model.txt")
+
+
+class TestModelFileSolveAndExport(unittest.TestCase):
+    """Test cases for run_model_file and export_model_mps."""
+
+    def test_run_model_file(self):
+        from solver_engine import run_model_file
+        result = run_model_file(io.BytesIO(MPS_MODEL.encode()), "mps", timeout=30, use_cache=False)
+        self.assertFalse(result["error"])
+        self.assertEqual(result["status"], "Optimal")
+        self.assertEqual(result["variables"], {"X": 2.0, "Y": 2.0, "Z": 2.0})
+        self.assertIn("Objective Value: 8.0", result["output"])
+
+    def test_export_of_generated_code(self):
+        from solver_engine import export_model_mps
+        code = (
+            "import pulp\n"
+            "m = pulp.LpProblem('export_me', pulp.LpMaximize)\n"
+            "a = pulp.LpVariable('a', 0, 4)\n"
+            "m += 5 * a\n"
+            "m += a <= 3, 'cap'\n"
+            "m.solve()\n"
+            "raise RuntimeError('should not run past the export')\n"
+        )
+        result = export_model_mps(code, timeout=30)
+        self.assertFalse(result["error"], result["error_details"])
+        self.assertEqual(result["model"], {"name": "export_me", "rows": 1, "columns": 1})
+        problem, _, _ = read_model(io.StringIO(result["mps"]), "mps")
+        problem.solve(pulp.PULP_CBC_CMD(msg=False))
+        self.assertEqual(pulp.value(problem.objective), 15.0)
+
+    def test_export_route_applies_the_preflight_checks(self):
+        from app.ui.app import app
+        client = app.test_client()
+        response = client.post("/export_mps", data={"python_code": "import subprocess\nwhile True:\n    pass\n"})
+        self.assertEqual(response.status_code, 400)
+        categories = {issue["category"] for issue in response.get_json()["preflight_issues"]}
+        self.assertEqual(categories, {"forbidden_import", "unbounded_loop", "missing_solve"})
+        code = "import pulp\nm = pulp.LpProblem('m')\nx = pulp.LpVariable('x', 0)\nm += x\nm.solve()\n"
+        response = client.post("/export_mps", data={"python_code": code})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("NAME", response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
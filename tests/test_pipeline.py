@@ -0,0 +1,147 @@
+"""Tests for the one-shot pipeline in main.py."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import main
+import model_formulator
+import response_cache
+import validator
+
+PRODUCT_MIX = {
+    "sets": ["Products ($I$)", "Resources ($J$)"],
+    "parameters": {
+        "$p_i$": "Profit per unit of product i",
+        "$a_{ij}$": "Amount of resource j used by product i",
+        "$b_j$": "Availability of resource j",
+    },
+    "variables": {"$x_i$": "Units of product i to make (continuous, non-negative)"},
+    "objective": {"type": "maximize", "expression": "$\\sum_{i \\in I} p_i x_i$"},
+    "constraints": ["$\\sum_{i \\in I} a_{ij} x_i \\le b_j \\quad \\forall j \\in J$ (Resource limits)"],
+    "data": {
+        "$I$": ["chairs", "tables"],
+        "$J$": ["wood", "labor"],
+        "$p_i$": {"chairs": 45, "tables": 80},
+        "$a_{ij}$": {"chairs,wood": 5, "chairs,labor": 10, "tables,wood": 20, "tables,labor": 15},
+        "$b_j$": {"wood": 400, "labor": 450},
+    },
+}
+
+
+def use_private_caches(test: unittest.TestCase) -> str:
+    """Disables the Gemini and solve caches and points the cache files at a temporary directory."""
+    tmpdir = tempfile.TemporaryDirectory()
+    test.addCleanup(tmpdir.cleanup)
+    environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false", "SOLVE_CACHE_ENABLED": "false",
+                                          "LLM_CACHE_PATH": os.path.join(tmpdir.name, "llm_cache.sqlite3"),
+                                          "SOLVE_CACHE_PATH": os.path.join(tmpdir.name, "solve_cache.sqlite3")})
+    # The formulated-model store shares the LLM cache file and is opened once per process
+    for patcher in (environment, patch.object(model_formulator, "_model_store", None),
+                    patch.object(response_cache, "_response_cache", None)):
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return tmpdir.name
+
+
+class TestRunPipeline(unittest.TestCase):
+    """Test cases for run_pipeline with the Gemini stages replaced by fixed answers."""
+
+    def setUp(self):
+        use_private_caches(self)
+
+    def test_runs_all_stages_and_reports_timings(self):
+        with patch.object(main, "optimize_problem_statement", return_value="refined") as optimize, \
+                patch.object(main, "parse_problem_statement", return_value=PRODUCT_MIX) as parse, \
+                patch.object(validator, "execute_code") as rerun:
+            result = main.run_pipeline("raw statement")
+        optimize.assert_called_once()
+        self.assertEqual(parse.call_args[0][0], "refined")
+        self.assertIsNone(result["error"], result)
+        self.assertEqual(result["generator"], "local")
+        self.assertIn("Status: Optimal", result["execution"]["output"])
+        self.assertIn("Objective Value: 2200", result["execution"]["output"])
+        self.assertTrue(result["model_plaintext"])
+        self.assertIn("\\begin{document}", result["model_latex"])
+        self.assertEqual(set(result["timings"]),
+                         {"optimize", "parse", "formulate", "render", "generate_code", "run", "validate"})
+        self.assertEqual(set(result["resources"]), set(result["timings"]))
+        self.assertGreater(result["resources"]["run"]["child_max_rss_kb"], 0)
+        # Validated locally from the run's own solve report, without running the code again
+        rerun.assert_not_called()
+        self.assertEqual(result["validation"]["validity_status"], "Valid")
+        self.assertEqual(result["validation"]["numerical_check"]["objective"]["computed"], 2200.0)
+        self.assertNotIn("solve_report", result["execution"])
+
+    def test_stops_at_the_failed_stage(self):
+        with patch.object(main, "parse_problem_statement", return_value={"error": "bad json"}):
+            result = main.run_pipeline("raw statement", optimize=False)
+        self.assertEqual(result["failed_stage"], "parse")
+        self.assertIn("bad json", result["error"])
+        self.assertIsNone(result["python_code"])
+        self.assertEqual(set(result["timings"]), {"parse"})
+
+
+class TestRunBatch(unittest.TestCase):
+    """Test cases for the batch runner: input formats, incremental output and resuming."""
+
+    def setUp(self):
+        self.directory = use_private_caches(self)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_read_problems_from_jsonl_and_directory(self):
+        with open(self.path("problems.jsonl"), "w") as f:
+            f.write(json.dumps({"id": "a", "problem_statement": "first"}) + "\n\n")
+            f.write(json.dumps({"statement": "second"}) + "\n")
+        self.assertEqual(main.read_problems(self.path("problems.jsonl")), [("a", "first"), ("3", "second")])
+
+        os.mkdir(self.path("corpus"))
+        for name, text in (("b.txt", "two"), ("a.md", "one"), ("notes.json", "{}")):
+            with open(os.path.join(self.path("corpus"), name), "w") as f:
+                f.write(text)
+        self.assertEqual(main.read_problems(self.path("corpus")), [("a", "one"), ("b", "two")])
+
+    def test_batch_writes_results_and_resumes(self):
+        output = self.path("results.jsonl")
+        with open(output, "w") as f:
+            f.write(json.dumps({"id": "p1"}) + "\n" + '{"id": "p2", "trunc')  # crashed mid-write
+        problems = [("p1", "one"), ("p2", "two"), ("p3", "three")]
+        with patch.object(main, "parse_problem_statement", return_value=PRODUCT_MIX) as parse:
+            summary = main.run_batch(problems, output, llm_concurrency=2, solver_concurrency=1,
+                                     optimize=False, validate=False)
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual(summary["skipped"], 1)
+        self.assertEqual(summary["succeeded"], 2)
+        self.assertEqual(summary["latency"]["run"]["count"], 2)
+        self.assertGreater(summary["problems_per_minute"], 0)
+        self.assertEqual(main.completed_ids(output), {"p1", "p2", "p3"})
+
+    def test_percentiles(self):
+        results = [{"timings": {"parse": float(i)}, "total_seconds": float(i), "failed_stage": None}
+                   for i in range(1, 101)]
+        latency = main.summarize_batch(results, 60.0)["latency"]["parse"]
+        self.assertEqual((latency["p50"], latency["p90"], latency["p99"], latency["max"]), (50.0, 90.0, 99.0, 100.0))
+
+
+class TestCommandLine(unittest.TestCase):
+    """The package entry point runs without 'app' on the path."""
+
+    def test_module_help(self):
+        root = os.path.join(os.path.dirname(__file__), '..')
+        completed = subprocess.run([sys.executable, "-W", "ignore", "-m", "app.main", "--help"], cwd=root,
+                                   capture_output=True, text=True)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn("usage: auto-modeler", completed.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
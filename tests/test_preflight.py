@@ -0,0 +1,115 @@
+"""Tests for the static pre-flight checks and the bytecode handed to the executor."""
+
+import marshal
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import solver_engine
+from preflight import check_code, format_issues, preflight
+from solver_pool import SolverPool, fork_available, run_in_subprocess
+
+WORKING = """import pulp
+model = pulp.LpProblem("m", pulp.LpMaximize)
+x = pulp.LpVariable("x", 0, 4)
+model += x
+status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+print(f"Status: {pulp.LpStatus[status]}")
+"""
+
+
+def categories(code, **kwargs):
+    return [(issue["category"], issue["line"]) for issue in check_code(code, **kwargs)]
+
+
+class TestPreflight(unittest.TestCase):
+    """Test cases for check_code and preflight."""
+
+    def test_clean_code_has_no_issues(self):
+        self.assertEqual(check_code(WORKING), [])
+        self.assertEqual(check_code("def f(a):\n    return [b for b in a]\nprint(f([1]))",
+                                    require_solve=False), [])
+
+    def test_syntax_error(self):
+        issues = check_code("x = 1 if y\n")
+        self.assertEqual(issues[0]["category"], "syntax")
+        self.assertEqual(issues[0]["line"], 1)
+        self.assertRegex(format_issues(issues), r"^line 1, col \d+: \[syntax\]")
+
+    def test_undefined_name_and_missing_module(self):
+        self.assertEqual(categories("import not_a_real_module_xyz\nprint(undefined_thing)\n", require_solve=False),
+                         [("unresolved_import", 1), ("undefined_name", 2)])
+
+    def test_missing_solve(self):
+        self.assertEqual(categories(WORKING.replace("model.solve(", "print(")), [("missing_solve", None)])
+        self.assertEqual(check_code("import pulp\npulp.PULP_CBC_CMD().actualSolve(None)\n"), [])
+
+    def test_forbidden_imports(self):
+        code = "import os.path\nfrom subprocess import run\nm = __import__('socket')\n" + WORKING
+        self.assertEqual(categories(code), [("forbidden_import", 1), ("forbidden_import", 2), ("forbidden_import", 3)])
+        with patch.dict(os.environ, {"PREFLIGHT_FORBIDDEN_IMPORTS": "pulp"}):
+            self.assertEqual(categories("import os\n" + WORKING), [("forbidden_import", 2)])
+
+    def test_unbounded_loops(self):
+        endless = WORKING + "while True:\n    for i in range(3):\n        if i:\n            break\n"
+        self.assertEqual(categories(endless), [("unbounded_loop", 7)])
+        self.assertEqual(categories(WORKING + "import itertools\nfor i in itertools.count():\n    pass\n"),
+                         [("unbounded_loop", 8)])
+        for body in ("    break", "    if x.varValue:\n        raise SystemExit", "    exit()"):
+            self.assertEqual(check_code(WORKING + "while 1:\n" + body + "\n"), [])
+        self.assertEqual(check_code(WORKING + "n = 0\nwhile n < 3:\n    n += 1\n"), [])
+
+    def test_names_bound_by_every_python_version(self):
+        # Runs on every supported version; `match` patterns are only checked where they parse
+        code = "try:\n    pass\nexcept ValueError as e:\n    print(e)\nwith open('f') as f:\n    print(f)\n"
+        self.assertEqual(check_code(code, require_solve=False), [])
+        if sys.version_info >= (3, 10):
+            code = ("match {'a': [1, 2]}:\n    case {'a': [first, *others], **rest}:\n"
+                    "        print(first, others, rest)\n    case {'b': value as alias}:\n        print(alias)\n")
+            self.assertEqual(check_code(code, require_solve=False), [])
+
+    def test_bytecode_only_for_accepted_code(self):
+        checked = preflight(WORKING)
+        self.assertTrue(checked["ok"])
+        self.assertEqual(marshal.loads(checked["bytecode"]).co_filename, "<string>")
+        rejected = preflight("while True:\n    pass\n")
+        self.assertFalse(rejected["ok"])
+        self.assertIsNone(rejected["bytecode"])
+
+
+class TestExecutorBytecode(unittest.TestCase):
+    """The executor runs the pre-compiled bytecode instead of compiling the source."""
+
+    def setUp(self):
+        environment = patch.dict(os.environ, {"SOLVE_CACHE_ENABLED": "false"})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_subprocess_runs_bytecode(self):
+        bytecode = preflight("print('from bytecode')", require_solve=False)["bytecode"]
+        result = run_in_subprocess("print('from source')", timeout=30, bytecode=bytecode)
+        self.assertEqual(result["stdout"].strip(), "from bytecode")
+
+    @unittest.skipUnless(fork_available(), "warm pool needs fork")
+    def test_pool_runs_bytecode(self):
+        pool = SolverPool(size=1)
+        self.addCleanup(pool.shutdown)
+        bytecode = preflight("print('from bytecode')", require_solve=False)["bytecode"]
+        result = pool.run("print('from source')", timeout=30, bytecode=bytecode)
+        self.assertEqual(result["stdout"].strip(), "from bytecode")
+
+    def test_run_solver_code_rejects_without_a_process(self):
+        with patch.object(solver_engine, "execute_code") as execute:
+            result = solver_engine.run_solver_code("import subprocess\n" + WORKING)
+        execute.assert_not_called()
+        self.assertTrue(result["error"])
+        self.assertEqual(result["preflight_issues"][0]["category"], "forbidden_import")
+        self.assertIn("[forbidden_import]", result["error_details"])
+
+
+if __name__ == '__main__':
+    unittest.main()
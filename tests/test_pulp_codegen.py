@@ -0,0 +1,106 @@
+"""Tests for the local model-to-PuLP code generator."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from model_ir import ModelIR
+from pulp_codegen import UnsupportedModel, translate_model
+from solver_pool import run_in_subprocess
+
+TRANSPORT_MODEL = {
+    "sets": ["Warehouses ($W$)", "Retailers ($R$)"],
+    "parameters": {
+        "$s_w$": "Supply at warehouse $w$ (units)",
+        "$d_r$": "Demand at retailer $r$ (units)",
+        "$c_{wr}$": "Cost to ship 1 unit from warehouse $w$ to retailer $r$ (\\$)",
+    },
+    "variables": {
+        "$x_{wr}$": "Quantity shipped from warehouse $w$ to retailer $r$ (units, $x_{wr} \\geq 0$, Continuous)",
+    },
+    "objective": {"type": "Minimize", "expression": "$\\sum_{w \\in W} \\sum_{r \\in R} c_{wr} x_{wr}$"},
+    "constraints": [
+        "$\\sum_{r \\in R} x_{wr} \\leq s_w$ for all $w \\in W$ (Supply constraints)",
+        "$\\sum_{w \\in W} x_{wr} \\geq d_r$ for all $r \\in R$ (Demand constraints)",
+    ],
+    "data": {
+        "$W$": ["W1", "W2"],
+        "$R$": ["R1", "R2", "R3"],
+        "$s$": {"W1": 100, "W2": 150},
+        "$d$": {"R1": 70, "R2": 80, "R3": 90},
+        "$c$": {"W1,R1": 10, "W1,R2": 12, "W1,R3": 14, "W2,R1": 11, "W2,R2": 9, "W2,R3": 13},
+    },
+}
+
+KNAPSACK_MODEL = {
+    "sets": ["Items ($I$)"],
+    "parameters": {"$v_i$": "Value of item $i$", "$w_i$": "Weight of item $i$", "$C$": "Capacity"},
+    "variables": {"$y_i$": "1 if item $i$ is packed"},
+    "objective": {"type": "Maximize", "expression": "$Z = \\sum_{i \\in I} v_i \\cdot y_i$"},
+    "constraints": [
+        "Capacity: $\\sum_{i \\in I} w_i y_i \\leq C$",
+        "$y_i \\in \\{0, 1\\} \\quad \\forall i \\in I$ (Binary)",
+    ],
+    "data": {"$I$": ["a", "b", "c"], "$v$": {"a": 10, "b": 13, "c": 7}, "$w$": {"a": 5, "b": 8, "c": 3}, "$C$": 10},
+}
+
+
+def _with(model, **changes):
+    changed = dict(model)
+    changed.update(changes)
+    return changed
+
+
+class TestTranslateModel(unittest.TestCase):
+    """Test cases for translate_model."""
+
+    def setUp(self):
+        # Every solve is a real one, cached (if at all) in a file of this test's own
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        environment = patch.dict(os.environ, {"SOLVE_CACHE_PATH": os.path.join(tmpdir.name, "solve_cache.sqlite3")})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def _run(self, model):
+        code = translate_model(ModelIR.from_dict(model))
+        result = run_in_subprocess(code, timeout=60)
+        self.assertEqual(result["returncode"], 0, result["stderr"])
+        return code, result["stdout"]
+
+    def test_transport_model(self):
+        code, stdout = self._run(TRANSPORT_MODEL)
+        self.assertIn("pulp.lpSum(c[w][r] * x[w][r] for w in W for r in R)", code)
+        self.assertIn("Status: Optimal", stdout)
+        self.assertIn("Objective Value: 2610.0", stdout)
+        self.assertIn("x[W2,R2] = 80.0", stdout)
+
+    def test_binary_domain_statement_and_scalar_parameter(self):
+        code, stdout = self._run(KNAPSACK_MODEL)
+        self.assertIn("cat=pulp.LpBinary", code)
+        self.assertIn("Objective Value: 17.0", stdout)
+
+    def test_nonlinear_objective_is_unsupported(self):
+        model = _with(KNAPSACK_MODEL, objective={"type": "Maximize", "expression": "$\\sum_{i \\in I} v_i y_i y_i$"})
+        with self.assertRaisesRegex(UnsupportedModel, "nonlinear"):
+            translate_model(ModelIR.from_dict(model))
+
+    def test_incomplete_data_is_unsupported(self):
+        data = dict(TRANSPORT_MODEL["data"])
+        data["$c$"] = {k: v for k, v in data["$c$"].items() if k != "W2,R3"}
+        with self.assertRaisesRegex(UnsupportedModel, "misses 1"):
+            translate_model(ModelIR.from_dict(_with(TRANSPORT_MODEL, data=data)))
+
+    def test_unknown_symbol_is_unsupported(self):
+        constraints = TRANSPORT_MODEL["constraints"] + ["$\\sum_{w \\in W} x_{wr} \\leq u_r$ for all $r \\in R$"]
+        with self.assertRaisesRegex(UnsupportedModel, "unknown symbol"):
+            translate_model(ModelIR.from_dict(_with(TRANSPORT_MODEL, constraints=constraints)))
+
+
+if __name__ == '__main__':
+    unittest.main()
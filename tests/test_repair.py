@@ -0,0 +1,123 @@
+"""Tests for pre-flight checks and the self-healing repair loop."""
+
+import json
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import nlp_processor
+import solver_engine
+
+WORKING = """import pulp
+model = pulp.LpProblem("m", pulp.LpMaximize)
+x = pulp.LpVariable("x", 0, 4)
+model += x
+status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+print(f"Status: {pulp.LpStatus[status]}")
+"""
+# Fails at run time: the bound is looked up in a dict without that key
+RUNTIME_ERROR = WORKING.replace('pulp.LpVariable("x", 0, 4)', 'pulp.LpVariable("x", 0, {"ub": 4}["up"])')
+
+
+class TestCodeRevision(unittest.TestCase):
+    """Test cases for the slicing and patching around suggest_code_revision."""
+
+    def test_failing_line_and_slice(self):
+        traceback = 'Traceback:\n  File "<string>", line 3, in <module>\nKeyError: \'up\''
+        self.assertEqual(nlp_processor.failing_line(traceback), 3)
+        code = "\n".join(f"x{i} = {i}" for i in range(1, 101))
+        self.assertEqual(nlp_processor.code_slice(code, 50), (42, 58))
+
+    def test_patch_is_applied_within_the_slice_only(self):
+        code = "a = 1\nb = 2\nc = 3\n"
+        patch_ = {"start_line": 2, "end_line": 2, "replacement": "b = 20"}
+        self.assertEqual(nlp_processor.apply_line_patch(code, patch_, (1, 3)), "a = 1\nb = 20\nc = 3\n")
+        self.assertIsNone(nlp_processor.apply_line_patch(code, patch_, (3, 3)))
+        self.assertIsNone(nlp_processor.apply_line_patch(code, {"start_line": 2}, (1, 3)))
+
+    def test_suggest_code_revision_sends_only_the_slice(self):
+        code = "\n".join(f"x{i} = {i}" for i in range(1, 101)) + "\nprint(x200)\n"
+        model = Mock()
+        model.generate_content.return_value = Mock(
+            text=json.dumps({"start_line": 101, "end_line": 101, "replacement": "print(x100)"}))
+        with patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false"}), \
+                patch.object(nlp_processor, "_model_for", return_value=(model, "m")):
+            revised = nlp_processor.suggest_code_revision(
+                'File "<string>", line 101, in <module>\nNameError: x200', code)
+        prompt = model.generate_content.call_args[0][0]
+        self.assertIn(" 101| print(x200)", prompt)
+        self.assertNotIn("x1 = 1\n", prompt)
+        self.assertTrue(revised.endswith("print(x100)\n"))
+
+
+class TestRunWithRepair(unittest.TestCase):
+    """Test cases for run_with_repair with Gemini replaced by fixed patches."""
+
+    def setUp(self):
+        environment = patch.dict(os.environ, {"SOLVE_CACHE_ENABLED": "false", "LLM_CACHE_ENABLED": "false"})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_runtime_error_is_repaired(self):
+        with patch.object(solver_engine, "suggest_code_revision", return_value=WORKING) as suggest:
+            result = solver_engine.run_with_repair(RUNTIME_ERROR, max_iterations=2)
+        self.assertFalse(result["error"])
+        self.assertIn("KeyError", suggest.call_args[0][0])
+        self.assertEqual(result["python_code"], WORKING)
+        self.assertEqual(result["repair"]["iterations"], 1)
+        self.assertEqual(result["repair"]["stopped"], "succeeded")
+        self.assertEqual(result["repair"]["history"][0]["stage"], "run")
+
+    def test_preflight_failure_is_repaired_without_a_run(self):
+        broken = WORKING.replace("model += x", "model += y")
+        with patch.object(solver_engine, "suggest_code_revision", return_value=WORKING), \
+                patch.object(solver_engine, "execute_code", wraps=solver_engine.execute_code) as execute:
+            result = solver_engine.run_with_repair(broken)
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(result["repair"]["history"][0]["stage"], "preflight")
+        self.assertIn("'y'", result["repair"]["history"][0]["error"])
+
+    def test_stops_when_no_patch_or_budget_is_left(self):
+        with patch.object(solver_engine, "suggest_code_revision", return_value=RUNTIME_ERROR):
+            result = solver_engine.run_with_repair(RUNTIME_ERROR)
+        self.assertEqual(result["repair"]["stopped"], "no_patch")
+        self.assertTrue(result["error"])
+        with patch.object(solver_engine, "suggest_code_revision") as suggest:
+            result = solver_engine.run_with_repair(RUNTIME_ERROR, max_iterations=0)
+        suggest.assert_not_called()
+        self.assertEqual(result["repair"]["stopped"], "iteration_budget")
+
+    def test_infeasible_result_is_diagnosed(self):
+        infeasible = WORKING.replace("model += x\n", "model += x\nmodel += x >= 5\n")
+        with patch.object(solver_engine, "diagnose_infeasibility", return_value="x cannot exceed 4") as diagnose:
+            result = solver_engine.run_with_repair(infeasible, model_plaintext="max x")
+        self.assertEqual(result["repair"]["diagnosis"], "x cannot exceed 4")
+        self.assertEqual(diagnose.call_args[0][0]["status"], "Infeasible")
+
+    def test_gemini_calls_hold_an_llm_slot_and_no_solver_slot(self):
+        held = {"llm": 0, "solver": 0}
+        slots = {}
+        for name in held:
+            slot = Mock()
+            slot.__enter__ = Mock(side_effect=lambda *_, name=name: held.__setitem__(name, held[name] + 1))
+            slot.__exit__ = Mock(side_effect=lambda *_, name=name: held.__setitem__(name, held[name] - 1))
+            slots[name] = slot
+
+        def suggest(*args, **kwargs):
+            self.assertEqual(held, {"llm": 1, "solver": 0})
+            return WORKING
+
+        with patch.object(solver_engine, "suggest_code_revision", side_effect=suggest):
+            result = solver_engine.run_with_repair(RUNTIME_ERROR, llm_slots=slots["llm"],
+                                                   solver_slots=slots["solver"])
+        self.assertEqual(result["repair"]["stopped"], "succeeded")
+        self.assertEqual((slots["llm"].__enter__.call_count, slots["solver"].__enter__.call_count), (1, 2))
+        self.assertEqual(held, {"llm": 0, "solver": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Tests for the Gemini response cache."""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import response_cache
+from response_cache import ResponseCache, cached_generate, cached_generate_stream, make_cache_key
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for ResponseCache and cached_generate."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+        self.cache = ResponseCache(self.path, max_entries=3, ttl_seconds=60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_ignores_trailing_whitespace(self):
+        """Prompts differing only in trailing whitespace share a key."""
+        self.assertEqual(
+            make_cache_key("a  \nb\n", "m", {"temperature": 0.2}),
+            make_cache_key("a\nb", "m", {"temperature": 0.2}),
+        )
+        self.assertNotEqual(make_cache_key("a", "m1"), make_cache_key("a", "m2"))
+        self.assertNotEqual(
+            make_cache_key("a", "m", {"temperature": 0.2}),
+            make_cache_key("a", "m", {"temperature": 0.3}),
+        )
+
+    def test_get_set_and_stats(self):
+        """Stored values come back and hits/misses are counted."""
+        self.assertIsNone(self.cache.get("k"))
+        self.cache.set("k", {"text": "hello"})
+        self.assertEqual(self.cache.get("k"), {"text": "hello"})
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted when the cache is full."""
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key)
+            time.sleep(0.01)
+        self.cache.get("a")  # refresh 'a' so 'b' becomes the oldest
+        time.sleep(0.01)
+        self.cache.set("d", "d")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), "a")
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+    def test_ttl_expiry(self):
+        """Entries older than the TTL are treated as misses."""
+        cache = ResponseCache(self.path, ttl_seconds=0.05, table="short_lived")
+        cache.set("k", "v")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("k"))
+
+    def test_cached_generate_skips_network_on_hit(self):
+        """A second identical call is answered from the cache; bypass forces a call."""
+        model = Mock()
+        model.generate_content.return_value = Mock(text="answer")
+        with patch.object(response_cache, "get_response_cache", return_value=self.cache):
+            self.assertEqual(cached_generate(model, "prompt", "m"), "answer")
+            self.assertEqual(cached_generate(model, "prompt", "m"), "answer")
+            self.assertEqual(model.generate_content.call_count, 1)
+            cached_generate(model, "prompt", "m", use_cache=False)
+            self.assertEqual(model.generate_content.call_count, 2)
+
+    def test_stream_shares_entries_with_cached_generate(self):
+        """A streamed response is stored complete and served to both variants."""
+        model = Mock()
+        model.generate_content.return_value = iter([Mock(text="ans"), Mock(text="", parts=[]), Mock(text="wer")])
+        with patch.object(response_cache, "get_response_cache", return_value=self.cache):
+            self.assertEqual(list(cached_generate_stream(model, "prompt", "m")), ["ans", "wer"])
+            model.generate_content.assert_called_once_with("prompt", stream=True)
+            self.assertEqual(list(cached_generate_stream(model, "prompt", "m")), ["answer"])
+            self.assertEqual(cached_generate(model, "prompt", "m"), "answer")
+            self.assertEqual(model.generate_content.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
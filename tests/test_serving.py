@@ -0,0 +1,77 @@
+"""Tests for the production server settings and the load generator."""
+
+import os
+import runpy
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+from werkzeug.serving import make_server
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+from load_test import run_load
+
+
+def gunicorn_settings(**environment):
+    """Evaluates gunicorn.conf.py on a 4-CPU machine; returns (settings, SOLVER_POOL_SIZE it leaves)."""
+    names = ("WEB_CONCURRENCY", "GUNICORN_THREADS", "SOLVER_TIMEOUT", "GUNICORN_TIMEOUT", "SOLVER_POOL_SIZE")
+    with patch.dict(os.environ, {}), patch.object(os, "cpu_count", return_value=4):
+        for name in names:
+            os.environ.pop(name, None)
+        os.environ.update(environment)
+        settings = runpy.run_path(os.path.join(ROOT, "gunicorn.conf.py"))
+        return settings, os.environ["SOLVER_POOL_SIZE"]
+
+
+class TestGunicornSettings(unittest.TestCase):
+    """Worker counts follow the CPUs and timeouts cover a full solve."""
+
+    def test_defaults(self):
+        settings, pool_size = gunicorn_settings()
+        self.assertEqual((settings["workers"], settings["threads"]), (9, 4))
+        self.assertTrue(settings["preload_app"])
+        self.assertEqual(settings["timeout"], 600)
+        self.assertEqual(pool_size, "1")
+        self.assertGreater(settings["max_requests"], 0)
+
+    def test_environment_overrides(self):
+        settings, pool_size = gunicorn_settings(WEB_CONCURRENCY="2", SOLVER_TIMEOUT="60")
+        self.assertEqual((settings["workers"], settings["timeout"]), (2, 360))
+        self.assertEqual(pool_size, "2")
+        self.assertEqual(gunicorn_settings(SOLVER_POOL_SIZE="3")[1], "3")
+
+
+class TestLoadTest(unittest.TestCase):
+    """The load generator completes every request against the real app."""
+
+    @classmethod
+    def setUpClass(cls):
+        environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false", "SOLVE_CACHE_ENABLED": "false"})
+        environment.start()
+        cls.addClassCleanup(environment.stop)
+        from app.ui.app import app
+        cls.server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def test_index(self):
+        result = run_load(self.url, "index", concurrency=3, requests=10)
+        self.assertEqual((result["requests"], result["errors"]), (10, 0))
+        self.assertGreater(result["throughput_rps"], 0)
+        self.assertLessEqual(result["p50_ms"], result["max_ms"])
+
+    def test_validate_results(self):
+        result = run_load(self.url, "validate_results", concurrency=2, requests=2)
+        self.assertEqual((result["requests"], result["errors"]), (2, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
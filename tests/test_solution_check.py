@@ -0,0 +1,193 @@
+"""Tests for the local numerical solution check and the validator built on it."""
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+import pulp
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import validator
+from solve_hooks import capture_problem
+from solution_check import reported_objective, run_rules, verify_solution
+
+CODE = """import pulp
+model = pulp.LpProblem("m", pulp.LpMaximize)
+x = pulp.LpVariable("x", 0, 4, cat="Integer")
+y = pulp.LpVariable("y", 0)
+model += 3 * x + 2 * y
+model += x + y <= 6, "cap"
+model += x - y >= -2, "mix"
+status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+print(f"Status: {pulp.LpStatus[status]}")
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+OUTPUT = "Status: Optimal\nObjective Value: 16.0"
+
+
+def recorded_model(values):
+    """The model in CODE as capture_problem records it, with the given x and y."""
+    problem = pulp.LpProblem("m", pulp.LpMaximize)
+    x = pulp.LpVariable("x", 0, 4, cat="Integer")
+    y = pulp.LpVariable("y", 0)
+    problem += 3 * x + 2 * y
+    problem += x + y <= 6, "cap"
+    problem += x - y >= -2, "mix"
+    problem += x + 2 * y == 8, "balance"
+    x.varValue, y.varValue = values
+    return capture_problem(problem)
+
+
+class TestVerifySolution(unittest.TestCase):
+    """Test cases for verify_solution on recorded models."""
+
+    def test_feasible_solution(self):
+        check = verify_solution(recorded_model((4, 2)), "Objective Value: 16.0")
+        self.assertTrue(check["feasible"])
+        self.assertEqual(check["violated_constraints"], 0)
+        self.assertEqual(sorted(check["binding"]), ["balance", "cap"])
+        self.assertEqual(check["objective"], {"computed": 16.0, "reported": 16.0, "consistent": True})
+
+    def test_violations_are_ranked(self):
+        check = verify_solution(recorded_model((4.5, 5)))
+        self.assertFalse(check["feasible"])
+        self.assertEqual([v["name"] for v in check["violations"]], ["balance", "cap"])
+        self.assertEqual(check["violations"][0], {"name": "balance", "sense": "=", "activity": 14.5,
+                                                  "rhs": 8.0, "violation": 6.5})
+        self.assertEqual(check["max_violation"], 6.5)
+        self.assertEqual(check["bound_violations"], [{"name": "x", "value": 4.5}])
+        self.assertEqual(check["integrality_violations"], [{"name": "x", "value": 4.5}])
+
+    def test_unset_values_and_tolerance(self):
+        check = verify_solution(recorded_model((None, 4 + 1e-9)))
+        self.assertEqual(check["unset_values"], 1)
+        # x counts as 0, so x - y >= -2 fails, while x + 2y == 8 holds up to the 1e-9
+        self.assertEqual([v["name"] for v in check["violations"]], ["mix"])
+        self.assertEqual(verify_solution(recorded_model((4, 2.001)), tolerance=1e-2)["violated_constraints"], 0)
+
+    def test_reported_objective_precision(self):
+        self.assertEqual(reported_objective("Objective Value: 2200.0"), (2200.0, 0.05))
+        self.assertEqual(reported_objective("Total objective = 1.5e3\nObjective: 12")[0], 12.0)
+        self.assertEqual(reported_objective("no objective printed"), (None, None))
+        check = verify_solution(recorded_model((4, 2)), "Objective Value: 16.04")
+        self.assertFalse(check["objective"]["consistent"])
+        self.assertTrue(verify_solution(recorded_model((4, 2)), "Objective: 16")["objective"]["consistent"])
+
+
+def synthetic_model(n):
+    """A recorded model with n variables and n/2 two-variable rows, solved at the lower bounds."""
+    pairs = [(i, 2 * i, 2 * i + 1) for i in range(n // 2)]
+    return {
+        "sense": 1,
+        "variables": {"names": [f"x{j}" for j in range(n)], "values": [0.0] * n,
+                      "lower": [0.0] * n, "upper": [10.0] * n, "integer": [j % 2 == 0 for j in range(n)]},
+        "constraints": {"names": [f"c{i}" for i in range(n // 2)], "senses": [-1] * (n // 2),
+                        "rhs": [25.0] * (n // 2),
+                        "rows": [r for i, _, _ in pairs for r in (i, i)],
+                        "cols": [c for _, a, b in pairs for c in (a, b)],
+                        "coefs": [1.0, 1.0] * (n // 2)},
+        "objective": {"cols": list(range(n)), "coefs": [1.0] * n, "constant": 0.0},
+    }
+
+
+class TestSanityRules(unittest.TestCase):
+    """Test cases for run_rules and the validator functions built on it."""
+
+    def rules(self, findings):
+        return {finding["rule"]: finding for finding in findings}
+
+    def test_each_rule(self):
+        problem = pulp.LpProblem("rules", pulp.LpMinimize)
+        x = pulp.LpVariable("x", 0, 10, cat="Integer")
+        big = pulp.LpVariable("big", 0, 1e7)
+        unused = pulp.LpVariable("unused", 0, 5)
+        tiny = pulp.LpVariable("tiny", 0)
+        problem += x - big
+        problem.addVariable(unused)  # declared, but used nowhere
+        problem += x + big >= 1, "demand"
+        problem += x <= 20, "loose"
+        problem += 1e-9 * tiny + 1e9 * x >= 0, "scaled"
+        x.varValue, big.varValue, unused.varValue, tiny.varValue = 2.5, 1e7, 0, 0
+        found = self.rules(run_rules(capture_problem(problem)))
+        self.assertEqual(set(found), {"integrality_violation", "variable_at_big_m_bound", "unused_variable",
+                                      "never_binding", "coefficient_range"})
+        self.assertEqual(found["integrality_violation"]["items"], ["x"])
+        self.assertEqual(found["variable_at_big_m_bound"]["items"], ["big"])
+        self.assertEqual(found["unused_variable"]["items"], ["unused"])
+        self.assertEqual(found["never_binding"]["items"], ["loose"])
+        self.assertEqual(found["coefficient_range"]["items"], ["scaled"])
+        self.assertEqual(run_rules(capture_problem(problem))[0]["severity"], "error")
+
+        found = self.rules(validator.perform_sanity_checks(capture_problem(problem), {"x": 11, "big": 3}))
+        self.assertEqual(found["bound_violation"]["items"], ["x"])
+        self.assertNotIn("variable_at_big_m_bound", found)
+
+    def test_model_reasonableness_comments(self):
+        model = synthetic_model(30)
+        self.assertEqual(validator.check_model_reasonableness(model), "- 15 constraints are implied by the "
+                         "variable bounds alone and can never be binding. (c0, c1, c2, c3, c4, c5, c6, c7, c8, c9 "
+                         "and 5 more)")
+        model["constraints"]["rhs"] = [15.0] * 15
+        self.assertEqual(validator.check_model_reasonableness(model), "No modeling concerns found.")
+
+    def test_large_model(self):
+        model = synthetic_model(100000)
+        model["variables"]["values"][3] = 0.5
+        found = self.rules(run_rules(model))
+        self.assertEqual(found["never_binding"]["count"], 50000)
+        self.assertNotIn("integrality_violation", found)  # x3 is continuous
+        model["variables"]["values"][2] = 0.5
+        self.assertEqual(self.rules(run_rules(model))["integrality_violation"]["items"], ["x2"])
+
+
+class TestValidator(unittest.TestCase):
+    """The validator checks solutions locally and calls Gemini only for reasonableness."""
+
+    def setUp(self):
+        environment = patch.dict(os.environ, {"SOLVE_CACHE_ENABLED": "false", "LLM_CACHE_ENABLED": "false"})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_local_validation_makes_no_gemini_call(self):
+        with patch.object(validator, "get_model") as gemini:
+            result = validator.validate_execution_results("p", "m", CODE, OUTPUT)
+        gemini.assert_not_called()
+        self.assertEqual((result["validity_status"], result["confidence"], result["is_valid"]), ("Valid", "High", True))
+        self.assertEqual(result["practical_reasonableness"], "Not requested.")
+        self.assertIn("All 2 constraints hold", result["constraint_verification"])
+        self.assertEqual(result["numerical_check"]["objective"]["computed"], 16.0)
+        self.assertEqual(result["sanity_checks"], [])
+        self.assertIn("MODEL CHECKS:\nNo modeling concerns found.", result["full_analysis"])
+
+    def test_solve_report_from_the_run_is_used(self):
+        from solver_engine import run_solver_code
+        run = run_solver_code(CODE)
+        with patch.object(validator, "execute_code") as execute:
+            result = validator.validate_execution_results("p", "m", CODE, "Objective Value: 15",
+                                                          solve_report=run["solve_report"])
+        execute.assert_not_called()
+        self.assertEqual(result["validity_status"], "Partially Valid")
+
+    def test_unrecorded_model_is_unknown(self):
+        result = validator.validate_execution_results("p", "m", "print('no model')", "out")
+        self.assertEqual((result["validity_status"], result["confidence"]), ("Unknown", "Low"))
+        self.assertIsNone(result["numerical_check"])
+
+    def test_reasonableness_on_request(self):
+        model = Mock()
+        model.generate_content.return_value = Mock(
+            text="1. PRACTICAL REASONABLENESS: Sensible plan.\n\n2. SUGGESTIONS: Add a demand cap.")
+        with patch.object(validator, "get_model", return_value=model):
+            result = validator.validate_execution_results("p", "m", CODE, OUTPUT, reasonableness=True)
+        prompt = model.generate_content.call_args[0][0]
+        self.assertIn("All 2 constraints hold", prompt)
+        self.assertEqual(result["practical_reasonableness"], "Sensible plan.")
+        self.assertEqual(result["suggestions"], "Add a demand cap.")
+        self.assertEqual(result["validity_status"], "Valid")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Tests for the two-level solve cache."""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from response_cache import ResponseCache
+from solve_cache import canonicalize_problem, code_cache_key, coalesced, normalize_code
+
+try:
+    import pulp
+except ImportError:
+    pulp = None
+
+
+class TestSolveCache(unittest.TestCase):
+    """Test cases for code normalization, LP canonicalization and coalescing."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.tmpdir.name, "solve.sqlite3"), table="t")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_comments_and_whitespace_do_not_change_key(self):
+        """Code differing only in comments and spacing shares a level-1 key."""
+        a = "import pulp\n# build model\nx = 1+2\n\nprint( x )\n"
+        b = "import pulp\nx = 1 + 2  # sum\nprint(x)"
+        self.assertEqual(code_cache_key(a), code_cache_key(b))
+        self.assertNotEqual(code_cache_key(a), code_cache_key("import pulp\nx = 1 + 3\nprint(x)"))
+
+    def test_indentation_is_significant(self):
+        """Moving a statement out of a block changes the key."""
+        a = "for i in range(3):\n    pass\n    print(i)\n"
+        b = "for i in range(3):\n    pass\nprint(i)\n"
+        self.assertNotEqual(normalize_code(a), normalize_code(b))
+
+    def test_coalesced_computes_once(self):
+        """Concurrent identical requests run the computation only once."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"value": 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(coalesced(self.cache, "k", compute)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 42}] * 5)
+        self.assertEqual(coalesced(self.cache, "k", compute), {"value": 42})
+        self.assertEqual(len(calls), 1)
+
+    def test_uncacheable_results_are_not_stored(self):
+        """Results rejected by should_store are recomputed next time."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"ok": False}
+
+        coalesced(self.cache, "k2", compute, should_store=lambda r: r["ok"])
+        coalesced(self.cache, "k2", compute, should_store=lambda r: r["ok"])
+        self.assertEqual(len(calls), 2)
+
+    def hold_claim(self, key):
+        """A process holding the claim on `key` until it is killed."""
+        script = ("import sys, time; sys.path.insert(0, sys.argv[1]); from response_cache import ResponseCache; "
+                  "from solve_cache import _claim; "
+                  "print(_claim(ResponseCache(sys.argv[2], table='t'), sys.argv[3], 300), flush=True); time.sleep(60)")
+        holder = subprocess.Popen([sys.executable, "-c", script, os.path.join(os.path.dirname(__file__), '..', 'app'),
+                                   self.cache.path, key], stdout=subprocess.PIPE, text=True)
+        self.addCleanup(holder.wait)
+        self.addCleanup(holder.kill)
+        self.assertEqual(holder.stdout.readline().strip(), "True")
+        return holder
+
+    @unittest.skipUnless(os.name == "posix", "claim owners are checked with signals")
+    def test_claim_of_a_killed_process_is_not_waited_for(self):
+        """A solver child killed while holding a claim does not hold up the next identical solve."""
+        holder = self.hold_claim("k3")
+        os.kill(holder.pid, signal.SIGKILL)
+        holder.wait()
+        started = time.monotonic()
+        self.assertEqual(coalesced(self.cache, "k3", lambda: {"value": 1}), {"value": 1})
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_wait_for_a_live_claim_is_bounded(self):
+        """A live claim is waited for only wait_timeout seconds before computing here."""
+        self.hold_claim("k4")
+        started = time.monotonic()
+        self.assertEqual(coalesced(self.cache, "k4", lambda: {"value": 2}, wait_timeout=0.3), {"value": 2})
+        self.assertLess(time.monotonic() - started, 2)
+
+    @unittest.skipIf(pulp is None, "pulp is not installed")
+    def test_same_lp_built_differently_hashes_equally(self):
+        """Constraint order and names do not affect the canonical LP hash."""
+        def build(reverse):
+            model = pulp.LpProblem("m", pulp.LpMaximize)
+            x = pulp.LpVariable("x", lowBound=0)
+            y = pulp.LpVariable("y", lowBound=0)
+            model += 3 * x + 2 * y
+            rows = [(x + y <= 4, "c1"), (x + 3 * y <= 6, "c2")]
+            for expr, name in (reversed(rows) if reverse else rows):
+                model += expr, name + ("_b" if reverse else "")
+            return model
+
+        self.assertEqual(canonicalize_problem(build(False))[0], canonicalize_problem(build(True))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Tests for the solver backend registry and the "auto" backend policy."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import pulp
+
+import solver_backends
+from solver_backends import choose_backend, is_available, register_backend, solver_for
+from solver_engine import run_solver_code
+from solver_options import apply_options, validate_options
+
+LP_CODE = """import pulp
+model = pulp.LpProblem("product_mix", pulp.LpMaximize)
+chairs = pulp.LpVariable("chairs", 0)
+tables = pulp.LpVariable("tables", 0)
+model += 45 * chairs + 80 * tables
+model += 5 * chairs + 20 * tables <= 400, "wood"
+model += 10 * chairs + 15 * tables <= 450, "labour"
+status = model.solve(pulp.PULP_CBC_CMD(msg=True))
+print(f"Status: {pulp.LpStatus[status]}")
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+
+
+def product_mix(integer: bool):
+    problem = pulp.LpProblem("product_mix", pulp.LpMaximize)
+    chairs = pulp.LpVariable("chairs", 0, cat="Integer" if integer else "Continuous")
+    tables = pulp.LpVariable("tables", 0)
+    problem += 45 * chairs + 80 * tables
+    problem += 5 * chairs + 20 * tables <= 400
+    problem += 10 * chairs + 15 * tables <= 450
+    return problem
+
+
+class TestBackendChoice(unittest.TestCase):
+    """"auto" picks from the installed backends by problem class and size."""
+
+    def installed(self, *names):
+        return patch.dict(solver_backends._available, {name: name in names for name in solver_backends.BACKENDS})
+
+    def test_lp_and_mip(self):
+        with self.installed("cbc", "highs"):
+            self.assertEqual(choose_backend(product_mix(integer=False)), ("highs", "lp"))
+            self.assertEqual(choose_backend(product_mix(integer=True)), ("cbc", "mip"))
+        with self.installed("cbc"):
+            self.assertEqual(choose_backend(product_mix(integer=False)), ("cbc", "lp"))
+
+    def test_large_models_skip_the_in_process_solver(self):
+        with self.installed("cbc", "highs"), patch.dict(os.environ, {"SOLVER_AUTO_INPROCESS_MAX_NONZEROS": "3"}):
+            self.assertEqual(choose_backend(product_mix(integer=False)), ("cbc", "large_lp"))
+
+    def test_solver_for_keeps_a_shorter_limit_from_the_code(self):
+        with self.installed("cbc", "highs"):
+            solver, backend, reason = solver_for(product_mix(integer=True), pulp.PULP_CBC_CMD(timeLimit=3),
+                                                 {"backend": "auto", "timeLimit": 10, "threads": 2})
+        self.assertEqual((backend, reason, solver.timeLimit, solver.msg), ("cbc", "auto:mip", 3, False))
+        self.assertEqual(solver.optionsDict["threads"], 2)
+
+        code_solver = pulp.PULP_CBC_CMD(msg=True)
+        solver, backend, reason = solver_for(product_mix(integer=True), code_solver, {"backend": "code"})
+        self.assertIs(solver, code_solver)
+        self.assertEqual((backend, reason), ("code", "code"))
+
+    def test_registered_backends_can_be_requested(self):
+        register_backend("cbc_strong", lambda: pulp.PULP_CBC_CMD(msg=False, strong=10))
+        self.addCleanup(solver_backends.BACKENDS.pop, "cbc_strong")
+        self.assertEqual(validate_options({"backend": "cbc_strong"}), {"backend": "cbc_strong"})
+        solver, backend, _ = solver_for(product_mix(integer=True), None, {"backend": "cbc_strong"})
+        self.assertEqual((backend, solver.optionsDict["strong"]), ("cbc_strong", 10))
+        with self.assertRaises(ValueError):
+            validate_options({"backend": "gurobi"})
+
+    def test_highs_options_use_its_own_names(self):
+        solver = apply_options(pulp.HiGHS(msg=False), {"threads": 2, "gapRel": 0.01, "presolve": False,
+                                                        "warmStart": True, "timeLimit": 5})
+        self.assertEqual((solver.threads, solver.gapRel, solver.timeLimit), (2, 0.01, 5))
+        self.assertEqual(solver.optionsDict, {"presolve": "off"})
+
+
+class TestBackendReport(unittest.TestCase):
+    """The run reports which backend solved the model and how long it took."""
+
+    def setUp(self):
+        environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false", "SOLVE_CACHE_ENABLED": "false",
+                                              "SOLVER_BACKEND": ""})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_code_backend_keeps_the_code_solver(self):
+        result = run_solver_code(LP_CODE, timeout=20, solver_options={"backend": "code"})
+        self.assertFalse(result["error"])
+        self.assertEqual((result["solver"]["backend"], result["solver"]["solver"]), ("code", "PULP_CBC_CMD"))
+        self.assertGreater(result["solver"]["solve_seconds"], 0)
+
+    @unittest.skipUnless(is_available("highs"), "highspy is not installed")
+    def test_auto_solves_lps_with_highs(self):
+        result = run_solver_code(LP_CODE, timeout=20)
+        self.assertFalse(result["error"])
+        self.assertIn("Objective Value: 2200.0", result["output"])
+        self.assertNotIn("Cbc", result["output"])  # the code's msg=True is not carried over
+        self.assertEqual((result["solver"]["backend"], result["solver"]["backend_reason"]), ("highs", "auto:lp"))
+
+
+if __name__ == '__main__':
+    unittest.main()
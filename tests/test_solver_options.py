@@ -0,0 +1,127 @@
+"""Tests for the solver options injected into generated code's solves."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import pulp
+
+from solver_engine import _code_key, _is_cacheable_result, run_solver_code
+from solver_options import apply_options, resolve_options, validate_options
+
+SMALL_CODE = """import pulp
+model = pulp.LpProblem("m", pulp.LpMaximize)
+x = pulp.LpVariable("x", 0, 4, cat="Integer")
+model += 3 * x
+model += x <= 3, "cap"
+status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+print(f"Status: {pulp.LpStatus[status]}")
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+
+# A multi-dimensional knapsack that CBC does not prove optimal within a few seconds
+HARD_CODE = """import pulp
+import random
+random.seed(1)
+n = 300
+model = pulp.LpProblem("knapsack", pulp.LpMaximize)
+x = [pulp.LpVariable(f"x{i}", cat="Binary") for i in range(n)]
+weights = [[random.randint(10, 99) for _ in range(n)] for _ in range(15)]
+values = [random.randint(10, 99) for _ in range(n)]
+model += pulp.lpSum(values[i] * x[i] for i in range(n))
+for k, w in enumerate(weights):
+    model += pulp.lpSum(w[i] * x[i] for i in range(n)) <= sum(w) // 2, f"capacity_{k}"
+status = model.solve()
+print(f"Status: {pulp.LpStatus[status]}")
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+
+NO_ENV = {"LLM_CACHE_ENABLED": "false", "SOLVE_CACHE_ENABLED": "false", "SOLVER_THREADS": "",
+          "SOLVER_TIME_LIMIT": "", "SOLVER_GAP_REL": "", "SOLVER_PRESOLVE": "", "SOLVER_WARM_START": "",
+          "SOLVER_BACKEND": ""}
+
+
+class TestResolveOptions(unittest.TestCase):
+    """Server defaults come from the environment; requests override them within the time left."""
+
+    def test_defaults_and_overrides(self):
+        with patch.dict(os.environ, dict(NO_ENV, SOLVER_THREADS="2", SOLVER_GAP_REL="0.05",
+                                         SOLVER_PRESOLVE="false")):
+            self.assertEqual(resolve_options(), {"threads": 2, "gapRel": 0.05, "presolve": False,
+                                                 "warmStart": False, "backend": "auto"})
+            self.assertEqual(resolve_options({"threads": 4, "gapRel": None, "warmStart": True, "backend": "cbc"}),
+                             {"threads": 4, "gapRel": 0.05, "presolve": False, "warmStart": True, "backend": "cbc"})
+
+    def test_time_limit_ends_before_the_run_is_killed(self):
+        with patch.dict(os.environ, dict(NO_ENV, SOLVER_TIME_LIMIT_MARGIN="2")):
+            self.assertEqual(resolve_options(time_left=30)["timeLimit"], 28)
+            self.assertEqual(resolve_options({"timeLimit": 10}, time_left=30)["timeLimit"], 10)
+            self.assertEqual(resolve_options({"timeLimit": 60}, time_left=30)["timeLimit"], 28)
+            self.assertEqual(resolve_options(time_left=0.5)["timeLimit"], 1.0)
+            self.assertNotIn("timeLimit", resolve_options())
+
+    def test_invalid_options(self):
+        for bad in ({"threads": 0}, {"gapRel": 1.5}, {"timeLimit": -1}, {"nodes": 5}):
+            with self.assertRaises(ValueError):
+                validate_options(bad)
+
+    def test_apply_keeps_a_shorter_limit_from_the_code(self):
+        solver = apply_options(pulp.PULP_CBC_CMD(msg=False, timeLimit=5), {"timeLimit": 20, "gapRel": 0.1})
+        self.assertEqual((solver.timeLimit, solver.optionsDict["gapRel"]), (5, 0.1))
+        self.assertEqual(apply_options(pulp.PULP_CBC_CMD(msg=False), {"timeLimit": 20}).timeLimit, 20)
+
+
+class TestInjectedOptions(unittest.TestCase):
+    """Options reach the solve the code makes, and a search out of time returns its incumbent."""
+
+    def setUp(self):
+        environment = patch.dict(os.environ, NO_ENV)
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_options_reach_the_solver(self):
+        result = run_solver_code(SMALL_CODE, timeout=20, solver_options={"threads": 2, "gapRel": 0.01})
+        self.assertFalse(result["error"])
+        self.assertEqual(result["solver"]["solver"], "PULP_CBC_CMD")
+        self.assertEqual((result["solver"]["options"]["threads"], result["solver"]["options"]["gapRel"]), (2, 0.01))
+        self.assertLessEqual(result["solver"]["options"]["timeLimit"], 20)
+        self.assertEqual(result["solver"]["solution_status"], "Optimal Solution Found")
+        self.assertFalse(result["solver"]["limit_reached"])
+
+    def test_incumbent_is_returned_instead_of_a_timeout(self):
+        result = run_solver_code(HARD_CODE, timeout=5)
+        self.assertFalse(result["error"], result.get("error_details"))
+        self.assertNotIn("timed_out", result)
+        self.assertTrue(result["solver"]["limit_reached"])
+        self.assertEqual(result["solver"]["solution_status"], "Solution Found")
+        self.assertIn("Objective Value:", result["output"])
+        self.assertFalse(_is_cacheable_result({"returncode": 0, "timed_out": False,
+                                               "solve_report": result["solve_report"]}))
+
+    def test_gap_changes_the_code_cache_key(self):
+        self.assertEqual(_code_key(SMALL_CODE), _code_key(SMALL_CODE, {"threads": 3}))
+        self.assertNotEqual(_code_key(SMALL_CODE), _code_key(SMALL_CODE, {"gapRel": 0.1}))
+
+    def test_run_code_rejects_bad_options(self):
+        from app.ui.app import app
+        response = app.test_client().post("/run_code", data={"python_code": SMALL_CODE, "threads": "0"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_run_code_time_limit_is_capped_by_solver_timeout(self):
+        from app.ui.app import app
+        client = app.test_client()
+        with patch.dict(os.environ, {"SOLVER_TIMEOUT": "30"}):
+            for bad in ("0", "-5", "many"):
+                response = client.post("/run_code", data={"python_code": SMALL_CODE, "time_limit": bad})
+                self.assertEqual(response.status_code, 400, bad)
+            response = client.post("/run_code", data={"python_code": SMALL_CODE, "time_limit": "31"})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("POST /jobs", response.get_json()["error_details"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""Tests for the warm solver worker pool."""
+
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from multiprocessing import Pipe
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import solver_pool
+from solver_pool import SolverPool, fork_available
+
+
+@unittest.skipUnless(fork_available(), "solver pool requires os.fork")
+class TestSolverPool(unittest.TestCase):
+    """Test cases for SolverPool."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = SolverPool(size=2, max_tasks_per_worker=3, timeout=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def test_captures_stdout_and_return_code(self):
+        """Output and a zero return code come back from a successful run."""
+        result = self.pool.run("print('hello')\nimport sys; print('warn', file=sys.stderr)")
+        self.assertEqual(result["returncode"], 0)
+        self.assertEqual(result["stdout"], "hello\n")
+        self.assertEqual(result["stderr"], "warn\n")
+        self.assertFalse(result["timed_out"])
+
+    def test_exception_reports_traceback(self):
+        """An uncaught exception yields exit code 1 and a `python -c` style traceback."""
+        result = self.pool.run("x = 1\nraise ValueError('boom')")
+        self.assertEqual(result["returncode"], 1)
+        self.assertIn('File "<string>", line 2', result["stderr"])
+        self.assertIn("ValueError: boom", result["stderr"])
+        self.assertNotIn("solver_pool.py", result["stderr"])
+
+    def test_sys_exit_code(self):
+        """sys.exit codes are propagated."""
+        self.assertEqual(self.pool.run("import sys; sys.exit(3)")["returncode"], 3)
+
+    def test_timeout_kills_job(self):
+        """A job exceeding its timeout is killed and flagged."""
+        result = self.pool.run("import time; time.sleep(30)", timeout=0.5)
+        self.assertTrue(result["timed_out"])
+        self.assertNotEqual(result["returncode"], 0)
+
+    def test_cancel_kills_job_and_keeps_worker(self):
+        """Setting the cancel event ends a running job early; the worker stays usable."""
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        started = time.monotonic()
+        result = self.pool.run("import time; time.sleep(30)", timeout=20, cancel=cancel)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(result["cancelled"])
+        self.assertFalse(result["timed_out"])
+        self.assertEqual(self.pool.run("print('next')", cancel=threading.Event())["stdout"], "next\n")
+
+    def test_cancel_already_waiting_at_the_fork(self):
+        """A cancel read before the child has set up its process group still kills the job."""
+        pool_end, worker_end = Pipe()
+        self.addCleanup(pool_end.close)
+        self.addCleanup(worker_end.close)
+        pool_end.send("cancel")
+        started = time.monotonic()
+        result = solver_pool.run_job_in_fork({"code": "import time; time.sleep(30)", "timeout": 20}, worker_end)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(result["cancelled"])
+        self.assertGreater(pool_end.recv()["job_pid"], 0)
+
+    def test_jobs_are_isolated(self):
+        """State set by one job does not leak into the next one."""
+        self.pool.run("import builtins; builtins.leaked = 1")
+        result = self.pool.run("import builtins; print(hasattr(builtins, 'leaked'))")
+        self.assertEqual(result["stdout"], "False\n")
+
+    def test_workers_are_recycled(self):
+        """Workers are replaced after max_tasks_per_worker jobs and the pool keeps working."""
+        pids = set()
+        for _ in range(8):
+            pids.add(self.pool.run("import os; print(os.getppid())")["stdout"].strip())
+        self.assertGreater(len(pids), 2)
+
+
+def _running(pid: int) -> bool:
+    """Whether `pid` is a live process (a zombie nobody has reaped yet does not count)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+@unittest.skipUnless(fork_available() and os.path.isdir("/proc"), "needs os.fork and /proc")
+class TestWedgedWorkers(unittest.TestCase):
+    """A pool whose workers stop answering still bounds every run."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        environment = patch.dict(os.environ, {"TMPDIR": self.tmpdir.name})  # where the workers put job reports
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.pool = SolverPool(size=1, timeout=10)
+        self.addCleanup(self.pool.shutdown)
+        self.pool.start()
+
+    def test_killing_a_hung_worker_kills_its_job(self):
+        """The job and its process group die with a worker that missed its deadline."""
+        pid_path = os.path.join(self.tmpdir.name, "job.pid")
+        worker = self.pool._idle.queue[0]
+
+        def stop_worker_once_the_job_runs():
+            while not os.path.exists(pid_path):
+                time.sleep(0.01)
+            os.kill(worker.process.pid, signal.SIGSTOP)  # the worker's own watchdog stops with it
+
+        threading.Thread(target=stop_worker_once_the_job_runs, daemon=True).start()
+        code = f"import os\nopen({pid_path!r}, 'w').write(str(os.getpid()))\nwhile True:\n    pass\n"
+        with patch.object(solver_pool, "WORKER_GRACE_SECONDS", 0.5):
+            result = self.pool.run(code, timeout=1)
+        self.assertTrue(result["timed_out"])
+        with open(pid_path) as f:
+            job_pid = int(f.read())
+        deadline = time.monotonic() + 5
+        while _running(job_pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(_running(job_pid))
+        self.assertEqual([name for name in os.listdir(self.tmpdir.name) if name.startswith("solve-report-")], [])
+
+    def test_waiting_for_a_worker_is_bounded(self):
+        """A run that gets no worker within its timeout comes back timed out."""
+        busy = threading.Thread(target=self.pool.run, args=("import time; time.sleep(2)",), kwargs={"timeout": 5})
+        busy.start()
+        self.addCleanup(busy.join)
+        time.sleep(0.3)
+        started = time.monotonic()
+        result = self.pool.run("print('late')", timeout=0.5)
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertTrue(result["timed_out"])
+        self.assertIn("No solver worker became free", result["stderr"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Tests for racing a portfolio of solver configurations on one model."""
+
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import pulp
+
+import solver_backends
+from solver_engine import run_solver_code
+from solver_options import format_member, parse_portfolio
+from solver_portfolio import member_options, race
+
+CODE = """import pulp
+model = pulp.LpProblem("product_mix", pulp.LpMaximize)
+chairs = pulp.LpVariable("chairs", 0, cat="Integer")
+tables = pulp.LpVariable("tables", 0, cat="Integer")
+model += 45 * chairs + 80 * tables
+model += 5 * chairs + 20 * tables <= 400, "wood"
+model += 10 * chairs + 15 * tables <= 450, "labour"
+status = model.solve()
+print(f"Status: {pulp.LpStatus[status]}")
+print(f"Objective Value: {pulp.value(model.objective)}")
+"""
+
+
+def knapsack(n: int, dimensions: int):
+    """A multi-dimensional knapsack; with n=300 and 15 dimensions CBC needs far more than a second."""
+    random.seed(1)
+    problem = pulp.LpProblem("knapsack", pulp.LpMaximize)
+    x = [pulp.LpVariable(f"x{i}", cat="Binary") for i in range(n)]
+    values = [random.randint(10, 99) for _ in range(n)]
+    problem += pulp.lpSum(values[i] * x[i] for i in range(n))
+    for k in range(dimensions):
+        weights = [random.randint(10, 99) for _ in range(n)]
+        problem += pulp.lpSum(weights[i] * x[i] for i in range(n)) <= sum(weights) // 2, f"capacity_{k}"
+    return problem
+
+
+class TestPortfolioSpec(unittest.TestCase):
+    """Portfolio specs name backends with their own options."""
+
+    def test_parse(self):
+        members = parse_portfolio("cbc cbc:presolve=false,gapRel=0.01,threads=2")
+        self.assertEqual(members, [{"backend": "cbc"},
+                                   {"backend": "cbc", "presolve": False, "gapRel": 0.01, "threads": 2}])
+        self.assertEqual(parse_portfolio(" ".join(format_member(member) for member in members)), members)
+        self.assertEqual(parse_portfolio("false"), [])
+        self.assertIsNone(parse_portfolio(""))
+        for bad in ("cbc:presolve", "gurobi", "cbc:nodes=5"):
+            with self.assertRaises(ValueError):
+                parse_portfolio(bad)
+        with self.assertRaises(ValueError):
+            parse_portfolio([{"backend": "cbc", "portfolio": "cbc"}])
+
+    def test_default_members_skip_missing_backends(self):
+        installed = {name: name == "cbc" for name in solver_backends.BACKENDS}
+        with patch.dict(solver_backends._available, installed), \
+                patch.dict(os.environ, {"SOLVER_PORTFOLIO_MEMBERS": "cbc highs cbc:presolve=false"}):
+            self.assertEqual(parse_portfolio(True), [{"backend": "cbc"}, {"backend": "cbc", "presolve": False}])
+
+    def test_member_budget(self):
+        with patch.dict(os.environ, {"SOLVER_PORTFOLIO_THREADS": ""}):
+            options = {"threads": 4, "timeLimit": 10, "portfolio": [{}, {}]}
+            self.assertEqual(member_options({"backend": "cbc"}, options, 2),
+                             {"threads": 2, "timeLimit": 10, "backend": "cbc"})
+            self.assertEqual(member_options({"backend": "cbc", "threads": 3, "timeLimit": 60}, options, 2),
+                             {"threads": 3, "timeLimit": 10, "backend": "cbc"})
+        with patch.dict(os.environ, {"SOLVER_PORTFOLIO_THREADS": "1"}):
+            self.assertEqual(member_options({"backend": "cbc"}, {"threads": 4}, 2)["threads"], 1)
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "portfolios race forked processes")
+class TestRace(unittest.TestCase):
+    """The first proven answer wins; without one, the best incumbent does."""
+
+    def test_first_proven_answer_wins(self):
+        reference = knapsack(40, 5)
+        reference.solve(pulp.PULP_CBC_CMD(msg=False))
+        problem = knapsack(40, 5)
+        entry = {}
+        status = race(pulp.LpProblem.solve, problem, parse_portfolio("cbc cbc:presolve=false"),
+                      {"timeLimit": 20}, entry)
+        self.assertEqual((status, problem.sol_status), (pulp.LpStatusOptimal, pulp.LpSolutionOptimal))
+        self.assertEqual(pulp.value(problem.objective), pulp.value(reference.objective))
+        portfolio = entry["portfolio"]
+        self.assertEqual(portfolio["won_by"], "proven")
+        self.assertEqual(portfolio["members"][portfolio["winner"]]["outcome"], "won")
+        self.assertEqual(entry["solver"], "PULP_CBC_CMD")
+
+    def test_best_incumbent_wins_at_the_time_limit(self):
+        problem = knapsack(300, 15)
+        entry = {}
+        status = race(pulp.LpProblem.solve, problem, parse_portfolio("cbc cbc:presolve=false"),
+                      {"timeLimit": 1}, entry)
+        self.assertEqual((status, problem.sol_status), (pulp.LpStatusOptimal, pulp.LpSolutionIntegerFeasible))
+        portfolio = entry["portfolio"]
+        self.assertEqual(portfolio["won_by"], "best_incumbent")
+        objectives = [member["objective"] for member in portfolio["members"]]
+        self.assertEqual(pulp.value(problem.objective), max(objectives))
+
+    def test_failing_member_does_not_stop_the_race(self):
+        def broken():
+            raise RuntimeError("not configured")
+
+        solver_backends.register_backend("broken", broken)
+        self.addCleanup(solver_backends.BACKENDS.pop, "broken")
+        entry = {}
+        race(pulp.LpProblem.solve, knapsack(40, 5), [{"backend": "broken"}, {"backend": "cbc"}], {"timeLimit": 20},
+             entry)
+        members = entry["portfolio"]["members"]
+        self.assertEqual((members[0]["outcome"], members[1]["outcome"]), ("error", "won"))
+        self.assertIn("not configured", members[0]["error"])
+
+
+class TestPortfolioRun(unittest.TestCase):
+    """run_solver_code races the portfolio on the model the generated code builds."""
+
+    def setUp(self):
+        environment = patch.dict(os.environ, {"LLM_CACHE_ENABLED": "false", "SOLVE_CACHE_ENABLED": "false",
+                                              "SOLVER_PORTFOLIO": ""})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_run_reports_the_winner(self):
+        result = run_solver_code(CODE, timeout=30, portfolio="cbc cbc:presolve=false")
+        self.assertFalse(result["error"], result["error_details"])
+        self.assertIn("Objective Value: 2200.0", result["output"])
+        self.assertEqual(result["solver"]["backend"], "portfolio")
+        portfolio = result["solver"]["portfolio"]
+        self.assertEqual([member["spec"] for member in portfolio["members"]], ["cbc", "cbc:presolve=False"])
+        self.assertIn(portfolio["winner"], (0, 1))
+
+    def test_without_a_portfolio_the_model_is_solved_once(self):
+        result = run_solver_code(CODE, timeout=30, portfolio=False)
+        self.assertIsNone(result["solver"]["portfolio"])
+
+    def test_run_code_rejects_bad_portfolios(self):
+        from app.ui.app import app
+        response = app.test_client().post("/run_code", data={"python_code": CODE, "portfolio": "cbc:threads=0"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Tests for speculative multi-candidate code generation."""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+import solver_engine
+from solver_pool import shutdown_solver_pool
+
+OPTIMAL = """
+import pulp
+model = pulp.LpProblem("m", pulp.LpMaximize)
+x = pulp.LpVariable("x", 0, 4)
+model += x
+status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+print(f"Status: {pulp.LpStatus[status]}")
+"""
+SLOW = "import time\ntime.sleep(30)\n" + OPTIMAL
+INFEASIBLE = OPTIMAL.replace("model += x\n", "model += x\nmodel += x >= 5\n")
+BROKEN = "x = 1 if y\nmodel.solve()"
+
+
+class Slots:
+    """A one-slot semaphore that records how many holders it ever had at once."""
+
+    def __init__(self):
+        self.semaphore = threading.BoundedSemaphore(1)
+        self.lock = threading.Lock()
+        self.holders = self.peak = self.taken = 0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        with self.lock:
+            self.holders += 1
+            self.taken += 1
+            self.peak = max(self.peak, self.holders)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.holders -= 1
+        self.semaphore.release()
+
+
+class TestSpeculativeCodegen(unittest.TestCase):
+    """Test cases for generate_code_speculatively with Gemini replaced by fixed programs."""
+
+    def setUp(self):
+        # One worker per candidate, so that the runs really overlap
+        environment = patch.dict(os.environ, {"SOLVE_CACHE_ENABLED": "false", "SOLVER_TIMEOUT": "20",
+                                              "SOLVER_POOL_SIZE": "3"})
+        environment.start()
+        shutdown_solver_pool()
+        self.addCleanup(shutdown_solver_pool)
+        self.addCleanup(environment.stop)
+
+    def speculate(self, programs, **kwargs):
+        """Runs the race with candidate i answered by programs[i]."""
+        by_temperature = dict(zip(solver_engine.candidate_temperatures(len(programs)), programs))
+
+        def fake_generate(model_plaintext, api_key=None, use_cache=True, temperature=None, **overrides):
+            return by_temperature[temperature]
+
+        with patch.object(solver_engine, "generate_pulp_code", side_effect=fake_generate) as generate:
+            result = solver_engine.generate_code_speculatively("model", len(programs), **kwargs)
+        return result, generate
+
+    def test_first_optimal_candidate_wins_and_slow_runs_are_cancelled(self):
+        started = time.monotonic()
+        result, _ = self.speculate([BROKEN, SLOW, OPTIMAL])
+        self.assertLess(time.monotonic() - started, 15)
+        self.assertEqual(result["winner"], 2)
+        self.assertEqual(result["python_code"], OPTIMAL)
+        self.assertEqual([c["status"] for c in result["candidates"]], ["rejected", "cancelled", "optimal"])
+        self.assertIn("[syntax]", result["candidates"][0]["error"])
+        self.assertEqual(result["execution"]["returncode"], 0)
+
+    def test_without_an_optimum_the_first_clean_run_is_returned(self):
+        result, _ = self.speculate([BROKEN, INFEASIBLE])
+        self.assertIsNone(result["winner"])
+        self.assertEqual(result["python_code"], INFEASIBLE)
+        self.assertEqual(result["candidates"][1]["status"], "not_optimal")
+
+    def test_candidate_count_and_token_limit_are_bounded(self):
+        with patch.dict(os.environ, {"CODEGEN_MAX_CANDIDATES": "2"}):
+            result, generate = self.speculate([OPTIMAL, OPTIMAL], max_output_tokens=512)
+        self.assertEqual(len(result["candidates"]), 2)
+        for call in generate.call_args_list:
+            self.assertEqual(call.kwargs["max_output_tokens"], 512)
+
+    def test_candidates_take_llm_and_solver_slots(self):
+        llm_slots, solver_slots = Slots(), Slots()
+        result, _ = self.speculate([INFEASIBLE, INFEASIBLE, INFEASIBLE], llm_slots=llm_slots,
+                                   solver_slots=solver_slots)
+        self.assertEqual([c["status"] for c in result["candidates"]], ["not_optimal"] * 3)
+        self.assertEqual((llm_slots.taken, llm_slots.peak), (3, 1))
+        self.assertEqual((solver_slots.taken, solver_slots.peak), (3, 1))
+
+
+class TestCandidateFormFields(unittest.TestCase):
+    """Routes answer 400 naming the field when a number field is not a number."""
+
+    def test_non_numeric_fields(self):
+        from app.ui.app import app
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["gemini_api_key"] = "key"
+        requests = [
+            ("/generate_code", {"model_plaintext": "max x", "candidates": "many"}, "candidates"),
+            ("/generate_code", {"model_plaintext": "max x", "max_output_tokens": "1e3"}, "max_output_tokens"),
+            ("/pipeline", {"problem_statement": "p", "candidates": "two"}, "candidates"),
+            ("/jobs", {"problem_statement": "p", "candidates": "two"}, "candidates"),
+            ("/repair_code", {"python_code": OPTIMAL, "max_iterations": "x"}, "max_iterations"),
+        ]
+        for route, form, field in requests:
+            response = client.post(route, data=form)
+            self.assertEqual(response.status_code, 400, route)
+            body = response.get_json()
+            self.assertIn(field, body.get("error_details") or body["error"], route)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Tests for the cold-start import profile and the lazy imports it guards."""
+
+import os
+import subprocess
+import sys
+import unittest
+
+# Application modules import each other by module name, so put 'app' on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from startup_profile import TARGETS, format_profile, parse_importtime, profile_target
+
+LOG = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2000 |       5000 |     numpy.core
+import time:       900 |       5900 |   numpy
+import time:       300 |       6200 | solution_check
+"""
+
+
+class TestStartupProfile(unittest.TestCase):
+    """The importtime log is parsed into per-module timings."""
+
+    def test_parse_importtime(self):
+        entries = parse_importtime(LOG + "some other stderr line\n")
+        self.assertEqual([entry["module"] for entry in entries], ["_io", "numpy.core", "numpy", "solution_check"])
+        self.assertEqual([entry["depth"] for entry in entries], [1, 2, 1, 0])
+        self.assertEqual((entries[3]["self_us"], entries[3]["cumulative_us"]), (300, 6200))
+
+    def test_profile_of_worker(self):
+        profile = profile_target("worker", runs=1, top=5)
+        self.assertEqual((profile["target"], profile["runs"]), ("worker", 1))
+        self.assertLessEqual(len(profile["modules"]), 5)
+        self.assertGreater(profile["process_ms"], 0)
+        self.assertIn("worker: imports", format_profile(profile))
+
+    def test_web_app_import_leaves_heavy_libraries_unloaded(self):
+        directory, statement = TARGETS["web"]
+        check = statement + "; import sys; print(sorted({'google.generativeai', 'numpy'} & set(sys.modules)))"
+        completed = subprocess.run([sys.executable, "-W", "ignore", "-c", check], cwd=directory,
+                                   capture_output=True, text=True, check=True)
+        self.assertEqual(completed.stdout.strip().splitlines()[-1], "[]")
+
+    def test_cli_import_has_no_side_effects(self):
+        directory, statement = TARGETS["cli"]
+        check = statement + "; import sys; print(sorted({'dotenv'} & set(sys.modules)))"
+        environment = {name: value for name, value in os.environ.items() if name != "GEMINI_API_KEY"}
+        completed = subprocess.run([sys.executable, "-W", "ignore", "-c", check], cwd=directory, env=environment,
+                                   capture_output=True, text=True, check=True)
+        self.assertEqual(completed.stdout.strip(), "[]")
+
+
+if __name__ == '__main__':
+    unittest.main()